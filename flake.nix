@@ -85,8 +85,58 @@
           echo "---------------------------------------------"
         '';
 
+        # Prebuilds the Home Manager and nix-darwin indexes (needs network, so it is an app, not a derivation)
+        buildIndexScript = pkgs.writeShellScriptBin "build-index" ''
+          set -e
+          if [ $# -ne 1 ]; then
+            echo "Usage: build-index DIR (mcp_nixos/data/prebuilt to bundle them into the next build)"
+            exit 1
+          fi
+          if [ -z "$VIRTUAL_ENV" ]; then
+            if [ ! -d ".venv" ]; then ${setupVenvScript}/bin/setup-venv; fi
+            source .venv/bin/activate
+          fi
+          python -m mcp_nixos --build-index "$1"
+        '';
+
+        # The server, with the output of build-index bundled if given:
+        #   nix run .#build-index -- ./prebuilt
+        #   nix build --impure --expr '(builtins.getFlake (toString ./.)).packages.${builtins.currentSystem}.default.override { prebuiltIndex = ./prebuilt; }'
+        mcp-nixos = pkgs.callPackage
+          ({ prebuiltIndex ? null }:
+            ps.buildPythonApplication {
+              pname = "mcp-nixos";
+              version = "0.4.0";
+              pyproject = true;
+              src = ./.;
+              build-system = [ ps.hatchling ];
+              dependencies = with ps; [
+                mcp
+                requests
+                python-dotenv
+                beautifulsoup4
+                psutil
+              ];
+              postPatch = pkgs.lib.optionalString (prebuiltIndex != null) ''
+                mkdir -p mcp_nixos/data/prebuilt
+                cp ${prebuiltIndex}/* mcp_nixos/data/prebuilt/
+              '';
+              doCheck = false;
+              pythonImportsCheck = [ "mcp_nixos" ];
+            })
+          { };
+
       in
       {
+        packages.default = mcp-nixos;
+        packages.mcp-nixos = mcp-nixos;
+
+        # nix run .#build-index -- DIR, then point MCP_NIXOS_PREBUILT_INDEX_DIR at DIR (or bundle it, see above)
+        apps.build-index = {
+          type = "app";
+          program = "${buildIndexScript}/bin/build-index";
+        };
+
         # Create a separate shell for website development
         devShells.web = pkgs.devshell.mkShell {
           name = "mcp-nixos-web";
@@ -332,14 +382,26 @@
             {
               name = "build";
               category = "distribution";
-              help = "Build package distributions (sdist and wheel)";
+              help = "Build package distributions (sdist and wheel) with the prebuilt indexes bundled";
               command = ''
+                echo "--- Building prebuilt indexes ---"
+                rm -rf mcp_nixos/data/prebuilt
+                if ! ${buildIndexScript}/bin/build-index mcp_nixos/data/prebuilt; then
+                  echo "Warning: building without prebuilt indexes"
+                  rm -rf mcp_nixos/data/prebuilt
+                fi
                  echo "--- Building package ---"
                 rm -rf dist/ build/ *.egg-info
                 python -m build
                 echo "✅ Build complete in dist/"
               '';
             }
+            {
+              name = "build-index";
+              category = "distribution";
+              help = "Prebuild the Home Manager and nix-darwin indexes into DIR (mcp_nixos/data/prebuilt to bundle them)";
+              command = "${buildIndexScript}/bin/build-index \"$@\"";
+            }
             {
               name = "publish";
               category = "distribution";
@@ -11,13 +11,18 @@ import sys
 import os
 
 # Import mcp from server
-from mcp_nixos.server import mcp, logger, run_precache
+from mcp_nixos.server import mcp, logger, run_precache, build_prebuilt_index
 
 
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="MCP-NixOS server")
     parser.add_argument("--pre-cache", action="store_true", help="Run initialization to populate cache and then exit")
+    parser.add_argument(
+        "--build-index",
+        metavar="DIR",
+        help="Build the Home Manager and nix-darwin indexes into DIR and exit",
+    )
     return parser.parse_args()
 
 
@@ -36,6 +41,16 @@ def main():
         logger.info("Running under Windsurf - monitoring for restart/refresh signals")
 
     try:
+        if args.build_index is not None:
+            logger.info("Running in build-index mode - will exit after the indexes are written")
+            results = build_prebuilt_index(args.build_index)
+            failed = [source for source, result in results.items() if "error" in result]
+            if failed:
+                logger.error(f"Building the prebuilt index failed for: {', '.join(failed)}")
+                return 1
+            logger.info("Prebuilt indexes built successfully")
+            return 0
+
         if args.pre_cache:
             logger.info("Running in pre-cache mode - will exit after caching completes")
             run_precache()
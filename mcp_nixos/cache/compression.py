@@ -0,0 +1,124 @@
+"""
+Compression codecs for cached content.
+
+Cache entries are compressed with zstd when the optional ``zstandard`` package is
+installed and with gzip otherwise. The codec used for an entry is recorded in its
+metadata, and payloads are also recognised by their magic bytes, so entries
+written uncompressed (or with a different codec) remain readable.
+"""
+
+import gzip
+import logging
+import os
+from typing import Optional
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+CODECS = (IDENTITY, GZIP, ZSTD)
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_MAGIC = {
+    GZIP: b"\x1f\x8b",
+    ZSTD: b"\x28\xb5\x2f\xfd",
+}
+
+
+def zstd_available() -> bool:
+    """Return True if the zstandard package is installed."""
+    return zstandard is not None
+
+
+def resolve_codec(name: Optional[str] = None) -> str:
+    """
+    Resolve a configured compression setting to a codec name.
+
+    Args:
+        name: "auto", "zstd", "gzip" or "none" (default: MCP_NIXOS_CACHE_COMPRESSION or "auto")
+
+    Returns:
+        The codec to use for new entries
+    """
+    name = (name or os.environ.get("MCP_NIXOS_CACHE_COMPRESSION", "auto")).strip().lower()
+    if name in ("none", "off", "false", IDENTITY):
+        return IDENTITY
+    if name == ZSTD and not zstd_available():
+        logger.warning("zstd compression requested but zstandard is not installed, using gzip")
+        return GZIP
+    if name == "auto":
+        return ZSTD if zstd_available() else GZIP
+    if name not in CODECS:
+        logger.warning(f"Unknown cache compression '{name}', using gzip")
+        return GZIP
+    return name
+
+
+def detect_codec(payload: bytes) -> str:
+    """
+    Identify the codec of a payload from its magic bytes.
+
+    Returns:
+        The detected codec, or "identity" if the payload is not compressed
+    """
+    for codec, magic in _MAGIC.items():
+        if payload.startswith(magic):
+            return codec
+    return IDENTITY
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """
+    Compress data with the given codec.
+
+    Args:
+        data: Raw bytes
+        codec: Codec name
+
+    Returns:
+        Compressed bytes (unchanged for "identity")
+    """
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == GZIP:
+        # mtime=0 keeps output deterministic for identical content
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return data
+
+
+def decompress(payload: bytes, codec: Optional[str] = None) -> bytes:
+    """
+    Decompress a payload.
+
+    The codec tag from the entry metadata is preferred, but the payload's magic
+    bytes win when they disagree, e.g. when a data file and its sidecar were
+    replaced at slightly different times.
+
+    Args:
+        payload: Stored bytes
+        codec: Codec recorded in the entry metadata, if any
+
+    Returns:
+        Decompressed bytes
+    """
+    detected = detect_codec(payload)
+    if codec != detected:
+        if codec is not None:
+            logger.debug(f"Cache entry tagged as {codec} but looks like {detected}, using {detected}")
+        codec = detected
+    if codec == ZSTD:
+        if zstandard is None:
+            raise ValueError("Cache entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(payload)
+    if codec == GZIP:
+        return gzip.decompress(payload)
+    return payload
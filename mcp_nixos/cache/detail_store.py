@@ -0,0 +1,333 @@
+"""
+Option details kept on disk until an option is looked up.
+
+Searches, prefix listings and stats read only a few fields of the options they
+go through (name, type, description and the fields they group or filter by),
+but every option also comes with a default, an example, a declaration or manual
+link and so on, which were held in memory for thousands of options although
+only the few options a query returns show them. A DetailStore keeps those
+details in a file instead: the details of each option are appended once as a
+small JSON array, the option keeps its summary fields and the number of its
+entry, and the entry is found through an array of file offsets. Entries read back are kept in a small
+LRU cache, since an option looked up is usually looked up again.
+
+What this saves is the heap the details would hold once loading is done, which
+is little next to the search indexes. The details are still decoded in full
+while pages are parsed or a snapshot is read, so peak and resident size, which
+follows the peak, stay about the same.
+
+Details moved out of freshly parsed options go to an unnamed temporary file,
+deleted as soon as it is closed, in the cache directory rather than the system
+temp directory, which may be RAM-backed. Entries are never rewritten, so they
+stay valid for every index generation that still refers to them; the file is
+closed once the last of them is gone.
+
+When a snapshot is saved, the details of its options are also written, in
+snapshot order, to a detail file in the same cache that every later load
+reopens instead of writing the details out again:
+
+    header    magic, entry count, length of the field list
+    fields    JSON list of the field names
+    offsets   entry count + 1 little-endian uint64 offsets into the entries
+    entries   one JSON array per option
+
+Detail files are named after a digest of their content and never modified; the
+snapshot names the one holding its details. The cache stores them like its other
+entries (see HTMLCache.set_details), so they are written by the write-behind
+queue and count against the disk budget. A store reopened from a detail file
+appends to a temporary file of its own, so processes sharing it never write to it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("mcp_nixos")
+
+DEFAULT_CACHE_SIZE = 128
+
+# Detail file header: magic, entry count, length of the JSON field list
+MAGIC = b"MNXDETL\x00"
+_HEADER = struct.Struct("<8sQI")
+
+# Detail files kept besides the newest, for processes loading the snapshot that named them
+KEEP_PREVIOUS = 1
+
+
+def lazy_details_enabled() -> bool:
+    """Whether option details are kept on disk (MCP_NIXOS_LAZY_DETAILS, default true)."""
+    return os.environ.get("MCP_NIXOS_LAZY_DETAILS", "true").lower() in ("1", "true", "yes")
+
+
+def detail_cache_size() -> int:
+    """Entries a detail store keeps in memory (MCP_NIXOS_DETAIL_CACHE_SIZE, default 128)."""
+    try:
+        return max(0, int(os.environ.get("MCP_NIXOS_DETAIL_CACHE_SIZE", DEFAULT_CACHE_SIZE)))
+    except ValueError:
+        logger.warning("Invalid MCP_NIXOS_DETAIL_CACHE_SIZE, using default")
+        return DEFAULT_CACHE_SIZE
+
+
+def _offsets_bytes(offsets: array) -> bytes:
+    if sys.byteorder != "little":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def encode_details(kind: str, fields: Sequence[str], entries: Iterable[Sequence[Any]]) -> Tuple[str, List[bytes]]:
+    """
+    Build a detail file.
+
+    Args:
+        kind: What the details belong to, e.g. "home_manager"
+        fields: Names of the values in each entry
+        entries: Values of each entry, in ``fields`` order and in the order they are read back by
+
+    Returns:
+        Tuple of (file name, content), the name made of the kind and a digest of the content
+    """
+    offsets = array("Q", [0])
+    chunks = []
+    for values in entries:
+        if len(values) != len(fields):
+            raise ValueError(f"Detail entries have {len(fields)} values, got {len(values)}")
+        chunk = json.dumps(list(values), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    field_bytes = json.dumps(list(fields)).encode("utf-8")
+    header = _HEADER.pack(MAGIC, len(offsets) - 1, len(field_bytes))
+    content = [header, field_bytes, _offsets_bytes(offsets), *chunks]
+    digest = hashlib.sha256()
+    for part in content:
+        digest.update(part)
+    return f"{kind}-{digest.hexdigest()[:16]}.details", content
+
+
+def save_details(cache: Any, kind: str, fields: Sequence[str], entries: Iterable[Sequence[Any]]) -> Optional[str]:
+    """
+    Store the details of a snapshot's options in a cache, unless MCP_NIXOS_LAZY_DETAILS is off.
+
+    Args:
+        cache: HTMLCache the snapshot is saved to
+        kind: Key of the snapshot
+        fields: Names of the values in each entry
+        entries: Values of each option, in snapshot order
+
+    Returns:
+        Name of the detail file, for the snapshot metadata, or None if none was stored
+    """
+    if cache is None or not lazy_details_enabled():
+        return None
+    name, content = encode_details(kind, fields, entries)
+    result = cache.set_details(name, content, keep_previous=KEEP_PREVIOUS)
+    if not result.get("stored"):
+        logger.warning(f"Cannot write option detail file for {kind}: {result.get('error')}")
+        return None
+    return name
+
+
+class DetailStore:
+    """Append-only file of option details, read back by entry number through an LRU cache."""
+
+    def __init__(
+        self, fields: Sequence[str], directory: Optional[pathlib.Path] = None, cache_size: Optional[int] = None
+    ):
+        """
+        Create the file.
+
+        Args:
+            fields: Names of the values in each entry, in order
+            directory: Where to create the file (default: the system temp directory)
+            cache_size: Entries kept in memory (default: detail_cache_size())
+
+        Raises:
+            OSError: If the file cannot be created
+        """
+        self._setup(fields, directory, cache_size)
+        self._file = self._create_file()
+
+    def _setup(self, fields: Sequence[str], directory: Optional[pathlib.Path], cache_size: Optional[int]) -> None:
+        self.fields = tuple(fields)
+        self.cache_size = detail_cache_size() if cache_size is None else max(0, cache_size)
+        self.path: Optional[pathlib.Path] = None  # Detail file holding the first entries, if reopened from one
+        self._directory = directory
+        self._saved: Optional[IO[bytes]] = None
+        self._saved_offsets = array("Q", [0])  # Saved entry N spans offsets N to N + 1 after _saved_start
+        self._saved_start = 0
+        self._file: Optional[IO[bytes]] = None
+        self._offsets = array("Q", [0])  # Entry len(_saved_offsets) - 1 + N spans offsets N to N + 1
+        self._appending = True  # Whether the file position is at the end
+        self._cache: "OrderedDict[int, Tuple[Any, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _create_file(self) -> IO[bytes]:
+        return tempfile.TemporaryFile(prefix="mcp_nixos-details-", dir=self._directory)
+
+    @classmethod
+    def open(
+        cls,
+        path: pathlib.Path,
+        fields: Sequence[str],
+        entries: int,
+        directory: Optional[pathlib.Path] = None,
+        cache_size: Optional[int] = None,
+    ) -> Optional["DetailStore"]:
+        """
+        Reopen a detail file built by encode_details, or None if it is missing or does not match.
+
+        Args:
+            path: The detail file
+            fields: Names of the values each entry must have
+            entries: Number of entries it must hold
+            directory: Where to create the file for entries appended later
+            cache_size: Entries kept in memory (default: detail_cache_size())
+        """
+        try:
+            f = open(path, "rb")
+        except OSError as e:
+            logger.info(f"Cannot open option detail file {path.name}: {e}")
+            return None
+        try:
+            magic, count, fields_length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or count != entries or json.loads(f.read(fields_length)) != list(fields):
+                raise ValueError("it holds other details")
+            offsets = array("Q")
+            offsets.frombytes(f.read(8 * (count + 1)))
+            if sys.byteorder != "little":
+                offsets.byteswap()
+            start = _HEADER.size + fields_length + 8 * (count + 1)
+            if len(offsets) != count + 1 or os.fstat(f.fileno()).st_size != start + offsets[-1]:
+                raise ValueError("it is truncated")
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring option detail file {path.name}: {e}")
+            f.close()
+            return None
+
+        store = cls.__new__(cls)
+        store._setup(fields, directory, cache_size)  # The temporary file is created on the first append
+        store.path = path
+        store._saved, store._saved_offsets, store._saved_start = f, offsets, start
+        return store
+
+    @classmethod
+    def for_cache(cls, cache: Any, fields: Sequence[str]) -> Optional["DetailStore"]:
+        """
+        Store in a cache's directory, or None if no file can be created there.
+
+        Args:
+            cache: HTMLCache whose cache_dir holds the file (the system temp directory is used without one)
+            fields: Names of the values in each entry
+        """
+        cache_dir = getattr(cache, "cache_dir", None)
+        directory = cache_dir if isinstance(cache_dir, pathlib.Path) and cache_dir.is_dir() else None
+        try:
+            return cls(fields, directory)
+        except OSError as e:
+            logger.warning(f"Cannot create option detail file, keeping details in memory: {e}")
+            return None
+
+    @classmethod
+    def for_snapshot(cls, cache: Any, name: Any, fields: Sequence[str], entries: int) -> Optional["DetailStore"]:
+        """
+        Reopen the detail file a snapshot names (see save_details), or None if it is unusable or lazy details are off.
+
+        Args:
+            cache: HTMLCache the snapshot was loaded from
+            name: Detail file named in the snapshot metadata
+            fields: Names of the values each entry must have
+            entries: Number of options in the snapshot
+        """
+        if cache is None or not lazy_details_enabled():
+            return None
+        path = cache.get_details_path(name)
+        if not isinstance(path, pathlib.Path):
+            return None
+        return cls.open(path, fields, entries, directory=cache.cache_dir)
+
+    def append(self, values: Sequence[Any]) -> int:
+        """
+        Write the details of one option.
+
+        Args:
+            values: JSON-serializable values, in ``fields`` order
+
+        Returns:
+            The entry number to read them back with
+        """
+        if len(values) != len(self.fields):
+            raise ValueError(f"Detail entries have {len(self.fields)} values, got {len(values)}")
+        data = json.dumps(list(values), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                self._file = self._create_file()
+            elif not self._appending:
+                self._file.seek(0, os.SEEK_END)
+                self._appending = True
+            self._file.write(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+            return len(self) - 1
+
+    def read(self, entry: int) -> Tuple[Any, ...]:
+        """
+        Details of one option, in ``fields`` order.
+
+        Raises:
+            IndexError: If there is no such entry
+            OSError: If the file cannot be read
+        """
+        with self._lock:
+            values = self._cache.get(entry)
+            if values is not None:
+                self._cache.move_to_end(entry)
+                self.hits += 1
+                return values
+            self.misses += 1
+            saved = len(self._saved_offsets) - 1
+            if entry < saved:
+                start = self._saved_start + self._saved_offsets[entry]
+                end = self._saved_start + self._saved_offsets[entry + 1]
+                f = self._saved
+            else:
+                start, end = self._offsets[entry - saved], self._offsets[entry - saved + 1]
+                f = self._file
+                self._appending = False
+            f.seek(start)
+            values = tuple(json.loads(f.read(end - start)))
+            if self.cache_size:
+                self._cache[entry] = values
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return values
+
+    def __len__(self) -> int:
+        return len(self._saved_offsets) + len(self._offsets) - 2
+
+    def stats(self) -> Dict[str, Any]:
+        """Entries and bytes stored, and how often reads were answered from memory."""
+        reads = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": self._saved_offsets[-1] + self._offsets[-1],
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / reads if reads else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the files, deleting the temporary one; entries can no longer be read."""
+        for f in (self._saved, self._file):
+            if f is not None:
+                f.close()
@@ -3,7 +3,14 @@ HTML content caching implementation using filesystem storage.
 
 This module provides a persistent caching mechanism for HTML content
 with support for cross-platform cache directory management, atomic file operations,
-and resilience against time shifts.
+and resilience against time shifts. Entries are stored either as individual files
+(the default) or in a single SQLite database, selected with MCP_NIXOS_CACHE_BACKEND.
+Writes can be handed to a background writer thread (MCP_NIXOS_CACHE_WRITE_BEHIND), and
+entries are compressed with zstd or gzip (MCP_NIXOS_CACHE_COMPRESSION). A manifest tracks
+entry sizes and access times so the cache stays within MCP_NIXOS_CACHE_MAX_SIZE_MB by
+evicting the least recently used entries. Option detail files, which are read in place
+rather than loaded, are kept uncompressed in a subdirectory but written, counted and
+evicted like any other entry.
 """
 
 import hashlib
@@ -14,8 +21,12 @@ import json
 import pickle
 import os
 import threading
-from typing import Optional, Dict, Any, Tuple, cast
+from typing import Optional, Dict, Any, Hashable, List, Sequence, Tuple, cast
 
+from .compression import IDENTITY, compress, decompress, resolve_codec
+from .manifest import CacheManifest
+from .sqlite_store import ENTRY_KINDS, SQLiteCacheStore
+from .write_behind import WriteBehindQueue, get_write_behind_queue
 from ..utils.cache_helpers import (
     init_cache_storage,
     atomic_write,
@@ -25,9 +36,22 @@ from ..utils.cache_helpers import (
     unlock_file,
 )
 
-
 logger = logging.getLogger(__name__)
 
+CACHE_BACKENDS = ("filesystem", "sqlite")
+
+DEFAULT_MAX_SIZE_MB = 512
+
+# HTTP response validators stored with HTML entries for conditional revalidation
+HTTP_VALIDATORS = ("etag", "last_modified")
+
+# Seconds get_stats() waits for the startup walk when there was no saved manifest to start from
+STATS_WALK_TIMEOUT = 5.0
+
+# Manifest kind and subdirectory of option detail files (see set_details)
+DETAILS_KIND = "details"
+DETAILS_SUFFIX = ".details"
+
 
 class HTMLCache:
     """
@@ -38,18 +62,60 @@ class HTMLCache:
     for frequent network requests. File operations are atomic and thread-safe.
     """
 
-    def __init__(self, cache_dir: Optional[str] = None, ttl: int = 86400):
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: int = 86400,
+        backend: Optional[str] = None,
+        write_behind: Optional[bool] = None,
+        compression: Optional[str] = None,
+        max_size_bytes: Optional[int] = None,
+    ):
         """
         Initialize the HTML cache.
 
         Args:
             cache_dir: Optional custom cache directory path
             ttl: Time-to-live for cache entries in seconds (default: 1 day)
+            backend: Storage backend, "filesystem" or "sqlite" (default: MCP_NIXOS_CACHE_BACKEND or "filesystem")
+            write_behind: Persist writes on a background thread (default: MCP_NIXOS_CACHE_WRITE_BEHIND or True)
+            compression: "auto", "zstd", "gzip" or "none" (default: MCP_NIXOS_CACHE_COMPRESSION or "auto")
+            max_size_bytes: Disk budget before LRU eviction, 0 for unlimited
+                (default: MCP_NIXOS_CACHE_MAX_SIZE_MB or 512 MB)
         """
         self.config = init_cache_storage(cache_dir, ttl)
         self.cache_dir = pathlib.Path(self.config["cache_dir"])
+        self.details_dir = self.cache_dir / DETAILS_KIND
         self.instance_id = self.config.get("instance_id", "")
         self.ttl = ttl
+
+        backend = (backend or os.environ.get("MCP_NIXOS_CACHE_BACKEND", "filesystem")).strip().lower()
+        if backend not in CACHE_BACKENDS:
+            logger.warning(f"Unknown cache backend '{backend}', falling back to filesystem")
+            backend = "filesystem"
+        self.backend = backend
+        self.store: Optional[SQLiteCacheStore] = None
+        if backend == "sqlite":
+            try:
+                self.store = SQLiteCacheStore(self.cache_dir)
+            except Exception as e:
+                logger.error(f"Failed to open SQLite cache store, falling back to filesystem: {e}")
+                self.backend = "filesystem"
+
+        if write_behind is None:
+            write_behind = os.environ.get("MCP_NIXOS_CACHE_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+        self.write_queue: Optional[WriteBehindQueue] = get_write_behind_queue() if write_behind else None
+        self.codec = resolve_codec(compression)
+
+        if max_size_bytes is None:
+            try:
+                max_size_mb = float(os.environ.get("MCP_NIXOS_CACHE_MAX_SIZE_MB", DEFAULT_MAX_SIZE_MB))
+                max_size_bytes = int(max_size_mb * 1024**2)
+            except ValueError:
+                logger.warning("Invalid MCP_NIXOS_CACHE_MAX_SIZE_MB, using default")
+                max_size_bytes = DEFAULT_MAX_SIZE_MB * 1024**2
+        self.max_size_bytes = max(0, max_size_bytes)
+
         self.stats = {
             "hits": 0,
             "misses": 0,
@@ -58,10 +124,27 @@ class HTMLCache:
             "data_hits": 0,
             "data_misses": 0,
             "data_writes": 0,
+            "evictions": 0,
         }
         # Lock for thread-safe stats updates
         self.stats_lock = threading.RLock()
-        logger.info(f"HTMLCache initialized with directory: {self.cache_dir}, instance: {self.instance_id}")
+
+        manifest_path = self.cache_dir / CacheManifest.FILENAME
+        if self.store is not None:
+            # The database is the source of truth; a manifest left by the file layout is stale
+            manifest_path.unlink(missing_ok=True)
+            self.manifest = CacheManifest()
+        else:
+            self.manifest = CacheManifest(manifest_path)
+        # Set once the manifest has been reconciled with the entries in storage
+        self.manifest_ready = threading.Event()
+        # Whether the manifest started out from a saved one (or the database) rather than empty
+        self.manifest_adopted = True
+        self._rebuild_manifest()
+        logger.info(
+            f"HTMLCache initialized with directory: {self.cache_dir}, backend: {self.backend}, "
+            f"write-behind: {self.write_queue is not None}, codec: {self.codec}, instance: {self.instance_id}"
+        )
 
     def __del__(self):
         """Destructor with cleanup logic for non-session scoped test caches."""
@@ -78,6 +161,249 @@ class HTMLCache:
         except Exception:
             pass
 
+    def close(self) -> None:
+        """Persist pending writes and release resources held by the storage backend."""
+        self.flush()
+        self.manifest.save()
+        if self.store is not None:
+            self.store.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for writes queued by this cache to reach storage.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if no writes remain pending
+        """
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+
+    def _rebuild_manifest(self) -> None:
+        """
+        Reconcile the manifest with the entries actually present in storage.
+
+        Runs once on startup. The database backend is queried directly. The file
+        backend adopts the persisted manifest right away and walks the directory on a
+        background thread, to pick up entries written or removed by processes that
+        did not save their manifest; until the walk finishes, a missing or outdated
+        manifest means the cache starts out untracked, and get_stats() waits for it.
+        """
+        self.manifest.clear()
+        if self.store is not None:
+            try:
+                for kind, entry_id, size, updated in self.store.entry_sizes():
+                    self.manifest.record(kind, entry_id, size, last_access=updated)
+                # Detail files are kept outside the database
+                for (kind, entry_id), record in self._find_details({}):
+                    self.manifest.record(kind, entry_id, record["size"], last_access=record["last_access"])
+            except Exception as e:
+                logger.warning(f"Failed to rebuild cache manifest for {self.cache_dir}: {e}")
+            self.manifest_ready.set()
+            return
+
+        # Access times of a manifest in the previous format still order the walked entries
+        self.manifest_adopted = self.manifest.load()
+        access_times = {} if self.manifest_adopted else self.manifest.load_access_times()
+        threading.Thread(
+            target=self._walk_entries,
+            args=(access_times, time.time(), self.manifest.epoch),
+            name="mcp_nixos-cache-manifest",
+            daemon=True,
+        ).start()
+
+    def _walk_entries(self, access_times: Dict[Tuple[str, str], float], started: float, epoch: int) -> None:
+        """Walk the cache directory and reconcile the manifest with the entries found."""
+        try:
+            suffixes = [(suffix, kind) for kind, suffix in ENTRY_KINDS.items()]
+            found = []
+            if self.cache_dir.exists():
+                with os.scandir(self.cache_dir) as entries:
+                    for dir_entry in entries:
+                        name = dir_entry.name
+                        for suffix, kind in suffixes:
+                            if not name.endswith(suffix):
+                                continue
+                            entry_id = name[: -len(suffix)]
+                            if name.startswith(".") or "." in entry_id:
+                                continue
+                            size, files, has_meta, mtime = self._entry_footprint(pathlib.Path(dir_entry.path))
+                            if files:
+                                record = {
+                                    "size": size,
+                                    "files": files,
+                                    "meta": has_meta,
+                                    "last_access": access_times.get((kind, entry_id), mtime),
+                                }
+                                found.append(((kind, entry_id), record))
+            found.extend(self._find_details(access_times))
+            self.manifest.reconcile(found, started, epoch)
+            self._enforce_budget()
+            self.manifest.schedule_save()
+        except Exception as e:
+            logger.warning(f"Failed to rebuild cache manifest for {self.cache_dir}: {e}")
+        finally:
+            self.manifest_ready.set()
+
+    def _find_details(self, access_times: Dict[Tuple[str, str], float]) -> List[Tuple[Tuple[str, str], Dict[str, Any]]]:
+        """Manifest records of the detail files in the details directory, for the startup walk."""
+        found = []
+        if not self.details_dir.is_dir():
+            return found
+        with os.scandir(self.details_dir) as entries:
+            for dir_entry in entries:
+                name = dir_entry.name
+                if not self._is_details_name(name):
+                    continue  # Temporary files of writes in progress
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                record = {
+                    "size": stat.st_size,
+                    "files": 1,
+                    "meta": False,
+                    "last_access": access_times.get((DETAILS_KIND, name), stat.st_mtime),
+                }
+                found.append(((DETAILS_KIND, name), record))
+        return found
+
+    @staticmethod
+    def _entry_footprint(path: pathlib.Path) -> Tuple[int, int, bool, float]:
+        """
+        Measure a cache file and its ``.meta`` sidecar.
+
+        Returns:
+            Tuple of (total bytes, number of files, whether a sidecar exists, content mtime)
+        """
+        size, files, has_meta, mtime = 0, 0, False, 0.0
+        for candidate in (path, pathlib.Path(f"{path}.meta")):
+            try:
+                stat = candidate.stat()
+            except OSError:
+                continue
+            size += stat.st_size
+            files += 1
+            if candidate is path:
+                mtime = stat.st_mtime
+            else:
+                has_meta = True
+        return size, files, has_meta, mtime
+
+    def _track_write(self, kind: str, key: str, path: pathlib.Path, stored_size: int = 0) -> None:
+        """
+        Record a completed write in the manifest and evict entries if over budget.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            key: URL or data key of the entry
+            path: Filesystem path of the entry (unused for the store backend)
+            stored_size: Bytes written, for the store backend
+        """
+        entry_id = self._hash_key(key)
+        if self.store is not None:
+            self.manifest.record(kind, entry_id, stored_size)
+        else:
+            size, files, has_meta, _ = self._entry_footprint(path)
+            self.manifest.record(kind, entry_id, size, files, has_meta)
+        self._enforce_budget(protect=(kind, entry_id))
+        self.manifest.schedule_save()
+
+    def _enforce_budget(self, protect: Optional[Tuple[str, str]] = None) -> int:
+        """
+        Evict least recently used entries until the cache fits its disk budget.
+
+        Args:
+            protect: Entry that must be kept (the one just written)
+
+        Returns:
+            Number of entries evicted
+        """
+        if not self.max_size_bytes:
+            return 0
+        victims = self.manifest.select_victims(self.max_size_bytes, protect)
+        for kind, entry_id in victims:
+            self._delete_entry(kind, entry_id)
+            self.manifest.remove(kind, entry_id)
+        if victims:
+            with self.stats_lock:
+                self.stats["evictions"] += len(victims)
+            logger.info(
+                f"Evicted {len(victims)} cache entries to stay within {self.max_size_bytes} bytes "
+                f"({self.manifest.total_bytes} bytes used)"
+            )
+        return len(victims)
+
+    def _delete_entry(self, kind: str, entry_id: str) -> None:
+        """Delete an entry, and its sidecar, from storage."""
+        if kind == DETAILS_KIND:
+            try:
+                (self.details_dir / entry_id).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:  # Still open on Windows; evicted again later
+                logger.warning(f"Failed to evict detail file {entry_id}: {e}")
+            return
+        if self.store is not None:
+            self.store.delete(kind, entry_id)
+            return
+        path = self.cache_dir / f"{entry_id}{ENTRY_KINDS[kind]}"
+        for candidate in (path, pathlib.Path(f"{path}.meta")):
+            try:
+                candidate.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict cache file {candidate}: {e}")
+
+    def _queue_key(self, kind: str, key: str) -> Hashable:
+        """Identify an entry in the shared write-behind queue."""
+        return (str(self.cache_dir), kind, key)
+
+    def _discard_pending(self, kinds: Tuple[str, ...], key: Optional[str] = None) -> None:
+        """Drop queued writes for this cache so they cannot resurrect invalidated entries."""
+        if self.write_queue is None:
+            return
+        cache_dir = str(self.cache_dir)
+        self.write_queue.discard(
+            lambda queued: queued[0] == cache_dir and queued[1] in kinds and (key is None or queued[2] == key)
+        )
+
+    def _peek_pending(self, kind: str, key: str, metadata: Dict[str, Any], hit_stat: str) -> Tuple[bool, Any]:
+        """
+        Serve a value that has been queued for writing but may not be on disk yet.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            key: URL or data key of the entry
+            metadata: Metadata dictionary to update on a hit
+            hit_stat: Name of the stats counter to increment on a hit
+
+        Returns:
+            Tuple of (found, value)
+        """
+        if self.write_queue is None:
+            return False, None
+        found, pending = self.write_queue.peek(self._queue_key(kind, key))
+        if not found:
+            return False, None
+        value, pending_metadata = pending
+        metadata.update(pending_metadata)
+        metadata["cache_hit"] = True
+        metadata["pending_write"] = True
+        with self.stats_lock:
+            self.stats[hit_stat] += 1
+        logger.debug(f"Cache hit for pending {kind} write: {key}")
+        return True, value
+
+    @staticmethod
+    def _hash_key(key: str) -> str:
+        """Hash a URL or data key into the identifier used for filenames and store rows."""
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
+
     def _get_cache_path(self, url: str) -> pathlib.Path:
         """
         Generate a cache file path for a given URL.
@@ -89,8 +415,7 @@ class HTMLCache:
             Path object pointing to the cache file location
         """
         # Create a hash of the URL to use as the filename
-        url_hash = hashlib.md5(url.encode("utf-8")).hexdigest()
-        return self.cache_dir / f"{url_hash}.html"
+        return self.cache_dir / f"{self._hash_key(url)}.html"
 
     def _get_data_cache_path(self, key: str) -> pathlib.Path:
         """
@@ -103,8 +428,7 @@ class HTMLCache:
             Path object pointing to the data cache file location
         """
         # Create a hash of the key to use as the filename
-        key_hash = hashlib.md5(key.encode("utf-8")).hexdigest()
-        return self.cache_dir / f"{key_hash}.data.json"
+        return self.cache_dir / f"{self._hash_key(key)}.data.json"
 
     def _get_binary_data_cache_path(self, key: str) -> pathlib.Path:
         """
@@ -116,8 +440,7 @@ class HTMLCache:
         Returns:
             Path object pointing to the binary data cache file location
         """
-        key_hash = hashlib.md5(key.encode("utf-8")).hexdigest()
-        return self.cache_dir / f"{key_hash}.data.pickle"
+        return self.cache_dir / f"{self._hash_key(key)}.data.pickle"
 
     def _is_expired(self, file_path: pathlib.Path, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """
@@ -191,12 +514,94 @@ class HTMLCache:
 
         return expired
 
-    def get(self, url: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    def _is_timestamp_expired(self, creation_time: float) -> bool:
+        """
+        Check whether an entry created at the given timestamp has outlived the TTL.
+
+        Used for store-backed entries, which have no file mtime. Backward time shifts
+        are treated as an age of zero, matching the filesystem behaviour.
+
+        Args:
+            creation_time: Creation timestamp of the entry
+
+        Returns:
+            True if the entry has expired
+        """
+        age = time.time() - creation_time
+        if age < 0:
+            logger.debug("Detected backward time shift for store entry. Using 0 for entry age.")
+            age = 0
+        return age > self.ttl
+
+    def _cache_location(self, kind: str, key: str, file_path: pathlib.Path) -> str:
+        """Describe where an entry is stored, for reporting in metadata."""
+        if self.store is not None:
+            return f"{self.store.db_path}#{kind}/{self._hash_key(key)}"
+        return str(file_path)
+
+    def _read_store_entry(
+        self,
+        kind: str,
+        key: str,
+        metadata: Dict[str, Any],
+        hit_stat: str,
+        miss_stat: str,
+        allow_expired: bool = False,
+    ) -> Optional[bytes]:
+        """
+        Read an entry from the SQLite store, applying TTL checks and updating stats.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            key: URL or data key of the entry
+            metadata: Metadata dictionary to update with entry and cache status info
+            hit_stat: Name of the stats counter to increment on a hit
+            miss_stat: Name of the stats counter to increment on a miss
+            allow_expired: Return expired content (counted as a miss and flagged as stale)
+
+        Returns:
+            The raw entry content, or None on a miss or expiry
+        """
+        assert self.store is not None
+        entry = self.store.read(kind, self._hash_key(key))
+        if entry is None:
+            with self.stats_lock:
+                self.stats[miss_stat] += 1
+            logger.debug(f"Store cache miss for {kind} entry: {key}")
+            return None
+
+        content, entry_metadata, created = entry
+        metadata.update(entry_metadata)
+        metadata["creation_timestamp"] = created
+
+        expired = self._is_timestamp_expired(created)
+        metadata["expired"] = expired
+        if expired:
+            with self.stats_lock:
+                self.stats[miss_stat] += 1
+            logger.debug(f"Store cache expired for {kind} entry: {key}")
+            if allow_expired:
+                metadata["stale"] = True
+                return content
+            return None
+
+        with self.stats_lock:
+            self.stats[hit_stat] += 1
+        self.manifest.touch(kind, self._hash_key(key))
+        metadata["cache_hit"] = True
+        logger.debug(f"Store cache hit for {kind} entry: {key}")
+        return content
+
+    def get(self, url: str, allow_expired: bool = False) -> Tuple[Optional[str], Dict[str, Any]]:
         """
         Retrieve HTML content from cache if available and not expired.
 
+        Expired content can still be requested with ``allow_expired``, e.g. to revalidate
+        it with a conditional request; it is counted as a miss and flagged with ``stale``.
+
         Args:
             url: URL to retrieve from cache
+            allow_expired: Return content even if its TTL has expired
 
         Returns:
             Tuple of (content, metadata) where content is the cached HTML
@@ -206,13 +611,23 @@ class HTMLCache:
         metadata = {
             "url": url,
             "cache_hit": False,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("html", url, cache_path),
             "expired": False,
         }
 
         try:
+            found, pending = self._peek_pending("html", url, metadata, "hits")
+            if found:
+                return pending, metadata
+
+            if self.store is not None:
+                raw = self._read_store_entry("html", url, metadata, "hits", "misses", allow_expired)
+                if raw is None:
+                    return None, metadata
+                return decompress(raw, metadata.get("codec")).decode("utf-8"), metadata
+
             # Use read_with_metadata to handle file locking and metadata reading
-            content, file_metadata = read_with_metadata(cache_path)
+            payload, file_metadata = read_with_metadata(cache_path, binary=True)
 
             # Update our metadata with file metadata
             metadata.update(file_metadata)
@@ -224,7 +639,7 @@ class HTMLCache:
                 logger.error(f"Error reading cache file for {url}: {file_metadata['error']}")
                 return None, metadata
 
-            if content is None:
+            if payload is None:
                 # If file doesn't exist or couldn't be read
                 with self.stats_lock:
                     self.stats["misses"] += 1
@@ -239,11 +654,17 @@ class HTMLCache:
                 with self.stats_lock:
                     self.stats["misses"] += 1
                 logger.debug(f"Cache expired for URL: {url}")
-                return None, metadata
+                if not allow_expired:
+                    return None, metadata
+                metadata["stale"] = True
+                return decompress(cast(bytes, payload), file_metadata.get("codec")).decode("utf-8"), metadata
+
+            content = decompress(cast(bytes, payload), file_metadata.get("codec")).decode("utf-8")
 
             # Content is valid
             with self.stats_lock:
                 self.stats["hits"] += 1
+            self.manifest.touch("html", self._hash_key(url))
             metadata["cache_hit"] = True
             logger.debug(f"Cache hit for URL: {url}")
 
@@ -256,12 +677,13 @@ class HTMLCache:
             metadata["error"] = str(e)
             return None, metadata
 
-    def get_data(self, key: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    def get_data(self, key: str, allow_expired: bool = False) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
         """
         Retrieve serialized data from cache if available and not expired.
 
         Args:
             key: Key to identify the cached data
+            allow_expired: Return data even if its TTL has expired (flagged with ``stale``)
 
         Returns:
             Tuple of (data, metadata) where data is the cached structured data
@@ -271,11 +693,21 @@ class HTMLCache:
         metadata = {
             "key": key,
             "cache_hit": False,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("data", key, cache_path),
             "expired": False,
         }
 
         try:
+            found, pending = self._peek_pending("data", key, metadata, "data_hits")
+            if found:
+                return pending, metadata
+
+            if self.store is not None:
+                raw = self._read_store_entry("data", key, metadata, "data_hits", "data_misses", allow_expired)
+                if raw is None:
+                    return None, metadata
+                return json.loads(decompress(raw, metadata.get("codec"))), metadata
+
             # Check if file exists first
             if not cache_path.exists():
                 with self.stats_lock:
@@ -283,12 +715,15 @@ class HTMLCache:
                 logger.debug(f"Data cache miss for key: {key}")
                 return None, metadata
 
+            # Compressed entries record their codec in a metadata sidecar
+            codec = self._read_sidecar(cache_path).get("codec")
+
             # Read with file locking to prevent race conditions
-            with open(cache_path, "r") as f:
+            with open(cache_path, "rb") as f:
                 if lock_file(f, exclusive=False, blocking=False):
                     try:
                         content = f.read()
-                        data = json.loads(content)
+                        data = json.loads(decompress(content, codec))
 
                         # Check if content is expired using both methods
                         expired = self._is_expired(cache_path, data)
@@ -298,11 +733,15 @@ class HTMLCache:
                             with self.stats_lock:
                                 self.stats["data_misses"] += 1
                             logger.debug(f"Data cache expired for key: {key}")
+                            if allow_expired:
+                                metadata["stale"] = True
+                                return data, metadata
                             return None, metadata
 
                         # Data is valid
                         with self.stats_lock:
                             self.stats["data_hits"] += 1
+                        self.manifest.touch("data", self._hash_key(key))
                         metadata["cache_hit"] = True
                         logger.debug(f"Data cache hit for key: {key}")
 
@@ -328,12 +767,13 @@ class HTMLCache:
             metadata["error"] = str(e)
             return None, metadata
 
-    def get_binary_data(self, key: str) -> Tuple[Optional[Any], Dict[str, Any]]:
+    def get_binary_data(self, key: str, allow_expired: bool = False) -> Tuple[Optional[Any], Dict[str, Any]]:
         """
         Retrieve binary serialized data from cache if available and not expired.
 
         Args:
             key: Key to identify the cached data
+            allow_expired: Return data even if its TTL has expired (flagged with ``stale``)
 
         Returns:
             Tuple of (data, metadata) where data is the cached binary data
@@ -343,7 +783,7 @@ class HTMLCache:
         metadata = {
             "key": key,
             "cache_hit": False,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("binary", key, cache_path),
             "expired": False,
         }
 
@@ -352,6 +792,17 @@ class HTMLCache:
         meta_data = {}
 
         try:
+            found, pending = self._peek_pending("binary", key, metadata, "data_hits")
+            if found:
+                return pending, metadata
+
+            if self.store is not None:
+                raw = self._read_store_entry("binary", key, metadata, "data_hits", "data_misses", allow_expired)
+                if raw is None:
+                    return None, metadata
+                payload = decompress(raw, metadata.get("codec"))
+                return self._unwrap_binary_data(pickle.loads(payload), metadata), metadata
+
             # Check if file exists first
             if not cache_path.exists():
                 with self.stats_lock:
@@ -380,24 +831,23 @@ class HTMLCache:
                 with self.stats_lock:
                     self.stats["data_misses"] += 1
                 logger.debug(f"Binary data cache expired for key: {key}")
-                return None, metadata
+                if not allow_expired:
+                    return None, metadata
+                metadata["stale"] = True
 
             # Read with file locking to prevent race conditions
             with open(cache_path, "rb") as f:
                 if lock_file(f, exclusive=False, blocking=False):
                     try:
                         # Read the binary data
-                        data = pickle.load(f)
-
-                        # If data is wrapped in a dict with _cache_metadata, extract it
-                        if isinstance(data, dict) and "_cache_metadata" in data:
-                            metadata.update(data["_cache_metadata"])
-                            actual_data = data.get("_data")
-                        else:
-                            actual_data = data
+                        payload = decompress(f.read(), meta_data.get("codec"))
+                        actual_data = self._unwrap_binary_data(pickle.loads(payload), metadata)
+                        if expired:
+                            return actual_data, metadata
 
                         with self.stats_lock:
                             self.stats["data_hits"] += 1
+                        self.manifest.touch("binary", self._hash_key(key))
                         metadata["cache_hit"] = True
                         logger.debug(f"Binary data cache hit for key: {key}")
 
@@ -419,13 +869,52 @@ class HTMLCache:
             metadata["error"] = str(e)
             return None, metadata
 
-    def set(self, url: str, content: str) -> Dict[str, Any]:
+    @staticmethod
+    def _read_sidecar(cache_path: pathlib.Path) -> Dict[str, Any]:
+        """Read the ``.meta`` sidecar of a cache file, returning an empty dict if absent or unreadable."""
+        meta_path = pathlib.Path(f"{cache_path}.meta")
+        if not meta_path.exists():
+            return {}
+        try:
+            with open(meta_path, "r") as f:
+                if lock_file(f, exclusive=False, blocking=False):
+                    try:
+                        return json.loads(f.read())
+                    finally:
+                        unlock_file(f)
+        except Exception as e:
+            logger.warning(f"Error reading metadata sidecar {meta_path}: {e}")
+        return {}
+
+    @staticmethod
+    def _write_sidecar(cache_path: pathlib.Path, meta_data: Dict[str, Any], key: str) -> None:
+        """Write the ``.meta`` sidecar of a cache file that has just been written, logging failures."""
+        meta_path = pathlib.Path(f"{cache_path}.meta")
+        try:
+            # Cast is needed because write returns an int but atomic_write expects None return type
+            atomic_write(meta_path, lambda f: cast(None, f.write(json.dumps(meta_data, indent=2))))
+        except Exception as e:
+            logger.warning(f"Failed to write metadata for {key}: {e}")
+
+    @staticmethod
+    def _unwrap_binary_data(data: Any, metadata: Dict[str, Any]) -> Any:
+        """Extract the payload from binary data wrapped with _cache_metadata, merging that metadata."""
+        if isinstance(data, dict) and "_cache_metadata" in data:
+            metadata.update(data["_cache_metadata"])
+            return data.get("_data")
+        return data
+
+    def set(self, url: str, content: str, validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
         Store HTML content in the cache using atomic file operations.
 
+        With write-behind enabled this returns as soon as the content is queued; the
+        write itself happens on the writer thread.
+
         Args:
             url: URL associated with the content
             content: HTML content to cache
+            validators: HTTP cache validators ("etag", "last_modified") to store with the entry
 
         Returns:
             Metadata dictionary with cache operation information
@@ -433,19 +922,52 @@ class HTMLCache:
         cache_path = self._get_cache_path(url)
         metadata = {
             "url": url,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("html", url, cache_path),
             "stored": False,
             "creation_timestamp": time.time(),
             "instance_id": self.instance_id,
         }
+        validators = {k: v for k, v in (validators or {}).items() if k in HTTP_VALIDATORS and v}
+        metadata.update(validators)
+
+        if self.write_queue is not None:
+            entry_metadata = dict(metadata)
+            self.write_queue.submit(
+                self._queue_key("html", url),
+                lambda: self._write_html(url, content, entry_metadata),
+                (content, {"creation_timestamp": metadata["creation_timestamp"], **validators}),
+            )
+            metadata["stored"] = True
+            metadata["pending_write"] = True
+            return metadata
 
+        return self._write_html(url, content, metadata)
+
+    def _write_html(self, url: str, content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist HTML content prepared by set()."""
+        cache_path = self._get_cache_path(url)
         try:
-            # Use atomic write with file locking and separate metadata
-            success = write_with_metadata(cache_path, content, metadata)
+            metadata["codec"] = self.codec
+            payload = compress(content.encode("utf-8"), self.codec)
+
+            if self.store is not None:
+                entry_metadata = {
+                    k: metadata[k]
+                    for k in ("url", "creation_timestamp", "instance_id", "codec", *HTTP_VALIDATORS)
+                    if k in metadata
+                }
+                success = self.store.write(
+                    "html", self._hash_key(url), payload, entry_metadata, metadata["creation_timestamp"]
+                )
+            else:
+                # Use atomic write with file locking and separate metadata; uncompressed
+                # entries stay plain text files
+                success = write_with_metadata(cache_path, content if self.codec == IDENTITY else payload, metadata)
 
             if success:
                 with self.stats_lock:
                     self.stats["writes"] += 1
+                self._track_write("html", url, cache_path, len(payload))
                 metadata["stored"] = True
                 logger.debug(f"Cached content for URL: {url}")
             else:
@@ -465,6 +987,10 @@ class HTMLCache:
         """
         Store structured data in the cache using atomic file operations.
 
+        With write-behind enabled this returns as soon as the data is queued. The
+        top-level dictionary is copied, but nested values are serialized later, so
+        callers must not mutate them after handing them over.
+
         Args:
             key: Key to identify the cached data
             data: Structured data to cache (must be JSON serializable)
@@ -475,45 +1001,78 @@ class HTMLCache:
         cache_path = self._get_data_cache_path(key)
         metadata = {
             "key": key,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("data", key, cache_path),
             "stored": False,
             "instance_id": self.instance_id,
         }
 
+        meta_data = {
+            "creation_timestamp": time.time(),
+            "instance_id": self.instance_id,
+        }
+        # Ensure data is mutable if it's a dict
+        if isinstance(data, dict):
+            # Create a copy to avoid modifying the original
+            data_copy = dict(data)
+            # Embed creation timestamp if not already present
+            if "creation_timestamp" not in data_copy:
+                data_copy["creation_timestamp"] = meta_data["creation_timestamp"]
+            # Add instance ID for debugging
+            data_copy["_cache_instance"] = self.instance_id
+        else:
+            # For non-dict data, we can't embed timestamps
+            data_copy = data
+
+        if self.write_queue is not None:
+            entry_metadata = dict(metadata)
+            self.write_queue.submit(
+                self._queue_key("data", key),
+                lambda: self._write_data(key, data_copy, meta_data, entry_metadata),
+                (data_copy, {"creation_timestamp": meta_data["creation_timestamp"]}),
+            )
+            metadata["stored"] = True
+            metadata["pending_write"] = True
+            return metadata
+
+        return self._write_data(key, data_copy, meta_data, metadata)
+
+    def _write_data(
+        self, key: str, data_copy: Any, meta_data: Dict[str, Any], metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Persist structured data prepared by set_data()."""
+        cache_path = self._get_data_cache_path(key)
         try:
-            # Ensure data is mutable if it's a dict
-            if isinstance(data, dict):
-                # Create a copy to avoid modifying the original
-                data_copy = dict(data)
-                # Embed creation timestamp if not already present
-                if "creation_timestamp" not in data_copy:
-                    data_copy["creation_timestamp"] = time.time()
-                # Add instance ID for debugging
-                data_copy["_cache_instance"] = self.instance_id
+            meta_data = dict(meta_data, codec=self.codec)
+            # Compact separators: indentation only inflates large snapshots
+            payload = compress(json.dumps(data_copy, separators=(",", ":")).encode("utf-8"), self.codec)
+
+            if self.store is not None:
+                created = data_copy["creation_timestamp"] if isinstance(data_copy, dict) else None
+                success = self.store.write(
+                    "data",
+                    self._hash_key(key),
+                    payload,
+                    {"key": key, **meta_data},
+                    float(created) if created is not None else meta_data["creation_timestamp"],
+                )
             else:
-                # For non-dict data, we can't embed timestamps
-                data_copy = data
-                # But we can create a metadata file
-                meta_data = {
-                    "creation_timestamp": time.time(),
-                    "instance_id": self.instance_id,
-                }
-                meta_path = pathlib.Path(f"{cache_path}.meta")
-                try:
-                    atomic_write(meta_path, lambda f: f.write(json.dumps(meta_data, indent=2)))
-                except Exception as e:
-                    logger.warning(f"Failed to write metadata for {key}: {e}")
+                # Write data atomically
+                def write_data(f):
+                    f.write(payload)
 
-            # Write data atomically
-            def write_data(f):
-                content = json.dumps(data_copy, indent=2)
-                f.write(content)
+                write_data.mode = "wb"  # type: ignore
 
-            success = atomic_write(cache_path, write_data)
+                success = atomic_write(cache_path, write_data)
+                if success and (not isinstance(data_copy, dict) or self.codec != IDENTITY):
+                    # Non-dict data has no embedded timestamp and compressed data needs its codec
+                    # tag, so write a metadata file (store rows carry their own metadata). Written
+                    # after the data: a crash in between leaves no sidecar describing missing data
+                    self._write_sidecar(cache_path, meta_data, key)
 
             if success:
                 with self.stats_lock:
                     self.stats["data_writes"] += 1
+                self._track_write("data", key, cache_path, len(payload))
                 metadata["stored"] = True
                 logger.debug(f"Cached data for key: {key}")
             else:
@@ -534,7 +1093,9 @@ class HTMLCache:
         Store binary data in the cache using pickle and atomic file operations.
 
         This implementation wraps the data in a dictionary with metadata to ensure
-        we can track creation time even for binary data.
+        we can track creation time even for binary data. With write-behind enabled
+        pickling happens on the writer thread, so callers must not mutate the data
+        after handing it over.
 
         Args:
             key: Key to identify the cached data
@@ -546,42 +1107,67 @@ class HTMLCache:
         cache_path = self._get_binary_data_cache_path(key)
         metadata = {
             "key": key,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("binary", key, cache_path),
             "stored": False,
             "instance_id": self.instance_id,
         }
 
-        try:
-            # Create metadata for separate storage and for embedding
-            cache_metadata = {
-                "creation_timestamp": time.time(),
-                "instance_id": self.instance_id,
-                "key": key,
-            }
+        # Create metadata for separate storage and for embedding
+        cache_metadata = {
+            "creation_timestamp": time.time(),
+            "instance_id": self.instance_id,
+            "key": key,
+        }
 
-            # Wrap data with metadata for resilience against time shifts
-            wrapped_data = {"_data": data, "_cache_metadata": cache_metadata}
+        if self.write_queue is not None:
+            entry_metadata = dict(metadata)
+            self.write_queue.submit(
+                self._queue_key("binary", key),
+                lambda: self._write_binary_data(key, data, cache_metadata, entry_metadata),
+                (data, dict(cache_metadata)),
+            )
+            metadata["stored"] = True
+            metadata["pending_write"] = True
+            return metadata
 
-            # Write metadata file separately too (belt and suspenders)
-            meta_path = pathlib.Path(f"{cache_path}.meta")
-            try:
-                # Cast is needed because write returns an int but atomic_write expects None return type
-                atomic_write(meta_path, lambda f: cast(None, f.write(json.dumps(cache_metadata, indent=2))))
-            except Exception as e:
-                logger.warning(f"Failed to write metadata for binary data {key}: {e}")
+        return self._write_binary_data(key, data, cache_metadata, metadata)
 
-            # Write data atomically
-            def write_binary_data(f):
-                pickle.dump(wrapped_data, f)
+    def _write_binary_data(
+        self, key: str, data: Any, cache_metadata: Dict[str, Any], metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Persist binary data prepared by set_binary_data()."""
+        cache_path = self._get_binary_data_cache_path(key)
+        try:
+            # Wrap data with metadata for resilience against time shifts
+            wrapped_data = {"_data": data, "_cache_metadata": cache_metadata}
+            cache_metadata = dict(cache_metadata, codec=self.codec)
+            payload = compress(pickle.dumps(wrapped_data, protocol=pickle.HIGHEST_PROTOCOL), self.codec)
+
+            if self.store is not None:
+                success = self.store.write(
+                    "binary",
+                    self._hash_key(key),
+                    payload,
+                    cache_metadata,
+                    cache_metadata["creation_timestamp"],
+                )
+            else:
+                # Write data atomically
+                def write_binary_data(f):
+                    f.write(payload)
 
-            # Set the mode attribute so atomic_write knows to open in binary mode
-            write_binary_data.mode = "wb"  # type: ignore
+                # Set the mode attribute so atomic_write knows to open in binary mode
+                write_binary_data.mode = "wb"  # type: ignore
 
-            success = atomic_write(cache_path, write_binary_data)
+                success = atomic_write(cache_path, write_binary_data)
+                if success:
+                    # Metadata file too (belt and suspenders), once the data it describes is in place
+                    self._write_sidecar(cache_path, cache_metadata, key)
 
             if success:
                 with self.stats_lock:
                     self.stats["data_writes"] += 1
+                self._track_write("binary", key, cache_path, len(payload))
                 metadata["stored"] = True
                 logger.debug(f"Cached binary data for key: {key}")
             else:
@@ -597,6 +1183,209 @@ class HTMLCache:
             metadata["error"] = str(e)
             return metadata
 
+    @staticmethod
+    def _is_details_name(name: Any) -> bool:
+        """Whether a name can be that of a detail file: a plain file name ending in ".details"."""
+        return (
+            isinstance(name, str)
+            and name.endswith(DETAILS_SUFFIX)
+            and not name.startswith(".")
+            and "/" not in name
+            and "\\" not in name
+        )
+
+    def set_details(self, name: str, parts: Sequence[bytes], keep_previous: int = 0) -> Dict[str, Any]:
+        """
+        Store an option detail file, uncompressed so that it can be read in place.
+
+        The file goes to the details directory whatever the backend, and is written
+        through the write-behind queue and counted against the disk budget like any
+        other entry. Files are named after their content, so one that exists already
+        is only marked as used. Older detail files of the same kind (the part of the
+        name before its last "-") are removed, except the newest ``keep_previous``,
+        which processes that loaded an older snapshot may still be reading.
+
+        Args:
+            name: File name, ending in ".details"
+            parts: Content of the file
+            keep_previous: Older files of the same kind to keep
+
+        Returns:
+            Metadata dictionary with cache operation information
+        """
+        metadata: Dict[str, Any] = {"name": name, "stored": False, "instance_id": self.instance_id}
+        if not self._is_details_name(name):
+            metadata["error"] = f"Invalid detail file name: {name}"
+            return metadata
+
+        if self.write_queue is not None:
+            entry_metadata = dict(metadata)
+            self.write_queue.submit(
+                self._queue_key(DETAILS_KIND, name),
+                lambda: self._write_details(name, parts, keep_previous, entry_metadata),
+                None,
+            )
+            metadata["stored"] = True
+            metadata["pending_write"] = True
+            return metadata
+
+        return self._write_details(name, parts, keep_previous, metadata)
+
+    def _write_details(
+        self, name: str, parts: Sequence[bytes], keep_previous: int, metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Persist a detail file prepared by set_details()."""
+        path = self.details_dir / name
+        try:
+            if not path.exists():
+
+                def write_details(f):
+                    f.writelines(parts)
+
+                write_details.mode = "wb"  # type: ignore
+                if not atomic_write(path, write_details):
+                    metadata["error"] = "Atomic write failed"
+                    logger.error(f"Failed to atomically write detail file {name}")
+                    return metadata
+                with self.stats_lock:
+                    self.stats["data_writes"] += 1
+
+            self.manifest.record(DETAILS_KIND, name, path.stat().st_size)
+            kind = name.rsplit("-", 1)[0]
+            try:
+                previous = sorted(
+                    (other for other in self.details_dir.glob(f"{kind}-*{DETAILS_SUFFIX}") if other != path),
+                    key=lambda other: other.stat().st_mtime,
+                    reverse=True,
+                )
+            except OSError as e:  # Removed by another process meanwhile; pruned on a later save
+                logger.debug(f"Cannot list old detail files: {e}")
+                previous = []
+            for other in previous[keep_previous:]:
+                self._delete_entry(DETAILS_KIND, other.name)
+                self.manifest.remove(DETAILS_KIND, other.name)
+            self._enforce_budget(protect=(DETAILS_KIND, name))
+            self.manifest.schedule_save()
+            metadata["stored"] = True
+            logger.debug(f"Cached detail file {name}")
+            return metadata
+
+        except Exception as e:
+            with self.stats_lock:
+                self.stats["errors"] += 1
+            logger.error(f"Error storing detail file {name}: {str(e)}")
+            metadata["error"] = str(e)
+            return metadata
+
+    def get_details_path(self, name: str) -> Optional[pathlib.Path]:
+        """
+        Find a detail file stored with set_details() and mark it as recently used.
+
+        A file still queued for writing is waited for, since callers open it directly.
+
+        Args:
+            name: File name the detail file was stored under
+
+        Returns:
+            Path of the file, or None if there is no such file
+        """
+        if not self._is_details_name(name):
+            return None
+        if self.write_queue is not None and self.write_queue.peek(self._queue_key(DETAILS_KIND, name))[0]:
+            self.write_queue.flush()
+        path = self.details_dir / name
+        if not path.is_file():
+            return None
+        self.manifest.touch(DETAILS_KIND, name)
+        return path
+
+    def renew(self, url: str, validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Restart the TTL of cached HTML content without rewriting it.
+
+        Used after the server confirmed with a 304 Not Modified response that the
+        cached content is still current.
+
+        Args:
+            url: URL of the entry to renew
+            validators: Updated HTTP cache validators ("etag", "last_modified")
+
+        Returns:
+            Metadata dictionary with renewal operation information
+        """
+        updates = {k: v for k, v in (validators or {}).items() if k in HTTP_VALIDATORS and v}
+        return self._renew_entry("html", url, self._get_cache_path(url), updates)
+
+    def renew_data(self, key: str) -> Dict[str, Any]:
+        """
+        Restart the TTL of cached structured and binary data without rewriting it.
+
+        Args:
+            key: Key of the data to renew
+
+        Returns:
+            Metadata dictionary with renewal operation information
+        """
+        metadata = self._renew_entry("data", key, self._get_data_cache_path(key))
+        binary_metadata = self._renew_entry("binary", key, self._get_binary_data_cache_path(key))
+        metadata["binary_renewed"] = binary_metadata["renewed"]
+        if "error" in binary_metadata:
+            metadata["error"] = binary_metadata["error"]
+        return metadata
+
+    def _renew_entry(
+        self, kind: str, key: str, cache_path: pathlib.Path, updates: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Reset an entry's creation timestamp and modification time, merging metadata updates.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            key: URL or data key of the entry
+            cache_path: Filesystem path of the entry (unused for the store backend)
+            updates: Metadata keys to merge into the entry's metadata
+
+        Returns:
+            Metadata dictionary with renewal operation information
+        """
+        now = time.time()
+        metadata: Dict[str, Any] = {
+            "key": key,
+            "cache_path": self._cache_location(kind, key, cache_path),
+            "renewed": False,
+            "creation_timestamp": now,
+        }
+
+        try:
+            if self.write_queue is not None and self.write_queue.peek(self._queue_key(kind, key))[0]:
+                # A queued write is about to store a fresh entry anyway
+                metadata["renewed"] = True
+                metadata["pending_write"] = True
+                return metadata
+
+            if self.store is not None:
+                metadata["renewed"] = self.store.touch(kind, self._hash_key(key), now, updates)
+            elif cache_path.exists():
+                meta_path = pathlib.Path(f"{cache_path}.meta")
+                if meta_path.exists() or updates:
+                    sidecar = dict(self._read_sidecar(cache_path), **(updates or {}))
+                    sidecar["creation_timestamp"] = now
+                    atomic_write(meta_path, lambda f: f.write(json.dumps(sidecar, indent=2)))
+                os.utime(cache_path, (now, now))
+                metadata["renewed"] = True
+
+            if metadata["renewed"]:
+                self.manifest.touch(kind, self._hash_key(key))
+                logger.debug(f"Renewed {kind} cache entry: {key}")
+            return metadata
+
+        except Exception as e:
+            with self.stats_lock:
+                self.stats["errors"] += 1
+            logger.error(f"Error renewing {kind} cache entry for {key}: {str(e)}")
+            metadata["error"] = str(e)
+            return metadata
+
     def invalidate(self, url: str) -> Dict[str, Any]:
         """
         Remove a specific URL from the cache.
@@ -611,12 +1400,21 @@ class HTMLCache:
         meta_path = pathlib.Path(f"{cache_path}.meta")
         metadata = {
             "url": url,
-            "cache_path": str(cache_path),
+            "cache_path": self._cache_location("html", url, cache_path),
             "invalidated": False,
             "meta_invalidated": False,
         }
 
         try:
+            self._discard_pending(("html",), url)
+            if self.manifest.remove("html", self._hash_key(url)) is not None:
+                self.manifest.schedule_save()
+
+            if self.store is not None:
+                metadata["invalidated"] = self.store.delete("html", self._hash_key(url))
+                logger.debug(f"Invalidated store cache for URL: {url}")
+                return metadata
+
             if cache_path.exists():
                 cache_path.unlink()
                 metadata["invalidated"] = True
@@ -658,8 +1456,8 @@ class HTMLCache:
 
         metadata = {
             "key": key,
-            "cache_path": str(cache_path),
-            "binary_cache_path": str(binary_cache_path),
+            "cache_path": self._cache_location("data", key, cache_path),
+            "binary_cache_path": self._cache_location("binary", key, binary_cache_path),
             "invalidated": False,
             "binary_invalidated": False,
             "meta_invalidated": False,
@@ -667,6 +1465,18 @@ class HTMLCache:
         }
 
         try:
+            self._discard_pending(("data", "binary"), key)
+            removed = [self.manifest.remove(kind, self._hash_key(key)) for kind in ("data", "binary")]
+            if any(entry is not None for entry in removed):
+                self.manifest.schedule_save()
+
+            if self.store is not None:
+                entry_id = self._hash_key(key)
+                metadata["invalidated"] = self.store.delete("data", entry_id)
+                metadata["binary_invalidated"] = self.store.delete("binary", entry_id)
+                logger.debug(f"Invalidated store data cache for key: {key}")
+                return metadata
+
             if cache_path.exists():
                 cache_path.unlink()
                 metadata["invalidated"] = True
@@ -714,19 +1524,34 @@ class HTMLCache:
         }
 
         try:
+            self._discard_pending(("html", "data", "binary", DETAILS_KIND))
+
             if not self.cache_dir.exists():
                 logger.debug(f"Cache directory does not exist: {self.cache_dir}")
                 return metadata
 
             count = 0
-            # Remove all files recursively, including hidden files and those without extensions
-            for file_path in self.cache_dir.glob("**/*"):
-                if file_path.is_file():
+            self.manifest.clear()
+            if self.store is not None:
+                # Entries live in the database; keep the database file itself
+                count = self.store.clear()
+                for file_path in self.details_dir.glob(f"*{DETAILS_SUFFIX}"):
                     try:
                         file_path.unlink()
                         count += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to remove cache file {file_path}: {e}")
+                    except OSError as e:
+                        logger.warning(f"Failed to remove detail file {file_path}: {e}")
+            else:
+                # Remove all files recursively, including hidden files and those without extensions
+                for file_path in self.cache_dir.glob("**/*"):
+                    if file_path.is_file():
+                        try:
+                            file_path.unlink()
+                            # The manifest and its lock are bookkeeping, not cache entries
+                            if not file_path.name.startswith(CacheManifest.FILENAME):
+                                count += 1
+                        except Exception as e:
+                            logger.warning(f"Failed to remove cache file {file_path}: {e}")
 
             # Reset stats since we've cleared everything
             with self.stats_lock:
@@ -738,6 +1563,7 @@ class HTMLCache:
                     "data_hits": 0,
                     "data_misses": 0,
                     "data_writes": 0,
+                    "evictions": 0,
                 }
 
             metadata["cleared"] = True
@@ -769,32 +1595,19 @@ class HTMLCache:
             total_data_requests = stats_copy["data_hits"] + stats_copy["data_misses"]
             data_hit_ratio = stats_copy["data_hits"] / total_data_requests if total_data_requests > 0 else 0
 
-        # Get cache size information
-        cache_size = 0
-        file_count = 0
-        html_count = 0
-        data_count = 0
-        binary_data_count = 0
-        meta_count = 0
-
-        try:
-            if self.cache_dir.exists():
-                for file_path in self.cache_dir.glob("*.*"):
-                    try:
-                        cache_size += file_path.stat().st_size
-                        file_count += 1
-                        if file_path.suffix == ".html":
-                            html_count += 1
-                        elif file_path.suffix == ".json":
-                            data_count += 1
-                        elif file_path.suffix == ".pickle":
-                            binary_data_count += 1
-                        elif file_path.suffix == ".meta":
-                            meta_count += 1
-                    except Exception:
-                        pass
-        except Exception as e:
-            logger.warning(f"Error calculating cache size: {e}")
+        # Size information comes from the manifest rather than walking the directory. Without
+        # a saved manifest to start from, only the startup walk knows what is there
+        if not self.manifest_adopted:
+            self.manifest_ready.wait(STATS_WALK_TIMEOUT)
+        manifest_stats = self.manifest.stats()
+        counts = manifest_stats["counts"]
+        cache_size = manifest_stats["size_bytes"]
+        file_count = manifest_stats["files"]
+        html_count = counts.get("html", 0)
+        data_count = counts.get("data", 0)
+        binary_data_count = counts.get("binary", 0)
+        details_count = counts.get(DETAILS_KIND, 0)
+        meta_count = manifest_stats["meta_files"]
 
         return {
             "hits": stats_copy["hits"],
@@ -806,13 +1619,18 @@ class HTMLCache:
             "errors": stats_copy["errors"],
             "writes": stats_copy["writes"],
             "data_writes": stats_copy["data_writes"],
+            "evictions": stats_copy["evictions"],
+            "max_size_bytes": self.max_size_bytes,
             "cache_dir": str(self.cache_dir),
+            "backend": self.backend,
+            "write_behind": self.write_queue.get_stats() if self.write_queue is not None else None,
             "ttl": self.ttl,
             "instance_id": self.instance_id,
             "file_count": file_count,
             "html_count": html_count,
             "data_count": data_count,
             "binary_data_count": binary_data_count,
+            "details_count": details_count,
             "meta_count": meta_count,
             "cache_size_bytes": cache_size,
             "cache_size_mb": round(cache_size / (1024 * 1024), 2) if cache_size > 0 else 0,
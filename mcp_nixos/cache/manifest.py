@@ -0,0 +1,412 @@
+"""
+Manifest of cache entries for size accounting and LRU eviction.
+
+The manifest keeps one record per cache entry (kind, size on disk, number of
+files and last access time) together with running totals, so cache statistics
+are available without walking the cache directory and the least recently used
+entries can be found when the cache exceeds its disk budget.
+
+The persisted manifest holds the full records, so a restart adopts it without a
+directory walk. Saves are debounced and merged with the file under a lock, so
+servers sharing a cache directory keep each other's entries.
+"""
+
+import atexit
+import json
+import logging
+import pathlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..utils.cache_helpers import atomic_write, lock_file, unlock_file
+
+logger = logging.getLogger(__name__)
+
+EntryKey = Tuple[str, str]
+
+# Seconds a change may wait before the manifest is written
+SAVE_DELAY = 2.0
+
+# Live manifests, saved at interpreter exit
+_live_manifests: "weakref.WeakSet[CacheManifest]" = weakref.WeakSet()
+
+
+class CacheManifest:
+    """
+    In-memory index of cache entries ordered from least to most recently used.
+
+    Entries are keyed by ``(kind, entry_id)``. When a path is given the manifest
+    is persisted there as JSON so records and access times survive restarts; the
+    owner is expected to reconcile it with the actual cache contents.
+    """
+
+    FILENAME = "MANIFEST"
+    VERSION = 2
+
+    def __init__(self, path: Optional[pathlib.Path] = None, save_delay: float = SAVE_DELAY):
+        """
+        Initialize an empty manifest.
+
+        Args:
+            path: File to persist the manifest to (None keeps it in memory only)
+            save_delay: Seconds schedule_save() waits so that bursts of changes are written once
+        """
+        self.path = path
+        self.save_delay = save_delay
+        self._entries: "OrderedDict[EntryKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        # Keys in the file as of the last load or save, and keys changed or removed here since
+        self._synced: Set[EntryKey] = set()
+        self._changed: Set[EntryKey] = set()
+        self._removed: Set[EntryKey] = set()
+        # Bumped by clear() so that a reconcile started before it is dropped
+        self.epoch = 0
+        self.total_bytes = 0
+        self.total_files = 0
+        self.meta_count = 0
+        self.counts: Dict[str, int] = {}
+        _live_manifests.add(self)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: EntryKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def record(
+        self,
+        kind: str,
+        entry_id: str,
+        size: int,
+        files: int = 1,
+        has_meta: bool = False,
+        last_access: Optional[float] = None,
+    ) -> None:
+        """
+        Add or update an entry and mark it as most recently used.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            entry_id: Hashed entry identifier
+            size: Bytes used on disk by the entry, including any sidecar
+            files: Number of files making up the entry
+            has_meta: Whether the entry has a ``.meta`` sidecar
+            last_access: Access timestamp (defaults to now)
+        """
+        key = (kind, entry_id)
+        with self._lock:
+            self._discard(key)
+            entry = {
+                "size": size,
+                "files": files,
+                "meta": has_meta,
+                "last_access": time.time() if last_access is None else last_access,
+            }
+            self._add(key, entry)
+            self._changed.add(key)
+            self._removed.discard(key)
+            self._dirty = True
+
+    def touch(self, kind: str, entry_id: str) -> None:
+        """Mark an entry as most recently used."""
+        key = (kind, entry_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["last_access"] = time.time()
+                self._entries.move_to_end(key)
+                self._changed.add(key)
+                self._dirty = True
+
+    def remove(self, kind: str, entry_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove an entry.
+
+        Returns:
+            The removed record, or None if it was not tracked
+        """
+        with self._lock:
+            entry = self._discard((kind, entry_id))
+            if entry is not None:
+                self._changed.discard((kind, entry_id))
+                self._removed.add((kind, entry_id))
+                self._dirty = True
+            return entry
+
+    def clear(self) -> None:
+        """Forget every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.total_files = 0
+            self.meta_count = 0
+            self.counts = {}
+            self._synced.clear()
+            self._changed.clear()
+            self._removed.clear()
+            self._dirty = False
+            self.epoch += 1
+
+    def select_victims(self, budget: int, protect: Optional[EntryKey] = None) -> List[EntryKey]:
+        """
+        Pick least recently used entries to drop until the total fits the budget.
+
+        The entries are not removed; the caller deletes them and then calls remove().
+
+        Args:
+            budget: Maximum total bytes
+            protect: Entry that must not be selected (e.g. the one just written)
+
+        Returns:
+            Keys of the entries to evict, oldest first
+        """
+        victims = []
+        with self._lock:
+            excess = self.total_bytes - budget
+            for key, entry in self._entries.items():
+                if excess <= 0:
+                    break
+                if key == protect:
+                    continue
+                victims.append(key)
+                excess -= entry["size"]
+        return victims
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get totals without touching the disk.
+
+        Returns:
+            Dictionary with entry, file and byte totals and per-kind counts
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "files": self.total_files,
+                "meta_files": self.meta_count,
+                "size_bytes": self.total_bytes,
+                "counts": dict(self.counts),
+            }
+
+    def load(self) -> bool:
+        """
+        Adopt the records of the persisted manifest.
+
+        Returns:
+            True if a current manifest was read; False if it is missing, unreadable
+            or in an older format, in which case the owner has to rebuild it
+        """
+        records = self._read()
+        if records is None:
+            return False
+        with self._lock:
+            self.clear()
+            for key, entry in sorted(records.items(), key=lambda item: item[1]["last_access"]):
+                self._add(key, entry)
+            self._synced = set(records)
+        return True
+
+    def load_access_times(self) -> Dict[EntryKey, float]:
+        """
+        Read last access times from the persisted manifest.
+
+        Returns:
+            Mapping of entry key to last access timestamp (empty if unavailable)
+        """
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == 1:
+                return {(kind, entry_id): float(last_access) for kind, entry_id, last_access in data["entries"]}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache manifest {self.path}: {e}")
+            return {}
+        records = self._read()
+        return {key: entry["last_access"] for key, entry in (records or {}).items()}
+
+    def reconcile(self, found: Iterable[Tuple[EntryKey, Dict[str, Any]]], started: float, epoch: int) -> None:
+        """
+        Bring the manifest in line with the entries found in storage.
+
+        Entries recorded or used since the walk started are kept as they are, since
+        the walk may have missed them. The result is ordered by last access again.
+
+        Args:
+            found: Key and record of every entry found, with its last access time
+            started: When the walk started
+            epoch: Value of ``epoch`` when the walk started; the walk is dropped if the manifest was cleared since
+        """
+        found = dict(found)
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            for key, entry in list(self._entries.items()):
+                if entry["last_access"] >= started:
+                    continue
+                if key not in found:
+                    self._discard(key)
+                    self._removed.add(key)
+                else:
+                    update = found[key]
+                    # The walk takes access times from the manifest, so keep the newer one
+                    update["last_access"] = max(update["last_access"], entry["last_access"])
+                    if update != entry:
+                        self._discard(key)
+                        self._add(key, update)
+                        self._changed.add(key)
+            for key, entry in found.items():
+                if key not in self._entries and key not in self._removed:
+                    self._add(key, entry)
+                    self._changed.add(key)
+            self._sort()
+            self._dirty = True
+
+    def schedule_save(self) -> None:
+        """Save the manifest after ``save_delay`` seconds, so a burst of changes is written once."""
+        if self.path is None:
+            return
+        if self.save_delay <= 0:
+            self.save()
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.save_delay, self._save_scheduled)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _save_scheduled(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.save()
+
+    def save(self, force: bool = False) -> bool:
+        """
+        Persist the manifest if it changed since the last save.
+
+        The file is read and merged under a lock first: entries another process added
+        are adopted, entries it removed are dropped unless changed here, and the newer
+        access time wins for entries both know.
+
+        Args:
+            force: Save even if nothing changed
+
+        Returns:
+            True if the manifest is persisted and up to date
+        """
+        if self.path is None:
+            return True
+        if not self.path.parent.exists():
+            # The cache directory was removed; don't recreate it just for the manifest
+            return False
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty and not force:
+                return True
+        try:
+            with open(self.path.with_name(f"{self.FILENAME}.lock"), "a") as lock:
+                locked = lock_file(lock)
+                try:
+                    with self._lock:
+                        self._merge(self._read() or {})
+                        # Entries are stored oldest first, so load order restores LRU order
+                        entries = [
+                            [kind, entry_id, entry["size"], entry["files"], entry["meta"], entry["last_access"]]
+                            for (kind, entry_id), entry in self._entries.items()
+                        ]
+                        content = json.dumps({"version": self.VERSION, "entries": entries}, separators=(",", ":"))
+                        if not atomic_write(self.path, lambda f: f.write(content)):
+                            return False
+                        self._synced = set(self._entries)
+                        self._changed.clear()
+                        self._removed.clear()
+                        self._dirty = False
+                        return True
+                finally:
+                    if locked:
+                        unlock_file(lock)
+        except Exception as e:
+            logger.warning(f"Failed to save cache manifest {self.path}: {e}")
+            return False
+
+    def _read(self) -> Optional[Dict[EntryKey, Dict[str, Any]]]:
+        """Read the records of the persisted manifest, or None if there is no current one."""
+        if self.path is None or not self.path.exists():
+            return None
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                return None
+            return {
+                (kind, entry_id): {
+                    "size": int(size),
+                    "files": int(files),
+                    "meta": bool(meta),
+                    "last_access": float(last_access),
+                }
+                for kind, entry_id, size, files, meta, last_access in data.get("entries", [])
+            }
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache manifest {self.path}: {e}")
+            return None
+
+    def _merge(self, records: Dict[EntryKey, Dict[str, Any]]) -> None:
+        """Merge the records saved by other processes into this manifest. Caller holds the lock."""
+        for key in list(self._entries):
+            if key not in records and key in self._synced and key not in self._changed:
+                # Saved before, gone from the file now: another process evicted or invalidated it
+                self._discard(key)
+        for key, entry in records.items():
+            if key in self._removed:
+                continue
+            current = self._entries.get(key)
+            if current is None or (key not in self._changed and entry != current):
+                self._discard(key)
+                self._add(key, entry)
+            elif entry["last_access"] > current["last_access"]:
+                current["last_access"] = entry["last_access"]
+        self._sort()
+
+    def _add(self, key: EntryKey, entry: Dict[str, Any]) -> None:
+        """Add a record as the most recently used entry. Caller holds the lock."""
+        self._entries[key] = entry
+        self.total_bytes += entry["size"]
+        self.total_files += entry["files"]
+        self.meta_count += int(entry["meta"])
+        self.counts[key[0]] = self.counts.get(key[0], 0) + 1
+
+    def _sort(self) -> None:
+        """Order the entries by last access again. Caller holds the lock."""
+        ordered = sorted(self._entries.items(), key=lambda item: item[1]["last_access"])
+        self._entries = OrderedDict(ordered)
+
+    def _discard(self, key: EntryKey) -> Optional[Dict[str, Any]]:
+        """Remove an entry and subtract it from the totals. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry["size"]
+            self.total_files -= entry["files"]
+            self.meta_count -= int(entry["meta"])
+            self.counts[key[0]] -= 1
+        return entry
+
+
+def save_live_manifests() -> None:
+    """Persist every live manifest with unsaved changes now, rather than after its save delay."""
+    for manifest in list(_live_manifests):
+        manifest.save()
+
+
+atexit.register(save_live_manifests)
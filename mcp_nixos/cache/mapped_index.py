@@ -0,0 +1,638 @@
+"""
+Read-only option indexes shared between processes through memory-mapped files.
+
+Every editor or assistant session runs its own server process, and each used to
+decode the same snapshot into its own dicts and sets. A mapped index file is
+laid out so that it can be used in place: processes map it read-only, share its
+pages through the OS page cache, and decode only the strings a query touches.
+
+    header    magic, format version, flags, metadata length
+    meta      small JSON document (kind, fields, counts, section offsets, index layout)
+    strings   offsets of every distinct string, then the UTF-8 bytes of all of them
+    records   one array of string IDs per field, records sorted by name
+    indexes   per index: key string IDs sorted by key, posting offsets and postings (in the order given)
+
+Integers are little-endian uint32 and every section starts on an 8-byte
+boundary. Because records are sorted by name, a record ID is also the position
+of its name in sorted order: names are found with a binary search, and the name
+column doubles as the sorted name list of a PrefixIndex. Index keys are sorted
+by their UTF-8 bytes (the same order as the strings) and found the same way.
+
+Files are written once per data version, named after a digest of their content,
+and published by atomically replacing a small pointer file naming the current
+version. A process that has mapped an older version keeps using it unaffected.
+
+The same layout serves as a prebuilt index: ``python -m mcp_nixos --build-index`` writes
+it ahead of time, either into the package (bundled with it) or into a directory
+named by MCP_NIXOS_PREBUILT_INDEX_DIR (pinned, e.g. a Nix store path), so a
+fresh install answers without downloading and parsing the documentation first.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import time
+from array import array
+from collections.abc import ItemsView, Mapping, Sequence, ValuesView
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from mcp_nixos.cache.snapshot import IndexKey, SnapshotError
+from mcp_nixos.utils.cache_helpers import atomic_write
+from mcp_nixos.utils.posting_lists import intersect_ids
+
+logger = logging.getLogger("mcp_nixos")
+
+MAGIC = b"MNXMMAP\x00"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHI")  # magic, version, flags, metadata length
+_ALIGN = 8
+# Joins the parts of a tuple key into one stored string (values may not contain it)
+_KEY_SEPARATOR = "\x00"
+
+# Prebuilt indexes shipped inside the package, written by ``--build-index mcp_nixos/data/prebuilt`` before a build
+BUNDLED_INDEX_DIR = pathlib.Path(__file__).resolve().parent.parent / "data" / "prebuilt"
+
+
+def shared_index_enabled() -> bool:
+    """Whether indexes are shared through mapped files (MCP_NIXOS_SHARED_INDEX, default true)."""
+    return os.environ.get("MCP_NIXOS_SHARED_INDEX", "true").lower() in ("1", "true", "yes")
+
+
+def dump_mapped_index(
+    kind: str,
+    fields: Sequence,
+    records: Sequence,
+    indexes: Mapping,
+    meta: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """
+    Serialize records and indexes into a mapped index file.
+
+    Args:
+        kind: What the file holds (checked on open, e.g. "home_manager")
+        fields: Field names, in the order of the values in each record; must include "name"
+        records: Records as sequences of strings or None, with unique names
+        indexes: Index name to mapping of key (string or tuple of strings) to positions in ``records``
+        meta: Additional JSON-serializable metadata
+
+    Returns:
+        File contents
+
+    Raises:
+        SnapshotError: If a value is not a string or None, contains a NUL character, or a name repeats
+    """
+    if sys.byteorder != "little":
+        raise SnapshotError("Mapped indexes are only supported on little-endian machines")
+    fields = tuple(fields)
+    if "name" not in fields:
+        raise SnapshotError("Mapped index records need a name field")
+    name_field = fields.index("name")
+
+    # Records are stored in name order, so positions are renumbered to record IDs
+    order = []
+    for position, record in enumerate(records):
+        if len(record) != len(fields):
+            raise SnapshotError(f"Record has {len(record)} values for {len(fields)} fields")
+        if not isinstance(record[name_field], str):
+            raise SnapshotError("Every record needs a name")
+        order.append((record[name_field].encode("utf-8"), position))
+    order.sort()
+    record_ids = [0] * len(order)
+    for record_id, (encoded, position) in enumerate(order):
+        if record_id and order[record_id - 1][0] == encoded:
+            raise SnapshotError(f"Option {encoded.decode('utf-8')} appears twice")
+        record_ids[position] = record_id
+
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        if not isinstance(value, str):
+            raise SnapshotError(f"Cannot store {type(value).__name__} value in a mapped index")
+        string_id = string_ids.get(value)
+        if string_id is None:
+            if _KEY_SEPARATOR in value:
+                raise SnapshotError("Cannot store strings containing NUL in a mapped index")
+            string_id = string_ids[value] = len(string_ids) + 1
+        return string_id
+
+    columns = [array("I", bytes(4 * len(order))) for _ in fields]
+    for position, record in enumerate(records):
+        record_id = record_ids[position]
+        for column, value in zip(columns, record):
+            column[record_id] = intern(value)
+
+    index_layout = []
+    index_sections: List[bytes] = []
+    for name, index in indexes.items():
+        entries = []
+        arity = None
+        for key, ids in index.items():
+            parts = (key,) if isinstance(key, str) else tuple(key)
+            if arity is None:
+                arity = len(parts)
+            elif len(parts) != arity:
+                raise SnapshotError(f"Index {name} mixes keys of different lengths")
+            if not all(isinstance(part, str) and _KEY_SEPARATOR not in part for part in parts):
+                raise SnapshotError(f"Index {name} has a key that cannot be stored: {key!r}")
+            joined = _KEY_SEPARATOR.join(parts)
+            entries.append((joined.encode("utf-8"), joined, [record_ids[i] for i in ids]))
+        entries.sort(key=lambda entry: entry[0])
+
+        keys, offsets, postings = array("I"), array("I", [0]), array("I")
+        for _, joined, ids in entries:
+            string_id = string_ids.get(joined)
+            if string_id is None:
+                string_id = string_ids[joined] = len(string_ids) + 1
+            keys.append(string_id)
+            postings.extend(ids)
+            offsets.append(len(postings))
+        index_layout.append({"name": name, "arity": arity or 1, "keys": len(keys)})
+        index_sections.extend([keys.tobytes(), offsets.tobytes(), postings.tobytes()])
+
+    blob = bytearray()
+    string_offsets = array("I", [0, 0])  # String 0 stands for None
+    for value in string_ids:
+        blob += value.encode("utf-8")
+        string_offsets.append(len(blob))
+
+    sections = [string_offsets.tobytes(), bytes(blob), *(column.tobytes() for column in columns), *index_sections]
+    body = bytearray()
+    layout = []
+    for section in sections:
+        body += bytes(-len(body) % _ALIGN)
+        layout.append([len(body), len(section)])
+        body += section
+
+    meta_bytes = json.dumps(
+        {
+            "kind": kind,
+            "fields": list(fields),
+            "records": len(order),
+            "strings": len(string_ids),
+            "sections": layout,
+            "indexes": index_layout,
+            "meta": meta or {},
+        },
+        default=str,
+    ).encode("utf-8")
+    meta_bytes += b" " * (-(_HEADER.size + len(meta_bytes)) % _ALIGN)
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta_bytes)) + meta_bytes + bytes(body)
+
+
+class MappedIndexFile:
+    """
+    A mapped index file, read in place.
+
+    Strings are decoded when they are read; nothing else is copied out of the
+    mapping. The mapping stays open as long as the object or any view of it is
+    referenced.
+    """
+
+    def __init__(self, path: pathlib.Path, kind: str):
+        """
+        Map a file and check its layout.
+
+        Args:
+            path: File written from dump_mapped_index
+            kind: Expected kind
+
+        Raises:
+            SnapshotError: If the file is not a valid mapped index of this format version and kind
+            OSError: If the file cannot be opened
+        """
+        if sys.byteorder != "little":
+            raise SnapshotError("Mapped indexes are only supported on little-endian machines")
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # Empty file
+                raise SnapshotError(f"Cannot map {self.path.name}: {e}") from e
+
+        size = len(self._mmap)
+        if size < _HEADER.size:
+            raise SnapshotError("Mapped index is truncated")
+        magic, version, _flags, meta_length = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise SnapshotError("Not a mapped index")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported mapped index format version {version}")
+        base = _HEADER.size + meta_length
+        try:
+            header_meta = json.loads(self._mmap[_HEADER.size : base])
+        except ValueError as e:
+            raise SnapshotError(f"Unreadable mapped index metadata: {e}") from e
+        if header_meta.get("kind") != kind:
+            raise SnapshotError(f"Mapped index holds {header_meta.get('kind')!r} data, not {kind!r}")
+
+        view = memoryview(self._mmap)
+        try:
+            sections = []
+            for offset, length in header_meta["sections"]:
+                start = base + offset
+                if start + length > size:
+                    raise SnapshotError("Mapped index is truncated")
+                sections.append((start, length))
+            self.fields: Tuple[str, ...] = tuple(header_meta["fields"])
+            self.meta: Dict[str, Any] = header_meta.get("meta", {})
+            self._record_count: int = header_meta["records"]
+
+            def uints(section: Tuple[int, int]) -> memoryview:
+                start, length = section
+                return view[start : start + length].cast("I")
+
+            self._string_offsets = uints(sections[0])
+            self._blob_start = sections[1][0]
+            if len(self._string_offsets) != header_meta["strings"] + 2:
+                raise SnapshotError("Mapped index string table is inconsistent")
+            self._columns = [uints(section) for section in sections[2 : 2 + len(self.fields)]]
+            if len(self._columns) != len(self.fields) or any(len(c) != self._record_count for c in self._columns):
+                raise SnapshotError("Mapped index record count is inconsistent")
+            self.name_field = self.fields.index("name")
+            self._names = self._columns[self.name_field]
+
+            self._indexes: Dict[str, Tuple[memoryview, memoryview, memoryview, int]] = {}
+            position = 2 + len(self.fields)
+            for layout in header_meta["indexes"]:
+                keys, offsets, postings = (uints(section) for section in sections[position : position + 3])
+                position += 3
+                if len(offsets) != len(keys) + 1 or offsets[-1] != len(postings) or len(keys) != layout["keys"]:
+                    raise SnapshotError(f"Mapped index {layout['name']} is inconsistent")
+                self._indexes[layout["name"]] = (keys, offsets, postings, layout["arity"])
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            raise SnapshotError(f"Mapped index is inconsistent: {e}") from e
+
+    def __len__(self) -> int:
+        return self._record_count
+
+    @property
+    def index_names(self) -> List[str]:
+        """Names of the indexes in the file."""
+        return list(self._indexes)
+
+    def _bytes(self, string_id: int) -> bytes:
+        start = self._blob_start + self._string_offsets[string_id]
+        return self._mmap[start : self._blob_start + self._string_offsets[string_id + 1]]
+
+    def string(self, string_id: int) -> Optional[str]:
+        """Decode a string by ID (0 is None)."""
+        return self._bytes(string_id).decode("utf-8") if string_id else None
+
+    def name(self, record_id: int) -> str:
+        """Name of a record."""
+        return self._bytes(self._names[record_id]).decode("utf-8")
+
+    def record(self, record_id: int) -> Tuple[Optional[str], ...]:
+        """Values of a record, in ``fields`` order."""
+        return tuple(self.string(column[record_id]) for column in self._columns)
+
+    def find(self, name: str) -> int:
+        """Record ID of a name, or -1 if there is no such record."""
+        return _search(self._names, self._bytes, name.encode("utf-8"))
+
+    @property
+    def names(self) -> "MappedNames":
+        """Record names in sorted order, decoded as they are read."""
+        return MappedNames(self)
+
+    def options(self, factory: Callable[[Tuple[Optional[str], ...]], Any]) -> "MappedRecords":
+        """Mapping of name to record, each built by ``factory`` from its values when read."""
+        return MappedRecords(self, factory)
+
+    def postings(self, index_name: str, container: Callable[[Iterable[str]], Any] = set) -> "MappedPostings":
+        """Mapping of an index's keys to the names under each, collected into ``container``."""
+        if index_name not in self._indexes:
+            raise KeyError(index_name)
+        return MappedPostings(self, index_name, container)
+
+
+def _search(string_ids: memoryview, read: Callable[[int], bytes], target: bytes) -> int:
+    """Position of ``target`` among strings sorted by their bytes, or -1."""
+    low, high = 0, len(string_ids)
+    while low < high:
+        middle = (low + high) // 2
+        if read(string_ids[middle]) < target:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(string_ids) and read(string_ids[low]) == target:
+        return low
+    return -1
+
+
+class MappedNames(Sequence):
+    """Sorted record names of a mapped index, usable by ``bisect`` and PrefixIndex."""
+
+    def __init__(self, mapped: MappedIndexFile):
+        """Initialize the view."""
+        self._mapped = mapped
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._mapped.name(record_id) for record_id in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self._mapped.name(position)
+
+    def __len__(self) -> int:
+        return len(self._mapped)
+
+
+class _RecordItems(ItemsView):
+    def __iter__(self):
+        mapped, factory = self._mapping._mapped, self._mapping._factory
+        for record_id in range(len(mapped)):
+            values = mapped.record(record_id)
+            yield values[mapped.name_field], factory(values)
+
+
+class _RecordValues(ValuesView):
+    def __iter__(self):
+        mapped, factory = self._mapping._mapped, self._mapping._factory
+        for record_id in range(len(mapped)):
+            yield factory(mapped.record(record_id))
+
+
+class MappedRecords(Mapping):
+    """Read-only mapping of option name to option, built from the mapped values on each read."""
+
+    def __init__(self, mapped: MappedIndexFile, factory: Callable[[Tuple[Optional[str], ...]], Any]):
+        """Initialize the view."""
+        self._mapped = mapped
+        self._factory = factory
+
+    def __getitem__(self, name: str) -> Any:
+        record_id = self._mapped.find(name) if isinstance(name, str) else -1
+        if record_id < 0:
+            raise KeyError(name)
+        return self._factory(self._mapped.record(record_id))
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return an option, or default if there is none of that name."""
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._mapped.find(name) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(MappedNames(self._mapped))
+
+    def __len__(self) -> int:
+        return len(self._mapped)
+
+    def items(self) -> ItemsView:
+        """Name and option pairs, in name order."""
+        return _RecordItems(self)
+
+    def values(self) -> ValuesView:
+        """Options, in name order."""
+        return _RecordValues(self)
+
+
+class MappedPostings(Mapping):
+    """Read-only mapping of index key to the names under it."""
+
+    def __init__(self, mapped: MappedIndexFile, index_name: str, container: Callable[[Iterable[str]], Any]):
+        """Initialize the view."""
+        self._mapped = mapped
+        self._keys, self._offsets, self._postings, self._arity = mapped._indexes[index_name]
+        self._container = container
+
+    def ids(self, key: IndexKey) -> Optional[memoryview]:
+        """Record IDs under a key, or None if the key is not in the index."""
+        parts = (key,) if isinstance(key, str) else key
+        if not isinstance(parts, tuple) or len(parts) != self._arity or not all(isinstance(p, str) for p in parts):
+            return None
+        position = _search(self._keys, self._mapped._bytes, _KEY_SEPARATOR.join(parts).encode("utf-8"))
+        if position < 0:
+            return None
+        return self._postings[self._offsets[position] : self._offsets[position + 1]]
+
+    def intersect(self, keys: Iterable[IndexKey]) -> Set[str]:
+        """
+        Names under every one of the keys that is in the index (other keys are ignored).
+
+        Record IDs are intersected from the shortest list up (see
+        mcp_nixos.utils.posting_lists), and only the names in the result are decoded.
+        """
+        postings = [ids for ids in map(self.ids, keys) if ids is not None]
+        # Postings keep the order they were written in, which need not be ascending
+        return {self._mapped.name(record_id) for record_id in intersect_ids(postings, is_sorted=False)}
+
+    def __getitem__(self, key: IndexKey) -> Any:
+        ids = self.ids(key)
+        if ids is None:
+            raise KeyError(key)
+        return self._container(map(self._mapped.name, ids))
+
+    def __contains__(self, key: object) -> bool:
+        return self.ids(key) is not None  # type: ignore[arg-type]
+
+    def __iter__(self) -> Iterator[IndexKey]:
+        for string_id in self._keys:
+            key = self._mapped.string(string_id) or ""
+            yield key if self._arity == 1 else tuple(key.split(_KEY_SEPARATOR))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class MappedIndexStore:
+    """
+    Versions of one kind of mapped index in a directory, with a pointer to the current one.
+
+        <directory>/<kind>-<digest>.idx   one file per data version, never modified
+        <directory>/<kind>.current        name of the current version
+
+    The age of the pointer is the age of the data, so renew() restarts its TTL.
+    A read-only store (a prebuilt index) is never modified and never expires;
+    its files may carry arbitrary modification times, as in the Nix store, so
+    whether its data is outdated() goes by the "timestamp" in the file's metadata.
+    """
+
+    def __init__(self, directory: pathlib.Path, kind: str, ttl: Optional[float] = None, read_only: bool = False):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the files (created on first publish)
+            kind: What the files hold, e.g. "home_manager"
+            ttl: Seconds after publication (or renewal) at which a version expires (None: never)
+            read_only: Whether versions are only opened, never published, renewed or dropped
+        """
+        self.directory = pathlib.Path(directory)
+        self.kind = kind
+        self.ttl = ttl
+        self.read_only = read_only
+        self.pointer = self.directory / f"{kind}.current"
+
+    @classmethod
+    def for_cache(cls, cache: Any, kind: str) -> Optional["MappedIndexStore"]:
+        """
+        Store under a cache's directory, or None if sharing is disabled or the cache has no directory.
+
+        Args:
+            cache: HTMLCache whose cache_dir holds the files
+            kind: What the files hold
+        """
+        cache_dir = getattr(cache, "cache_dir", None)
+        if not shared_index_enabled() or not isinstance(cache_dir, pathlib.Path):
+            return None
+        return cls(cache_dir / "mapped", kind, ttl=getattr(cache, "ttl", None))
+
+    @classmethod
+    def prebuilt(cls, kind: str, ttl: Optional[float] = None) -> Optional["MappedIndexStore"]:
+        """
+        Read-only store of the prebuilt index, or None if MCP_NIXOS_PREBUILT_INDEX_DIR is set but empty.
+
+        Either is served whatever its age, so answers never wait for the network.
+        The one bundled with the package is outdated once older than the TTL,
+        telling the client to fetch current data in the background; one pinned
+        with MCP_NIXOS_PREBUILT_INDEX_DIR never is.
+
+        Args:
+            kind: What the files hold
+            ttl: Seconds after the bundled index was built at which it is outdated
+        """
+        pinned = os.environ.get("MCP_NIXOS_PREBUILT_INDEX_DIR")
+        if pinned is not None:
+            return cls(pathlib.Path(pinned).expanduser(), kind, read_only=True) if pinned else None
+        return cls(BUNDLED_INDEX_DIR, kind, ttl=ttl, read_only=True)
+
+    def publish(self, data: bytes, keep_previous: bool = True) -> Optional[pathlib.Path]:
+        """
+        Write a version if it is not there yet, and make it the current one.
+
+        Args:
+            data: Contents from dump_mapped_index
+            keep_previous: Whether to keep the version before it for processes still switching over
+
+        Returns:
+            Path of the published file, or None if it could not be written
+        """
+        if self.read_only:
+            logger.warning(f"Not publishing to read-only {self.kind} index store {self.directory}")
+            return None
+        path = self.directory / f"{self.kind}-{hashlib.sha256(data).hexdigest()[:16]}.idx"
+
+        def write_index(f):
+            f.write(data)
+
+        def write_pointer(f):
+            f.write(path.name.encode("utf-8"))
+
+        write_index.mode = "wb"  # type: ignore
+        write_pointer.mode = "wb"  # type: ignore
+        if not path.exists() and not atomic_write(path, write_index):
+            return None
+        if not atomic_write(self.pointer, write_pointer):
+            return None
+        logger.info(f"Published shared {self.kind} index {path.name} ({len(data)} bytes)")
+        self._remove_old_versions(path, keep=1 if keep_previous else 0)
+        return path
+
+    def _remove_old_versions(self, current: pathlib.Path, keep: int = 1) -> None:
+        """Delete versions other than the current and the ``keep`` before it."""
+        versions = sorted(
+            (path for path in self.directory.glob(f"{self.kind}-*.idx") if path != current),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        # The previous version is kept for processes that read the pointer just before it changed
+        for path in versions[keep:]:
+            try:
+                path.unlink()
+            except OSError as e:  # Still mapped on Windows; removed on a later publish
+                logger.debug(f"Cannot remove old shared index {path.name}: {e}")
+
+    def current_path(self, allow_expired: bool = False) -> Optional[pathlib.Path]:
+        """
+        Path of the current version.
+
+        Args:
+            allow_expired: Whether a version older than the TTL is acceptable
+
+        Returns:
+            The path, or None if there is no current version or it has expired
+        """
+        try:
+            age = time.time() - self.pointer.stat().st_mtime
+            if self.ttl is not None and age > self.ttl and not allow_expired and not self.read_only:
+                return None
+            name = self.pointer.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if not name.startswith(f"{self.kind}-") or "/" in name or "\\" in name:
+            return None
+        return self.directory / name
+
+    def open(self, allow_expired: bool = False) -> Optional[MappedIndexFile]:
+        """
+        Map the current version.
+
+        Args:
+            allow_expired: Whether a version older than the TTL is acceptable
+
+        Returns:
+            The mapped file, or None if there is no usable current version
+        """
+        path = self.current_path(allow_expired)
+        if path is None:
+            return None
+        try:
+            mapped = MappedIndexFile(path, self.kind)
+        except (OSError, SnapshotError) as e:
+            logger.warning(f"Ignoring unusable shared {self.kind} index {path.name}: {e}")
+            self.invalidate()
+            return None
+        return mapped
+
+    def outdated(self) -> bool:
+        """
+        Whether the current version of a read-only store was built longer than the TTL ago.
+
+        Its files may have any modification time (1970, in the Nix store), so
+        the build time recorded in the metadata is used instead.
+        """
+        if not self.read_only or self.ttl is None:
+            return False
+        mapped = self.open()
+        if mapped is None:
+            return False
+        built = mapped.meta.get("timestamp")
+        if isinstance(built, (int, float)) and time.time() - built <= self.ttl:
+            return False
+        logger.info(f"Prebuilt {self.kind} index {mapped.path.name} is outdated")
+        return True
+
+    def renew(self) -> bool:
+        """Restart the TTL of the current version."""
+        if self.read_only:
+            return False
+        try:
+            os.utime(self.pointer)
+            return True
+        except OSError:
+            return False
+
+    def invalidate(self) -> None:
+        """Stop using the current version; processes that mapped it are unaffected."""
+        if self.read_only:
+            return
+        try:
+            self.pointer.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Cannot remove shared {self.kind} index pointer: {e}")
@@ -0,0 +1,125 @@
+"""
+Search results remembered per index generation.
+
+Assistants tend to repeat the same search within a conversation, and every
+repetition used to tokenize the query, intersect postings, correct spelling
+and rank the matches again, although the answer could not have changed: it
+only changes when the index it came from is replaced. A ResultCache keeps the
+most recent answers keyed by the generation of the index and the normalized
+query, limit and filters, so a replaced index is never asked for them again
+and nothing has to be invalidated. Once a newer generation is seen, the
+answers of the older ones are dropped.
+
+Answers are stored and handed out as copies, since callers sort and extend
+the lists they get. Each entry remembers the CPU time its search took, which
+is counted as saved every time the entry is reused.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("mcp_nixos")
+
+DEFAULT_MAX_SIZE = 256
+
+
+def result_cache_size() -> int:
+    """Search results remembered per client (MCP_NIXOS_RESULT_CACHE_SIZE, default 256; 0 disables)."""
+    try:
+        return max(0, int(os.environ.get("MCP_NIXOS_RESULT_CACHE_SIZE", DEFAULT_MAX_SIZE)))
+    except ValueError:
+        logger.warning("Invalid MCP_NIXOS_RESULT_CACHE_SIZE, using default")
+        return DEFAULT_MAX_SIZE
+
+
+def copy_result(value: Any) -> Any:
+    """Copy the dicts and lists of a search result, sharing the strings and numbers they hold."""
+    if isinstance(value, dict):
+        return {key: copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_result(item) for item in value]
+    return value
+
+
+class ResultCache:
+    """LRU cache of search results for the current index generation, counting the CPU time it saved."""
+
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size: Results kept (default: result_cache_size()); 0 disables the cache
+        """
+        self.max_size = result_cache_size() if max_size is None else max(0, max_size)
+        self.generation = 0  # Newest generation results were asked for
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_cpu_seconds = 0.0
+        self.spent_cpu_seconds = 0.0
+
+    def get_or_compute(self, generation: int, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Answer a search from the cache, or run it and remember the answer.
+
+        Args:
+            generation: Generation of the index the search runs against
+            key: Normalized query, limit and filters
+            compute: Runs the search
+
+        Returns:
+            A copy of the answer
+        """
+        if not self.max_size:
+            return compute()
+        with self._lock:
+            if generation > self.generation:
+                self._entries.clear()  # Older generations are never searched again
+                self.generation = generation
+            entry = self._entries.get(key) if generation == self.generation else None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_cpu_seconds += entry[1]
+            else:
+                self.misses += 1
+        if entry is not None:
+            return copy_result(entry[0])
+
+        started = time.thread_time()
+        value = compute()
+        cpu_seconds = time.thread_time() - started
+        with self._lock:
+            self.spent_cpu_seconds += cpu_seconds
+            if generation == self.generation:  # Not if the index was replaced meanwhile
+                self._entries[key] = (copy_result(value), cpu_seconds)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Forget every result, e.g. after the served index was changed in place."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Results kept, hits and misses, the hit ratio, and the CPU seconds spent searching and saved by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "spent_cpu_seconds": self.spent_cpu_seconds,
+                "saved_cpu_seconds": self.saved_cpu_seconds,
+            }
@@ -0,0 +1,270 @@
+"""
+Versioned binary snapshots of option indexes.
+
+A snapshot holds a set of option records together with the search indexes built
+over them, laid out so that loading is a handful of bulk operations instead of a
+JSON decode of every record:
+
+    header    magic, format version, flags, payload length, CRC-32 of the payload
+    payload   length-prefixed sections:
+                meta      small JSON document (kind, fields, index layout, counts)
+                strings   every distinct string once, NUL-separated UTF-8
+                records   one packed array of string IDs per field (0 stands for None)
+                indexes   per index: packed key string IDs, posting offsets and postings
+
+Options are referred to by integer IDs (their position in the record list), and
+posting lists are packed ``array('I')`` slices of those IDs in ascending order, so
+they load as they are, without sorting. The header checksum
+rejects truncated or corrupt files before anything is decoded.
+"""
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+MAGIC = b"MNXSNAP\x00"
+# 2: posting lists are sorted
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<8sHHQI")  # magic, version, flags, payload length, CRC-32 of the payload
+_LENGTH = struct.Struct("<Q")
+
+IndexKey = Union[str, Tuple[str, ...]]
+
+
+class SnapshotError(ValueError):
+    """Raised for snapshots that are corrupt, truncated, or of another version or kind."""
+
+
+@dataclass
+class IndexSnapshot:
+    """Decoded snapshot: one list of values per field, plus packed postings per index."""
+
+    kind: str
+    fields: Tuple[str, ...]
+    columns: List[List[Optional[str]]]
+    meta: Dict[str, Any] = field(default_factory=dict)
+    _indexes: Dict[str, Tuple[List[IndexKey], array, array]] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, field_name: str) -> List[Optional[str]]:
+        """Values of one field, in record order."""
+        return self.columns[self.fields.index(field_name)]
+
+    @property
+    def records(self) -> List[Tuple[Optional[str], ...]]:
+        """Records as tuples in ``fields`` order (built on each access; columns are cheaper to read)."""
+        return list(zip(*self.columns))
+
+    @property
+    def index_names(self) -> List[str]:
+        """Names of the indexes stored in the snapshot."""
+        return list(self._indexes)
+
+    def postings(self, name: str) -> Iterator[Tuple[IndexKey, array]]:
+        """
+        Iterate over an index.
+
+        Args:
+            name: Index name given when the snapshot was written
+
+        Yields:
+            (key, record IDs in ascending order) pairs in the stored order
+        """
+        keys, offsets, postings = self._indexes[name]
+        return zip(keys, map(postings.__getitem__, map(slice, offsets, offsets[1:])))
+
+    def packed(self, name: str) -> Tuple[List[IndexKey], array, array]:
+        """
+        An index as stored: its keys, the offset of each key's record IDs followed by the end offset, and all IDs.
+
+        Args:
+            name: Index name given when the snapshot was written
+        """
+        return self._indexes[name]
+
+
+def dump_snapshot(
+    kind: str,
+    fields: Sequence[str],
+    records: Sequence[Sequence[Optional[str]]],
+    indexes: Mapping[str, Mapping[IndexKey, Iterable[int]]],
+    meta: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """
+    Serialize records and indexes into a snapshot.
+
+    Args:
+        kind: What the snapshot holds (checked on load, e.g. "home_manager")
+        fields: Field names, in the order of the values in each record
+        records: Records as sequences of strings or None
+        indexes: Index name to mapping of key (string or tuple of strings) to record IDs
+        meta: Additional JSON-serializable metadata
+
+    Returns:
+        Snapshot bytes
+
+    Raises:
+        SnapshotError: If a value is not a string or None, or contains a NUL character
+    """
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        if not isinstance(value, str):
+            raise SnapshotError(f"Cannot store {type(value).__name__} value in a snapshot")
+        string_id = string_ids.get(value)
+        if string_id is None:
+            if "\x00" in value:
+                raise SnapshotError("Cannot store strings containing NUL in a snapshot")
+            string_id = string_ids[value] = len(string_ids) + 1
+        return string_id
+
+    columns = [array("I") for _ in fields]
+    for record in records:
+        if len(record) != len(fields):
+            raise SnapshotError(f"Record has {len(record)} values for {len(fields)} fields")
+        for column, value in zip(columns, record):
+            column.append(intern(value))
+
+    index_sections: List[bytes] = []
+    index_layout = []
+    for name, index in indexes.items():
+        keys, offsets, postings = array("I"), array("I", [0]), array("I")
+        arity = 1
+        for position, (key, ids) in enumerate(index.items()):
+            parts = (key,) if isinstance(key, str) else tuple(key)
+            if position == 0:
+                arity = len(parts)
+            elif len(parts) != arity:
+                raise SnapshotError(f"Index {name} mixes keys of different lengths")
+            keys.extend(intern(part) for part in parts)
+            postings.extend(sorted(ids))
+            offsets.append(len(postings))
+        index_layout.append({"name": name, "arity": arity, "keys": len(offsets) - 1})
+        index_sections.extend([keys.tobytes(), offsets.tobytes(), postings.tobytes()])
+
+    header_meta = {
+        "kind": kind,
+        "fields": list(fields),
+        "records": len(records),
+        "strings": len(string_ids),
+        "indexes": index_layout,
+        "byteorder": sys.byteorder,
+        "meta": meta or {},
+    }
+    sections = [
+        json.dumps(header_meta, default=str).encode("utf-8"),
+        "\x00".join(string_ids).encode("utf-8"),
+        *(column.tobytes() for column in columns),
+        *index_sections,
+    ]
+    payload = b"".join(_LENGTH.pack(len(section)) + section for section in sections)
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(payload), zlib.crc32(payload)) + payload
+
+
+def load_snapshot(data: bytes, kind: str) -> IndexSnapshot:
+    """
+    Decode a snapshot written by dump_snapshot.
+
+    Args:
+        data: Snapshot bytes
+        kind: Expected snapshot kind
+
+    Returns:
+        The decoded snapshot
+
+    Raises:
+        SnapshotError: If the data is not a valid snapshot of this format version and kind
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        raise SnapshotError(f"Expected snapshot bytes, got {type(data).__name__}")
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        raise SnapshotError("Snapshot is truncated")
+    magic, version, _flags, length, checksum = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise SnapshotError("Not an index snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format version {version}")
+    payload = view[_HEADER.size :]
+    if len(payload) != length:
+        raise SnapshotError("Snapshot is truncated")
+    if zlib.crc32(payload) != checksum:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    sections = _split_sections(payload)
+    try:
+        header_meta = json.loads(bytes(next(sections)))
+    except (StopIteration, ValueError) as e:
+        raise SnapshotError(f"Unreadable snapshot metadata: {e}") from e
+    if header_meta.get("kind") != kind:
+        raise SnapshotError(f"Snapshot holds {header_meta.get('kind')!r} data, not {kind!r}")
+    swap = header_meta.get("byteorder", sys.byteorder) != sys.byteorder
+
+    def next_array() -> array:
+        values = array("I")
+        try:
+            values.frombytes(next(sections))
+        except (StopIteration, ValueError) as e:
+            raise SnapshotError(f"Snapshot is missing data: {e}") from e
+        if swap:
+            values.byteswap()
+        return values
+
+    strings: List[Optional[str]] = [None]
+    try:
+        blob = bytes(next(sections)).decode("utf-8")
+    except (StopIteration, UnicodeDecodeError) as e:
+        raise SnapshotError(f"Unreadable snapshot strings: {e}") from e
+    if header_meta["strings"]:
+        strings.extend(blob.split("\x00"))
+    if len(strings) != header_meta["strings"] + 1:
+        raise SnapshotError("Snapshot string table is inconsistent")
+
+    try:
+        fields = tuple(header_meta["fields"])
+        columns = [list(map(strings.__getitem__, next_array())) for _ in fields]
+        if any(len(column) != header_meta["records"] for column in columns):
+            raise SnapshotError("Snapshot record count is inconsistent")
+
+        indexes: Dict[str, Tuple[List[IndexKey], array, array]] = {}
+        for layout in header_meta["indexes"]:
+            key_ids, offsets, postings = next_array(), next_array(), next_array()
+            key_strings = list(map(strings.__getitem__, key_ids))
+            arity = layout["arity"]
+            # Tuple keys are consecutive strings, grouped by zipping one iterator with itself
+            keys: List[IndexKey] = key_strings if arity == 1 else list(zip(*[iter(key_strings)] * arity))
+            if (
+                len(key_strings) != len(keys) * arity
+                or len(keys) != layout["keys"]
+                or len(offsets) != len(keys) + 1
+                or offsets[-1] != len(postings)
+            ):
+                raise SnapshotError(f"Snapshot index {layout['name']} is inconsistent")
+            indexes[layout["name"]] = (keys, offsets, postings)
+    except (IndexError, KeyError, TypeError) as e:
+        raise SnapshotError(f"Snapshot is inconsistent: {e}") from e
+
+    return IndexSnapshot(kind, fields, columns, header_meta.get("meta", {}), indexes)
+
+
+def _split_sections(payload: memoryview) -> Iterator[memoryview]:
+    """Yield the length-prefixed sections of a payload."""
+    position = 0
+    while position < len(payload):
+        if position + _LENGTH.size > len(payload):
+            raise SnapshotError("Snapshot section header is truncated")
+        (length,) = _LENGTH.unpack_from(payload, position)
+        position += _LENGTH.size
+        if position + length > len(payload):
+            raise SnapshotError("Snapshot section is truncated")
+        yield payload[position : position + length]
+        position += length
@@ -0,0 +1,338 @@
+"""
+SQLite-backed storage for the HTML cache.
+
+This module provides an alternative to the one-file-per-entry cache layout. Every
+cache entry (content, metadata and timestamps) lives in a single row of an embedded
+database running in WAL mode, so reads and writes are single transactions without
+temporary files, sidecar ``.meta`` files or advisory file locks.
+"""
+
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .compression import decompress
+
+logger = logging.getLogger(__name__)
+
+# Entry kinds and the file suffixes they use in the filesystem layout
+ENTRY_KINDS = {
+    "html": ".html",
+    "data": ".data.json",
+    "binary": ".data.pickle",
+}
+
+
+class SQLiteCacheStore:
+    """
+    Transactional cache store holding all entries in one SQLite database file.
+
+    Entries are addressed by ``(kind, entry_id)`` where ``entry_id`` is the same
+    hash used for filenames in the filesystem layout, which lets existing cache
+    directories be migrated in place. Each thread gets its own connection; WAL mode
+    lets readers proceed while a writer commits, and a busy timeout makes writers
+    wait for each other instead of failing.
+    """
+
+    DB_FILENAME = "cache.sqlite3"
+    SCHEMA_VERSION = 1
+
+    def __init__(self, cache_dir: Union[str, pathlib.Path], busy_timeout: float = 5.0, migrate: bool = True):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            cache_dir: Directory holding the database file
+            busy_timeout: Seconds to wait for a competing writer before giving up
+            migrate: Whether to import entries from the legacy file layout
+        """
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.db_path = self.cache_dir / self.DB_FILENAME
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+        if migrate:
+            self.migrate_from_directory()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Connections are never shared between threads; check_same_thread is off only so close() can
+            # release connections opened by other threads.
+            conn = sqlite3.connect(
+                str(self.db_path), timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _init_schema(self) -> None:
+        """Create the entries table if it does not exist yet."""
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                entry_id TEXT NOT NULL,
+                content BLOB NOT NULL,
+                metadata TEXT NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (kind, entry_id)
+            )
+            """)
+        conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+
+    def read(self, kind: str, entry_id: str) -> Optional[Tuple[bytes, Dict[str, Any], float]]:
+        """
+        Read an entry.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            entry_id: Hashed entry identifier
+
+        Returns:
+            Tuple of (content, metadata, creation timestamp), or None if absent
+        """
+        row = (
+            self._connect()
+            .execute("SELECT content, metadata, created FROM entries WHERE kind = ? AND entry_id = ?", (kind, entry_id))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        content, metadata_json, created = row
+        try:
+            metadata = json.loads(metadata_json) if metadata_json else {}
+        except ValueError:
+            logger.warning(f"Discarding unreadable metadata for cache entry {kind}/{entry_id}")
+            metadata = {}
+        return bytes(content), metadata, float(created)
+
+    def write(
+        self, kind: str, entry_id: str, content: bytes, metadata: Dict[str, Any], created: Optional[float] = None
+    ) -> bool:
+        """
+        Insert or replace an entry in a single transaction.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            entry_id: Hashed entry identifier
+            content: Serialized entry content
+            metadata: JSON-serializable metadata stored alongside the content
+            created: Creation timestamp (defaults to now)
+
+        Returns:
+            True if the entry was committed
+        """
+        now = time.time()
+        created = now if created is None else created
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (kind, entry_id, content, metadata, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, entry_id, sqlite3.Binary(content), json.dumps(metadata, default=str), created, now),
+            )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write cache entry {kind}/{entry_id}: {e}")
+            return False
+
+    def touch(
+        self, kind: str, entry_id: str, created: Optional[float] = None, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Reset an entry's creation timestamp without rewriting its content.
+
+        Args:
+            kind: Entry kind ("html", "data" or "binary")
+            entry_id: Hashed entry identifier
+            created: New creation timestamp (defaults to now)
+            metadata: Metadata keys to merge into the stored metadata
+
+        Returns:
+            True if the entry exists and was updated
+        """
+        now = time.time()
+        created = now if created is None else created
+        try:
+            conn = self._connect()
+            if metadata:
+                row = conn.execute(
+                    "SELECT metadata FROM entries WHERE kind = ? AND entry_id = ?", (kind, entry_id)
+                ).fetchone()
+                if row is None:
+                    return False
+                try:
+                    merged = json.loads(row[0]) if row[0] else {}
+                except ValueError:
+                    merged = {}
+                merged.update(metadata)
+                cursor = conn.execute(
+                    "UPDATE entries SET metadata = ?, created = ?, updated = ? WHERE kind = ? AND entry_id = ?",
+                    (json.dumps(merged, default=str), created, now, kind, entry_id),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE entries SET created = ?, updated = ? WHERE kind = ? AND entry_id = ?",
+                    (created, now, kind, entry_id),
+                )
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Failed to touch cache entry {kind}/{entry_id}: {e}")
+            return False
+
+    def delete(self, kind: str, entry_id: str) -> bool:
+        """
+        Delete an entry.
+
+        Returns:
+            True if a row was removed
+        """
+        cursor = self._connect().execute("DELETE FROM entries WHERE kind = ? AND entry_id = ?", (kind, entry_id))
+        return cursor.rowcount > 0
+
+    def clear(self) -> int:
+        """
+        Delete every entry.
+
+        Returns:
+            Number of entries removed
+        """
+        cursor = self._connect().execute("DELETE FROM entries")
+        return max(cursor.rowcount, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get entry counts per kind and the on-disk size of the database.
+
+        Returns:
+            Dictionary with ``counts`` (per kind), ``entries`` and ``size_bytes``
+        """
+        counts = {kind: 0 for kind in ENTRY_KINDS}
+        for kind, count in self._connect().execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind"):
+            counts[kind] = count
+
+        size = 0
+        for suffix in ("", "-wal", "-shm"):
+            path = pathlib.Path(f"{self.db_path}{suffix}")
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+
+        return {"counts": counts, "entries": sum(counts.values()), "size_bytes": size}
+
+    def entry_sizes(self) -> List[Tuple[str, str, int, float]]:
+        """
+        List every entry with its stored size.
+
+        Returns:
+            List of (kind, entry_id, size in bytes, last update timestamp), oldest update first
+        """
+        return (
+            self._connect()
+            .execute("SELECT kind, entry_id, length(content) + length(metadata), updated FROM entries ORDER BY updated")
+            .fetchall()
+        )
+
+    def migrate_from_directory(self) -> int:
+        """
+        Import entries written by the filesystem layout and remove the old files.
+
+        Existing rows win over legacy files, so running this repeatedly is harmless.
+
+        Returns:
+            Number of entries imported
+        """
+        imported: List[pathlib.Path] = []
+        rows = []
+
+        for kind, suffix in ENTRY_KINDS.items():
+            for path in self.cache_dir.glob(f"*{suffix}"):
+                if not path.is_file() or path.name.startswith("."):
+                    continue
+                # "*.html" never matches ".data.json", but guard against odd names anyway
+                entry_id = path.name[: -len(suffix)]
+                if "." in entry_id:
+                    continue
+                try:
+                    content = path.read_bytes()
+                    metadata = self._read_legacy_metadata(path, kind, content)
+                    created = float(metadata.get("creation_timestamp", path.stat().st_mtime))
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable legacy cache file {path}: {e}")
+                    continue
+                rows.append((kind, entry_id, sqlite3.Binary(content), json.dumps(metadata, default=str), created))
+                imported.append(path)
+
+        if not rows:
+            return 0
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO entries (kind, entry_id, content, metadata, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [row + (time.time(),) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK")
+            logger.error(f"Failed to migrate legacy cache files into {self.db_path}: {e}")
+            return 0
+
+        for path in imported:
+            for stale in (path, pathlib.Path(f"{path}.meta")):
+                try:
+                    stale.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to remove migrated cache file {stale}: {e}")
+
+        logger.info(f"Migrated {len(rows)} legacy cache entries into {self.db_path}")
+        return len(rows)
+
+    def _read_legacy_metadata(self, path: pathlib.Path, kind: str, content: bytes) -> Dict[str, Any]:
+        """Collect metadata for a legacy cache file from its sidecar or embedded fields."""
+        metadata: Dict[str, Any] = {}
+        meta_path = pathlib.Path(f"{path}.meta")
+        if meta_path.exists():
+            try:
+                metadata.update(json.loads(meta_path.read_text()))
+            except ValueError:
+                logger.warning(f"Ignoring unreadable metadata sidecar {meta_path}")
+
+        if kind == "data" and "creation_timestamp" not in metadata:
+            try:
+                data = json.loads(decompress(content, metadata.get("codec")))
+                if isinstance(data, dict) and "creation_timestamp" in data:
+                    metadata["creation_timestamp"] = data["creation_timestamp"]
+            except (ValueError, OSError):
+                pass
+        return metadata
+
+    def close(self) -> None:
+        """Close every connection opened by this store."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,278 @@
+"""
+Write-behind queue for persisting cache entries off the request path.
+
+Cache writes serialize large structures and fsync them to disk, which can take
+seconds for the Home Manager and nix-darwin indexes. The queue lets callers hand
+over a write and return immediately while a single dedicated writer thread
+performs the actual I/O. Writes to the same key are coalesced so only the latest
+value is persisted, the number of pending writes is bounded (submitters block
+when the queue is full), and pending writes are flushed on shutdown.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING = 64
+
+
+class WriteBehindQueue:
+    """
+    Bounded, coalescing queue of write jobs drained by a dedicated thread.
+
+    Each job is registered under a key together with the value being written, so
+    readers can see pending values (read-your-writes) until the job has run.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING, name: str = "mcp-nixos-cache-writer"):
+        """
+        Initialize the queue. The writer thread is started lazily on first submit.
+
+        Args:
+            max_pending: Maximum number of distinct keys waiting to be written
+            name: Name of the writer thread
+        """
+        self.max_pending = max(1, max_pending)
+        self.name = name
+        self._pending: "OrderedDict[Hashable, Tuple[Callable[[], Any], Any]]" = OrderedDict()
+        self._in_flight: Optional[Tuple[Hashable, Any]] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "written": 0,
+            "failed": 0,
+            "blocked": 0,
+            "inline": 0,
+        }
+
+    def submit(self, key: Hashable, job: Callable[[], Any], value: Any = None) -> bool:
+        """
+        Queue a write job, replacing any pending job for the same key.
+
+        Blocks while the queue is full. If the queue has been shut down the job is
+        run synchronously in the caller instead.
+
+        Args:
+            key: Identity of the entry being written
+            job: Callable performing the write
+            value: Value being written, returned by peek() until the write completes
+
+        Returns:
+            True if the job was queued, False if it ran inline
+        """
+        with self._cond:
+            if not self._closed:
+                self.stats["submitted"] += 1
+                if key in self._pending:
+                    # Keep the original queue position so hot keys cannot starve others
+                    self._pending[key] = (job, value)
+                    self.stats["coalesced"] += 1
+                    return True
+
+                if len(self._pending) >= self.max_pending:
+                    self.stats["blocked"] += 1
+                    while len(self._pending) >= self.max_pending and not self._closed:
+                        self._cond.wait()
+
+                if not self._closed:
+                    self._pending[key] = (job, value)
+                    self._ensure_thread()
+                    self._cond.notify_all()
+                    return True
+
+            self.stats["inline"] += 1
+
+        self._run(key, job)
+        return False
+
+    def peek(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a value that is queued or currently being written.
+
+        Returns:
+            Tuple of (found, value)
+        """
+        with self._cond:
+            if key in self._pending:
+                return True, self._pending[key][1]
+            if self._in_flight is not None and self._in_flight[0] == key:
+                return True, self._in_flight[1]
+        return False, None
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drop pending jobs whose key matches, waiting for a matching in-flight write.
+
+        Used when entries are invalidated so a queued write cannot resurrect them.
+
+        Returns:
+            Number of pending jobs dropped
+        """
+        with self._cond:
+            keys = [key for key in self._pending if predicate(key)]
+            for key in keys:
+                del self._pending[key]
+            while self._in_flight is not None and predicate(self._in_flight[0]):
+                self._cond.wait()
+            self._cond.notify_all()
+        return len(keys)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued write has been persisted.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight is not None:
+                if self._thread is None or not self._thread.is_alive():
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            drained = not self._pending and self._in_flight is None
+        if not drained:
+            # Writer thread is gone; persist what is left from the calling thread
+            self._drain_inline()
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        Flush pending writes and stop accepting new ones.
+
+        Later submissions are written synchronously by the caller.
+
+        Returns:
+            True if all pending writes were persisted
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return flushed
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_thread(self) -> None:
+        """Start the writer thread if it is not running. Caller holds the lock."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _worker(self) -> None:
+        """Writer thread loop: run queued jobs oldest first."""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                key, (job, value) = self._pending.popitem(last=False)
+                self._in_flight = (key, value)
+                # Wake submitters blocked on a full queue
+                self._cond.notify_all()
+
+            self._run(key, job)
+
+            with self._cond:
+                self._in_flight = None
+                self._cond.notify_all()
+
+    def _drain_inline(self) -> None:
+        """Run every pending job in the calling thread."""
+        while True:
+            with self._cond:
+                if not self._pending:
+                    return
+                key, (job, _) = self._pending.popitem(last=False)
+            self._run(key, job)
+
+    def _run(self, key: Hashable, job: Callable[[], Any]) -> None:
+        """Run a single job, recording the outcome."""
+        try:
+            job()
+            outcome = "written"
+        except Exception as e:
+            logger.error(f"Write-behind job for {key} failed: {e}")
+            outcome = "failed"
+        with self._cond:
+            self.stats[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics.
+
+        Returns:
+            Dictionary with job counters and the current queue depth
+        """
+        with self._cond:
+            stats: Dict[str, Any] = dict(self.stats)
+            stats["pending"] = len(self._pending)
+            stats["max_pending"] = self.max_pending
+        return stats
+
+
+_default_queue: Optional[WriteBehindQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """
+    Get the process-wide write-behind queue, creating it on first use.
+
+    The queue size is read from MCP_NIXOS_CACHE_WRITE_QUEUE_SIZE.
+
+    Returns:
+        The shared WriteBehindQueue
+    """
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            try:
+                max_pending = int(os.environ.get("MCP_NIXOS_CACHE_WRITE_QUEUE_SIZE", DEFAULT_MAX_PENDING))
+            except ValueError:
+                logger.warning("Invalid MCP_NIXOS_CACHE_WRITE_QUEUE_SIZE, using default")
+                max_pending = DEFAULT_MAX_PENDING
+            _default_queue = WriteBehindQueue(max_pending=max_pending)
+        return _default_queue
+
+
+def flush_write_behind(timeout: Optional[float] = None) -> bool:
+    """
+    Flush the process-wide write-behind queue if it has been created.
+
+    Args:
+        timeout: Maximum seconds to wait (None waits indefinitely)
+
+    Returns:
+        True if all pending writes were persisted
+    """
+    queue = _default_queue
+    if queue is None:
+        return True
+    flushed = queue.flush(timeout)
+    if flushed:
+        logger.debug("Write-behind cache queue flushed")
+    else:
+        logger.warning(f"Write-behind cache queue still has {len(queue)} pending writes after {timeout}s")
+    return flushed
+
+
+atexit.register(flush_write_behind)
@@ -1,5 +1,6 @@
 """Darwin client for fetching and parsing nix-darwin documentation."""
 
+import asyncio
 import dataclasses
 import logging
 import os
@@ -8,18 +9,47 @@ import re
 import time
 from collections import defaultdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from functools import partial
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
 from bs4 import BeautifulSoup, Tag
 from bs4.element import PageElement
 
+from mcp_nixos.cache.detail_store import DetailStore, lazy_details_enabled, save_details
+from mcp_nixos.cache.mapped_index import MappedIndexStore, dump_mapped_index
+from mcp_nixos.cache.result_cache import ResultCache
 from mcp_nixos.cache.simple_cache import SimpleCache
+from mcp_nixos.cache.snapshot import SnapshotError, dump_snapshot, load_snapshot
 from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.clients.option_record import InternTable, short_description
+from mcp_nixos.utils.option_filters import (
+    FilterKey,
+    filter_keys,
+    filtered_names,
+    names_under_prefix,
+    normalize_filter_value,
+)
+from mcp_nixos.utils.source_digest import DigestStats, content_digest
 
 logger = logging.getLogger(__name__)
 
+# DarwinOption fields stored in index snapshots (the parser never fills sub_options)
+SNAPSHOT_FIELDS = ("name", "description", "type", "default", "example", "declared_by", "parent")
 
-@dataclasses.dataclass
+# DarwinOption fields whose values repeat across many options
+INTERNED_FIELDS = ("type", "default", "example", "declared_by", "parent")
+
+# Fields options can be filtered by; the category is the top-level segment of the name
+FILTER_FIELDS = ("type", "category")
+
+# DarwinOption fields of search results and prefix listings (the description shortened)
+SUMMARY_FIELDS = ("name", "description", "type", "parent")
+
+# DarwinOption fields kept on disk by DarwinOptionSummary: the full description, and the fields only lookups show
+DETAIL_FIELDS = ("description", "default", "example", "declared_by")
+
+
+@dataclasses.dataclass(slots=True)
 class DarwinOption:
     """Data class for a nix-darwin configuration option."""
 
@@ -32,6 +62,91 @@ class DarwinOption:
     sub_options: Dict[str, "DarwinOption"] = dataclasses.field(default_factory=dict)
     parent: Optional[str] = None
 
+    @property
+    def summary_description(self) -> str:
+        """The description, shortened as in search results and prefix listings."""
+        return short_description(self.description)
+
+
+def _detail_property(position: int, field: str) -> property:
+    """Read-only property reading one of the DETAIL_FIELDS from the store of a DarwinOptionSummary."""
+
+    def fget(self: "DarwinOptionSummary") -> str:
+        return self._details.read(self._entry)[position]
+
+    return property(fget, doc=f"The ``{field}`` of the option, read from the detail store.")
+
+
+class DarwinOptionSummary(DarwinOption):
+    """
+    A DarwinOption whose DETAIL_FIELDS are read from a DetailStore when needed.
+
+    Only the shortened description is kept in memory, as summary_description.
+    Reads like the option it summarizes and compares equal to it; the details
+    cannot be changed.
+    """
+
+    __slots__ = ("_details", "_entry")
+
+    description = _detail_property(0, "description")
+    default = _detail_property(1, "default")
+    example = _detail_property(2, "example")
+    declared_by = _detail_property(3, "declared_by")
+    # The description slot of DarwinOption, holding the shortened description
+    summary_description = DarwinOption.description
+
+    def __init__(self, option: DarwinOption, details: DetailStore):
+        """
+        Write the details of an option to a store and summarize it.
+
+        Args:
+            option: Option without sub-options
+            details: Store with DETAIL_FIELDS entries
+        """
+        entry = details.append([getattr(option, field) for field in DETAIL_FIELDS])
+        self._summarize(details, entry, option.name, option.description, option.type, option.parent)
+
+    @classmethod
+    def from_entry(
+        cls, details: DetailStore, entry: int, name: str, description: str, type: str, parent: Optional[str]
+    ) -> "DarwinOptionSummary":
+        """
+        Summarize an option whose details a store already holds.
+
+        Args:
+            details: Store with DETAIL_FIELDS entries
+            entry: Entry of the option in that store
+            name: Name of the option
+            description: Its full description, shortened here
+            type: Its type
+            parent: Its parent, if any
+        """
+        summary = cls.__new__(cls)
+        summary._summarize(details, entry, name, description, type, parent)
+        return summary
+
+    def _summarize(
+        self, details: DetailStore, entry: int, name: str, description: str, type: str, parent: Optional[str]
+    ) -> None:
+        self._details = details
+        self._entry = entry
+        self.name = name
+        DarwinOption.description.__set__(self, short_description(description))
+        self.type = type
+        self.sub_options = {}
+        self.parent = parent
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DarwinOption):
+            return NotImplemented
+        return all(getattr(self, field.name) == getattr(other, field.name) for field in dataclasses.fields(other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self):
+        # Pickled in full, as the DarwinOption it summarizes
+        return (DarwinOption, tuple(getattr(self, field.name) for field in dataclasses.fields(DarwinOption)))
+
 
 class DarwinClient:
     """Client for fetching and parsing nix-darwin documentation."""
@@ -46,23 +161,44 @@ class DarwinClient:
         self.html_cache = self.html_client.cache  # Reuse HTMLClient's cache
         self.memory_cache = SimpleCache(max_size=1000, ttl=self.cache_ttl)
 
-        self.options: Dict[str, DarwinOption] = {}
+        # Counts replacements of the options (and options indexed in place), keying result_cache
+        self.generation = 0
+        # Search results of the current generation, keyed by normalized query, limit and filters
+        self.result_cache = ResultCache()
+        self.options = {}
+        self.intern_table = InternTable()  # Shares repeated values (types, defaults, ...) between options
         self.name_index: Dict[str, List[str]] = defaultdict(list)
         self.word_index: Dict[str, Set[str]] = defaultdict(set)
         self.prefix_index: Dict[str, List[str]] = defaultdict(list)
+        # (field, normalized value) to names, for filtered queries
+        self.attribute_index: Dict[FilterKey, Set[str]] = defaultdict(set)
 
         self.total_options = 0
         self.total_categories = 0
+        # Options per top-level category, counted once per load and saved with the cached data
+        self.category_counts: Dict[str, int] = {}
         self.last_updated: Optional[datetime] = None
         self.loading_status = "not_started"
         self.error_message = ""
         self.data_version = "1.1.0"  # Bumped due to structure changes
         self.cache_key = f"darwin_data_v{self.data_version}"
+        # Binary index snapshot, loaded in preference to the JSON/pickle pair under cache_key
+        self.snapshot_key = f"{self.cache_key}_snapshot"
+
+        # Metadata of the most recent fetch (e.g. whether it was a 304 Not Modified)
+        self.last_fetch_metadata: Dict[str, Any] = {}
+        # Fetches current options while an outdated prebuilt index is served
+        self.refresh_task: Optional[asyncio.Task] = None
+        # Digest of the documentation page the loaded options were parsed from
+        self.source_digest: Optional[str] = None
+        # Expired snapshots kept (hits) or re-parsed (misses) after comparing page digests
+        self.digest_stats = DigestStats()
 
     async def fetch_url(self, url: str, force_refresh: bool = False) -> str:
         """Fetch URL content from the HTML client."""
         try:
             content, metadata = self.html_client.fetch(url, force_refresh=force_refresh)
+            self.last_fetch_metadata = metadata
             if content is None:
                 error = metadata.get("error", "Unknown error")
                 raise ValueError(f"Failed to fetch URL {url}: {error}")
@@ -73,28 +209,31 @@ class DarwinClient:
             logger.error(f"Error in fetch_url for {url}: {str(e)}")
             raise
 
-    async def load_options(self, force_refresh: bool = False) -> Dict[str, DarwinOption]:
-        """Load nix-darwin options from documentation."""
+    async def load_options(self, force_refresh: bool = False, allow_prebuilt: bool = True) -> Dict[str, DarwinOption]:
+        """
+        Load nix-darwin options from the cache, the prebuilt index, or the documentation.
+
+        Args:
+            force_refresh: Whether to discard cached data and fetch the documentation again
+            allow_prebuilt: Whether the prebuilt index may be used
+        """
         try:
             self.loading_status = "loading"
             if force_refresh:
                 logger.info("Forced refresh requested, invalidating caches")
                 self.invalidate_cache()
+            allow_prebuilt = allow_prebuilt and not force_refresh
 
             if not force_refresh and await self._load_from_memory_cache():
                 self.loading_status = "loaded"
                 return self.options
 
-            html = await self.fetch_url(self.OPTION_REFERENCE_URL, force_refresh=force_refresh)
-            if not html:
-                raise ValueError(f"Failed to fetch options from {self.OPTION_REFERENCE_URL}")
-
-            soup = BeautifulSoup(html, "html.parser")
-            await self._parse_options(soup)
-            await self._cache_parsed_data()
+            if allow_prebuilt and self._load_prebuilt_index():
+                self.loading_status = "loaded"
+                return self.options
 
+            await self._load_from_documentation(force_refresh)
             self.loading_status = "loaded"
-            self.last_updated = datetime.now()
             return self.options
 
         except Exception as e:
@@ -103,6 +242,75 @@ class DarwinClient:
             logger.error(f"Error loading nix-darwin options: {e}")
             raise
 
+    async def _load_from_documentation(self, force_refresh: bool = False) -> None:
+        """
+        Fetch the documentation and serve its options, reusing the expired disk cache if the page is unchanged.
+
+        Args:
+            force_refresh: Whether to bypass the cached page
+        """
+        html = await self.fetch_url(self.OPTION_REFERENCE_URL, force_refresh=force_refresh)
+        if not html:
+            raise ValueError(f"Failed to fetch options from {self.OPTION_REFERENCE_URL}")
+
+        digest = content_digest(html)
+        if await self._load_unchanged_cache(digest):
+            # The page is unchanged since the cached snapshot was parsed; renew it instead of re-parsing
+            logger.info("nix-darwin documentation not modified; reusing expired disk cache")
+            if self.html_client.cache:
+                self.html_client.cache.renew_data(self.cache_key)
+                self.html_client.cache.renew_data(self.snapshot_key)
+                if store := self._mapped_store():
+                    store.renew()
+            return
+
+        soup = BeautifulSoup(html, "html.parser")
+        await self._parse_options(soup)
+        self.source_digest = digest
+        await self._cache_parsed_data()
+        self.last_updated = datetime.now()
+
+    async def _refresh_outdated_prebuilt(self) -> None:
+        """Replace the outdated prebuilt options with current ones, which keep being served meanwhile."""
+        try:
+            await self._load_from_documentation()
+            logger.info(f"Refreshed the outdated prebuilt index with {len(self.options)} nix-darwin options")
+        except Exception as e:
+            logger.error(f"Error refreshing the outdated prebuilt nix-darwin index: {e}")
+
+    async def _load_unchanged_cache(self, digest: str) -> bool:
+        """
+        Load the expired disk cache if the page fetched is the one it was parsed from.
+
+        The page is unchanged if the server answered 304 Not Modified, or if it
+        has the digest recorded with the cache.
+
+        Args:
+            digest: Digest of the page just fetched
+        """
+        if self.last_fetch_metadata.get("not_modified") is True:
+            return await self._load_from_filesystem_cache(allow_expired=True)
+        # Compared before it is served, so changed data is never answered from the old cache
+        cached = self._read_filesystem_cache(allow_expired=True)
+        if cached is None:
+            return False  # Nothing cached to compare with
+        unchanged = cached.get("source_digest") == digest
+        self.digest_stats.record(unchanged, self.OPTION_REFERENCE_URL)
+        if unchanged:
+            logger.info("nix-darwin documentation is byte-identical to the parsed copy")
+            await self._serve_cached(cached)
+        return unchanged
+
+    @property
+    def options(self) -> Dict[str, DarwinOption]:
+        """The options being served; replacing them starts a new generation."""
+        return self._options
+
+    @options.setter
+    def options(self, options: Dict[str, DarwinOption]) -> None:
+        self._options = options
+        self.generation += 1
+
     def invalidate_cache(self) -> None:
         """Invalidate both memory and filesystem cache for nix-darwin data."""
         try:
@@ -112,7 +320,10 @@ class DarwinClient:
 
             if self.html_client and self.html_client.cache:
                 self.html_client.cache.invalidate_data(self.cache_key)
+                self.html_client.cache.invalidate_data(self.snapshot_key)
                 self.html_client.cache.invalidate(self.OPTION_REFERENCE_URL)
+                if store := self._mapped_store():
+                    store.invalidate()
 
             # Legacy cache cleanup (unchanged, but included for completeness)
             legacy_bad_path = pathlib.Path("darwin")
@@ -172,9 +383,11 @@ class DarwinClient:
         fallback strategies, similar to the Home Manager fixes.
         """
         self.options = {}
+        self.intern_table = InternTable()
         self.name_index = defaultdict(list)
         self.word_index = defaultdict(set)
         self.prefix_index = defaultdict(list)
+        self.attribute_index = defaultdict(set)
 
         option_links: Sequence[PageElement] = []
 
@@ -264,7 +477,7 @@ class DarwinClient:
 
                 option = self._parse_option_details(option_name, dd)
                 if option:
-                    self.options[option_name] = option
+                    self.options[option_name] = self._compact_option(option)
                     self._index_option(option_name, option)
                     total_processed += 1
                     if total_processed % 250 == 0:
@@ -274,8 +487,10 @@ class DarwinClient:
                 logger.warning(f"Failed to parse option details: {e}")
 
         self.total_options = len(self.options)
-        self.total_categories = len(self._get_top_level_categories())
+        self.category_counts = self._count_categories()
+        self.total_categories = len(self.category_counts)
         logger.info(f"Parsed {self.total_options} options in {self.total_categories} categories")
+        self._spill_details()
 
     # --- Metadata Extraction Helpers ---
 
@@ -443,8 +658,39 @@ class DarwinClient:
             # Create a minimal valid option with just the name as a fallback
             return DarwinOption(name=name, description=f"Error processing {name}: {str(e)}")
 
+    def _compact_option(self, option: DarwinOption) -> DarwinOption:
+        """Make the repeated field values of an option shared with other options."""
+        for field in INTERNED_FIELDS:
+            setattr(option, field, self.intern_table(getattr(option, field)))
+        return option
+
+    def _spill_details(self) -> None:
+        """
+        Keep only the summaries of the loaded options in memory, with their details on disk.
+
+        Every DarwinOption (without sub-options) is replaced by a DarwinOptionSummary
+        writing its details to a new DetailStore; mapped options are read from the
+        mapping already. Nothing changes if MCP_NIXOS_LAZY_DETAILS is off or the
+        store cannot be written.
+        """
+        if not lazy_details_enabled() or not isinstance(self.options, dict):
+            return
+        full = [(name, option) for name, option in self.options.items() if type(option) is DarwinOption]
+        full = [(name, option) for name, option in full if not option.sub_options]
+        details = DetailStore.for_cache(self.html_cache, DETAIL_FIELDS) if full else None
+        if details is None:
+            return
+        try:
+            summaries = {name: DarwinOptionSummary(option, details) for name, option in full}
+        except OSError as e:
+            logger.warning(f"Cannot write nix-darwin option details, keeping them in memory: {e}")
+            return
+        self.options.update(summaries)
+        logger.info(f"Moved the details of {len(summaries)} nix-darwin options to disk")
+
     def _index_option(self, option_name: str, option: DarwinOption) -> None:
         """Index an option for searching."""
+        self.generation += 1  # Searches may find it from now on
         name_parts = option_name.split(".")
         for i in range(len(name_parts)):
             prefix = ".".join(name_parts[: i + 1])
@@ -457,12 +703,57 @@ class DarwinClient:
         for word in set(name_words + desc_words):
             if len(word) > 2:
                 self.word_index[word].add(option.name)
+        for key in self._attribute_keys(option):
+            self.attribute_index[key].add(option_name)
+
+    @staticmethod
+    def _attribute_keys(option: DarwinOption) -> List[FilterKey]:
+        """Keys of the attribute index an option is filed under, one per filter field."""
+        return [
+            ("type", normalize_filter_value(option.type or "unknown")),
+            ("category", normalize_filter_value(option.name.split(".")[0])),
+        ]
+
+    def _rebuild_attributes(self) -> None:
+        """File every option in the attribute index, for cached data saved without it."""
+        self.attribute_index = defaultdict(set)
+        for option_name, option in self.options.items():
+            for key in self._attribute_keys(option):
+                self.attribute_index[key].add(option_name)
+
+    def _filter_names(self, filters: Optional[Mapping[str, Optional[str]]]) -> Optional[Set[str]]:
+        """
+        Names of the options passing every filter.
+
+        Args:
+            filters: Field (one of FILTER_FIELDS) to required value; empty values are ignored
+
+        Returns:
+            The names, or None if there is nothing to filter by
+
+        Raises:
+            ValueError: If a filter names a field that is not indexed
+        """
+        keys = filter_keys(filters, FILTER_FIELDS)
+        return filtered_names(self.attribute_index, keys) if keys else None
 
     def _get_top_level_categories(self) -> List[str]:
         """Get top-level option categories."""
         categories = {name.split(".")[0] for name in self.options.keys() if "." in name}
         return sorted(list(categories))
 
+    def _count_categories(self, stored: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """
+        Options per top-level category, in category order.
+
+        Args:
+            stored: Counts saved with cached data; data cached before they were saved is counted again
+        """
+        if stored:
+            return dict(stored)
+        # Approximate count using prefix index
+        return {category: len(self.prefix_index.get(category, [])) for category in self._get_top_level_categories()}
+
     # --- Caching Logic (Refactored for clarity) ---
 
     async def _load_from_memory_cache(self) -> bool:
@@ -484,9 +775,15 @@ class DarwinClient:
         self.name_index = cached_data.get("name_index", defaultdict(list))
         self.word_index = cached_data.get("word_index", defaultdict(set))
         self.prefix_index = cached_data.get("prefix_index", defaultdict(list))
+        if "attribute_index" in cached_data:
+            self.attribute_index = cached_data["attribute_index"]
+        else:
+            self._rebuild_attributes()
         self.total_options = cached_data.get("total_options", 0)
         self.total_categories = cached_data.get("total_categories", 0)
         self.last_updated = cached_data.get("last_updated")
+        self.source_digest = cached_data.get("source_digest")
+        self.category_counts = self._count_categories(cached_data.get("category_counts"))
 
     def _validate_cached_data(self, data: Dict[str, Any], binary_data: Dict[str, Any]) -> bool:
         """Validates the integrity of cached data before loading."""
@@ -504,54 +801,95 @@ class DarwinClient:
             return False
         return True
 
-    async def _load_from_filesystem_cache(self) -> bool:
-        """Attempt to load data from disk cache."""
+    async def _load_from_filesystem_cache(self, allow_expired: bool = False) -> bool:
+        """Attempt to load data from disk cache, optionally accepting an expired snapshot."""
+        cached = self._read_filesystem_cache(allow_expired)
+        if cached is None:
+            return False
+        await self._serve_cached(cached)
+        return True
+
+    async def _serve_cached(self, cached: Dict[str, Any]) -> None:
+        """Serve options read by _read_filesystem_cache, caching decoded copies in memory."""
+        self._load_data_into_memory(cached)
+        if cached.get("mapped"):
+            return  # Already shared; a decoded copy in the memory cache would defeat that
+        self._spill_details()
+        await self._cache_to_memory()
+
+    def _read_filesystem_cache(self, allow_expired: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Read the disk cache without serving it yet.
+
+        Tries the shared mapped index, then the binary snapshot, then the JSON/pickle pair.
+
+        Args:
+            allow_expired: Whether data older than its TTL is acceptable
+
+        Returns:
+            The options and indices in the memory cache layout (plus "mapped" for a mapped
+            index), or None if no usable cache was found
+        """
         try:
             logger.info("Attempting to load nix-darwin data from disk cache")
             if not self.html_client or not self.html_client.cache:
                 logger.warning("HTML client or cache not available for filesystem load")
-                return False
+                return None
+
+            cached = self._read_mapped_index(allow_expired=allow_expired)
+            if cached is None:
+                cached = self._read_index_snapshot(allow_expired=allow_expired)
+            if cached is not None:
+                return cached
 
-            data, metadata = self.html_client.cache.get_data(self.cache_key)
-            binary_data, binary_metadata = self.html_client.cache.get_binary_data(self.cache_key)
+            cache = self.html_client.cache
+            data, metadata = cache.get_data(self.cache_key, allow_expired=allow_expired)
+            binary_data, binary_metadata = cache.get_binary_data(self.cache_key, allow_expired=allow_expired)
 
-            if not metadata.get("cache_hit") or not binary_metadata.get("cache_hit"):
+            def usable(meta: Dict[str, Any]) -> bool:
+                return bool(meta.get("cache_hit") or (allow_expired and meta.get("stale")))
+
+            if not usable(metadata) or not usable(binary_metadata):
                 logger.info(f"No complete cached data found for key {self.cache_key}")
-                return False
+                return None
 
             # Ensure data is not None before validation
             if data is None or binary_data is None:
                 logger.warning("Cached data or binary_data is None - ignoring cache")
-                return False
+                return None
 
             if not self._validate_cached_data(data, binary_data):
-                return False
+                return None
 
             # Load basic options data (convert dicts back to DarwinOption)
-            self.options = {name: DarwinOption(**option_dict) for name, option_dict in data.get("options", {}).items()}
-            self.total_options = data.get("total_options", len(self.options))
-            self.total_categories = data.get("total_categories", 0)
-            if "last_updated" in data and data["last_updated"]:
-                self.last_updated = datetime.fromisoformat(data["last_updated"])
-
-            # Load complex data structures from binary data
-            self.name_index = binary_data["name_index"]
-            self.word_index = defaultdict(set, {k: set(v) for k, v in binary_data["word_index"].items()})
-            self.prefix_index = binary_data["prefix_index"]
-
-            # Final validation check
-            if len(self.options) != self.total_options:
-                logger.warning(f"Option count mismatch ({len(self.options)} vs {self.total_options}), correcting.")
-                self.total_options = len(self.options)
-
-            await self._cache_to_memory()  # Cache in memory after successful load
-            logger.info(f"Successfully loaded nix-darwin data from disk cache ({len(self.options)} options)")
-            return True
+            self.intern_table = InternTable()
+            options = {
+                name: self._compact_option(DarwinOption(**option_dict))
+                for name, option_dict in data.get("options", {}).items()
+            }
+            total_options = data.get("total_options", len(options))
+            if len(options) != total_options:
+                logger.warning(f"Option count mismatch ({len(options)} vs {total_options}), correcting.")
+            last_updated = data.get("last_updated")
+
+            logger.info(f"Successfully loaded nix-darwin data from disk cache ({len(options)} options)")
+            return {
+                "options": options,
+                "name_index": binary_data["name_index"],
+                "word_index": defaultdict(set, {k: set(v) for k, v in binary_data["word_index"].items()}),
+                "prefix_index": binary_data["prefix_index"],
+                # No attribute index in this format; it is rebuilt
+                "total_options": len(options),
+                "total_categories": data.get("total_categories", 0),
+                "last_updated": datetime.fromisoformat(last_updated) if last_updated else None,
+                "source_digest": data.get("source_digest"),
+                "category_counts": data.get("category_counts"),
+            }
         except Exception as e:
             logger.error(f"Failed to load nix-darwin data from disk cache: {str(e)}")
             # Invalidate potentially corrupt cache on load failure
             self.invalidate_cache()
-            return False
+            return None
 
     async def _cache_parsed_data(self) -> None:
         """Cache parsed data to memory cache and filesystem."""
@@ -569,9 +907,12 @@ class DarwinClient:
             # Convert sets to lists for SimpleCache compatibility if needed
             "word_index": {k: list(v) for k, v in self.word_index.items()},
             "prefix_index": dict(self.prefix_index),
+            "attribute_index": self.attribute_index,
             "total_options": self.total_options,
             "total_categories": self.total_categories,
             "last_updated": self.last_updated or datetime.now(),
+            "source_digest": self.source_digest,
+            "category_counts": self.category_counts,
         }
 
     async def _cache_to_memory(self) -> None:
@@ -597,6 +938,8 @@ class DarwinClient:
             "total_categories": self.total_categories,
             "last_updated": self.last_updated.isoformat() if self.last_updated else datetime.now().isoformat(),
             "timestamp": time.time(),
+            "source_digest": self.source_digest,
+            "category_counts": self.category_counts,
         }
 
         binary_data = {
@@ -619,19 +962,261 @@ class DarwinClient:
                 logger.warning("HTML client or cache not available for saving")
                 return False
 
-            json_data, binary_data = self._prepare_filesystem_cache_data()
-            if json_data is None or binary_data is None:
-                return False  # Validation failed or data was empty
+            if not self.options or self.total_options < 10:
+                logger.warning(f"Refusing to cache dataset with only {self.total_options} options.")
+                return False
+            if not self.name_index or not self.word_index or not self.prefix_index:
+                logger.error("Index data is empty, refusing to cache.")
+                return False
 
             logger.info(f"Saving nix-darwin data structures to disk cache ({len(self.options)} options)")
-            self.html_client.cache.set_data(self.cache_key, json_data)
-            self.html_client.cache.set_binary_data(self.cache_key, binary_data)
+            if self._save_index_snapshot():
+                # A pair left by an earlier save would hold outdated options
+                self.html_client.cache.invalidate_data(self.cache_key)
+            else:
+                # Options the snapshot cannot hold (with sub-options) are saved as the JSON/pickle pair
+                json_data, binary_data = self._prepare_filesystem_cache_data()
+                if json_data is None or binary_data is None:
+                    return False
+                self.html_client.cache.set_data(self.cache_key, json_data)
+                self.html_client.cache.set_binary_data(self.cache_key, binary_data)
+            self._save_mapped_index()
             logger.info(f"Successfully saved nix-darwin data to disk cache with key {self.cache_key}")
             return True
         except Exception as e:
             logger.error(f"Failed to save nix-darwin data to disk cache: {str(e)}")
             return False
 
+    def _save_index_snapshot(self) -> bool:
+        """Save options and indices as a binary snapshot (see mcp_nixos.cache.snapshot)."""
+        try:
+            option_ids = {name: option_id for option_id, name in enumerate(self.options)}
+            records = []
+            for option in self.options.values():
+                if option.sub_options:
+                    raise SnapshotError(f"Option {option.name} has sub-options")
+                records.append(tuple(getattr(option, field) for field in SNAPSHOT_FIELDS))
+
+            def postings(index: Dict[str, Any]) -> Dict[str, List[int]]:
+                return {key: [option_ids[name] for name in names] for key, names in index.items()}
+
+            # Reopened by later loads instead of writing the details out again
+            positions = [SNAPSHOT_FIELDS.index(field) for field in DETAIL_FIELDS]
+            entries = ([record[position] for position in positions] for record in records)
+            details = save_details(self.html_cache, self.snapshot_key, DETAIL_FIELDS, entries)
+            snapshot = dump_snapshot(
+                "darwin",
+                SNAPSHOT_FIELDS,
+                records,
+                {
+                    "name_index": postings(self.name_index),
+                    "word_index": postings(self.word_index),
+                    "prefix_index": postings(self.prefix_index),
+                    "attribute_index": postings(self.attribute_index),
+                },
+                meta={
+                    "total_options": self.total_options,
+                    "total_categories": self.total_categories,
+                    "last_updated": self.last_updated.isoformat() if self.last_updated else None,
+                    "source_digest": self.source_digest,
+                    "category_counts": self.category_counts,
+                    "details": details,
+                },
+            )
+            self.html_client.cache.set_binary_data(self.snapshot_key, snapshot)
+            return True
+        except (SnapshotError, KeyError) as e:
+            logger.warning(f"Cannot write nix-darwin index snapshot: {e}")
+            return False
+
+    def _mapped_store(self) -> Optional[MappedIndexStore]:
+        """Where this data version's shared index files live, if sharing is enabled."""
+        return MappedIndexStore.for_cache(getattr(self.html_client, "cache", None), self.cache_key)
+
+    def _prebuilt_store(self) -> Optional[MappedIndexStore]:
+        """Where the prebuilt index for this data version is read from, unless disabled."""
+        return MappedIndexStore.prebuilt(self.cache_key, ttl=self.cache_ttl)
+
+    def _save_mapped_index(self, store: Optional[MappedIndexStore] = None) -> bool:
+        """
+        Publish options and indices as a memory-mapped index file.
+
+        Args:
+            store: Where to publish it (default: the shared index under the cache directory)
+        """
+        store = store or self._mapped_store()
+        if store is None:
+            return False
+        try:
+            option_ids = {name: option_id for option_id, name in enumerate(self.options)}
+            records = []
+            for option in self.options.values():
+                if option.sub_options:
+                    raise SnapshotError(f"Option {option.name} has sub-options")
+                records.append(tuple(getattr(option, field) for field in SNAPSHOT_FIELDS))
+
+            def postings(index: Dict[str, Any]) -> Dict[str, List[int]]:
+                return {key: [option_ids[name] for name in names] for key, names in index.items()}
+
+            data = dump_mapped_index(
+                store.kind,
+                SNAPSHOT_FIELDS,
+                records,
+                {
+                    "name_index": postings(self.name_index),
+                    "word_index": postings(self.word_index),
+                    "prefix_index": postings(self.prefix_index),
+                    "attribute_index": postings(self.attribute_index),
+                },
+                meta={
+                    "total_categories": self.total_categories,
+                    "last_updated": self.last_updated.isoformat() if self.last_updated else None,
+                    "timestamp": time.time(),
+                    "source_digest": self.source_digest,
+                    "category_counts": self.category_counts,
+                },
+            )
+        except (SnapshotError, KeyError) as e:
+            logger.warning(f"Cannot write shared nix-darwin index: {e}")
+            return False
+        return store.publish(data, keep_previous=not store.read_only) is not None
+
+    def _load_mapped_index(self, allow_expired: bool = False, store: Optional[MappedIndexStore] = None) -> bool:
+        """Map an index file and serve it (see _read_mapped_index)."""
+        cached = self._read_mapped_index(allow_expired, store)
+        if cached is None:
+            return False
+        self._load_data_into_memory(cached)
+        return True
+
+    def _read_mapped_index(
+        self, allow_expired: bool = False, store: Optional[MappedIndexStore] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Map an index file without serving it yet; options and postings are read from it as queries need them.
+
+        Args:
+            allow_expired: Whether an index older than its TTL is acceptable
+            store: Where to map it from (default: the shared index under the cache directory)
+
+        Returns:
+            The options and indices in the memory cache layout, or None if no usable index was found
+        """
+        store = store or self._mapped_store()
+        if store is None:
+            return None
+        mapped = store.open(allow_expired)
+        if mapped is None:
+            return None
+        try:
+            if len(mapped) < 10:
+                raise SnapshotError(f"Shared index holds only {len(mapped)} options")
+            fields = mapped.fields
+            options = mapped.options(lambda values: DarwinOption(**dict(zip(fields, values))))
+            cached = {
+                "mapped": True,
+                "options": options,
+                "name_index": mapped.postings("name_index", list),
+                "word_index": mapped.postings("word_index", set),
+                "prefix_index": mapped.postings("prefix_index", list),
+                "total_options": len(options),
+                "total_categories": mapped.meta.get("total_categories", 0),
+                "source_digest": mapped.meta.get("source_digest"),
+                "category_counts": mapped.meta.get("category_counts"),
+            }
+            if "attribute_index" in mapped.index_names:
+                cached["attribute_index"] = mapped.postings("attribute_index", set)
+            # Otherwise written before the attribute index was stored, and rebuilt
+            last_updated = mapped.meta.get("last_updated")
+            cached["last_updated"] = datetime.fromisoformat(last_updated) if last_updated else None
+        except (SnapshotError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unusable shared nix-darwin index: {e}")
+            store.invalidate()
+            return None
+
+        origin = "prebuilt" if store.read_only else "shared"
+        logger.info(f"Mapped {len(options)} nix-darwin options from {origin} index {mapped.path.name}")
+        return cached
+
+    def _load_prebuilt_index(self) -> bool:
+        """
+        Map the prebuilt index bundled with the package or pinned by MCP_NIXOS_PREBUILT_INDEX_DIR.
+
+        It is served whatever its age; if it is outdated, current options are
+        fetched in a background task and replace it once parsed.
+        """
+        store = self._prebuilt_store()
+        if store is None or not self._load_mapped_index(store=store):
+            return False
+        if store.outdated():
+            self.refresh_task = asyncio.get_running_loop().create_task(self._refresh_outdated_prebuilt())
+        return True
+
+    def _load_index_snapshot(self, allow_expired: bool = False) -> bool:
+        """Load options and indices from the binary snapshot and serve them, if a usable one is cached."""
+        cached = self._read_index_snapshot(allow_expired)
+        if cached is None:
+            return False
+        self._load_data_into_memory(cached)
+        self._spill_details()
+        return True
+
+    def _read_index_snapshot(self, allow_expired: bool = False) -> Optional[Dict[str, Any]]:
+        """Read options and indices from the binary snapshot without serving them, if a usable one is cached."""
+        result = self.html_client.cache.get_binary_data(self.snapshot_key, allow_expired=allow_expired)
+        if not isinstance(result, tuple) or len(result) != 2:
+            return None
+        data, metadata = result
+        if data is None or not (metadata.get("cache_hit") or (allow_expired and metadata.get("stale"))):
+            return None
+        try:
+            snapshot = load_snapshot(data, "darwin")
+            if len(snapshot) < 10:
+                raise SnapshotError(f"Snapshot holds only {len(snapshot)} options")
+            details = None
+            if snapshot.fields == SNAPSHOT_FIELDS:
+                details = DetailStore.for_snapshot(
+                    self.html_cache, snapshot.meta.get("details"), DETAIL_FIELDS, len(snapshot)
+                )
+            if details is not None:
+                # The details stay in the file saved with the snapshot; nothing is spilled on loading
+                columns = [snapshot.column(field) for field in ("name", "description", "type", "parent")]
+                options = list(map(partial(DarwinOptionSummary.from_entry, details), range(len(snapshot)), *columns))
+            else:
+                options = [DarwinOption(**dict(zip(snapshot.fields, record))) for record in snapshot.records]
+            names = snapshot.column("name")
+            lookup = names.__getitem__
+            cached = {
+                "options": dict(zip(names, options)),
+                "name_index": defaultdict(
+                    list, {key: list(map(lookup, ids)) for key, ids in snapshot.postings("name_index")}
+                ),
+                "word_index": defaultdict(
+                    set, {key: set(map(lookup, ids)) for key, ids in snapshot.postings("word_index")}
+                ),
+                "prefix_index": defaultdict(
+                    list, {key: list(map(lookup, ids)) for key, ids in snapshot.postings("prefix_index")}
+                ),
+                "total_options": len(options),
+                "total_categories": snapshot.meta.get("total_categories", 0),
+                "source_digest": snapshot.meta.get("source_digest"),
+                "category_counts": snapshot.meta.get("category_counts"),
+            }
+            if "attribute_index" in snapshot.index_names:
+                cached["attribute_index"] = defaultdict(
+                    set, {key: set(map(lookup, ids)) for key, ids in snapshot.postings("attribute_index")}
+                )
+            # Otherwise written before the attribute index was stored, and rebuilt
+            last_updated = snapshot.meta.get("last_updated")
+            cached["last_updated"] = datetime.fromisoformat(last_updated) if last_updated else None
+        except (SnapshotError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unusable nix-darwin index snapshot: {e}")
+            self.html_client.cache.invalidate_data(self.snapshot_key)
+            return None
+
+        logger.info(f"Loaded {len(options)} nix-darwin options from index snapshot")
+        return cached
+
     # --- Refactored Search Logic ---
 
     def _find_exact_matches(self, query: str) -> List[str]:
@@ -703,16 +1288,47 @@ class DarwinClient:
         matches = {}
         for phrase in quoted_phrases:
             phrase_lower = phrase.lower()
-            for name, option in self.options.items():
+            for name in self._phrase_candidates(phrase_lower):
+                option = self.options.get(name)
                 score = 0
                 if phrase_lower in name.lower():
                     score = 90  # High score for name match
-                elif option.description and phrase_lower in option.description.lower():
+                elif option is not None and self._description_contains(option, phrase_lower):
                     score = 50  # Lower score for description match
                 if score > 0:
                     matches[name] = max(matches.get(name, 0), score)
         return matches
 
+    def _phrase_candidates(self, phrase_lower: str) -> Iterable[str]:
+        """
+        Names of the options that can contain a phrase.
+
+        Words inside the phrase are whole words of any name or description
+        containing it, so only options indexed under all of them are checked;
+        the first and last word may be cut off. Without such words every option
+        is a candidate.
+        """
+        words = re.findall(r"\w+", phrase_lower)
+        if re.match(r"\w", phrase_lower):
+            words = words[1:]
+        if re.search(r"\w$", phrase_lower):
+            words = words[:-1]
+        inner = [word for word in words if len(word) > 2]
+        if not inner:
+            return self.options.keys()
+        postings = sorted((self.word_index.get(word) or () for word in inner), key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    @staticmethod
+    def _description_contains(option: DarwinOption, phrase_lower: str) -> bool:
+        """Whether the full description of an option contains a phrase, read from the detail store only if needed."""
+        if type(option) is not DarwinOptionSummary:
+            return bool(option.description) and phrase_lower in option.description.lower()
+        summary = option.summary_description
+        if not summary.endswith("..."):  # Not shortened
+            return phrase_lower in summary.lower()
+        return phrase_lower in summary[:-3].lower() or phrase_lower in option.description.lower()
+
     def _merge_and_score_results(
         self, all_matches: List[Dict[str, int]], limit: int, initial_results: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -736,29 +1352,55 @@ class DarwinClient:
                 break
             # Check again for duplicates just in case initial_results had some
             if name not in {r["name"] for r in final_results}:
-                option_data = self._option_to_dict(self.options[name])
+                option_data = self._option_summary_dict(self.options[name])
                 # Add score for debugging/ranking?
                 # option_data['search_score'] = scored_matches[name]
                 final_results.append(option_data)
 
         return final_results[:limit]
 
-    async def search_options(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """Search for options by query (Refactored Orchestration)."""
+    async def search_options(
+        self, query: str, limit: int = 20, filters: Optional[Mapping[str, Optional[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for options by query (Refactored Orchestration).
+
+        Results are remembered until the options are replaced, so a repeated search
+        is answered without going through the indexes again.
+
+        Args:
+            query: Option name, dotted path, words or "quoted phrases"
+            limit: Maximum number of options to return
+            filters: Only match options with these values of "type" and "category"
+                (the top-level name segment), compared case-insensitively
+
+        Raises:
+            ValueError: If the options cannot be loaded, or a filter names another field
+        """
         if not self.options:
             await self.load_options()  # Ensure options are loaded
             if not self.options:  # If still not loaded, raise error
                 raise ValueError("Options not loaded. Call load_options() successfully first.")
 
-        results: List[Dict[str, Any]] = []
         query = query.strip()
+        key = (query, limit, tuple(filter_keys(filters, FILTER_FIELDS)))
+        return self.result_cache.get_or_compute(self.generation, key, lambda: self._search(query, limit, filters))
+
+    def _search(self, query: str, limit: int, filters: Optional[Mapping[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Run a search (see search_options) for a stripped query."""
+        allowed = self._filter_names(filters)
+        results: List[Dict[str, Any]] = []
         if not query:  # Handle empty query
+            if allowed is not None:  # Every option passing the filters matches
+                return [self._option_summary_dict(self.options[name]) for name in sorted(allowed)[:limit]]
             sample_names = list(self.options.keys())[: min(limit, len(self.options))]
-            return [self._option_to_dict(self.options[name]) for name in sample_names]
+            return [self._option_summary_dict(self.options[name]) for name in sample_names]
 
         # --- Strategy 1: Exact Match ---
         exact_matches_names = self._find_exact_matches(query)
-        results.extend([self._option_to_dict(self.options[name]) for name in exact_matches_names])
+        if allowed is not None:
+            exact_matches_names = [name for name in exact_matches_names if name in allowed]
+        results.extend([self._option_summary_dict(self.options[name]) for name in exact_matches_names])
 
         # --- Prepare for other strategies ---
         quoted_phrases = re.findall(r'"([^"]+)"', query)
@@ -782,6 +1424,11 @@ class DarwinClient:
             quoted_matches = self._find_quoted_phrase_matches(quoted_phrases)
             all_strategy_matches.append(quoted_matches)
 
+        if allowed is not None:
+            all_strategy_matches = [
+                {name: matches[name] for name in matches.keys() & allowed} for matches in all_strategy_matches
+            ]
+
         # --- Merge, Score, Sort, and Limit ---
         final_results = self._merge_and_score_results(all_strategy_matches, limit, results)
 
@@ -820,18 +1467,33 @@ class DarwinClient:
         option = self.options.get(name)
         return self._option_to_dict(option) if option else None
 
-    async def get_options_by_prefix(self, prefix: str) -> List[Dict[str, Any]]:
-        """Get options by prefix."""
+    async def get_options_by_prefix(
+        self, prefix: str, filters: Optional[Mapping[str, Optional[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get options by prefix.
+
+        Args:
+            prefix: Dotted prefix; only options under it are returned, not the one of that name
+            filters: Only include options with these values of "type" and "category" (see search_options)
+        """
         if not self.options:
             await self.load_options()
             if not self.options:
                 raise ValueError("Options not loaded.")
 
+        allowed = self._filter_names(filters)
+        names = self.prefix_index.get(prefix, [])
+        if allowed is None:
+            names = sorted(names)
+        else:
+            names = names_under_prefix(prefix, len(names), lambda: sorted(names), allowed, include_prefix=False)
+
         # Use the more specific prefix_index now
         options = []
-        for name in sorted(self.prefix_index.get(prefix, [])):
+        for name in names:
             if name in self.options:  # Ensure option exists
-                options.append(self._option_to_dict(self.options[name]))
+                options.append(self._option_summary_dict(self.options[name]))
         return options
 
     async def get_categories(self) -> List[Dict[str, Any]]:
@@ -841,11 +1503,11 @@ class DarwinClient:
             if not self.options:
                 raise ValueError("Options not loaded.")
 
-        categories = []
-        for category in self._get_top_level_categories():
-            count = len(self.prefix_index.get(category, []))  # Approximate count using prefix index
-            categories.append({"name": category, "option_count": count, "path": category})
-        return categories
+        # Counted when the options were loaded, not per call
+        return [
+            {"name": category, "option_count": count, "path": category}
+            for category, count in self.category_counts.items()
+        ]
 
     async def get_statistics(self) -> Dict[str, Any]:
         """Get statistics about the loaded options."""
@@ -860,6 +1522,8 @@ class DarwinClient:
             "last_updated": self.last_updated.isoformat() if self.last_updated else None,
             "loading_status": self.loading_status,
             "categories": await self.get_categories(),  # Reuse get_categories
+            "source_digest_checks": self.digest_stats.get_stats(),
+            "search_result_cache": self.result_cache.get_stats(),
         }
 
     def _option_to_dict(self, option: DarwinOption) -> Dict[str, Any]:
@@ -880,3 +1544,13 @@ class DarwinClient:
             ),
             "parent": option.parent,
         }
+
+    @staticmethod
+    def _option_summary_dict(option: DarwinOption) -> Dict[str, Any]:
+        """Convert an option to a dictionary of its SUMMARY_FIELDS, without reading its details."""
+        return {
+            "name": option.name,
+            "description": option.summary_description,
+            "type": option.type,
+            "parent": option.parent,
+        }
@@ -2,13 +2,18 @@
 Home Manager HTML parser and search engine.
 """
 
+import ast
+import heapq
+import json
 import logging
+import multiprocessing
 import os
 import re
 import threading
 import time
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Set, Tuple, cast, Union
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple, cast, Union
 
 from bs4 import BeautifulSoup, Tag, PageElement
 
@@ -16,13 +21,62 @@ from bs4 import BeautifulSoup, Tag, PageElement
 logger = logging.getLogger("mcp_nixos")
 
 # Import caches and HTML client
+from mcp_nixos.cache.detail_store import DetailStore, lazy_details_enabled, save_details
+from mcp_nixos.cache.mapped_index import MappedIndexStore, dump_mapped_index
+from mcp_nixos.cache.result_cache import ResultCache
 from mcp_nixos.cache.simple_cache import SimpleCache
+from mcp_nixos.cache.snapshot import SnapshotError, dump_snapshot, load_snapshot
+from mcp_nixos.clients.home_manager_index import FILTER_FIELDS, HomeManagerIndex, attribute_keys
 from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.clients.ngram_index import TrigramIndex
+from mcp_nixos.clients.option_record import DETAIL_FIELDS, OPTION_FIELDS, OptionRecord, OptionSummary
+from mcp_nixos.clients.prefix_index import PrefixIndex
+from mcp_nixos.utils.option_filters import describe_filters, filter_keys, names_under_prefix
+from mcp_nixos.utils.posting_lists import PostingLists
+from mcp_nixos.utils.readiness import ReadinessEvent, ready_timeout
+from mcp_nixos.utils.source_digest import DigestStats, content_digest
+from mcp_nixos.clients.home_manager_parser import (
+    HomeManagerOptionParser,
+    expand_records,
+    extract_paragraph_metadata,
+    make_option_record,
+    parse_options_compact,
+)
+
+# Similar segments considered per misspelled segment, and partial paths kept while correcting a name
+SPELLING_CANDIDATES = 20
+SPELLING_BEAM = 5
+
+
+def _index_attribute(name: str) -> property:
+    """Property reading and replacing one structure of the active index generation."""
+
+    def fget(self: "HomeManagerClient") -> Any:
+        return getattr(self.index, name)
+
+    def fset(self: "HomeManagerClient", value: Any) -> None:
+        setattr(self.index, name, value)
+        self.result_cache.clear()  # The generation was changed in place, so its number no longer tells
+
+    return property(fget, fset, doc=f"The ``{name}`` of the active index generation.")
 
 
 class HomeManagerClient:
     """Client for fetching and searching Home Manager documentation."""
 
+    # Shortcuts to the structures of the active generation. A method that reads several
+    # of them takes ``index = self.index`` once instead, so a refresh published
+    # meanwhile cannot mix two generations.
+    options = _index_attribute("options")
+    intern_table = _index_attribute("intern_table")
+    options_by_category = _index_attribute("options_by_category")
+    inverted_index = _index_attribute("inverted_index")
+    attribute_index = _index_attribute("attribute_index")
+    prefix_index = _index_attribute("prefix_index")
+    segment_index = _index_attribute("segment_index")
+    hierarchical_index = _index_attribute("hierarchical_index")
+    option_hashes = _index_attribute("option_hashes")
+
     def __init__(self):
         """Initialize the Home Manager client with caching."""
         self.hm_urls = {
@@ -34,15 +88,28 @@ class HomeManagerClient:
         self.cache = SimpleCache(max_size=100, ttl=self.cache_ttl)  # Memory cache
         self.html_client = HTMLClient(ttl=self.cache_ttl)  # Filesystem cache via HTMLClient
 
-        # Data structures
-        self.options: Dict[str, Dict[str, Any]] = {}
-        self.options_by_category: Dict[str, List[str]] = defaultdict(list)
-        self.inverted_index: Dict[str, Set[str]] = defaultdict(set)
-        self.prefix_index: Dict[str, Set[str]] = defaultdict(set)
-        self.hierarchical_index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        # Options and search indices being served; replaced as a whole by _publish_index
+        self.index = HomeManagerIndex()
+        # Search results of the generation being served, keyed by normalized query, limit and filters
+        self.result_cache = ResultCache()
 
         self.data_version = "1.0.0"
         self.cache_key = f"home_manager_data_v{self.data_version}"
+        # Binary index snapshot, loaded in preference to the JSON/pickle pair under cache_key
+        self.snapshot_key = f"{self.cache_key}_snapshot"
+
+        # Metadata of the most recent fetch per URL (e.g. whether it was a 304 Not Modified)
+        self.last_fetch_metadata: Dict[str, Dict[str, Any]] = {}
+        # Digest of each page parsed by the most recent load_all_options, by URL
+        self.fetched_digests: Dict[str, str] = {}
+        # Why each source failed in the most recent load_all_options, by doc type
+        self.source_errors: Dict[str, str] = {}
+        # Expired snapshots kept (hits) or re-parsed (misses) after comparing page digests
+        self.digest_stats = DigestStats()
+        # Sources not yet merged into the generation being published by a progressive cold-start load
+        self.pending_sources: Tuple[str, ...] = ()
+        # Why the sources still pending in the served generation will not arrive, if the load failed
+        self.pending_error: Optional[str] = None
 
         # State flags
         self.is_loaded = False
@@ -50,18 +117,38 @@ class HomeManagerClient:
         self.loading_lock = threading.RLock()
         self.loading_thread: Optional[threading.Thread] = None
         self.loading_in_progress = False
+        # Fetches current data while an outdated prebuilt index is served
+        self.refresh_thread: Optional[threading.Thread] = None
+        # A refresh while a generation is being served; queries keep using that generation
+        self.refresh_in_progress = False
+        self.refresh_error: Optional[str] = None
+        # Set once the initial load has settled (loaded or failed); requests wait on it up to ready_timeout
+        self.ready = ReadinessEvent("Home Manager data")
+        self.ready_timeout = ready_timeout()
 
         # Timing parameters - configurable for tests
         self.retry_delay = 1.0
         self.initial_load_delay = 0.1
 
+        # Worker processes parsing the documentation pages (0 parses in the fetching threads)
+        default_workers = min(len(self.hm_urls), os.cpu_count() or 1)
+        try:
+            self.parse_workers = max(0, int(os.environ.get("MCP_NIXOS_HM_PARSE_WORKERS", default_workers)))
+        except ValueError:
+            logger.warning("Invalid MCP_NIXOS_HM_PARSE_WORKERS, using default")
+            self.parse_workers = default_workers
+
         logger.info("Home Manager client initialized")
 
-    def fetch_url(self, url: str, force_refresh: bool = False) -> str:
-        """Fetch HTML content from a URL with filesystem caching."""
+    def fetch_url(self, url: str, force_refresh: bool = False, consumer: Optional[Callable[[str], Any]] = None) -> str:
+        """Fetch HTML content from a URL with filesystem caching, optionally streaming it to a consumer."""
         logger.debug(f"Fetching URL: {url}")
         try:
-            content, metadata = self.html_client.fetch(url, force_refresh=force_refresh)
+            if consumer is not None:
+                content, metadata = self.html_client.fetch(url, force_refresh=force_refresh, chunk_consumer=consumer)
+            else:
+                content, metadata = self.html_client.fetch(url, force_refresh=force_refresh)
+            self.last_fetch_metadata[url] = metadata
             if content is None:
                 error_msg = metadata.get("error", "Unknown error")
                 raise Exception(f"Failed to fetch URL {url}: {error_msg}")
@@ -87,32 +174,7 @@ class HomeManagerClient:
 
     def _extract_metadata_from_paragraphs(self, p_elements: List[Union[Tag, PageElement]]) -> Dict[str, Optional[str]]:
         """Extracts metadata (Type, Default, Example, Versions) from <p> elements."""
-        metadata: Dict[str, Optional[str]] = {
-            "type": None,
-            "default": None,
-            "example": None,
-            "introduced_version": None,
-            "deprecated_version": None,
-        }
-        for p in p_elements:
-            if not hasattr(p, "text"):
-                continue
-            text = p.text.strip()
-            if "Type:" in text:
-                metadata["type"] = text.split("Type:", 1)[1].strip()
-            elif "Default:" in text:
-                metadata["default"] = text.split("Default:", 1)[1].strip()
-            elif "Example:" in text:
-                metadata["example"] = text.split("Example:", 1)[1].strip()
-            elif "Introduced in version:" in text or "Since:" in text:
-                match = re.search(r"(Introduced in version|Since):\s*([\d.]+)", text)
-                if match:
-                    metadata["introduced_version"] = match.group(2)
-            elif "Deprecated in version:" in text or "Deprecated since:" in text:
-                match = re.search(r"(Deprecated in version|Deprecated since):\s*([\d.]+)", text)
-                if match:
-                    metadata["deprecated_version"] = match.group(2)
-        return metadata
+        return extract_paragraph_metadata(p_elements)
 
     def _find_manual_url(self, dd_element: Tag) -> Optional[str]:
         """Finds a potential manual URL within a <dd> element."""
@@ -123,14 +185,33 @@ class HomeManagerClient:
         return None
 
     def _find_category(self, dt_element: Tag) -> str:
-        """Determines the category based on the preceding <h3> heading."""
+        """
+        Determines the category based on the preceding <h3> heading.
+
+        This walks backwards through the document, so it is only suitable for
+        one-off lookups; _parse_html_dom tracks the current heading as it goes.
+        """
         heading = dt_element.find_previous("h3")
         if heading and hasattr(heading, "text"):
             return heading.text.strip()
         return "Uncategorized"
 
-    def _parse_single_option(self, dt_element: Union[Tag, PageElement], doc_type: str) -> Optional[Dict[str, Any]]:
-        """Parses a single option from its <dt> and associated <dd> element."""
+    def _parse_single_option(
+        self,
+        dt_element: Union[Tag, PageElement],
+        doc_type: str,
+        dd_element: Optional[Tag] = None,
+        category: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Parses a single option from its <dt> and associated <dd> element.
+
+        Args:
+            dt_element: The option's <dt> element
+            doc_type: Source name stored in the record
+            dd_element: The associated <dd>, if already known (default: the next <dd> sibling)
+            category: The option's category, if already known (default: the preceding <h3>)
+        """
         dt_tag = cast(Tag, dt_element) if isinstance(dt_element, Tag) else None
         if not dt_tag:
             return None
@@ -139,7 +220,7 @@ class HomeManagerClient:
         if not option_name:
             return None
 
-        dd = dt_tag.find_next_sibling("dd") if isinstance(dt_tag, Tag) else None
+        dd = dd_element if dd_element is not None else dt_tag.find_next_sibling("dd")
         if not dd or not isinstance(dd, Tag):
             return None
 
@@ -147,26 +228,33 @@ class HomeManagerClient:
         description = p_elements[0].text.strip() if p_elements and hasattr(p_elements[0], "text") else ""
         metadata = self._extract_metadata_from_paragraphs(list(p_elements[1:]))
         manual_url = self._find_manual_url(dd)
-        category = self._find_category(dt_tag)
-
-        return {
-            "name": option_name,
-            "type": metadata["type"],
-            "description": description,
-            "default": metadata["default"],
-            "example": metadata["example"],
-            "category": category,
-            "source": doc_type,
-            "introduced_version": metadata["introduced_version"],
-            "deprecated_version": metadata["deprecated_version"],
-            "manual_url": manual_url,
-        }
+        if category is None:
+            category = self._find_category(dt_tag)
+
+        return make_option_record(option_name, description, metadata, category, doc_type, manual_url)
 
     def parse_html(self, html: str, doc_type: str) -> List[Dict[str, Any]]:
-        """Parse Home Manager HTML documentation (Refactored Main Loop)."""
+        """Parse Home Manager HTML documentation with the streaming option parser."""
+        logger.info(f"Parsing HTML content for {doc_type}")
+        parser = HomeManagerOptionParser(doc_type)
+        options = parser.feed(html)
+        options.extend(parser.close())
+        if parser.failed:
+            logger.warning(f"Streaming parser failed for {doc_type}, falling back to the DOM parser")
+            return self._parse_html_dom(html, doc_type)
+        logger.info(f"Parsed {len(options)} options from {doc_type}")
+        return options
+
+    def _parse_html_dom(self, html: str, doc_type: str) -> List[Dict[str, Any]]:
+        """
+        Parse Home Manager HTML documentation by building a BeautifulSoup DOM.
+
+        Headings and option terms are visited in a single forward pass: the current
+        <h3> heading is carried along as the category, and each <dt> is paired with
+        the next <dd> of the option list, so the cost is linear in document size.
+        """
         options = []
         try:
-            logger.info(f"Parsing HTML content for {doc_type}")
             soup = BeautifulSoup(html, "html.parser")
             variablelist = soup.find(class_="variablelist")
             if not variablelist:
@@ -174,17 +262,29 @@ class HomeManagerClient:
             dl = variablelist.find("dl")
             if not dl or not isinstance(dl, Tag):
                 return []
-            dt_elements = dl.find_all("dt", recursive=False)
-
-            for dt in dt_elements:
-                try:
-                    option = self._parse_single_option(dt, doc_type)
-                    if option:
-                        options.append(option)
-                except Exception as e:
-                    option_name_guess = self._extract_option_name(dt) or "unknown"
-                    logger.warning(f"Error parsing option '{option_name_guess}' in {doc_type}: {str(e)}")
-                    continue  # Skip this option, proceed with others
+
+            category = "Uncategorized"
+            pending_terms: List[Tuple[Tag, str]] = []  # <dt>s waiting for their <dd>
+            for element in soup.find_all(["h3", "dt", "dd"]):
+                if element.name == "h3":
+                    category = element.text.strip()
+                    continue
+                if element.parent is not dl:
+                    continue  # Only direct children of the option list are options
+                if element.name == "dt":
+                    pending_terms.append((element, category))
+                    continue
+
+                for dt, dt_category in pending_terms:
+                    try:
+                        option = self._parse_single_option(dt, doc_type, dd_element=element, category=dt_category)
+                        if option:
+                            options.append(option)
+                    except Exception as e:
+                        option_name_guess = self._extract_option_name(dt) or "unknown"
+                        logger.warning(f"Error parsing option '{option_name_guess}' in {doc_type}: {str(e)}")
+                        continue  # Skip this option, proceed with others
+                pending_terms = []
 
             logger.info(f"Parsed {len(options)} options from {doc_type}")
             return options
@@ -194,70 +294,302 @@ class HomeManagerClient:
 
     # --- Indexing Logic (Largely Unchanged) ---
 
-    def build_search_indices(self, options: List[Dict[str, Any]]) -> None:
-        """Build in-memory search indices for fast option lookup."""
+    def build_search_indices(self, options: List[Dict[str, Any]], origin: str = "web") -> None:
+        """
+        Build search indices for fast option lookup and publish them as a new generation.
+
+        The indices are built in a new HomeManagerIndex while the active one keeps
+        serving queries; nothing is published if building fails.
+
+        Args:
+            options: The complete option list
+            origin: Where the options came from, reported in the status
+        """
         try:
             logger.info("Building search indices for Home Manager options")
-            # Reset indices
-            self.options = {}
-            self.options_by_category = defaultdict(list)
-            self.inverted_index = defaultdict(set)
-            self.prefix_index = defaultdict(set)
-            self.hierarchical_index = defaultdict(set)
-
-            for option in options:
-                option_name = option["name"]
-                self.options[option_name] = option
-                category = option.get("category", "Uncategorized")
-                self.options_by_category[category].append(option_name)
-
-                # Build indices
-                name_words = re.findall(r"\w+", option_name.lower())
-                desc_words = re.findall(r"\w+", option.get("description", "").lower())
-                for word in set(name_words + desc_words):
-                    if len(word) > 2:
-                        self.inverted_index[word].add(option_name)
-
-                parts = option_name.split(".")
-                for i in range(1, len(parts) + 1):
-                    prefix = ".".join(parts[:i])
-                    self.prefix_index[prefix].add(option_name)
-                    if i < len(parts):  # Hierarchical index for parent/child
-                        parent = ".".join(parts[:i])
-                        child = parts[i]
-                        # Use tuple key for hierarchical index
-                        self.hierarchical_index[(parent, child)].add(option_name)
+            index = HomeManagerIndex()
+            index.origin = origin
+            options_by_name = self._options_by_name(options)
+            # Sorted once up front; _index_option then finds every name already present
+            index.prefix_index = PrefixIndex(options_by_name)
+            for option in options_by_name.values():
+                self._index_option(option, index)
 
             logger.info(
-                f"Built indices: {len(self.options)} options, {len(self.inverted_index)} words, "
-                f"{len(self.prefix_index)} prefixes, {len(self.hierarchical_index)} hierarchical parts"
+                f"Built indices: {len(index.options)} options, {len(index.inverted_index)} words, "
+                f"{len(index.hierarchical_index)} hierarchical parts"
             )
         except Exception as e:
             logger.error(f"Error building search indices: {str(e)}")
             raise
+        self._publish_index(index)
+
+    def _publish_index(self, index: HomeManagerIndex) -> None:
+        """Make a fully built generation the active one, with a single reference swap."""
+        self._spill_details(index)
+        with self.loading_lock:
+            index.generation = self.index.generation + 1
+            index.published_at = time.time()
+            index.pending_sources = self.pending_sources
+            index._owned = None  # From now on nothing writes to the previous generation
+            self.index = index
+        logger.info(f"Published Home Manager index generation {index.generation} ({len(index.options)} options)")
+
+    def _spill_details(self, index: HomeManagerIndex) -> None:
+        """Keep only the summaries of a generation's options in memory, unless MCP_NIXOS_LAZY_DETAILS is off."""
+        if not lazy_details_enabled() or not isinstance(index.options, dict):
+            return  # Mapped options are read from the mapping already
+        if index.details is None:
+            index.details = DetailStore.for_cache(getattr(self.html_client, "cache", None), DETAIL_FIELDS)
+        try:
+            moved = index.spill_details()
+        except OSError as e:
+            logger.warning(f"Cannot write Home Manager option details, keeping them in memory: {e}")
+            return
+        if moved:
+            logger.info(f"Moved the details of {moved} Home Manager options to disk")
+
+    def update_search_indices(self, options: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Bring the search indices up to date with a new set of options.
+
+        Options are compared with the indexed ones by name and content hash, and only
+        the added, removed and changed options are indexed or unindexed, so the work
+        grows with the size of the change rather than the corpus. The changes are made
+        to a successor of the active generation, which is then published; the active
+        one is left untouched. Falls back to a full rebuild when nothing is indexed yet
+        or most options changed.
+
+        Args:
+            options: The complete new option list
+
+        Returns:
+            Counts of added, removed, updated and unchanged options
+        """
+        new_options = self._options_by_name(options)
+        if not self.index.options:
+            self.build_search_indices(options)
+            return {"added": len(new_options), "removed": 0, "updated": 0, "unchanged": 0}
+
+        index = self.index.successor()
+        index.origin = "web"
+        # Hashes of indexed options are computed on the first update after they were loaded
+        for option_name, option in index.options.items():
+            if option_name not in index.option_hashes:
+                index.option_hashes[option_name] = self._option_hash(option)
+
+        new_hashes = {option_name: self._option_hash(option) for option_name, option in new_options.items()}
+        removed = [option_name for option_name in index.options if option_name not in new_hashes]
+        added = [option_name for option_name in new_hashes if option_name not in index.options]
+        updated = [
+            option_name
+            for option_name, option_hash in new_hashes.items()
+            if option_name in index.options and index.option_hashes[option_name] != option_hash
+        ]
+        diff = {
+            "added": len(added),
+            "removed": len(removed),
+            "updated": len(updated),
+            "unchanged": len(new_hashes) - len(added) - len(updated),
+        }
+
+        if len(added) + len(removed) + len(updated) > len(new_hashes) // 2:
+            logger.info(f"Most Home Manager options changed ({diff}), rebuilding indices")
+            self.build_search_indices(options)
+            return diff
+
+        try:
+            for option_name in removed + updated:
+                self._unindex_option(index.options[option_name], index)
+                del index.option_hashes[option_name]
+            for option_name in updated + added:
+                self._index_option(new_options[option_name], index)
+                index.option_hashes[option_name] = new_hashes[option_name]
+        except Exception as e:
+            logger.error(f"Error updating search indices, rebuilding: {str(e)}")
+            self.build_search_indices(options)
+            return diff
+
+        self._publish_index(index)
+        logger.info(f"Updated indices incrementally: {diff}")
+        return diff
+
+    @staticmethod
+    def _build_segment_index(names: Iterable[str]) -> TrigramIndex:
+        """Trigram index of the dotted segments of option names, built when first used (names must not change)."""
+        return TrigramIndex.deferred(segment for name in names for segment in name.split("."))
+
+    @staticmethod
+    def _options_by_name(options: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Key options by name; a later option replaces an earlier one of the same name."""
+        return {option["name"]: option for option in options}
+
+    @staticmethod
+    def _option_hash(option: Mapping[str, Any]) -> int:
+        """Content hash of an option record (only meaningful within this process)."""
+        try:
+            return hash(tuple(option.items()))
+        except TypeError:  # Unhashable field values
+            return hash(json.dumps(dict(option), sort_keys=True, default=str))
+
+    @staticmethod
+    def _index_keys(option: Mapping[str, Any]) -> Tuple[Set[str], List[Tuple[str, str]]]:
+        """Words and (parent, child) pairs an option is indexed under."""
+        option_name = option["name"]
+        name_words = re.findall(r"\w+", option_name.lower())
+        desc_words = re.findall(r"\w+", (option.get("description") or "").lower())
+        words = {word for word in name_words + desc_words if len(word) > 2}
+
+        parts = option_name.split(".")
+        prefixes = [".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+        # Hierarchical index for parent/child, keyed by tuples
+        hierarchy = [(prefixes[i - 1], parts[i]) for i in range(1, len(parts))]
+        return words, hierarchy
+
+    def _index_option(self, option: Mapping[str, Any], index: Optional[HomeManagerIndex] = None) -> None:
+        """Add an option to every index of a generation (by default the active one)."""
+        index = index or self.index
+        option_name = option["name"]
+        index.options[option_name] = OptionRecord.from_mapping(option, index.intern_table)
+        index.options_by_category[option.get("category", "Uncategorized")].append(option_name)
+        index.count_option(option, 1)
+
+        words, hierarchy = self._index_keys(option)
+        for word in words:
+            index.inverted_index.add(word, option_name)
+        for key in attribute_keys(option):
+            index.attribute_index.add(key, option_name)
+        index.prefix_index.add(option_name)
+        for segment in option_name.split("."):
+            index.add_segment(segment)  # Kept on removal; candidates are checked against the other indices
+        for key in hierarchy:
+            index.postings(index.hierarchical_index, key).add(option_name)
+
+    def _unindex_option(self, option: Mapping[str, Any], index: Optional[HomeManagerIndex] = None) -> None:
+        """Remove an option from every index of a generation, dropping keys left without options."""
+        index = index or self.index
+        option_name = option["name"]
+        if index.options.pop(option_name, None) is not None:
+            index.count_option(option, -1)
+        category = option.get("category", "Uncategorized")
+        names = index.options_by_category.get(category)
+        if names is not None and option_name in names:
+            names.remove(option_name)
+            if not names:
+                del index.options_by_category[category]
+
+        index.prefix_index.discard(option_name)
+        words, hierarchy = self._index_keys(option)
+        for word in words:
+            index.inverted_index.discard(word, option_name)
+        index.inverted_index.forget(option_name)
+        for key in attribute_keys(option):
+            index.attribute_index.discard(key, option_name)
+        index.attribute_index.forget(option_name)
+        for key in hierarchy:
+            if key not in index.hierarchical_index:
+                continue
+            postings = index.postings(index.hierarchical_index, key)
+            postings.discard(option_name)
+            if not postings:
+                del index.hierarchical_index[key]
 
     # --- Loading Logic (Unchanged) ---
 
-    def load_all_options(self) -> List[Dict[str, Any]]:
-        """Load options from all Home Manager HTML documentation sources."""
-        all_options = []
+    def load_all_options(
+        self, on_source: Optional[Callable[[Dict[str, List[Dict[str, Any]]]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Load options from all Home Manager HTML documentation sources.
+
+        The sources are fetched concurrently, one thread each. Every page is handed to
+        a pool of parse worker processes as soon as it arrives, so parsing neither
+        waits for the other downloads nor holds this process's GIL; the workers send
+        back compact records. Without parse workers each page is parsed in its
+        fetching thread while it downloads.
+
+        Args:
+            on_source: Called in this thread each time a source has been parsed, in
+                completion order, with the options of every source parsed so far by
+                doc type. An exception it raises is logged and loading goes on.
+        """
+        results: Dict[str, List[Dict[str, Any]]] = {}
         errors = []
-        for doc_type, url in self.hm_urls.items():
-            try:
-                logger.info(f"Loading options from {doc_type}: {url}")
-                html = self.fetch_url(url)
-                options = self.parse_html(html, doc_type)
-                all_options.extend(options)
-            except Exception as e:
-                error_msg = f"Error loading options from {doc_type} ({url}): {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-
+        self.fetched_digests = {}
+        self.source_errors = {}
+        parse_pool = self._create_parse_pool()
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.hm_urls), thread_name_prefix="hm-fetch") as fetchers:
+                futures = {
+                    doc_type: fetchers.submit(self._load_source, doc_type, url, parse_pool)
+                    for doc_type, url in self.hm_urls.items()
+                }
+                doc_types = {future: doc_type for doc_type, future in futures.items()}
+                for future in as_completed(doc_types):
+                    doc_type = doc_types[future]
+                    try:
+                        results[doc_type] = future.result()
+                    except Exception as e:
+                        error_msg = f"Error loading options from {doc_type} ({self.hm_urls[doc_type]}): {str(e)}"
+                        logger.error(error_msg)
+                        errors.append(error_msg)
+                        self.source_errors[doc_type] = error_msg
+                        continue
+                    if on_source is not None:
+                        try:
+                            on_source(results)
+                        except Exception as e:
+                            logger.warning(f"Error publishing Home Manager options from {doc_type}: {str(e)}")
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown(wait=False, cancel_futures=True)
+
+        # Keep the documented source order regardless of which page finished first
+        all_options = [option for doc_type in self.hm_urls for option in results.get(doc_type, [])]
         if not all_options and errors:
             raise Exception(f"Failed to load any Home Manager options: {'; '.join(errors)}")
         logger.info(f"Loaded {len(all_options)} options total")
         return all_options
 
+    def _create_parse_pool(self) -> Optional[Executor]:
+        """Create the process pool for parsing pages, or None to parse in-process."""
+        if self.parse_workers <= 0:
+            return None
+        try:
+            # Spawned rather than forked: this process runs an event loop and other threads
+            return ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, ValueError, NotImplementedError) as e:
+            logger.warning(f"Cannot start Home Manager parse workers, parsing in-process: {e}")
+            return None
+
+    def _load_source(self, doc_type: str, url: str, parse_pool: Optional[Executor] = None) -> List[Dict[str, Any]]:
+        """Fetch and parse one documentation source."""
+        logger.info(f"Loading options from {doc_type}: {url}")
+        if parse_pool is None:
+            # Parse while the page downloads; pages served from the cache are parsed afterwards
+            parser = HomeManagerOptionParser(doc_type)
+            streamed: List[Dict[str, Any]] = []
+            html = self.fetch_url(url, consumer=lambda chunk: streamed.extend(parser.feed(chunk)))
+            self.fetched_digests[url] = content_digest(html)
+            if self.last_fetch_metadata.get(url, {}).get("streamed") is True and not parser.failed:
+                streamed.extend(parser.close())
+                logger.info(f"Parsed {len(streamed)} options from {doc_type} while downloading")
+                return streamed
+            return self.parse_html(html, doc_type)
+
+        html = self.fetch_url(url)
+        self.fetched_digests[url] = content_digest(html)
+        try:
+            rows = parse_pool.submit(parse_options_compact, html, doc_type).result()
+        except Exception as e:
+            logger.warning(f"Parse worker failed for {doc_type}, parsing in-process: {e}")
+            return self.parse_html(html, doc_type)
+        if rows is None:
+            # The streaming parser gave up; parse_html falls back to the DOM parser
+            return self.parse_html(html, doc_type)
+        logger.info(f"Parsed {len(rows)} options from {doc_type} in a worker process")
+        return expand_records(rows, doc_type)
+
     def ensure_loaded(self, force_refresh: bool = False) -> None:
         """Ensure that options are loaded and indices are built."""
         if self.is_loaded and not force_refresh:
@@ -265,17 +597,15 @@ class HomeManagerClient:
         if self.loading_error and not force_refresh:
             raise Exception(f"Previous loading attempt failed: {self.loading_error}")
 
-        # Simplified check and wait for background loading
+        # Wait for a load already in progress rather than starting another
         if self.loading_in_progress and not force_refresh:
             logger.info("Waiting for background data loading...")
-            if self.loading_thread:
-                self.loading_thread.join(timeout=5.0)  # Wait up to 5 seconds
-                if self.loading_in_progress:  # Still loading? Timeout.
-                    raise Exception("Timed out waiting for background loading")
-                if self.is_loaded:
-                    return  # Success
-                if self.loading_error:
-                    raise Exception(f"Loading failed: {self.loading_error}")
+            if not self.ready.wait(self.ready_timeout):
+                raise Exception("Timed out waiting for background loading")
+            if self.is_loaded:
+                return  # Success
+            if self.loading_error:
+                raise Exception(f"Loading failed: {self.loading_error}")
 
         with self.loading_lock:
             # Double-check state after acquiring lock
@@ -292,22 +622,40 @@ class HomeManagerClient:
             if force_refresh:
                 logger.info("Forced refresh requested, invalidating cache")
                 self.invalidate_cache()
-                self.is_loaded = False
                 self.loading_error = None
 
-            self.loading_in_progress = True  # Mark as loading *before* starting work
+            # A refresh builds the next generation while the current one keeps serving queries
+            refreshing = self.is_loaded
+            if refreshing:
+                self.refresh_in_progress = True
+                self.refresh_error = None
+            else:
+                self.loading_in_progress = True  # Mark as loading *before* starting work
+                self.ready.clear()
 
         try:
-            self._load_data_internal()
+            if force_refresh:
+                self._load_data_internal(allow_prebuilt=False)  # A forced refresh is for current data
+            else:
+                self._load_data_internal()
             with self.loading_lock:
                 self.is_loaded = True
                 self.loading_error = None  # Clear any previous error
                 self.loading_in_progress = False
+                if refreshing:
+                    self.refresh_in_progress = False  # Not one an outdated prebuilt index started
+            self.ready.set()
             logger.info("HomeManagerClient data successfully loaded/refreshed")
         except Exception as e:
             with self.loading_lock:
-                self.loading_error = str(e)
-                self.loading_in_progress = False
+                if refreshing:
+                    # The previous generation is still complete; keep serving it
+                    self.refresh_error = str(e)
+                    self.refresh_in_progress = False
+                else:
+                    self.loading_error = str(e)
+                    self.loading_in_progress = False
+            self.ready.set()
             logger.error(f"Failed to load/refresh Home Manager options: {str(e)}")
             raise
 
@@ -317,6 +665,9 @@ class HomeManagerClient:
             logger.info(f"Invalidating Home Manager data cache with key {self.cache_key}")
             if self.html_client and hasattr(self.html_client, "cache") and self.html_client.cache:
                 self.html_client.cache.invalidate_data(self.cache_key)
+                self.html_client.cache.invalidate_data(self.snapshot_key)
+                if store := self._mapped_store():
+                    store.invalidate()
                 for url in self.hm_urls.values():
                     self.html_client.cache.invalidate(url)
                 logger.info("Home Manager data cache invalidated")
@@ -326,13 +677,13 @@ class HomeManagerClient:
             logger.error(f"Failed to invalidate Home Manager data cache: {str(e)}")
 
     def force_refresh(self) -> bool:
-        """Force a complete refresh of Home Manager data from the web."""
+        """
+        Force a complete refresh of Home Manager data from the web.
+
+        Data already loaded keeps being served until the refreshed generation replaces it.
+        """
         try:
             logger.info("Forcing a complete refresh of Home Manager data")
-            with self.loading_lock:
-                self.is_loaded = False
-                self.loading_error = None
-            # Call ensure_loaded with force_refresh=True
             self.ensure_loaded(force_refresh=True)
             return self.is_loaded  # Return true if loading succeeded
         except Exception as e:
@@ -341,6 +692,10 @@ class HomeManagerClient:
 
     def load_in_background(self) -> None:
         """Start loading options in a background thread if not already loaded/loading."""
+        if multiprocessing.parent_process() is not None:
+            # Spawned parse workers re-import the server's main module; only the server itself loads data
+            logger.debug("Skipping background load in a worker process")
+            return
         with self.loading_lock:
             if self.is_loaded or self.loading_in_progress:
                 logger.debug("Skipping background load: Already loaded or in progress.")
@@ -348,6 +703,7 @@ class HomeManagerClient:
             logger.info("Starting background thread for loading Home Manager options")
             self.loading_in_progress = True  # Set flag within lock
             self.loading_error = None  # Clear previous error
+            self.ready.clear()
             self.loading_thread = threading.Thread(target=self._background_load_task, daemon=True)
             self.loading_thread.start()
 
@@ -360,6 +716,7 @@ class HomeManagerClient:
                 self.is_loaded = True
                 self.loading_error = None
                 self.loading_in_progress = False
+            self.ready.set()
             logger.info("Background loading of Home Manager options completed successfully")
         except Exception as e:
             error_msg = str(e)
@@ -367,8 +724,35 @@ class HomeManagerClient:
                 self.loading_error = error_msg
                 self.is_loaded = False  # Ensure loaded is false on error
                 self.loading_in_progress = False
+            self.ready.set()
             logger.error(f"Background loading of Home Manager options failed: {error_msg}")
 
+    def _refresh_in_background(self) -> None:
+        """Load current data in a background thread while the generation being served keeps answering."""
+        if multiprocessing.parent_process() is not None:
+            return
+        with self.loading_lock:
+            if self.refresh_in_progress:
+                return
+            self.refresh_in_progress = True
+            self.refresh_error = None
+        logger.info("Starting background thread for refreshing Home Manager options")
+        self.refresh_thread = threading.Thread(target=self._background_refresh_task, daemon=True)
+        self.refresh_thread.start()
+
+    def _background_refresh_task(self) -> None:
+        """Task executed by the background refresh thread."""
+        try:
+            self._load_data_internal(allow_prebuilt=False)
+            logger.info("Background refresh of Home Manager options completed successfully")
+        except Exception as e:
+            with self.loading_lock:
+                self.refresh_error = str(e)
+            logger.error(f"Background refresh of Home Manager options failed: {e}")
+        finally:
+            with self.loading_lock:
+                self.refresh_in_progress = False
+
     # --- Caching Logic (Refactored) ---
 
     def _validate_hm_cache_data(self, data: Optional[Dict], binary_data: Optional[Dict]) -> bool:
@@ -388,75 +772,109 @@ class HomeManagerClient:
 
     def _load_from_cache(self) -> bool:
         """Attempt to load data from disk cache."""
+        return self._load_cached_snapshot()
+
+    def _load_cached_snapshot(self, allow_expired: bool = False) -> bool:
+        """Load and publish the disk cache snapshot, optionally accepting one whose TTL has expired."""
+        index = self._read_cached_snapshot(allow_expired)
+        if index is None:
+            return False
+        self._publish_index(index)
+        return True
+
+    def _read_cached_snapshot(self, allow_expired: bool = False) -> Optional[HomeManagerIndex]:
+        """
+        Build a generation from the disk cache without publishing it.
+
+        Tries the shared mapped index, then the binary snapshot, then the JSON/pickle pair.
+
+        Args:
+            allow_expired: Whether data older than its TTL is acceptable
+
+        Returns:
+            The generation, or None if no usable cache was found
+        """
         try:
             logger.info("Attempting to load Home Manager data from disk cache")
 
             if not self.html_client or not hasattr(self.html_client, "cache") or not self.html_client.cache:
                 logger.warning("Cannot load from cache: HTML client cache not available")
-                return False
+                return None
+
+            index = self._read_mapped_index(allow_expired=allow_expired)
+            if index is None:
+                index = self._read_index_snapshot(allow_expired=allow_expired)
+            if index is not None:
+                return index
 
-            data_result = self.html_client.cache.get_data(self.cache_key)
+            data_result = self.html_client.cache.get_data(self.cache_key, allow_expired=allow_expired)
             if not data_result or len(data_result) != 2:
                 logger.warning("Invalid data returned from cache.get_data")
-                return False
+                return None
 
             data, data_meta = data_result
 
-            binary_result = self.html_client.cache.get_binary_data(self.cache_key)
+            binary_result = self.html_client.cache.get_binary_data(self.cache_key, allow_expired=allow_expired)
             if not binary_result or len(binary_result) != 2:
                 logger.warning("Invalid data returned from cache.get_binary_data")
-                return False
+                return None
 
             binary_data, bin_meta = binary_result
 
-            if not data_meta or not data_meta.get("cache_hit") or not bin_meta or not bin_meta.get("cache_hit"):
+            def usable(meta: Optional[Dict[str, Any]]) -> bool:
+                return bool(meta) and bool(meta.get("cache_hit") or (allow_expired and meta.get("stale")))
+
+            if not usable(data_meta) or not usable(bin_meta):
                 logger.info(f"No complete HM cached data found for key {self.cache_key}")
-                return False
+                return None
 
             if not self._validate_hm_cache_data(data, binary_data):
                 logger.warning("Invalid HM cache data found, ignoring.")
                 self.invalidate_cache()  # Invalidate corrupt cache
-                return False
+                return None
 
             # Load data
             if not data or not isinstance(data, dict) or "options" not in data:
                 logger.warning("Invalid options data structure in cache")
-                return False
+                return None
 
-            self.options = data["options"]
+            # Loaded into a new generation, published once complete
+            index = HomeManagerIndex()
+            index.origin = "cache"
+            index.options = {
+                name: OptionRecord.from_mapping(option, index.intern_table) for name, option in data["options"].items()
+            }
+            index.source_digests = dict(data.get("source_digests") or {})
+            index.restore_counts(data.get("option_counts"))
 
             if not binary_data or not isinstance(binary_data, dict):
                 logger.warning("Invalid binary data structure in cache")
-                return False
+                return None
 
             if "options_by_category" in binary_data:
-                self.options_by_category = defaultdict(list, binary_data["options_by_category"])
+                index.options_by_category = defaultdict(list, binary_data["options_by_category"])
             else:
-                self.options_by_category = defaultdict(list)
                 logger.warning("Missing options_by_category in cache")
 
             if "inverted_index" in binary_data:
-                self.inverted_index = defaultdict(set, {k: set(v) for k, v in binary_data["inverted_index"].items()})
+                index.inverted_index = PostingLists.from_names(binary_data["inverted_index"])
             else:
-                self.inverted_index = defaultdict(set)
                 logger.warning("Missing inverted_index in cache")
 
-            if "prefix_index" in binary_data:
-                self.prefix_index = defaultdict(set, {k: set(v) for k, v in binary_data["prefix_index"].items()})
-            else:
-                self.prefix_index = defaultdict(set)
-                logger.warning("Missing prefix_index in cache")
+            # The stored per-prefix sets are only kept for older releases
+            index.prefix_index = PrefixIndex(index.options)
+            index.rebuild_attributes()  # Not stored in this format
+            index.segment_index = self._build_segment_index(list(index.options))
 
-            self.hierarchical_index = defaultdict(set)
             if "hierarchical_index" in binary_data and binary_data["hierarchical_index"]:
                 for k_str, v in binary_data["hierarchical_index"].items():
                     try:
                         if not k_str:
                             continue
-                        # Safer eval for tuple string like "('programs', 'git')"
-                        key_tuple = eval(k_str, {"__builtins__": {}}, {})
+                        # Tuple keys were stored as strings like "('programs', 'git')"
+                        key_tuple = ast.literal_eval(k_str)
                         if isinstance(key_tuple, tuple) and len(key_tuple) == 2:
-                            self.hierarchical_index[key_tuple] = set(v) if v else set()
+                            index.hierarchical_index[key_tuple] = set(v) if v else set()
                         else:
                             logger.warning(f"Skipping invalid hierarchical key from cache: {k_str}")
                     except Exception as e:
@@ -464,62 +882,442 @@ class HomeManagerClient:
             else:
                 logger.warning("Missing hierarchical_index in cache")
 
-            logger.info(f"Loaded {len(self.options)} Home Manager options from disk cache")
-            return True
+            logger.info(f"Loaded {len(index.options)} Home Manager options from disk cache")
+            return index
         except Exception as e:
             logger.error(f"Failed to load Home Manager data from disk cache: {str(e)}")
             self.invalidate_cache()  # Invalidate potentially corrupt cache
-            return False
+            return None
 
     def _save_in_memory_data(self) -> bool:
         """Save in-memory data structures to disk cache."""
+        index = self.index
         try:
-            if not self.options:  # Don't save empty data
+            if not index.options:  # Don't save empty data
                 logger.warning("Attempted to save empty HM options, skipping.")
                 return False
 
-            logger.info(f"Saving {len(self.options)} Home Manager options to disk cache")
-            serializable_data = {
-                "options_count": len(self.options),
-                "options": self.options,  # Options are already dicts
-                "timestamp": time.time(),
-            }
-            binary_data = {
-                "options_by_category": dict(self.options_by_category),  # Convert defaultdict
-                "inverted_index": {k: list(v) for k, v in self.inverted_index.items()},
-                "prefix_index": {k: list(v) for k, v in self.prefix_index.items()},
-                # Convert tuple keys to strings for JSON/Pickle compatibility
-                "hierarchical_index": {str(k): list(v) for k, v in self.hierarchical_index.items()},
-            }
-
+            logger.info(f"Saving {len(index.options)} Home Manager options to disk cache")
             if not self.html_client or not hasattr(self.html_client, "cache") or not self.html_client.cache:
                 logger.warning("Cannot save to cache: HTML client cache not available")
                 return False
 
-            self.html_client.cache.set_data(self.cache_key, serializable_data)
-            self.html_client.cache.set_binary_data(self.cache_key, binary_data)
+            if self._save_index_snapshot(index):
+                # A pair left by an earlier save would hold outdated options
+                self.html_client.cache.invalidate_data(self.cache_key)
+            else:
+                # Options the snapshot cannot hold are saved as the JSON/pickle pair
+                self._save_legacy_data(index)
+            self._save_mapped_index(index)
             logger.info(f"Successfully saved Home Manager data to disk cache with key {self.cache_key}")
             return True
         except Exception as e:
             logger.error(f"Failed to save Home Manager data to disk cache: {str(e)}")
             return False
 
-    def _load_data_internal(self) -> None:
-        """Internal method to load data, trying cache first, then web."""
+    def _save_legacy_data(self, index: HomeManagerIndex) -> None:
+        """Save a generation as the JSON/pickle pair under cache_key."""
+        serializable_data = {
+            "options_count": len(index.options),
+            "options": {name: dict(option) for name, option in index.options.items()},
+            "timestamp": time.time(),
+            "source_digests": index.source_digests,
+            "option_counts": index.option_counts,
+        }
+        binary_data = {
+            "options_by_category": dict(index.options_by_category),  # Convert defaultdict
+            "inverted_index": {k: list(v) for k, v in index.inverted_index.items()},
+            "prefix_index": dict(index.prefix_index.items()),
+            # Convert tuple keys to strings for JSON/Pickle compatibility
+            "hierarchical_index": {str(k): list(v) for k, v in index.hierarchical_index.items()},
+        }
+        self.html_client.cache.set_data(self.cache_key, serializable_data)
+        self.html_client.cache.set_binary_data(self.cache_key, binary_data)
+
+    @staticmethod
+    def _snapshot_tables(index: HomeManagerIndex) -> Tuple[Tuple[str, ...], List[Tuple[Any, ...]], Dict[str, Any]]:
+        """
+        A generation's options as records and its indices as postings of record positions.
+
+        Raises:
+            SnapshotError: If the options do not share one set of fields
+            KeyError: If an index refers to an option that is not there
+        """
+        names = list(index.options)
+        option_ids = {name: option_id for option_id, name in enumerate(names)}
+        fields = tuple(index.options[names[0]])
+        records = []
+        for option in index.options.values():
+            if tuple(option) != fields:
+                raise SnapshotError("Options do not share one set of fields")
+            records.append(tuple(option.values()))
+
+        def postings(members_by_key: Mapping[Any, Any]) -> Dict[Any, List[int]]:
+            return {key: [option_ids[name] for name in members] for key, members in members_by_key.items()}
+
+        indexes = {
+            "options_by_category": postings(index.options_by_category),
+            "inverted_index": postings(index.inverted_index),
+            "attribute_index": postings(index.attribute_index),
+            "hierarchical_index": postings(index.hierarchical_index),
+        }
+        return fields, records, indexes
+
+    def _save_index_snapshot(self, index: Optional[HomeManagerIndex] = None) -> bool:
+        """Save a generation's options and indices (by default the active one) as a binary snapshot."""
+        index = index or self.index
+        try:
+            fields, records, indexes = self._snapshot_tables(index)
+            meta = {
+                "timestamp": time.time(),
+                "source_digests": index.source_digests,
+                "option_counts": index.option_counts,
+            }
+            if fields == OPTION_FIELDS:
+                # Reopened by later loads instead of writing the details out again
+                positions = [OPTION_FIELDS.index(field) for field in DETAIL_FIELDS]
+                entries = ([record[position] for position in positions] for record in records)
+                meta["details"] = save_details(self.html_client.cache, self.snapshot_key, DETAIL_FIELDS, entries)
+            snapshot = dump_snapshot("home_manager", fields, records, indexes, meta=meta)
+            self.html_client.cache.set_binary_data(self.snapshot_key, snapshot)
+            return True
+        except (SnapshotError, KeyError, IndexError) as e:
+            logger.warning(f"Cannot write Home Manager index snapshot: {e}")
+            return False
+
+    def _mapped_store(self) -> Optional[MappedIndexStore]:
+        """Where this data version's shared index files live, if sharing is enabled."""
+        return MappedIndexStore.for_cache(getattr(self.html_client, "cache", None), self.cache_key)
+
+    def _prebuilt_store(self) -> Optional[MappedIndexStore]:
+        """Where the prebuilt index for this data version is read from, unless disabled."""
+        return MappedIndexStore.prebuilt(self.cache_key, ttl=self.cache_ttl)
+
+    def _save_mapped_index(
+        self, index: Optional[HomeManagerIndex] = None, store: Optional[MappedIndexStore] = None
+    ) -> bool:
+        """
+        Publish a generation (by default the active one) as a memory-mapped index file.
+
+        Args:
+            index: Generation to publish (default: the active one)
+            store: Where to publish it (default: the shared index under the cache directory)
+        """
+        store = store or self._mapped_store()
+        if store is None:
+            return False
+        index = index or self.index
+        try:
+            fields, records, indexes = self._snapshot_tables(index)
+            # Key-only index of the name segments, for the spelling index
+            indexes["segments"] = {segment: () for name in index.options for segment in name.split(".")}
+            meta = {
+                "timestamp": time.time(),
+                "source_digests": index.source_digests,
+                "option_counts": index.option_counts,
+            }
+            data = dump_mapped_index(store.kind, fields, records, indexes, meta=meta)
+        except (SnapshotError, KeyError, IndexError) as e:
+            logger.warning(f"Cannot write shared Home Manager index: {e}")
+            return False
+        return store.publish(data, keep_previous=not store.read_only) is not None
+
+    def _load_mapped_index(self, allow_expired: bool = False, store: Optional[MappedIndexStore] = None) -> bool:
+        """Map and publish the shared index (see _read_mapped_index)."""
+        index = self._read_mapped_index(allow_expired, store)
+        if index is None:
+            return False
+        self._publish_index(index)
+        return True
+
+    def _read_mapped_index(
+        self, allow_expired: bool = False, store: Optional[MappedIndexStore] = None
+    ) -> Optional[HomeManagerIndex]:
+        """
+        Map the shared index file written by this or another server process, without serving it yet.
+
+        Options and postings are read from the mapping as queries need them, so
+        every process serves from the same pages of the OS page cache instead of
+        its own decoded copy. Only the small spelling index is built in memory.
+
+        Args:
+            allow_expired: Whether an index older than its TTL is acceptable
+            store: Where to map it from (default: the shared index under the cache directory)
+
+        Returns:
+            The generation, or None if no usable index was found
+        """
+        store = store or self._mapped_store()
+        if store is None:
+            return None
+        mapped = store.open(allow_expired)
+        if mapped is None:
+            return None
+        try:
+            fields = mapped.fields
+            if fields == OPTION_FIELDS:
+                options = mapped.options(lambda values: OptionRecord(*values))
+            else:
+                options = mapped.options(lambda values: dict(zip(fields, values)))
+            if not options:
+                raise SnapshotError("Shared index holds no options")
+            index = HomeManagerIndex()
+            index.origin = "prebuilt" if store.read_only else "shared"
+            index.options = options
+            index.options_by_category = mapped.postings("options_by_category", list)
+            index.inverted_index = mapped.postings("inverted_index", set)
+            if "attribute_index" in mapped.index_names:
+                index.attribute_index = mapped.postings("attribute_index", set)
+            else:
+                index.rebuild_attributes()  # Written before the attribute index was stored
+            index.hierarchical_index = mapped.postings("hierarchical_index", set)
+            index.prefix_index = PrefixIndex.from_sorted(mapped.names)
+            index.segment_index = TrigramIndex.deferred(mapped.postings("segments"))
+            index.source_digests = dict(mapped.meta.get("source_digests") or {})
+            index.restore_counts(mapped.meta.get("option_counts"))
+        except (SnapshotError, KeyError) as e:
+            logger.warning(f"Ignoring unusable shared Home Manager index: {e}")
+            store.invalidate()
+            return None
+        logger.info(f"Mapped {len(index.options)} Home Manager options from {index.origin} index {mapped.path.name}")
+        return index
+
+    def _load_prebuilt_index(self) -> bool:
+        """
+        Map the prebuilt index bundled with the package or pinned by MCP_NIXOS_PREBUILT_INDEX_DIR.
+
+        It is served whatever its age; if it is outdated, current data is loaded
+        in the background and replaces it once ready.
+        """
+        store = self._prebuilt_store()
+        if store is None or not self._load_mapped_index(store=store):
+            return False
+        if store.outdated():
+            self._refresh_in_background()
+        return True
+
+    def _load_index_snapshot(self, allow_expired: bool = False) -> bool:
+        """Load and publish options and indices from the binary snapshot, if a usable one is cached."""
+        index = self._read_index_snapshot(allow_expired)
+        if index is None:
+            return False
+        self._publish_index(index)
+        return True
+
+    def _read_index_snapshot(self, allow_expired: bool = False) -> Optional[HomeManagerIndex]:
+        """Build a generation from the binary snapshot without publishing it, if a usable one is cached."""
+        result = self.html_client.cache.get_binary_data(self.snapshot_key, allow_expired=allow_expired)
+        if not isinstance(result, tuple) or len(result) != 2:
+            return None
+        data, meta = result
+        if data is None or not (meta.get("cache_hit") or (allow_expired and meta.get("stale"))):
+            return None
+        try:
+            snapshot = load_snapshot(data, "home_manager")
+            if not len(snapshot):
+                raise SnapshotError("Snapshot holds no options")
+            details = None
+            if snapshot.fields == OPTION_FIELDS:
+                details = DetailStore.for_snapshot(
+                    self.html_client.cache, snapshot.meta.get("details"), DETAIL_FIELDS, len(snapshot)
+                )
+            if details is not None:
+                # The details stay in the file saved with the snapshot; nothing is spilled on publishing
+                options: List[Mapping[str, Any]] = OptionSummary.from_columns(details, snapshot.columns)
+            elif snapshot.fields == OPTION_FIELDS:
+                # Equal strings are already shared through the snapshot's string table
+                options = OptionRecord.from_columns(snapshot.columns)
+            else:
+                options = [dict(zip(snapshot.fields, record)) for record in snapshot.records]
+            names = snapshot.column("name")
+            lookup = names.__getitem__
+            # Snapshot record positions serve as option IDs, and the postings stay packed until read.
+            # The hierarchical index is only changed in a successor, which copies it into sets.
+            inverted_index = PostingLists.from_packed(names, *snapshot.packed("inverted_index"))
+            attribute_index = None
+            if "attribute_index" in snapshot.index_names:
+                attribute_index = PostingLists.from_packed(names, *snapshot.packed("attribute_index"))
+            hierarchical_index = PostingLists.from_packed(names, *snapshot.packed("hierarchical_index"))
+            by_category = {key: list(map(lookup, ids)) for key, ids in snapshot.postings("options_by_category")}
+        except (SnapshotError, KeyError, IndexError) as e:
+            logger.warning(f"Ignoring unusable Home Manager index snapshot: {e}")
+            self.html_client.cache.invalidate_data(self.snapshot_key)
+            return None
+
+        index = HomeManagerIndex()
+        index.origin = "cache"
+        index.options = dict(zip(names, options))
+        index.details = details
+        index.options_by_category = defaultdict(list, by_category)
+        index.inverted_index = inverted_index
+        if attribute_index is None:
+            index.rebuild_attributes()  # Written before the attribute index was stored
+        else:
+            index.attribute_index = attribute_index
+        index.prefix_index = PrefixIndex(names)
+        index.segment_index = self._build_segment_index(names)
+        index.hierarchical_index = hierarchical_index
+        index.source_digests = dict(snapshot.meta.get("source_digests") or {})
+        index.restore_counts(snapshot.meta.get("option_counts"))
+        logger.info(f"Loaded {len(index.options)} Home Manager options from index snapshot")
+        return index
+
+    def _revalidate_stale_cache(self) -> bool:
+        """
+        Reuse an expired disk snapshot if none of the documentation pages changed.
+
+        Each page is fetched with a conditional request. A page is unchanged if it
+        answers 304 Not Modified, or if the page downloaded again has the digest
+        recorded in the snapshot. Only if every page is unchanged is the snapshot
+        published (and its TTL renewed), skipping the parse; until then it is not
+        served, so a changed or failed revalidation never serves the old data.
+        """
+        if not self.html_client or not getattr(self.html_client, "cache", None):
+            return False
+        index = self._read_cached_snapshot(allow_expired=True)
+        if index is None:
+            return False
+
+        digests = index.source_digests
+        for url in self.hm_urls.values():
+            try:
+                html = self.fetch_url(url)
+            except Exception as e:
+                logger.info(f"Could not revalidate {url}: {e}")
+                return False
+            if self.last_fetch_metadata.get(url, {}).get("not_modified") is True:
+                continue
+            unchanged = digests.get(url) == content_digest(html)
+            self.digest_stats.record(unchanged, url)
+            if not unchanged:
+                logger.info(f"Home Manager documentation changed at {url}, re-parsing")
+                return False
+            logger.info(f"Home Manager documentation at {url} is byte-identical to the parsed copy")
+
+        self.html_client.cache.renew_data(self.cache_key)
+        self.html_client.cache.renew_data(self.snapshot_key)
+        if store := self._mapped_store():
+            store.renew()
+        self._publish_index(index)
+        return True
+
+    def _load_data_internal(self, allow_prebuilt: bool = True) -> None:
+        """
+        Internal method to load data, trying cache first, then the prebuilt index, then web.
+
+        Args:
+            allow_prebuilt: Whether the prebuilt index may be used
+        """
         if self._load_from_cache():
             self.is_loaded = True
             logger.info("HM options loaded from disk cache.")
             return
 
+        if allow_prebuilt and self._load_prebuilt_index():
+            self.is_loaded = True
+            logger.info("HM options loaded from prebuilt index.")
+            return
+
+        if self._revalidate_stale_cache():
+            self.is_loaded = True
+            logger.info("HM documentation not modified; reused expired disk cache without re-parsing.")
+            return
+
         logger.info("Loading HM options from web")
-        options = self.load_all_options()
-        if not options:
-            raise Exception("Failed to load any HM options from web sources.")
-        self.build_search_indices(options)
+        # With nothing to serve yet, sources are published as they arrive rather than all at the end
+        progressive = not self.index.options
+        try:
+            options = self.load_all_options(self._publish_partial) if progressive else self.load_all_options()
+            if not options:
+                raise Exception("Failed to load any HM options from web sources.")
+        except Exception as e:
+            self.pending_sources = ()
+            if progressive and self._keep_partial_publish(e):
+                return
+            raise
+        try:
+            # Sources that failed while the others loaded are still missing from this generation
+            self.pending_sources = tuple(doc_type for doc_type in self.hm_urls if doc_type in self.source_errors)
+            # Only the options that changed since the last load are re-indexed
+            self.update_search_indices(options)
+        except Exception as e:
+            if progressive and self._keep_partial_publish(e):
+                return
+            raise
+        finally:
+            if progressive:
+                with self.loading_lock:
+                    self.refresh_in_progress = False
+        # Recorded for the saved snapshot; queries never read it
+        self.index.source_digests = dict(self.fetched_digests)
+        if self.pending_sources:
+            # Not saved, so the next load fetches the failed sources again rather than
+            # serving this generation without them for a whole TTL
+            self._keep_partial_publish(Exception("; ".join(self.source_errors.values())))
+            return
         self._save_in_memory_data()  # Save newly loaded data
         self.is_loaded = True
         logger.info("HM options loaded from web and indices built.")
 
+    def _publish_partial(self, results: Dict[str, List[Dict[str, Any]]]) -> None:
+        """
+        Publish the sources parsed so far during a cold-start load from the web.
+
+        Nothing is published until the main options page is in, since most queries
+        are for its options; every other source is then merged in as it completes.
+        Each of these generations lists the sources it still lacks as pending_sources,
+        and the first one ends the wait for the initial load: queries are answered
+        from it while the remaining sources load as a refresh. Once every source is
+        in, the caller publishes and saves the complete generation; a source that
+        failed stays pending in it, and it is not saved.
+
+        Args:
+            results: The options of every source parsed so far, by doc type
+        """
+        if next(iter(self.hm_urls)) not in results or len(results) == len(self.hm_urls):
+            return
+        self.pending_sources = tuple(doc_type for doc_type in self.hm_urls if doc_type not in results)
+        self.pending_error = None
+        options = [option for doc_type in self.hm_urls for option in results.get(doc_type, [])]
+        self.update_search_indices(options)
+        logger.info(f"Published HM options from {', '.join(results)}; still loading {', '.join(self.pending_sources)}")
+        with self.loading_lock:
+            if self.is_loaded:
+                return
+            self.is_loaded = True
+            self.loading_in_progress = False
+            self.refresh_in_progress = True
+        self.ready.set()
+
+    def _keep_partial_publish(self, error: Exception) -> bool:
+        """
+        Keep serving the sources already published when a load fails, or some of its sources do.
+
+        The served generation still lists the missing sources as pending_sources, and
+        the failure is reported with them (and as the refresh error) rather than
+        marking the data as unavailable.
+
+        Args:
+            error: Why the load failed
+
+        Returns:
+            True if a partial generation is being served, False if there is nothing to keep
+        """
+        index = self.index
+        if not index.pending_sources:
+            return False
+        with self.loading_lock:
+            self.pending_error = self.refresh_error = str(error)
+            self.refresh_in_progress = False
+            self.is_loaded = True
+        # Results remembered for this generation were tagged as still loading
+        self.result_cache.clear()
+        logger.error(
+            f"Failed to load HM sources {', '.join(index.pending_sources)}; "
+            f"serving the {len(index.options)} options published so far: {error}"
+        )
+        return True
+
     # --- Search & Get Methods (Simplified loading checks) ---
 
     def _check_load_status(self, operation_name: str) -> Optional[Dict[str, Any]]:
@@ -540,8 +1338,37 @@ class HomeManagerClient:
                 return {"error": msg, "loading": False, "found": False}
         return None  # No error, ready to proceed
 
-    def search_options(self, query: str, limit: int = 20) -> Dict[str, Any]:
-        """Search Home Manager options using in-memory indices."""
+    def search_options(
+        self,
+        query: str,
+        limit: int = 20,
+        count_total: bool = True,
+        filters: Optional[Mapping[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Search Home Manager options using in-memory indices.
+
+        Matches are scored: 100 for the exact option name, 90 for children of a
+        query ending in ".", 80 for options under the query as a dotted prefix, and
+        50 for options whose name or description contains every query word (60 if
+        one of the words is in the name). Only the best ``limit`` matches are
+        selected and sorted. Query words that no option has are replaced by the
+        closest spelled name segment, if there is one. Results are remembered per
+        index generation, so a repeated search is answered without ranking again.
+
+        Args:
+            query: Option name, dotted prefix or words
+            limit: Maximum number of options to return
+            count_total: Whether to count all matches. Without the count, the word
+                search is skipped once name matches fill the result.
+            filters: Only match options with these values of "type", "source" and
+                "category" (compared case-insensitively); empty values are ignored
+
+        Returns:
+            Best matches first (score descending, then name), with the total number
+            of matches as "count" unless count_total is False, and any spelling
+            corrections applied as "corrections"
+        """
         if status_error := self._check_load_status("search options"):
             return status_error
         logger.info(f"Searching Home Manager options for: '{query}'")
@@ -549,46 +1376,141 @@ class HomeManagerClient:
         if not query:
             return {"count": 0, "options": [], "error": "Empty query", "found": False}
 
-        matches: Dict[str, int] = {}  # option_name -> score
+        index = self.index  # One generation for the whole query, even if a refresh is published meanwhile
+        try:
+            keys = tuple(filter_keys(filters, FILTER_FIELDS))
+        except ValueError as e:
+            return {"count": 0, "options": [], "error": str(e), "found": False}
+        return self.result_cache.get_or_compute(
+            index.generation,
+            (query, limit, count_total, keys),
+            lambda: self._search(query, limit, count_total, filters, index),
+        )
+
+    def _search(
+        self,
+        query: str,
+        limit: int,
+        count_total: bool,
+        filters: Optional[Mapping[str, Optional[str]]],
+        index: HomeManagerIndex,
+    ) -> Dict[str, Any]:
+        """Run a search (see search_options) on a generation, for a normalized, non-empty query."""
+        allowed = index.filter_names(filters)
         words = re.findall(r"\w+", query)
+        corrections = self._correct_words(words, index)
+        corrected = [corrections.get(word, word) for word in words]
+        ranked, total = self._rank_matches(query, corrected, limit, count_total, index, allowed)
+        # Only the returned options are read in full; ranking went through the summaries
+        result_options = [{**index.options[name].copy(), "score": score} for name, score in ranked]
+
+        result: Dict[str, Any] = {"count": total} if count_total else {}
+        result.update({"options": result_options, "found": len(result_options) > 0})
+        if corrections:
+            result["corrections"] = corrections
+        return self._tag_pending_sources(result, index)
+
+    def _tag_pending_sources(self, result: Dict[str, Any], index: HomeManagerIndex) -> Dict[str, Any]:
+        """Mark a result answered before every documentation source was loaded, listing the missing ones."""
+        if index.pending_sources:
+            result["pending_sources"] = list(index.pending_sources)
+            if self.pending_error and index is self.index:
+                result["pending_error"] = self.pending_error
+        return result
 
-        # Exact match
-        if query in self.options:
-            matches[query] = 100
-        # Prefix match
-        if query in self.prefix_index:
-            for name in self.prefix_index[query]:
-                matches[name] = max(matches.get(name, 0), 80)
-        # Hierarchical child match
-        if query.endswith(".") and query[:-1] in self.prefix_index:
-            parent_prefix = query[:-1]
-            for name in self.prefix_index[parent_prefix]:
-                if name.startswith(query):  # Matches children
-                    matches[name] = max(matches.get(name, 0), 90)
-
-        # Word match
-        candidate_sets = []
-        for word in words:
-            if word in self.inverted_index:
-                candidate_sets.append(self.inverted_index[word])
-        # Find intersection if multiple words
-        candidates = set.intersection(*candidate_sets) if candidate_sets else set()
-
-        for name in candidates:
-            score = 50  # Base score for word match
-            if any(word in name.lower() for word in words):
-                score += 10  # Boost if word in name
-            matches[name] = max(matches.get(name, 0), score)
-
-        # Sort matches: score desc, name asc
-        sorted_matches = sorted(matches.items(), key=lambda item: (-item[1], item[0]))
-
-        # Format results
-        result_options = [
-            {**self.options[name], "score": score} for name, score in sorted_matches[:limit]  # Add score to result
-        ]
+    def _correct_words(self, words: List[str], index: Optional[HomeManagerIndex] = None) -> Dict[str, str]:
+        """
+        Spelling corrections for query words that no option is indexed under.
 
-        return {"count": len(matches), "options": result_options, "found": len(result_options) > 0}
+        Args:
+            words: Lowercased query words
+            index: Generation to use (by default the active one)
+
+        Returns:
+            Misspelled word to the closest indexed word among the option name segments
+        """
+        index = index or self.index
+        corrections: Dict[str, str] = {}
+        for word in words:
+            if len(word) <= 2 or word in index.inverted_index or word in corrections:
+                continue  # Short words are never indexed, so there is nothing to correct them to
+            for segment, _similarity in index.segment_index.similar(word, limit=SPELLING_CANDIDATES):
+                if segment.lower() in index.inverted_index:
+                    corrections[word] = segment.lower()
+                    break
+        return corrections
+
+    def _rank_matches(
+        self,
+        query: str,
+        words: List[str],
+        limit: int,
+        count_total: bool,
+        index: Optional[HomeManagerIndex] = None,
+        allowed: Optional[Set[str]] = None,
+    ) -> Tuple[List[Tuple[str, int]], Optional[int]]:
+        """
+        Select the top ``limit`` (name, score) pairs for a normalized query and its words.
+
+        Name matches come from the sorted prefix index, so they are already in
+        result order and only the head is taken. Word matches are split into the
+        two score tiers and only the best names of each are selected, with a
+        bounded heap instead of a full sort. With ``allowed`` (the names passing
+        the query's filters), both kinds of match are intersected with it.
+
+        Returns:
+            The ranked pairs and the number of matches (None if count_total is False)
+        """
+        index = index or self.index
+        limit = max(limit, 0)
+        if query.endswith("."):
+            exact, child_prefix, child_score = None, query, 90
+            top: List[Tuple[str, int]] = []
+        else:
+            exact, child_prefix, child_score = query, query + ".", 80
+            top = [(query, 100)] if query in index.options and (allowed is None or query in allowed) else []
+        parent = child_prefix[:-1]
+        if allowed is None:
+            name_total = len(top) + index.prefix_index.count_children(parent)
+            children = index.prefix_index.children(parent, limit - len(top))
+        else:
+            children = names_under_prefix(
+                parent,
+                index.prefix_index.count_children(parent),
+                lambda: index.prefix_index.children(parent),
+                allowed,
+                include_prefix=False,
+            )
+            name_total = len(top) + len(children)
+            children = children[: max(limit - len(top), 0)]
+        top.extend((name, child_score) for name in children)
+        top = top[:limit]
+        if not count_total and len(top) == limit:
+            return top, None  # Word matches score lower than any of these
+
+        in_name = re.compile("|".join(map(re.escape, words))) if words else None
+        boosted, plain = [], []  # Word matches with a query word in the name (60) and without (50)
+        matches = self._intersect_postings(words, index)
+        for name in matches if allowed is None else matches & allowed:
+            if name == exact or name.startswith(child_prefix):
+                continue  # Already a name match
+            (boosted if in_name and in_name.search(name.lower()) else plain).append(name)
+
+        for names, score in ((boosted, 60), (plain, 50)):
+            if len(top) < limit:
+                top.extend((name, score) for name in heapq.nsmallest(limit - len(top), names))
+        return top, (name_total + len(boosted) + len(plain) if count_total else None)
+
+    def _intersect_postings(self, words: List[str], index: Optional[HomeManagerIndex] = None) -> Set[str]:
+        """
+        Names indexed under every word that has postings (other words are ignored).
+
+        Posting lists are intersected as option ID arrays (record IDs for a mapped
+        generation) from the smallest up, so every intermediate result is at most
+        as large as the rarest word's list and the intersection stops as soon as
+        it is empty. Only the IDs in the result are turned into names.
+        """
+        return (index or self.index).inverted_index.intersect(dict.fromkeys(words))
 
     def get_option(self, option_name: str) -> Dict[str, Any]:
         """Get detailed information about a specific Home Manager option."""
@@ -596,36 +1518,103 @@ class HomeManagerClient:
             return status_error
         logger.info(f"Getting Home Manager option: {option_name}")
 
-        option = self.options.get(option_name)
+        index = self.index
+        option = index.options.get(option_name)
         if option:
             result = option.copy()  # Return a copy
             result["found"] = True
             # Find related options if needed (simplified example)
             if "." in option_name:
                 parent_path = ".".join(option_name.split(".")[:-1])
+                # Only the first siblings are read, however many options the parent has
                 related = [
-                    {k: self.options[name].get(k) for k in ["name", "type", "description"]}
-                    for name in self.prefix_index.get(parent_path, set())
-                    if name != option_name and name.startswith(parent_path + ".")
+                    {k: index.options[name].get(k) for k in ["name", "type", "description"]}
+                    for name in index.prefix_index.children(parent_path, 6)
+                    if name != option_name
                 ][
                     :5
                 ]  # Limit related
                 if related:
                     result["related_options"] = related
-            return result
+            return self._tag_pending_sources(result, index)
         else:
             # Suggest similar options if not found
-            suggestions = [name for name in self.prefix_index.get(option_name, set())]
+            # Both lookups come back sorted
+            suggestions = index.prefix_index.get(option_name, [])[:5]
             if not suggestions and "." in option_name:  # Try parent prefix
                 parent = ".".join(option_name.split(".")[:-1])
-                suggestions = [name for name in self.prefix_index.get(parent, set()) if name.startswith(parent + ".")]
+                suggestions = index.prefix_index.children(parent, 5)
+            spelling = [name for name in self.spelling_suggestions(option_name, index=index) if name not in suggestions]
 
             error_msg = "Option not found"
             response: Dict[str, Any] = {"name": option_name, "error": error_msg, "found": False}
-            if suggestions:
-                response["suggestions"] = sorted(suggestions)[:5]  # Limit suggestions
+            if suggestions or spelling:
+                response["suggestions"] = suggestions + spelling
                 response["error"] += f". Did you mean one of: {', '.join(response['suggestions'])}?"
-            return response
+            if spelling:
+                response["spelling_suggestions"] = spelling
+            return self._tag_pending_sources(response, index)
+
+    def spelling_suggestions(
+        self, option_name: str, limit: int = 5, index: Optional[HomeManagerIndex] = None
+    ) -> List[str]:
+        """
+        Option names that a misspelled option name probably refers to.
+
+        The name is corrected segment by segment: a segment that does not continue
+        a known path is replaced by similarly spelled segments (from the trigram
+        index) that do, keeping the SPELLING_BEAM closest paths. Where no segment
+        fits, correction stops at the paths found so far. A corrected path that is
+        a prefix rather than an option yields the first options under it.
+
+        Args:
+            option_name: The name that was not found
+            limit: Maximum number of suggestions
+            index: Generation to use (by default the active one)
+
+        Returns:
+            Existing option names, closest first
+        """
+        index = index or self.index
+        paths: List[Tuple[str, float]] = [("", 0.0)]  # Corrected path and its accumulated distance
+        for part in option_name.split("."):
+            extended = []
+            for path, cost in paths:
+                exact = f"{path}.{part}" if path else part
+                if exact in index.prefix_index:
+                    extended.append((exact, cost))
+                    continue
+                for segment, similarity in index.segment_index.similar(part, limit=SPELLING_CANDIDATES):
+                    candidate = f"{path}.{segment}" if path else segment
+                    if candidate in index.prefix_index:
+                        extended.append((candidate, cost + 1 - similarity))
+            if not extended:
+                break  # Suggest options under the paths corrected so far
+            paths = sorted(extended, key=lambda item: (item[1], item[0]))[:SPELLING_BEAM]
+        if paths == [("", 0.0)]:
+            return []
+
+        suggestions: List[str] = []
+        for path, _cost in paths:
+            for name in [path] if path in index.options else index.prefix_index.children(path, limit):
+                if name != option_name and name not in suggestions:
+                    suggestions.append(name)
+        return suggestions[:limit]
+
+    def get_generation_info(self) -> Dict[str, Any]:
+        """
+        Describe the generation being served and any refresh building the next one.
+
+        Returns:
+            The generation number (0 before the first load), when and from where it
+            was published, its option count, whether a refresh is in progress, and the
+            error of the last failed refresh, if any
+        """
+        info = self.index.info()
+        info["refreshing"] = self.refresh_in_progress
+        if self.refresh_error:
+            info["refresh_error"] = self.refresh_error
+        return info
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about Home Manager options."""
@@ -633,58 +1622,77 @@ class HomeManagerClient:
             return status_error
         logger.info("Getting Home Manager option statistics")
 
-        options_by_source = defaultdict(int)
-        options_by_type = defaultdict(int)
-        for option in self.options.values():
-            options_by_source[option.get("source", "unknown")] += 1
-            options_by_type[option.get("type", "unknown")] += 1
-
-        return {
-            "total_options": len(self.options),
-            "total_categories": len(self.options_by_category),
-            "total_types": len(options_by_type),
-            "by_source": dict(options_by_source),
-            "by_category": {cat: len(opts) for cat, opts in self.options_by_category.items()},
-            "by_type": dict(options_by_type),
+        # Counted as the generation was indexed (or saved with its snapshot), not per call
+        index = self.index
+        counts = index.option_counts
+        stats = {
+            "total_options": len(index.options),
+            "total_categories": len(counts["by_category"]),
+            "total_types": len(counts["by_type"]),
+            "by_source": dict(counts["by_source"]),
+            "by_category": dict(counts["by_category"]),
+            "by_type": dict(counts["by_type"]),
             "index_stats": {
-                "words": len(self.inverted_index),
-                "prefixes": len(self.prefix_index),
-                "hierarchical_parts": len(self.hierarchical_index),
+                "words": len(index.inverted_index),
+                "prefixes": len(index.prefix_index),
+                "hierarchical_parts": len(index.hierarchical_index),
             },
+            "generation": index.generation,
             "found": True,
         }
+        return self._tag_pending_sources(stats, index)
 
     def get_options_list(self) -> Dict[str, Any]:
         """Get a hierarchical list of top-level Home Manager options."""
         if status_error := self._check_load_status("get options list"):
             return status_error
-        # Reuse get_stats and structure the output if needed, or use category index directly
-        # This simplified version just uses the category index
+        # The category counts kept with the generation, as in get_stats
+        category_counts = self.index.option_counts["by_category"]
         result = {"options": {}, "count": 0, "found": True}
-        for category, names in self.options_by_category.items():
+        for category, count in category_counts.items():
             result["options"][category] = {
-                "count": len(names),
+                "count": count,
                 "has_children": True,  # Assume categories have children for list view
             }
-        result["count"] = len(self.options_by_category)
+        result["count"] = len(category_counts)
         return result
 
-    def get_options_by_prefix(self, option_prefix: str) -> Dict[str, Any]:
-        """Get all options under a specific option prefix."""
+    def get_options_by_prefix(
+        self, option_prefix: str, filters: Optional[Mapping[str, Optional[str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get all options under a specific option prefix.
+
+        Args:
+            option_prefix: Dotted prefix; the option of that name is included too
+            filters: Only include options with these values of "type", "source" and
+                "category" (see search_options)
+        """
         if status_error := self._check_load_status("get options by prefix"):
             return status_error
         logger.info(f"Getting HM options by prefix: {option_prefix}")
 
-        matching_names = self.prefix_index.get(option_prefix, set())
-        # Also include options *starting* with the prefix + "." if it's not already a full path
-        if not option_prefix.endswith("."):
-            for name in self.options:
-                if name.startswith(option_prefix + "."):
-                    matching_names.add(name)
-
-        options_data = [self.options[name] for name in sorted(matching_names)]
+        # The option itself and everything under "<prefix>.", already sorted
+        index = self.index
+        try:
+            allowed = index.filter_names(filters)
+        except ValueError as e:
+            return self._tag_pending_sources({"prefix": option_prefix, "error": str(e), "found": False}, index)
+        if allowed is None:
+            names = index.prefix_index.get(option_prefix, [])
+        else:
+            names = names_under_prefix(
+                option_prefix,
+                index.prefix_index.count(option_prefix),
+                lambda: index.prefix_index.get(option_prefix, []),
+                allowed,
+            )
+        options_data = [index.options[name].copy() for name in names]
         if not options_data:
-            return {"prefix": option_prefix, "error": f"No options found with prefix '{option_prefix}'", "found": False}
+            error = f"No options found with prefix '{option_prefix}'"
+            if allowed is not None:
+                error += f" and {describe_filters(filters)}"
+            return self._tag_pending_sources({"prefix": option_prefix, "error": error, "found": False}, index)
 
         type_counts = defaultdict(int)
         enable_options = []
@@ -698,7 +1706,7 @@ class HomeManagerClient:
                         {"name": name, "parent": parts[-2], "description": opt.get("description", "")}
                     )
 
-        return {
+        result = {
             "prefix": option_prefix,
             "options": options_data,
             "count": len(options_data),
@@ -706,3 +1714,4 @@ class HomeManagerClient:
             "enable_options": enable_options,
             "found": True,
         }
+        return self._tag_pending_sources(result, index)
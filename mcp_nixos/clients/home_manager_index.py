@@ -0,0 +1,232 @@
+"""
+One generation of the Home Manager options and search indices.
+
+A refresh used to rebuild the client's indices in place, so queries had to be
+refused until it finished and could otherwise see half-built structures.
+Instead, every load or refresh now fills a new HomeManagerIndex off to the
+side, and the client publishes it by replacing a single reference. A query
+reads that reference once and works on one consistent generation, however
+long it runs and whatever is published meanwhile.
+
+An incremental refresh starts from successor(), a copy of the active
+generation that shares its posting sets until they are written: only the
+sets of the words and prefixes that actually change are copied, so the
+previous generation is never modified while it may still be serving queries.
+
+Each generation also keeps the option counts reported by the stats tools, up
+to date as options are indexed and unindexed and saved with its snapshots, so
+stats never have to go through the options. The same fields (source, type and
+category) are indexed in attribute_index, which filtered queries intersect
+instead of scanning the options they matched.
+
+Options are indexed as complete OptionRecords; before a generation is
+published, spill_details() moves their details to its DetailStore and keeps
+OptionSummary records in memory. A generation loaded from a snapshot whose
+details were saved with it holds OptionSummary records reading that file from
+the start. A successor appends to the same store, so the options it shares
+with the previous generation keep their entries.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Union
+
+from mcp_nixos.cache.detail_store import DetailStore
+from mcp_nixos.clients.ngram_index import TrigramIndex
+from mcp_nixos.clients.option_record import InternTable, OptionRecord, OptionSummary
+from mcp_nixos.clients.prefix_index import PrefixIndex
+from mcp_nixos.utils.option_filters import FilterKey, filter_keys, filtered_names, normalize_filter_value
+from mcp_nixos.utils.posting_lists import PostingLists
+
+# Aggregate counts kept per generation: name, option field counted, value for options without a value there
+COUNTED_FIELDS = (
+    ("by_source", "source", "unknown"),
+    ("by_type", "type", "unknown"),
+    ("by_category", "category", "Uncategorized"),
+)
+
+# Fields options can be filtered by
+FILTER_FIELDS = tuple(field for _, field, _ in COUNTED_FIELDS)
+
+
+def attribute_keys(option: Mapping[str, Any]) -> List[FilterKey]:
+    """Keys of attribute_index an option is filed under, one per filter field."""
+    return [(field, normalize_filter_value(option.get(field) or missing)) for _, field, missing in COUNTED_FIELDS]
+
+
+class HomeManagerIndex:
+    """Options and search indices of one generation, replaced as a whole on refresh."""
+
+    __slots__ = (
+        "generation",
+        "published_at",
+        "origin",
+        "options",
+        "details",
+        "intern_table",
+        "options_by_category",
+        "inverted_index",
+        "attribute_index",
+        "prefix_index",
+        "segment_index",
+        "hierarchical_index",
+        "option_hashes",
+        "source_digests",
+        "pending_sources",
+        "option_counts",
+        "_owned",
+    )
+
+    def __init__(self) -> None:
+        """Initialize an empty, unpublished generation."""
+        self.generation = 0  # Assigned when published; 0 until then
+        self.published_at: Optional[float] = None
+        self.origin: Optional[str] = None  # Where the options came from ("web", "cache", ...)
+        self.options: Dict[str, Mapping[str, Any]] = {}  # OptionRecord, or a dict with nonstandard fields
+        self.details: Optional[DetailStore] = None  # Where spill_details() moves option details
+        self.intern_table = InternTable()  # Shares repeated values (types, categories, ...) between records
+        self.options_by_category: Dict[str, List[str]] = defaultdict(list)
+        self.inverted_index = PostingLists()  # Word to names, as option ID arrays
+        self.attribute_index = PostingLists()  # (field, normalized value) to names, for filtered queries
+        self.prefix_index = PrefixIndex()  # Sorted names, looked up by dotted prefix
+        self.segment_index = TrigramIndex()  # Dotted name segments, for spelling corrections
+        self.hierarchical_index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self.option_hashes: Dict[str, int] = {}  # Content hash per option, for incremental updates
+        self.source_digests: Dict[str, str] = {}  # Digest of each documentation page, by URL
+        # Documentation sources still loading when this generation was published; () once complete
+        self.pending_sources: Tuple[str, ...] = ()
+        # Options per source, type and category, kept up to date by count_option
+        self.option_counts: Dict[str, Dict[str, int]] = {name: {} for name, _, _ in COUNTED_FIELDS}
+        # Posting sets and structures copied from the previous generation; None if nothing is shared
+        self._owned: Optional[Set[Any]] = None
+
+    def successor(self) -> "HomeManagerIndex":
+        """
+        Start the next generation from this one.
+
+        Dicts, category lists and the prefix index are copied; posting sets,
+        word and attribute posting arrays and the segment index stay shared until
+        postings(), the posting arrays or add_segment() change them.
+
+        Returns:
+            An unpublished generation with the same content
+        """
+        successor = HomeManagerIndex()
+        successor.origin = self.origin
+        successor.options = dict(self.options)
+        successor.details = self.details  # Append-only, so shared entries stay valid
+        successor.intern_table = self.intern_table  # Only ever added to, and not read by queries
+        successor.options_by_category = defaultdict(
+            list, {key: list(names) for key, names in self.options_by_category.items()}
+        )
+        successor.inverted_index = self._copy_postings(self.inverted_index)
+        successor.attribute_index = self._copy_postings(self.attribute_index)
+        successor.prefix_index = self.prefix_index.copy()
+        successor.segment_index = self.segment_index
+        successor.hierarchical_index = defaultdict(set, self.hierarchical_index)
+        successor.option_hashes = dict(self.option_hashes)
+        successor.source_digests = dict(self.source_digests)
+        successor.option_counts = {name: dict(counts) for name, counts in self.option_counts.items()}
+        successor._owned = set()
+        return successor
+
+    @staticmethod
+    def _copy_postings(postings: Union[PostingLists, Mapping[Any, Any]]) -> PostingLists:
+        """Posting arrays for a successor: shared until written, or read from the postings of a mapped file."""
+        return postings.copy() if isinstance(postings, PostingLists) else PostingLists.from_names(postings)
+
+    def postings(self, index: Dict[Any, Set[str]], key: Any) -> Set[str]:
+        """
+        The posting set under a key of hierarchical_index, ready to be changed.
+
+        A set still shared with the previous generation is replaced by a copy
+        first; a missing key gets a new empty set.
+        """
+        if self._owned is not None:
+            marker = (id(index), key)
+            if marker not in self._owned:
+                self._owned.add(marker)
+                index[key] = set(index.get(key, ()))
+        return index[key]
+
+    def add_segment(self, segment: str) -> None:
+        """Add a name segment to the segment index, copying a shared index first."""
+        if segment in self.segment_index:
+            return
+        if self._owned is not None and "segment_index" not in self._owned:
+            self._owned.add("segment_index")
+            self.segment_index = self.segment_index.copy()
+        self.segment_index.add(segment)
+
+    def count_option(self, option: Mapping[str, Any], delta: int) -> None:
+        """Add an option to (delta 1) or remove it from (delta -1) the aggregate counts."""
+        for name, field, missing in COUNTED_FIELDS:
+            counts = self.option_counts[name]
+            value = option.get(field) or missing  # Also None, which would not survive as a JSON key
+            counts[value] = counts.get(value, 0) + delta
+            if not counts[value]:
+                del counts[value]
+
+    def restore_counts(self, stored: Optional[Mapping[str, Mapping[str, int]]]) -> None:
+        """
+        Take the aggregate counts saved with a snapshot of this generation.
+
+        Snapshots written before the counts were saved, or whose counts do not
+        add up to the options they hold, are counted option by option instead.
+        """
+        if stored and all(sum(stored.get(name, {}).values()) == len(self.options) for name, _, _ in COUNTED_FIELDS):
+            self.option_counts = {name: dict(stored[name]) for name, _, _ in COUNTED_FIELDS}
+            return
+        self.option_counts = {name: {} for name, _, _ in COUNTED_FIELDS}
+        for option in self.options.values():
+            self.count_option(option, 1)
+
+    def spill_details(self) -> int:
+        """
+        Move the details of the options held as OptionRecords to the detail store.
+
+        Each record is replaced by an OptionSummary reading its details from the
+        store; summaries, options with nonstandard fields and mapped options stay
+        as they are. Only called before the generation is published.
+
+        Returns:
+            Number of options moved
+        """
+        if self.details is None or not isinstance(self.options, dict):
+            return 0
+        records = [(name, option) for name, option in self.options.items() if type(option) is OptionRecord]
+        for option_name, option in records:
+            self.options[option_name] = OptionSummary.spill(option, self.details)
+        return len(records)
+
+    def rebuild_attributes(self) -> None:
+        """File every option in attribute_index, for snapshots written before it was saved with them."""
+        self.attribute_index = PostingLists()
+        for option_name, option in self.options.items():
+            for key in attribute_keys(option):
+                self.attribute_index.add(key, option_name)
+
+    def filter_names(self, filters: Optional[Mapping[str, Optional[str]]]) -> Optional[Set[str]]:
+        """
+        Names of the options passing every filter.
+
+        Args:
+            filters: Field (one of FILTER_FIELDS) to required value; empty values are ignored
+
+        Returns:
+            The names, or None if there is nothing to filter by
+
+        Raises:
+            ValueError: If a filter names a field that is not indexed
+        """
+        keys = filter_keys(filters, FILTER_FIELDS)
+        return filtered_names(self.attribute_index, keys) if keys else None
+
+    def info(self) -> Dict[str, Any]:
+        """Summary of the generation for status reports."""
+        return {
+            "generation": self.generation,
+            "published_at": self.published_at,
+            "origin": self.origin,
+            "options_count": len(self.options),
+            "pending_sources": list(self.pending_sources),
+        }
@@ -0,0 +1,431 @@
+"""
+Streaming parser for Home Manager option documentation.
+
+Home Manager renders its options as a DocBook ``variablelist``: a ``<dl>`` whose
+``<dt>`` terms hold the option names, each followed by a ``<dd>`` with the
+description and the Type/Default/Example paragraphs. Instead of building a DOM of
+the whole document, this parser is fed the page incrementally (e.g. straight from
+the HTTP response) and keeps only the term and definition currently being read.
+An option record is emitted as soon as its ``<dd>`` closes.
+
+parse_options_compact() runs the same parser over a whole page and returns the
+records as compact tuples, which is what the Home Manager client's parse worker
+processes send back to the parent.
+
+Records are identical to those produced by the BeautifulSoup-based
+``HomeManagerClient._parse_single_option``; the tree-building rules below mirror
+the ones BeautifulSoup applies with the ``html.parser`` builder.
+"""
+
+import logging
+import re
+from html import unescape
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union, cast
+
+from bs4.builder import HTMLTreeBuilder
+
+logger = logging.getLogger(__name__)
+
+# Elements BeautifulSoup closes immediately, so they never contain anything
+VOID_ELEMENTS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+
+# Strings inside these elements are excluded from the text of their ancestors
+STRING_CONTAINERS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+
+# Field order of compact records; the "source" field is implied by the page they came from
+COMPACT_FIELDS = (
+    "name",
+    "type",
+    "description",
+    "default",
+    "example",
+    "category",
+    "introduced_version",
+    "deprecated_version",
+    "manual_url",
+)
+
+
+def extract_paragraph_metadata(p_elements: List[Any]) -> Dict[str, Optional[str]]:
+    """
+    Extract metadata (Type, Default, Example, Versions) from option paragraphs.
+
+    Args:
+        p_elements: Paragraph elements following the description; anything with a ``text`` attribute
+
+    Returns:
+        Dictionary with type, default, example, introduced_version and deprecated_version
+    """
+    metadata: Dict[str, Optional[str]] = {
+        "type": None,
+        "default": None,
+        "example": None,
+        "introduced_version": None,
+        "deprecated_version": None,
+    }
+    for p in p_elements:
+        if not hasattr(p, "text"):
+            continue
+        text = p.text.strip()
+        if "Type:" in text:
+            metadata["type"] = text.split("Type:", 1)[1].strip()
+        elif "Default:" in text:
+            metadata["default"] = text.split("Default:", 1)[1].strip()
+        elif "Example:" in text:
+            metadata["example"] = text.split("Example:", 1)[1].strip()
+        elif "Introduced in version:" in text or "Since:" in text:
+            match = re.search(r"(Introduced in version|Since):\s*([\d.]+)", text)
+            if match:
+                metadata["introduced_version"] = match.group(2)
+        elif "Deprecated in version:" in text or "Deprecated since:" in text:
+            match = re.search(r"(Deprecated in version|Deprecated since):\s*([\d.]+)", text)
+            if match:
+                metadata["deprecated_version"] = match.group(2)
+    return metadata
+
+
+def make_option_record(
+    name: str,
+    description: str,
+    metadata: Dict[str, Optional[str]],
+    category: str,
+    doc_type: str,
+    manual_url: Optional[str],
+) -> Dict[str, Any]:
+    """Assemble an option record in the shape used by the Home Manager indices."""
+    return {
+        "name": name,
+        "type": metadata["type"],
+        "description": description,
+        "default": metadata["default"],
+        "example": metadata["example"],
+        "category": category,
+        "source": doc_type,
+        "introduced_version": metadata["introduced_version"],
+        "deprecated_version": metadata["deprecated_version"],
+        "manual_url": manual_url,
+    }
+
+
+class _Element:
+    """Minimal element tree node for the ``<dt>``/``<dd>`` currently being parsed."""
+
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(self, tag: str, attrs: Dict[str, str]):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Union["_Element", str]] = []
+
+    def descendants(self) -> Iterator["_Element"]:
+        """Yield descendant elements in document order."""
+        stack = list(reversed([c for c in self.children if isinstance(c, _Element)]))
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed([c for c in element.children if isinstance(c, _Element)]))
+
+    def find(self, tag: str, class_: Optional[str] = None, attr: Optional[str] = None) -> Optional["_Element"]:
+        """Return the first descendant with the given tag, class token and attribute."""
+        for element in self.descendants():
+            if element.tag != tag:
+                continue
+            if class_ is not None and class_ not in element.attrs.get("class", "").split():
+                continue
+            if attr is not None and attr not in element.attrs:
+                continue
+            return element
+        return None
+
+    def find_all(self, tag: str) -> List["_Element"]:
+        """Return every descendant with the given tag."""
+        return [element for element in self.descendants() if element.tag == tag]
+
+    @property
+    def text(self) -> str:
+        """Concatenated text of the element and its descendants."""
+        parts: List[str] = []
+        stack: List[Union[_Element, str]] = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return "".join(parts)
+
+
+class HomeManagerOptionParser(HTMLParser):
+    """
+    Incremental parser turning a Home Manager options page into option records.
+
+    Feed the document in chunks of any size with feed(), collecting the records each
+    call returns, and call close() at the end for any remaining records. A critical
+    parsing error stops the parser; close() then returns no records, matching
+    ``HomeManagerClient.parse_html``.
+    """
+
+    def __init__(self, doc_type: str):
+        """
+        Initialize the parser.
+
+        Args:
+            doc_type: Source name stored in each record (e.g. "options")
+        """
+        super().__init__(convert_charrefs=False)
+        self.doc_type = doc_type
+        self.failed = False
+        self.option_count = 0
+
+        # Open elements as (tag, tree node or None); only the current <dt>/<dd> gets tree nodes
+        self._stack: List[Tuple[str, Optional[_Element]]] = []
+        self._containers = 0  # Open string containers (script, style, ...)
+        self._variablelist_depth: Optional[int] = None
+        self._dl_depth: Optional[int] = None
+        self._done = False
+
+        # The last <h3> started so far; its text is the category of the options that follow
+        self._heading_parts: Optional[List[str]] = None
+        self._heading_depth: Optional[int] = None
+        self._category = "Uncategorized"
+
+        self._item: Optional[_Element] = None
+        self._item_category = "Uncategorized"
+        self._pending_terms: List[Tuple[_Element, str]] = []
+        self._records: List[Dict[str, Any]] = []
+
+    def feed(self, data: str) -> List[Dict[str, Any]]:  # type: ignore[override]
+        """
+        Parse a chunk of the document.
+
+        Args:
+            data: Next chunk of HTML
+
+        Returns:
+            Option records completed by this chunk
+        """
+        if self.failed or self._done:
+            return []
+        try:
+            super().feed(data)
+        except Exception as e:
+            self._fail(e)
+        return self._take_records()
+
+    def close(self) -> List[Dict[str, Any]]:  # type: ignore[override]
+        """
+        Finish parsing, completing an option left open by a truncated document.
+
+        Returns:
+            Remaining option records
+        """
+        if not self.failed and not self._done:
+            try:
+                super().close()
+                # Unclosed elements are complete as far as the document goes
+                while self._stack:
+                    self._pop()
+            except Exception as e:
+                self._fail(e)
+        return self._take_records()
+
+    def _fail(self, error: Exception) -> None:
+        logger.error(f"Critical error parsing HTML for {self.doc_type}: {str(error)}")
+        self.failed = True
+        self._records = []
+
+    def _take_records(self) -> List[Dict[str, Any]]:
+        if self.failed:
+            return []
+        records, self._records = self._records, []
+        self.option_count += len(records)
+        return records
+
+    # --- Tree building ---
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._done:
+            return
+        attributes = {name: value if value is not None else "" for name, value in attrs}
+        depth = len(self._stack)
+
+        if tag == "h3":
+            self._heading_parts = []
+            self._heading_depth = depth
+            self._category = ""
+
+        node: Optional[_Element] = None
+        if self._item is not None:
+            node = _Element(tag, attributes)
+            parent = self._stack[-1][1]
+            if parent is not None:
+                parent.children.append(node)
+        elif self._dl_depth is not None and depth == self._dl_depth + 1 and tag in ("dt", "dd"):
+            node = self._item = _Element(tag, attributes)
+            if tag == "dt":
+                self._item_category = self._category
+        elif self._variablelist_depth is None:
+            if "variablelist" in attributes.get("class", "").split():
+                self._variablelist_depth = depth
+                # An empty variablelist element cannot contain the option list
+                self._done = tag in VOID_ELEMENTS
+        elif self._dl_depth is None and tag == "dl":
+            self._dl_depth = depth
+
+        if tag in VOID_ELEMENTS:
+            return
+        self._stack.append((tag, node))
+        if tag in STRING_CONTAINERS:
+            self._containers += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._done or tag in VOID_ELEMENTS:
+            return
+        # Close everything up to the most recent matching element; stray end tags are ignored
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                while len(self._stack) > index:
+                    self._pop()
+                return
+
+    def _pop(self) -> None:
+        tag, node = self._stack.pop()
+        depth = len(self._stack)
+        if tag in STRING_CONTAINERS:
+            self._containers -= 1
+        if depth == self._heading_depth and self._heading_parts is not None:
+            self._category = "".join(self._heading_parts).strip()
+            self._heading_depth = None
+        if node is not None and node is self._item:
+            self._item = None
+            self._finish_item(node)
+        if depth == self._dl_depth or (depth == self._variablelist_depth and self._dl_depth is None):
+            # Only the first definition list of the first variablelist holds options
+            self._done = True
+            self._stack.clear()
+
+    def handle_data(self, data: str) -> None:
+        if self._done or self._containers:
+            return
+        if self._heading_depth is not None and self._heading_parts is not None:
+            self._heading_parts.append(data)
+            self._category = "".join(self._heading_parts).strip()
+        if self._item is not None:
+            parent = self._stack[-1][1]
+            if parent is not None:
+                parent.children.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self.handle_data(html5.get(f"{name};", f"&{name}"))
+
+    def handle_charref(self, name: str) -> None:
+        self.handle_data(unescape(f"&#{name};"))
+
+    def unknown_decl(self, data: str) -> None:
+        if data.startswith("CDATA["):
+            self.handle_data(data[len("CDATA[") :])
+
+    # --- Option extraction ---
+
+    def _finish_item(self, item: _Element) -> None:
+        """Pair completed terms with their definition and build records."""
+        if item.tag == "dt":
+            self._pending_terms.append((item, self._item_category))
+            return
+        terms, self._pending_terms = self._pending_terms, []
+        for term, category in terms:
+            try:
+                record = self._build_record(term, item, category)
+                if record:
+                    self._records.append(record)
+            except Exception as e:
+                name_guess = self._extract_name(term) or "unknown"
+                logger.warning(f"Error parsing option '{name_guess}' in {self.doc_type}: {str(e)}")
+
+    @staticmethod
+    def _extract_name(term: _Element) -> Optional[str]:
+        span = term.find("span", class_="term")
+        code = span.find("code") if span is not None else None
+        return code.text.strip() if code is not None else None
+
+    def _build_record(self, term: _Element, definition: _Element, category: str) -> Optional[Dict[str, Any]]:
+        name = self._extract_name(term)
+        if not name:
+            return None
+        paragraphs = definition.find_all("p")
+        description = paragraphs[0].text.strip() if paragraphs else ""
+        metadata = extract_paragraph_metadata(paragraphs[1:])
+        link = definition.find("a", attr="href")
+        href = link.attrs["href"] if link is not None else ""
+        manual_url = href if href and "manual" in href else None
+        return make_option_record(name, description, metadata, category, self.doc_type, manual_url)
+
+
+def parse_options(html: str, doc_type: str) -> List[Dict[str, Any]]:
+    """
+    Parse a complete Home Manager options page.
+
+    Args:
+        html: Document content
+        doc_type: Source name stored in each record
+
+    Returns:
+        Option records in document order (empty on a critical parsing error)
+    """
+    parser = HomeManagerOptionParser(doc_type)
+    records = parser.feed(html)
+    records.extend(parser.close())
+    return records
+
+
+def parse_options_compact(html: str, doc_type: str) -> Optional[List[Tuple[Optional[str], ...]]]:
+    """
+    Parse a complete Home Manager options page into compact records.
+
+    Each record is a tuple of its COMPACT_FIELDS values. Equal values (categories,
+    types, defaults) are shared between records, so pickling the result to send it
+    from a worker process writes each of them only once.
+
+    Args:
+        html: Document content
+        doc_type: Source name of the page
+
+    Returns:
+        Compact records in document order, or None on a critical parsing error
+    """
+    parser = HomeManagerOptionParser(doc_type)
+    records = parser.feed(html)
+    records.extend(parser.close())
+    if parser.failed:
+        return None
+    shared: Dict[Optional[str], Optional[str]] = {}
+    return [tuple(shared.setdefault(record[field], record[field]) for field in COMPACT_FIELDS) for record in records]
+
+
+def expand_records(rows: List[Tuple[Optional[str], ...]], doc_type: str) -> List[Dict[str, Any]]:
+    """
+    Turn compact records back into option records.
+
+    Args:
+        rows: Records returned by parse_options_compact
+        doc_type: Source name of the page they were parsed from
+
+    Returns:
+        Option records, identical to those returned by parse_options
+    """
+    options = []
+    for row in rows:
+        values = dict(zip(COMPACT_FIELDS, row))
+        options.append(
+            make_option_record(
+                cast(str, values["name"]),
+                cast(str, values["description"]),
+                values,
+                cast(str, values["category"]),
+                doc_type,
+                values["manual_url"],
+            )
+        )
+    return options
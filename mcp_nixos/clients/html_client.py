@@ -5,15 +5,19 @@ This module provides a client for fetching HTML content from the web
 with persistent caching support to improve performance.
 """
 
+import codecs
 import logging
 import requests
-from typing import Optional, Dict, Any, Tuple
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from ..cache.html_cache import HTMLCache
 
-
 logger = logging.getLogger(__name__)
 
+# Size of the chunks handed to a streaming consumer while a response downloads
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class HTMLClient:
     """
@@ -43,13 +47,29 @@ class HTMLClient:
             self.cache = None
             logger.info("HTMLClient initialized with caching disabled")
 
-    def fetch(self, url: str, force_refresh: bool = False) -> Tuple[Optional[str], Dict[str, Any]]:
+    def fetch(
+        self,
+        url: str,
+        force_refresh: bool = False,
+        chunk_consumer: Optional[Callable[[str], Any]] = None,
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
         """
         Fetch HTML content from a URL with caching support.
 
+        When a cached entry has expired but carries an ETag or Last-Modified value, a
+        conditional request is sent. A 304 Not Modified response renews the entry's TTL
+        and returns the cached content with ``not_modified`` set in the metadata, so
+        callers can skip re-processing content they have already seen.
+
+        With a ``chunk_consumer`` the response is streamed: each decoded chunk is passed
+        to the consumer as it arrives, so processing overlaps the download, and
+        ``streamed`` is set in the metadata. Content served from the cache is not passed
+        to the consumer.
+
         Args:
             url: URL to fetch content from
             force_refresh: Whether to ignore cache and force a fresh request
+            chunk_consumer: Optional callable receiving the content in chunks as it downloads
 
         Returns:
             Tuple of (content, metadata) where content is the HTML content
@@ -59,35 +79,71 @@ class HTMLClient:
             "url": url,
             "from_cache": False,
             "success": False,
+            "not_modified": False,
+            "streamed": False,
         }
 
+        stale_content: Optional[str] = None
+        headers: Dict[str, str] = {}
+
         # Try to get content from cache if caching is enabled and not forcing refresh
         if self.use_cache and not force_refresh and self.cache is not None:
-            cache_result = self.cache.get(url)
+            cache_result = self.cache.get(url, allow_expired=True)
             if cache_result and len(cache_result) == 2:
                 cached_content, cache_metadata = cache_result
                 if cache_metadata and isinstance(cache_metadata, dict):
                     metadata.update(cache_metadata)
 
-                if cached_content is not None:
+                if cached_content is not None and not metadata.get("stale"):
                     logger.debug(f"Fetched content from cache for URL: {url}")
                     metadata["from_cache"] = True
                     metadata["success"] = True
                     return cached_content, metadata
 
+                if cached_content is not None:
+                    # Expired entry: revalidate it instead of downloading it again
+                    if metadata.get("etag"):
+                        headers["If-None-Match"] = metadata["etag"]
+                    if metadata.get("last_modified"):
+                        headers["If-Modified-Since"] = metadata["last_modified"]
+                    if headers:
+                        stale_content = cached_content
+
         # Fetch content from the web
         logger.debug(f"Fetching content from web for URL: {url}")
         try:
-            response = requests.get(url, timeout=self.timeout)
+            request_kwargs: Dict[str, Any] = {"timeout": self.timeout}
+            if headers:
+                request_kwargs["headers"] = headers
+            if chunk_consumer is not None:
+                request_kwargs["stream"] = True
+            response = requests.get(url, **request_kwargs)
+            metadata["status_code"] = response.status_code
+
+            if response.status_code == 304 and stale_content is not None and self.cache is not None:
+                logger.debug(f"Cached content for URL {url} is still current (304 Not Modified)")
+                metadata["cache_result"] = self.cache.renew(url, self._response_validators(response))
+                metadata["from_cache"] = True
+                metadata["not_modified"] = True
+                metadata["success"] = True
+                return stale_content, metadata
+
             response.raise_for_status()
-            content = response.text
+            if chunk_consumer is not None:
+                content = self._stream_content(response, chunk_consumer)
+                metadata["streamed"] = True
+            else:
+                content = response.text
 
-            metadata["status_code"] = response.status_code
             metadata["success"] = True
 
             # Store in cache if caching is enabled
             if self.use_cache and self.cache is not None:
-                cache_result = self.cache.set(url, content)
+                validators = self._response_validators(response)
+                if validators:
+                    cache_result = self.cache.set(url, content, validators)
+                else:
+                    cache_result = self.cache.set(url, content)
                 metadata["cache_result"] = cache_result
 
             return content, metadata
@@ -100,6 +156,35 @@ class HTMLClient:
 
             return None, metadata
 
+    @staticmethod
+    def _stream_content(response: requests.Response, chunk_consumer: Callable[[str], Any]) -> str:
+        """Decode a streamed response chunk by chunk, handing each chunk to the consumer."""
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        chunks: List[str] = []
+        for raw in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            chunk = decoder.decode(raw)
+            if chunk:
+                chunks.append(chunk)
+                chunk_consumer(chunk)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            chunks.append(tail)
+            chunk_consumer(tail)
+        return "".join(chunks)
+
+    @staticmethod
+    def _response_validators(response: requests.Response) -> Dict[str, str]:
+        """Extract the ETag and Last-Modified cache validators from a response."""
+        headers = getattr(response, "headers", None)
+        if not isinstance(headers, Mapping):
+            return {}
+        validators = {}
+        for name, key in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+            value = headers.get(name)
+            if isinstance(value, str) and value:
+                validators[key] = value
+        return validators
+
     def clear_cache(self) -> Dict[str, Any]:
         """
         Clear all cached content.
@@ -0,0 +1,169 @@
+"""
+Character-trigram index for typo-tolerant lookups.
+
+Terms (option name segments such as ``neovim`` or ``userName``) are indexed
+under the trigrams of their lowercased, padded form, like ``pg_trgm`` does:
+``"  neovim "`` gives ``"  n"``, ``" ne"``, ``"neo"``, ... A misspelled term
+shares most of its trigrams with the intended one, so candidates are found by
+counting shared trigrams over a few posting lists instead of comparing the
+term with the whole vocabulary. Candidates are then confirmed by edit
+distance.
+"""
+
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def trigrams(term: str) -> Set[str]:
+    """Trigrams of a term, lowercased and padded with two spaces before and one after."""
+    padded = f"  {term.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(first: str, second: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions and adjacent transpositions).
+
+    Args:
+        first: A string
+        second: Another string
+        max_distance: Distances above this are not computed exactly
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    before_previous: List[int] = []
+    previous = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        current = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Set of terms that can be searched for terms spelled similarly to a given one."""
+
+    def __init__(self, terms: Iterable[str] = ()):
+        """
+        Initialize the index.
+
+        Args:
+            terms: Terms to index
+        """
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._sizes: Dict[str, int] = {}  # Number of distinct trigrams per term
+        self._pending: Optional[Iterable[str]] = None  # Terms of a deferred index, until first used
+        self._lock = threading.Lock()
+        for term in terms:
+            self._add(term)
+
+    @classmethod
+    def deferred(cls, terms: Iterable[str]) -> "TrigramIndex":
+        """
+        Index terms when the index is first used rather than now.
+
+        Loading a dataset then costs nothing for spelling corrections that may
+        never be asked for. The terms must not change until then.
+
+        Args:
+            terms: Terms to index
+        """
+        index = cls()
+        index._pending = terms
+        return index
+
+    def _index_pending(self) -> None:
+        """Index the terms of a deferred index, once, even if several threads use it first."""
+        with self._lock:
+            if self._pending is None:
+                return
+            for term in self._pending:
+                self._add(term)
+            self._pending = None
+
+    def add(self, term: str) -> None:
+        """Add a term to the index."""
+        if self._pending is not None:
+            self._index_pending()
+        self._add(term)
+
+    def _add(self, term: str) -> None:
+        if term in self._sizes:
+            return
+        grams = trigrams(term)
+        self._sizes[term] = len(grams)
+        for gram in grams:
+            self._postings[gram].add(term)
+
+    def copy(self) -> "TrigramIndex":
+        """Return an independent copy of the index."""
+        if self._pending is not None:
+            self._index_pending()
+        clone = TrigramIndex()
+        clone._postings.update((gram, set(terms)) for gram, terms in self._postings.items())
+        clone._sizes = dict(self._sizes)
+        return clone
+
+    def __contains__(self, term: object) -> bool:
+        if self._pending is not None:
+            self._index_pending()
+        return term in self._sizes
+
+    def __len__(self) -> int:
+        if self._pending is not None:
+            self._index_pending()
+        return len(self._sizes)
+
+    def similar(
+        self, term: str, limit: int = 5, min_similarity: Optional[float] = None, max_distance: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find indexed terms spelled like a term.
+
+        Args:
+            term: The (possibly misspelled) term
+            limit: Maximum number of terms to return
+            min_similarity: Minimum trigram similarity (shared / all distinct trigrams of both terms);
+                by default 0.3, or none for terms of up to four characters, where a single typo
+                leaves few trigrams in common
+            max_distance: Maximum case-insensitive edit distance; by default 1 for terms of up to
+                four characters and 2 for longer ones
+
+        Returns:
+            (term, similarity) pairs, closest first (by edit distance, then similarity)
+        """
+        if self._pending is not None:
+            self._index_pending()
+        short = len(term) <= 4
+        if min_similarity is None:
+            min_similarity = 0.0 if short else 0.3
+        if max_distance is None:
+            max_distance = 1 if short else 2
+        grams = trigrams(term)
+        shared: Counter = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting:
+                shared.update(posting)
+
+        lowered = term.lower()
+        ranked = []
+        for candidate, common in shared.items():
+            similarity = common / (len(grams) + self._sizes[candidate] - common)
+            if similarity < min_similarity:
+                continue
+            distance = edit_distance(lowered, candidate.lower(), max_distance)
+            if distance <= max_distance:
+                ranked.append((distance, -similarity, candidate))
+        ranked.sort()
+        return [(candidate, -negated) for _distance, negated, candidate in ranked[:limit]]
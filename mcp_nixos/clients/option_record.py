@@ -0,0 +1,295 @@
+"""
+Compact in-memory option records.
+
+A Home Manager option used to be held as a ten-key dict, and every record
+carried its own copy of strings such as the type, category, source and
+default, even though a few hundred distinct values cover thousands of
+options. OptionRecord stores the same fields in ``__slots__``, and an
+InternTable makes equal values share one string object. Records remain
+read-only mappings, so code that reads them as dicts keeps working. copy()
+and dict() return a plain dict for anything that needs to change or
+serialize one.
+
+Once a generation is published, its records are replaced by OptionSummary
+records holding only SUMMARY_FIELDS, the fields queries go through, with the
+description shortened; the DETAIL_FIELDS, including the full description, are
+moved to a DetailStore on disk and read back from there when asked for.
+Summaries read like the records they replace. Searches rank matches through
+the summaries and read the details of the options they return only, so a
+query costs at most one read per result rather than one per match.
+"""
+
+from collections import deque
+from collections.abc import Mapping
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from mcp_nixos.cache.detail_store import DetailStore
+
+# Fields of a Home Manager option, in the order make_option_record produces them
+OPTION_FIELDS = (
+    "name",
+    "type",
+    "description",
+    "default",
+    "example",
+    "category",
+    "source",
+    "introduced_version",
+    "deprecated_version",
+    "manual_url",
+)
+
+# Fields whose values repeat across many options (names and descriptions are mostly unique)
+INTERNED_FIELDS = frozenset(
+    ("type", "default", "example", "category", "source", "introduced_version", "deprecated_version")
+)
+
+# Fields held in memory for every option, which ranking, filters and stats go through (the description shortened)
+SUMMARY_FIELDS = ("name", "type", "description", "category", "source")
+# Fields kept on disk and read for the options a query returns: the full description, defaults, examples, ...
+DETAIL_FIELDS = ("description",) + tuple(field for field in OPTION_FIELDS if field not in SUMMARY_FIELDS)
+
+# Characters of a description kept in a summary, including the "..." marking a shortened one
+SHORT_DESCRIPTION_LENGTH = 200
+
+_FIELD_SET = frozenset(OPTION_FIELDS)
+_MEMORY_SET = frozenset(field for field in SUMMARY_FIELDS if field not in DETAIL_FIELDS)
+_DETAIL_POSITIONS = {field: position for position, field in enumerate(DETAIL_FIELDS)}
+
+
+def short_description(description: Optional[str]) -> Optional[str]:
+    """A description cut to SHORT_DESCRIPTION_LENGTH characters, ending in "..." if it was longer."""
+    if description is None or len(description) <= SHORT_DESCRIPTION_LENGTH:
+        return description
+    return description[: SHORT_DESCRIPTION_LENGTH - 3].rstrip() + "..."
+
+
+def summarize(option: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    The SUMMARY_FIELDS of an option as a new dict, with the description shortened.
+
+    These are the values an OptionSummary holds; it answers without reading its details.
+    """
+    if type(option) is OptionSummary:
+        return {field: getattr(option, field) for field in SUMMARY_FIELDS}
+    summary = {field: option.get(field) for field in SUMMARY_FIELDS}
+    summary["description"] = short_description(summary["description"])
+    return summary
+
+
+class InternTable:
+    """Hands out one shared instance for every distinct string it is given."""
+
+    __slots__ = ("_values",)
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self._values: Dict[str, str] = {}
+
+    def __call__(self, value: Any) -> Any:
+        """Return the shared instance of a string; other values are returned unchanged."""
+        if type(value) is not str:
+            return value
+        return self._values.setdefault(value, value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class OptionRecord(Mapping):
+    """Slotted, read-only record of one Home Manager option, readable as a dict."""
+
+    __slots__ = OPTION_FIELDS
+
+    def __init__(self, *values: Optional[str]):
+        """
+        Initialize a record.
+
+        Args:
+            values: Field values in OPTION_FIELDS order
+        """
+        if len(values) != len(OPTION_FIELDS):
+            raise TypeError(f"OptionRecord takes {len(OPTION_FIELDS)} values, got {len(values)}")
+        for field, value in zip(OPTION_FIELDS, values):
+            object.__setattr__(self, field, value)
+
+    @classmethod
+    def from_columns(cls, columns: Sequence[Sequence[Optional[str]]]) -> List["OptionRecord"]:
+        """
+        Build records from one sequence of values per field, as a snapshot stores them.
+
+        Each field is set on all records at once through its slot, without a
+        Python-level loop per record, which is about three times faster than
+        calling the constructor for every option.
+
+        Args:
+            columns: One sequence of values per field, in OPTION_FIELDS order, all of the same length
+        """
+        if len(columns) != len(OPTION_FIELDS):
+            raise TypeError(f"OptionRecord takes {len(OPTION_FIELDS)} columns, got {len(columns)}")
+        records = list(map(object.__new__, repeat(cls, len(columns[0]))))
+        for field, values in zip(OPTION_FIELDS, columns):
+            if len(values) != len(records):
+                raise ValueError(f"Column {field} has {len(values)} values for {len(records)} records")
+            deque(map(getattr(cls, field).__set__, records, values), maxlen=0)
+        return records
+
+    @classmethod
+    def from_mapping(cls, option: Mapping, intern: Optional[InternTable] = None) -> Union["OptionRecord", Mapping]:
+        """
+        Compact an option dict.
+
+        Args:
+            option: Option with exactly the OPTION_FIELDS keys
+            intern: Table shared by the records of one dataset, for the repeated fields
+
+        Returns:
+            An OptionRecord, or the option itself if it has other keys and cannot be compacted
+        """
+        if isinstance(option, cls):
+            return option
+        if len(option) != len(OPTION_FIELDS) or option.keys() != _FIELD_SET:
+            return option
+        if intern is None:
+            return cls(*(option[field] for field in OPTION_FIELDS))
+        return cls(*(intern(option[field]) if field in INTERNED_FIELDS else option[field] for field in OPTION_FIELDS))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a field value, or default for unknown keys (faster than Mapping.get)."""
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(OPTION_FIELDS)
+
+    def __len__(self) -> int:
+        return len(OPTION_FIELDS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET
+
+    def copy(self) -> Dict[str, Any]:
+        """Return the record as a new dict."""
+        return {field: getattr(self, field) for field in OPTION_FIELDS}
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, field) for field in OPTION_FIELDS))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.copy()!r})"
+
+
+class OptionSummary(Mapping):
+    """Read-only record of one Home Manager option whose details are read from a DetailStore when needed."""
+
+    __slots__ = SUMMARY_FIELDS + ("_details", "_entry")
+
+    def __init__(self, details: DetailStore, entry: int, *values: Optional[str]):
+        """
+        Initialize a summary.
+
+        Args:
+            details: Store holding the DETAIL_FIELDS values of the option
+            entry: Entry of the option in that store
+            values: Field values in SUMMARY_FIELDS order, the description shortened
+        """
+        if len(values) != len(SUMMARY_FIELDS):
+            raise TypeError(f"OptionSummary takes {len(SUMMARY_FIELDS)} values, got {len(values)}")
+        for field, value in zip(SUMMARY_FIELDS, values):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "_details", details)
+        object.__setattr__(self, "_entry", entry)
+
+    @classmethod
+    def spill(cls, option: Mapping, details: DetailStore) -> "OptionSummary":
+        """
+        Write the details of an option to a store and summarize it.
+
+        Args:
+            option: Option with the OPTION_FIELDS keys, e.g. an OptionRecord
+            details: Store with DETAIL_FIELDS entries
+        """
+        entry = details.append([option[field] for field in DETAIL_FIELDS])
+        summary = {field: option[field] for field in SUMMARY_FIELDS}
+        summary["description"] = short_description(summary["description"])
+        return cls(details, entry, *summary.values())
+
+    @classmethod
+    def from_columns(cls, details: DetailStore, columns: Sequence[Sequence[Optional[str]]]) -> List["OptionSummary"]:
+        """
+        Summarize options stored a field at a time, whose details are already stored in the same order.
+
+        Built like OptionRecord.from_columns; the detail columns are not read.
+
+        Args:
+            details: Store whose entry N holds the DETAIL_FIELDS values of option N
+            columns: One sequence of values per field, in OPTION_FIELDS order, all of the same length
+        """
+        if len(columns) != len(OPTION_FIELDS):
+            raise TypeError(f"OptionSummary takes {len(OPTION_FIELDS)} columns, got {len(columns)}")
+        by_field = dict(zip(OPTION_FIELDS, columns))
+        count = len(by_field["name"])
+        if len(details) < count:
+            raise ValueError(f"Detail store holds {len(details)} entries for {count} options")
+        summaries = list(map(object.__new__, repeat(cls, count)))
+        for field in SUMMARY_FIELDS:
+            values = by_field[field]
+            if len(values) != count:
+                raise ValueError(f"Column {field} has {len(values)} values for {count} options")
+            if field == "description":
+                values = map(short_description, values)
+            deque(map(getattr(cls, field).__set__, summaries, values), maxlen=0)
+        deque(map(cls._details.__set__, summaries, repeat(details)), maxlen=0)
+        deque(map(cls._entry.__set__, summaries, range(count)), maxlen=0)
+        return summaries
+
+    def details(self) -> Dict[str, Any]:
+        """The DETAIL_FIELDS values, read from the store."""
+        return dict(zip(DETAIL_FIELDS, self._details.read(self._entry)))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _MEMORY_SET:
+            return getattr(self, key)
+        position = _DETAIL_POSITIONS.get(key)
+        if position is None:
+            raise KeyError(key)
+        return self._details.read(self._entry)[position]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a field value, or default for unknown keys; only detail fields are read from the store."""
+        if key in _MEMORY_SET:
+            return getattr(self, key)
+        position = _DETAIL_POSITIONS.get(key)
+        return default if position is None else self._details.read(self._entry)[position]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(OPTION_FIELDS)
+
+    def __len__(self) -> int:
+        return len(OPTION_FIELDS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET
+
+    def copy(self) -> Dict[str, Any]:
+        """Return the whole option as a new dict, reading its details once."""
+        details = self.details()
+        return {field: details[field] if field in details else getattr(self, field) for field in OPTION_FIELDS}
+
+    def __reduce__(self):
+        # Pickled in full, as the OptionRecord it summarizes
+        return (OptionRecord, tuple(self.copy().values()))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({summarize(self)!r})"
@@ -0,0 +1,153 @@
+"""
+Dotted-prefix lookup over option names.
+
+Instead of a set of names for every dotted prefix of every option, the index
+keeps the names in one sorted list. All names under a prefix ``p`` (other than
+``p`` itself) sort between ``p + "."`` and ``p + "/"``, so a lookup is two
+binary searches plus a slice: O(log n + k) time, and memory for one reference
+per option instead of one per path component.
+"""
+
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+class PrefixIndex(Mapping):
+    """
+    Read-only mapping from dotted prefix to the sorted names it covers.
+
+    ``index["programs.git"]`` lists ``programs.git`` itself (if it is a name) and
+    every name starting with ``programs.git.``, in sorted order. Prefixes only
+    match at component boundaries, so ``programs.gi`` is not a key. Lookups
+    return a new list; the index is changed only through add and discard.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Initialize the index.
+
+        Args:
+            names: Option names to index
+        """
+        self._names: Sequence[str] = sorted(set(names))
+        self._key_count: Optional[int] = None
+
+    @classmethod
+    def from_sorted(cls, names: Sequence[str]) -> "PrefixIndex":
+        """
+        Index names that are already sorted and unique, without copying them.
+
+        The sequence only needs indexing, slicing to a list and len(), so it can
+        be a view of names stored elsewhere (such as a mapped index file). It is
+        copied into a list before the first add or discard.
+
+        Args:
+            names: Sorted, unique option names
+        """
+        index = cls()
+        index._names = names
+        return index
+
+    def _find(self, name: str) -> Tuple[int, bool]:
+        position = bisect_left(self._names, name)
+        return position, position < len(self._names) and self._names[position] == name
+
+    def _children(self, prefix: str) -> Tuple[int, int]:
+        """Bounds of the names that start with ``prefix + "."``."""
+        start = bisect_left(self._names, prefix + ".")
+        return start, bisect_left(self._names, prefix + "/", start)
+
+    def _mutable_names(self) -> List[str]:
+        if not isinstance(self._names, list):
+            self._names = list(self._names)
+        return self._names
+
+    def add(self, name: str) -> None:
+        """Add a name to the index."""
+        position, found = self._find(name)
+        if not found:
+            self._mutable_names().insert(position, name)
+            self._key_count = None
+
+    def discard(self, name: str) -> None:
+        """Remove a name from the index if present."""
+        position, found = self._find(name)
+        if found:
+            del self._mutable_names()[position]
+            self._key_count = None
+
+    def copy(self) -> "PrefixIndex":
+        """Return an independent copy of the index."""
+        clone = PrefixIndex()
+        clone._names = list(self._names)
+        clone._key_count = self._key_count
+        return clone
+
+    @property
+    def names(self) -> List[str]:
+        """All indexed names, sorted (a copy)."""
+        return list(self._names)
+
+    def children(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Names strictly under a prefix (starting with ``prefix + "."``), sorted.
+
+        Args:
+            prefix: Dotted prefix
+            limit: Return at most this many of the first names
+
+        Returns:
+            A new list of names
+        """
+        start, end = self._children(prefix)
+        if limit is not None:
+            end = min(end, start + max(limit, 0))
+        return self._names[start:end]
+
+    def count_children(self, prefix: str) -> int:
+        """Number of names strictly under a prefix."""
+        start, end = self._children(prefix)
+        return end - start
+
+    def count(self, prefix: str) -> int:
+        """Number of names under a prefix, without building the list."""
+        return self.count_children(prefix) + self._find(prefix)[1]
+
+    def __getitem__(self, prefix: str) -> List[str]:
+        if not isinstance(prefix, str):
+            raise KeyError(prefix)
+        start, end = self._children(prefix)
+        names = self._names[start:end]
+        if self._find(prefix)[1]:
+            names.insert(0, prefix)  # A name sorts before its children
+        if not names:
+            raise KeyError(prefix)
+        return names
+
+    def __contains__(self, prefix: object) -> bool:
+        if not isinstance(prefix, str):
+            return False
+        start, end = self._children(prefix)
+        return start < end or self._find(prefix)[1]
+
+    def _prefixes(self) -> Set[str]:
+        prefixes = set()
+        for name in self._names:
+            position = name.find(".")
+            while position != -1:
+                prefixes.add(name[:position])
+                position = name.find(".", position + 1)
+            prefixes.add(name)
+        return prefixes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self._prefixes()))
+
+    def __len__(self) -> int:
+        if self._key_count is None:
+            self._key_count = len(self._prefixes())
+        return self._key_count
+
+    def __repr__(self) -> str:
+        return f"PrefixIndex({len(self._names)} names)"
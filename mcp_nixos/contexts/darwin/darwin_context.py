@@ -2,10 +2,12 @@
 
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional
 from unittest.mock import MagicMock
 
 from mcp_nixos.clients.darwin.darwin_client import DarwinClient
+from mcp_nixos.utils.option_filters import filter_arguments
+from mcp_nixos.utils.readiness import ReadinessEvent, ready_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +35,9 @@ class DarwinContext:
         self.eager_loading = eager_loading
         self.eager_loading_timeout = eager_loading_timeout
         self.loading_task = None
+        # Set once loading has settled; requests arriving meanwhile wait on it up to ready_timeout
+        self.ready = ReadinessEvent("nix-darwin data")
+        self.ready_timeout = ready_timeout()
 
     async def startup(self) -> None:
         """Start the Darwin context.
@@ -51,6 +56,7 @@ class DarwinContext:
                     self.client.load_options(force_refresh=False), timeout=self.eager_loading_timeout
                 )
                 self.status = "loaded"
+                self.ready.set()
                 logger.info(f"Darwin options loaded successfully: {self.client.total_options} options")
             except asyncio.TimeoutError:
                 # If timeout occurs, continue loading in background
@@ -80,6 +86,8 @@ class DarwinContext:
             logger.error(f"Background loading of Darwin options failed: {e}")
             self.status = "error"
             self.error = str(e)
+        finally:
+            self.ready.set()
 
     async def shutdown(self) -> None:
         """Shut down the Darwin context.
@@ -109,6 +117,7 @@ class DarwinContext:
             "options_count": 0,
             "categories_count": 0,
             "last_updated": None,
+            "ready_wait": self.ready.get_stats(),
         }
 
         if self.status in ["loaded", "loading_background"]:
@@ -121,27 +130,43 @@ class DarwinContext:
                         "last_updated": darwin_stats["last_updated"],
                     }
                 )
+                for key in ("source_digest_checks", "search_result_cache"):
+                    if key in darwin_stats:
+                        stats[key] = darwin_stats[key]
             except Exception as e:
                 logger.error(f"Error getting Darwin statistics: {e}")
 
         return stats
 
-    async def search_options(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    async def _ensure_loaded(self) -> None:
+        """Make sure options are available before answering a request.
+
+        While options are loading, waits until they are loaded (or loading fails),
+        at most ready_timeout seconds; the client then answers from whatever it
+        has. If no load is running and none succeeded, loads them now.
+        """
+        if self.status in ["loading", "loading_background"]:
+            await self.ready.wait_async(self.ready_timeout)
+        elif self.status != "loaded":
+            await self.client.load_options(force_refresh=False)
+
+    async def search_options(
+        self, query: str, limit: int = 20, filters: Optional[Mapping[str, Optional[str]]] = None
+    ) -> List[Dict[str, Any]]:
         """Search for options by query.
 
         Args:
             query: Search query.
             limit: Maximum number of results to return.
+            filters: Required option type and category, if any.
 
         Returns:
             List of matching options.
         """
         try:
-            # If options are not loaded yet, try to load them first
-            if self.status not in ["loaded", "loading_background"]:
-                await self.client.load_options(force_refresh=False)
+            await self._ensure_loaded()
 
-            return await self.client.search_options(query, limit=limit)
+            return await self.client.search_options(query, limit=limit, **filter_arguments(filters))
         except Exception as e:
             logger.error(f"Error searching Darwin options: {e}")
             return []
@@ -156,30 +181,29 @@ class DarwinContext:
             Option as a dictionary, or None if not found.
         """
         try:
-            # If options are not loaded yet, try to load them first
-            if self.status not in ["loaded", "loading_background"]:
-                await self.client.load_options(force_refresh=False)
+            await self._ensure_loaded()
 
             return await self.client.get_option(name)
         except Exception as e:
             logger.error(f"Error getting Darwin option {name}: {e}")
             return None
 
-    async def get_options_by_prefix(self, prefix: str) -> List[Dict[str, Any]]:
+    async def get_options_by_prefix(
+        self, prefix: str, filters: Optional[Mapping[str, Optional[str]]] = None
+    ) -> List[Dict[str, Any]]:
         """Get options by prefix.
 
         Args:
             prefix: Option prefix.
+            filters: Required option type and category, if any.
 
         Returns:
             List of options with the given prefix.
         """
         try:
-            # If options are not loaded yet, try to load them first
-            if self.status not in ["loaded", "loading_background"]:
-                await self.client.load_options(force_refresh=False)
+            await self._ensure_loaded()
 
-            return await self.client.get_options_by_prefix(prefix)
+            return await self.client.get_options_by_prefix(prefix, **filter_arguments(filters))
         except Exception as e:
             logger.error(f"Error getting Darwin options by prefix {prefix}: {e}")
             return []
@@ -191,9 +215,7 @@ class DarwinContext:
             List of categories.
         """
         try:
-            # If options are not loaded yet, try to load them first
-            if self.status not in ["loaded", "loading_background"]:
-                await self.client.load_options(force_refresh=False)
+            await self._ensure_loaded()
 
             return await self.client.get_categories()
         except Exception as e:
@@ -207,9 +229,7 @@ class DarwinContext:
             Dictionary with statistics.
         """
         try:
-            # If options are not loaded yet, try to load them first
-            if self.status not in ["loaded", "loading_background"]:
-                await self.client.load_options(force_refresh=False)
+            await self._ensure_loaded()
 
             return await self.client.get_statistics()
         except Exception as e:
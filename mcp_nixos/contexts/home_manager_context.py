@@ -3,13 +3,14 @@ Home Manager context for MCP server.
 """
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Optional
 
 # Get logger
 logger = logging.getLogger("mcp_nixos")
 
 # Import HomeManagerClient
 from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.utils.option_filters import filter_arguments
 
 
 class HomeManagerContext:
@@ -51,6 +52,15 @@ class HomeManagerContext:
         self.hm_client.invalidate_cache()
         logger.info("Home Manager data cache invalidated")
 
+    def _wait_for_load(self) -> None:
+        """Wait for data still loading in the background, at most the client's ready_timeout.
+
+        Returns as soon as the data is loaded or loading fails, so callers only
+        answer "still loading" once the deadline has passed.
+        """
+        if self.hm_client.loading_in_progress and not self.hm_client.is_loaded:
+            self.hm_client.ready.wait(self.hm_client.ready_timeout)
+
     def get_status(self) -> Dict[str, Any]:
         """Get the status of the Home Manager context."""
         try:
@@ -62,6 +72,10 @@ class HomeManagerContext:
                         "status": "ok",
                         "loaded": True,
                         "options_count": stats.get("total_options", 0),
+                        "generation": self.hm_client.get_generation_info(),
+                        "ready_wait": self.hm_client.ready.get_stats(),
+                        "source_digest_checks": self.hm_client.digest_stats.get_stats(),
+                        "search_result_cache": self.hm_client.result_cache.get_stats(),
                         "cache_stats": self.hm_client.cache.get_stats(),
                     }
                 elif self.hm_client.loading_error:
@@ -75,6 +89,7 @@ class HomeManagerContext:
                     return {
                         "status": "loading",
                         "loaded": False,
+                        "ready_wait": self.hm_client.ready.get_stats(),
                         "cache_stats": self.hm_client.cache.get_stats(),
                     }
         except Exception as e:
@@ -85,9 +100,16 @@ class HomeManagerContext:
                 "loaded": False,
             }
 
-    def search_options(self, query: str, limit: int = 10) -> Dict[str, Any]:
-        """Search for Home Manager options."""
-        # Check if client is still loading or has an error
+    def search_options(
+        self,
+        query: str,
+        limit: int = 10,
+        count_total: bool = True,
+        filters: Optional[Mapping[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Search for Home Manager options (see HomeManagerClient.search_options)."""
+        # Wait for a load in progress, then check if client is still loading or has an error
+        self._wait_for_load()
         if self.hm_client.loading_in_progress:
             logger.warning("Could not search options - data still loading")
             return {
@@ -109,7 +131,7 @@ class HomeManagerContext:
 
         try:
             # Try to search without forcing a load
-            return self.hm_client.search_options(query, limit)
+            return self.hm_client.search_options(query, limit, count_total=count_total, **filter_arguments(filters))
         except Exception as e:
             # Handle other exceptions
             logger.warning(f"Could not search options: {str(e)}")
@@ -123,7 +145,8 @@ class HomeManagerContext:
 
     def get_option(self, option_name: str) -> Dict[str, Any]:
         """Get information about a specific Home Manager option."""
-        # Check if client is still loading or has an error
+        # Wait for a load in progress, then check if client is still loading or has an error
+        self._wait_for_load()
         if self.hm_client.loading_in_progress:
             logger.warning("Could not get option - data still loading")
             return {
@@ -162,7 +185,8 @@ class HomeManagerContext:
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about Home Manager options."""
-        # Check if client is still loading or has an error
+        # Wait for a load in progress, then check if client is still loading or has an error
+        self._wait_for_load()
         if self.hm_client.loading_in_progress:
             logger.warning("Could not get stats - data still loading")
             return {
@@ -201,7 +225,8 @@ class HomeManagerContext:
 
     def get_options_list(self) -> Dict[str, Any]:
         """Get a hierarchical list of all top-level Home Manager options."""
-        # Check if client is still loading or has an error
+        # Wait for a load in progress, then check if client is still loading or has an error
+        self._wait_for_load()
         if self.hm_client.loading_in_progress:
             logger.warning("Could not get options list - data still loading")
             return {
@@ -281,9 +306,12 @@ class HomeManagerContext:
             logger.error(f"Error getting Home Manager options list: {str(e)}")
             return {"error": f"Failed to get options list: {str(e)}", "found": False}
 
-    def get_options_by_prefix(self, option_prefix: str) -> Dict[str, Any]:
-        """Get all options under a specific option prefix."""
-        # Check if client is still loading or has an error
+    def get_options_by_prefix(
+        self, option_prefix: str, filters: Optional[Mapping[str, Optional[str]]] = None
+    ) -> Dict[str, Any]:
+        """Get all options under a specific option prefix, passing the filters (type, source, category)."""
+        # Wait for a load in progress, then check if client is still loading or has an error
+        self._wait_for_load()
         if self.hm_client.loading_in_progress:
             logger.warning(f"Could not get options by prefix '{option_prefix}' - data still loading")
             return {
@@ -310,7 +338,7 @@ class HomeManagerContext:
         try:
             # Search with wildcard to get all options under this prefix
             search_query = f"{option_prefix}.*"
-            search_results = self.hm_client.search_options(search_query, limit=500)
+            search_results = self.hm_client.search_options(search_query, limit=500, **filter_arguments(filters))
 
             # Add found=False if not already present
             if "found" not in search_results:
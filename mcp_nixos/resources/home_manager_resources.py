@@ -1,7 +1,13 @@
 """
 MCP resources for Home Manager.
+
+Reading a resource can block while options load in the background: queries
+wait for the data (see HomeManagerContext._wait_for_load) and the status takes
+the loading lock. The registered handlers therefore run in a worker thread
+instead of on the event loop.
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, Callable
 
@@ -56,155 +62,163 @@ def register_home_manager_resources(mcp, get_home_manager_context: Callable[[],
 
     # Register status resource
     @mcp.resource("home-manager://status")
-    def home_manager_status_resource_handler():
-        return home_manager_status_resource(get_home_manager_context())
+    async def home_manager_status_resource_handler():
+        return await asyncio.to_thread(home_manager_status_resource, get_home_manager_context())
 
     # Register search options resource
     @mcp.resource("home-manager://search/options/{query}")
-    def home_manager_search_options_resource_handler(query: str):
-        return home_manager_search_options_resource(query, get_home_manager_context())
+    async def home_manager_search_options_resource_handler(query: str):
+        return await asyncio.to_thread(home_manager_search_options_resource, query, get_home_manager_context())
 
     # Register option resource
     @mcp.resource("home-manager://option/{option_name}")
-    def home_manager_option_resource_handler(option_name: str):
-        return home_manager_option_resource(option_name, get_home_manager_context())
+    async def home_manager_option_resource_handler(option_name: str):
+        return await asyncio.to_thread(home_manager_option_resource, option_name, get_home_manager_context())
 
     # Register stats resource
     @mcp.resource("home-manager://options/stats")
-    def home_manager_stats_resource_handler():
-        return home_manager_stats_resource(get_home_manager_context())
+    async def home_manager_stats_resource_handler():
+        return await asyncio.to_thread(home_manager_stats_resource, get_home_manager_context())
 
     # Register options list resource
     @mcp.resource("home-manager://options/list")
-    def home_manager_options_list_resource_handler():
-        return home_manager_options_list_resource(get_home_manager_context())
+    async def home_manager_options_list_resource_handler():
+        return await asyncio.to_thread(home_manager_options_list_resource, get_home_manager_context())
 
     # Register resource for programs
     @mcp.resource("home-manager://options/programs")
-    def home_manager_options_programs_handler():
-        return home_manager_options_by_prefix_resource("programs", get_home_manager_context())
+    async def home_manager_options_programs_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "programs", get_home_manager_context())
 
     # Register resource for services
     @mcp.resource("home-manager://options/services")
-    def home_manager_options_services_handler():
-        return home_manager_options_by_prefix_resource("services", get_home_manager_context())
+    async def home_manager_options_services_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "services", get_home_manager_context())
 
     # Register resource for home
     @mcp.resource("home-manager://options/home")
-    def home_manager_options_home_handler():
-        return home_manager_options_by_prefix_resource("home", get_home_manager_context())
+    async def home_manager_options_home_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "home", get_home_manager_context())
 
     # Register resource for accounts
     @mcp.resource("home-manager://options/accounts")
-    def home_manager_options_accounts_handler():
-        return home_manager_options_by_prefix_resource("accounts", get_home_manager_context())
+    async def home_manager_options_accounts_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "accounts", get_home_manager_context())
 
     # Register resource for fonts
     @mcp.resource("home-manager://options/fonts")
-    def home_manager_options_fonts_handler():
-        return home_manager_options_by_prefix_resource("fonts", get_home_manager_context())
+    async def home_manager_options_fonts_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "fonts", get_home_manager_context())
 
     # Register resource for gtk
     @mcp.resource("home-manager://options/gtk")
-    def home_manager_options_gtk_handler():
-        return home_manager_options_by_prefix_resource("gtk", get_home_manager_context())
+    async def home_manager_options_gtk_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "gtk", get_home_manager_context())
 
     # Register resource for qt
     @mcp.resource("home-manager://options/qt")
-    def home_manager_options_qt_handler():
-        return home_manager_options_by_prefix_resource("qt", get_home_manager_context())
+    async def home_manager_options_qt_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "qt", get_home_manager_context())
 
     # Register resource for xdg
     @mcp.resource("home-manager://options/xdg")
-    def home_manager_options_xdg_handler():
-        return home_manager_options_by_prefix_resource("xdg", get_home_manager_context())
+    async def home_manager_options_xdg_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "xdg", get_home_manager_context())
 
     # Register resource for wayland
     @mcp.resource("home-manager://options/wayland")
-    def home_manager_options_wayland_handler():
-        return home_manager_options_by_prefix_resource("wayland", get_home_manager_context())
+    async def home_manager_options_wayland_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "wayland", get_home_manager_context())
 
     # Register resource for i18n
     @mcp.resource("home-manager://options/i18n")
-    def home_manager_options_i18n_handler():
-        return home_manager_options_by_prefix_resource("i18n", get_home_manager_context())
+    async def home_manager_options_i18n_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "i18n", get_home_manager_context())
 
     # Register resource for manual
     @mcp.resource("home-manager://options/manual")
-    def home_manager_options_manual_handler():
-        return home_manager_options_by_prefix_resource("manual", get_home_manager_context())
+    async def home_manager_options_manual_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "manual", get_home_manager_context())
 
     # Register resource for news
     @mcp.resource("home-manager://options/news")
-    def home_manager_options_news_handler():
-        return home_manager_options_by_prefix_resource("news", get_home_manager_context())
+    async def home_manager_options_news_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "news", get_home_manager_context())
 
     # Register resource for nix
     @mcp.resource("home-manager://options/nix")
-    def home_manager_options_nix_handler():
-        return home_manager_options_by_prefix_resource("nix", get_home_manager_context())
+    async def home_manager_options_nix_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "nix", get_home_manager_context())
 
     # Register resource for nixpkgs
     @mcp.resource("home-manager://options/nixpkgs")
-    def home_manager_options_nixpkgs_handler():
-        return home_manager_options_by_prefix_resource("nixpkgs", get_home_manager_context())
+    async def home_manager_options_nixpkgs_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "nixpkgs", get_home_manager_context())
 
     # Register resource for systemd
     @mcp.resource("home-manager://options/systemd")
-    def home_manager_options_systemd_handler():
-        return home_manager_options_by_prefix_resource("systemd", get_home_manager_context())
+    async def home_manager_options_systemd_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "systemd", get_home_manager_context())
 
     # Register resource for targets
     @mcp.resource("home-manager://options/targets")
-    def home_manager_options_targets_handler():
-        return home_manager_options_by_prefix_resource("targets", get_home_manager_context())
+    async def home_manager_options_targets_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "targets", get_home_manager_context())
 
     # Register resource for dconf
     @mcp.resource("home-manager://options/dconf")
-    def home_manager_options_dconf_handler():
-        return home_manager_options_by_prefix_resource("dconf", get_home_manager_context())
+    async def home_manager_options_dconf_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "dconf", get_home_manager_context())
 
     # Register resource for editorconfig
     @mcp.resource("home-manager://options/editorconfig")
-    def home_manager_options_editorconfig_handler():
-        return home_manager_options_by_prefix_resource("editorconfig", get_home_manager_context())
+    async def home_manager_options_editorconfig_handler():
+        return await asyncio.to_thread(
+            home_manager_options_by_prefix_resource, "editorconfig", get_home_manager_context()
+        )
 
     # Register resource for lib
     @mcp.resource("home-manager://options/lib")
-    def home_manager_options_lib_handler():
-        return home_manager_options_by_prefix_resource("lib", get_home_manager_context())
+    async def home_manager_options_lib_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "lib", get_home_manager_context())
 
     # Register resource for launchd
     @mcp.resource("home-manager://options/launchd")
-    def home_manager_options_launchd_handler():
-        return home_manager_options_by_prefix_resource("launchd", get_home_manager_context())
+    async def home_manager_options_launchd_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "launchd", get_home_manager_context())
 
     # Register resource for pam
     @mcp.resource("home-manager://options/pam")
-    def home_manager_options_pam_handler():
-        return home_manager_options_by_prefix_resource("pam", get_home_manager_context())
+    async def home_manager_options_pam_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "pam", get_home_manager_context())
 
     # Register resource for sops
     @mcp.resource("home-manager://options/sops")
-    def home_manager_options_sops_handler():
-        return home_manager_options_by_prefix_resource("sops", get_home_manager_context())
+    async def home_manager_options_sops_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "sops", get_home_manager_context())
 
     # Register resource for windowManager
     @mcp.resource("home-manager://options/windowManager")
-    def home_manager_options_windowManager_handler():
-        return home_manager_options_by_prefix_resource("windowManager", get_home_manager_context())
+    async def home_manager_options_windowManager_handler():
+        return await asyncio.to_thread(
+            home_manager_options_by_prefix_resource, "windowManager", get_home_manager_context()
+        )
 
     # Register resource for xresources
     @mcp.resource("home-manager://options/xresources")
-    def home_manager_options_xresources_handler():
-        return home_manager_options_by_prefix_resource("xresources", get_home_manager_context())
+    async def home_manager_options_xresources_handler():
+        return await asyncio.to_thread(
+            home_manager_options_by_prefix_resource, "xresources", get_home_manager_context()
+        )
 
     # Register resource for xsession
     @mcp.resource("home-manager://options/xsession")
-    def home_manager_options_xsession_handler():
-        return home_manager_options_by_prefix_resource("xsession", get_home_manager_context())
+    async def home_manager_options_xsession_handler():
+        return await asyncio.to_thread(home_manager_options_by_prefix_resource, "xsession", get_home_manager_context())
 
     # Keep a generic endpoint for other prefixes and nested paths
     @mcp.resource("home-manager://options/prefix/{option_prefix}")
-    def home_manager_options_by_prefix_resource_handler(option_prefix: str):
-        return home_manager_options_by_prefix_resource(option_prefix, get_home_manager_context())
+    async def home_manager_options_by_prefix_resource_handler(option_prefix: str):
+        return await asyncio.to_thread(
+            home_manager_options_by_prefix_resource, option_prefix, get_home_manager_context()
+        )
@@ -35,6 +35,7 @@ Home Manager and nix-darwin documentation.
 
 import asyncio
 import os
+import pathlib
 import psutil
 import signal
 import sys
@@ -44,7 +45,9 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 
+from mcp_nixos.cache.mapped_index import MappedIndexStore
 from mcp_nixos.cache.simple_cache import SimpleCache  # noqa: F401
+from mcp_nixos.cache.write_behind import flush_write_behind
 from mcp_nixos.clients.darwin.darwin_client import DarwinClient  # noqa: F401
 
 # Compatibility imports for tests - these are used by tests
@@ -183,6 +186,10 @@ async def run_precache_async():
     else:
         logger.warning(f"Timed out after {max_wait_seconds}s waiting for Home Manager data to load")
 
+    # Make sure everything handed to the cache writer is on disk before exiting
+    logger.info("Flushing cache writes...")
+    await asyncio.to_thread(flush_write_behind, 60.0)
+
     logger.info("All initialization completed successfully")
     return True
 
@@ -199,6 +206,54 @@ def run_precache():
         return False
 
 
+def build_prebuilt_index(output_dir):
+    """Build the Home Manager and nix-darwin indexes ahead of time into a directory.
+
+    Data comes from the disk cache if it is fresh, otherwise from the web; an
+    existing prebuilt index is never used as the source. The directory can be
+    bundled into the package at mcp_nixos/data/prebuilt when it is built, or
+    pinned with MCP_NIXOS_PREBUILT_INDEX_DIR.
+
+    Args:
+        output_dir: Directory to write the index files to
+
+    Returns:
+        Per source, the number of options and the file written, or the error that stopped it
+    """
+    output_dir = pathlib.Path(output_dir)
+    logger.info(f"Building prebuilt indexes in {output_dir}")
+    results = {}
+
+    try:
+        hm_client = HomeManagerClient()
+        hm_client._load_data_internal(allow_prebuilt=False)
+        store = MappedIndexStore(output_dir, hm_client.cache_key)
+        if not hm_client._save_mapped_index(store=store):
+            raise RuntimeError(f"Could not write the index to {output_dir}")
+        results["home_manager"] = {"options": len(hm_client.options), "path": str(store.current_path())}
+    except Exception as e:
+        logger.error(f"Error building prebuilt Home Manager index: {e}")
+        results["home_manager"] = {"error": str(e)}
+
+    try:
+        darwin_client = DarwinClient()
+        asyncio.run(darwin_client.load_options(allow_prebuilt=False))
+        store = MappedIndexStore(output_dir, darwin_client.cache_key)
+        if not darwin_client._save_mapped_index(store=store):
+            raise RuntimeError(f"Could not write the index to {output_dir}")
+        results["darwin"] = {"options": len(darwin_client.options), "path": str(store.current_path())}
+    except Exception as e:
+        logger.error(f"Error building prebuilt nix-darwin index: {e}")
+        results["darwin"] = {"error": str(e)}
+
+    # Pages and data fetched for the build are kept in the disk cache too
+    flush_write_behind(60.0)
+    for source, result in results.items():
+        if "error" not in result:
+            logger.info(f"Prebuilt {source} index: {result['options']} options in {result['path']}")
+    return results
+
+
 # Define the lifespan context manager for app initialization
 @asynccontextmanager
 async def app_lifespan(mcp_server: FastMCP):
@@ -482,6 +537,12 @@ async def app_lifespan(mcp_server: FastMCP):
             except Exception:
                 pass  # Avoid cascading errors
 
+        # Persist cache writes still queued for the background writer thread
+        try:
+            await asyncio.to_thread(flush_write_behind, 5.0)
+        except Exception as e:
+            logger.error(f"Error flushing cache writes during shutdown: {e}")
+
         # Log shutdown duration
         shutdown_duration = time.time() - shutdown_start
         logger.info(f"Shutdown completed in {shutdown_duration:.2f}s")
@@ -5,6 +5,7 @@ from typing import Optional
 
 from mcp_nixos.contexts.darwin.darwin_context import DarwinContext
 from mcp_nixos.utils.helpers import get_context_or_fallback
+from mcp_nixos.utils.option_filters import describe_filters, filter_arguments
 
 logger = logging.getLogger(__name__)
 
@@ -33,8 +34,10 @@ def register_darwin_tools(context: Optional[DarwinContext] = None, mcp=None) ->
         )
 
         @mcp.tool("darwin_search")
-        async def darwin_search_handler(query: str, limit: int = 20):
-            return await darwin_search(query, limit, context)
+        async def darwin_search_handler(
+            query: str, limit: int = 20, option_type: Optional[str] = None, category: Optional[str] = None
+        ):
+            return await darwin_search(query, limit, context, option_type, category)
 
         @mcp.tool("darwin_info")
         async def darwin_info_handler(name: str):
@@ -49,18 +52,28 @@ def register_darwin_tools(context: Optional[DarwinContext] = None, mcp=None) ->
             return await darwin_list_options(context)
 
         @mcp.tool("darwin_options_by_prefix")
-        async def darwin_options_by_prefix_handler(option_prefix: str):
-            return await darwin_options_by_prefix(option_prefix, context)
-
-
-async def darwin_search(query: str, limit: int = 20, context: Optional[DarwinContext] = None) -> str:
+        async def darwin_options_by_prefix_handler(
+            option_prefix: str, option_type: Optional[str] = None, category: Optional[str] = None
+        ):
+            return await darwin_options_by_prefix(option_prefix, context, option_type, category)
+
+
+async def darwin_search(
+    query: str,
+    limit: int = 20,
+    context: Optional[DarwinContext] = None,
+    option_type: Optional[str] = None,
+    category: Optional[str] = None,
+) -> str:
     """
     Search for nix-darwin options.
 
     Args:
-        query: The search term
+        query: The search term (may be empty when filtering)
         limit: Maximum number of results to return (default: 20)
         context: Optional context object for dependency injection in tests
+        option_type: Only options of this type (e.g. "boolean", "package")
+        category: Only options under this top-level name (e.g. "system", "services")
 
     Returns:
         Results formatted as text
@@ -70,12 +83,17 @@ async def darwin_search(query: str, limit: int = 20, context: Optional[DarwinCon
         if not ctx:
             return "Error: no Darwin context available"
 
-        results = await ctx.search_options(query, limit=limit)
+        filters = {"type": option_type, "category": category}
+        filtered = describe_filters(filters)
+        results = await ctx.search_options(query, limit=limit, **filter_arguments(filters))
 
         if not results:
-            return f"No nix-darwin options found matching '{query}'."
+            matching = f" with {filtered}" if filtered else ""
+            return f"No nix-darwin options found matching '{query}'{matching}."
 
         output = [f"## Search results for '{query}' in nix-darwin options\n"]
+        if filtered:
+            output.append(f"Filtered by {filtered}\n")
 
         for option in results:
             name = option.get("name", "")
@@ -240,13 +258,20 @@ async def darwin_list_options(context: Optional[DarwinContext] = None) -> str:
         return f"Error listing nix-darwin option categories: {e}"
 
 
-async def darwin_options_by_prefix(option_prefix: str, context: Optional[DarwinContext] = None) -> str:
+async def darwin_options_by_prefix(
+    option_prefix: str,
+    context: Optional[DarwinContext] = None,
+    option_type: Optional[str] = None,
+    category: Optional[str] = None,
+) -> str:
     """
     Get all nix-darwin options under a specific prefix.
 
     Args:
         option_prefix: The option prefix to search for (e.g., "programs", "services")
         context: Optional context object for dependency injection in tests
+        option_type: Only options of this type (e.g. "boolean")
+        category: Only options under this top-level name
 
     Returns:
         Formatted list of options under the given prefix
@@ -256,12 +281,17 @@ async def darwin_options_by_prefix(option_prefix: str, context: Optional[DarwinC
         if not ctx:
             return "Error: no Darwin context available"
 
-        options = await ctx.get_options_by_prefix(option_prefix)
+        filters = {"type": option_type, "category": category}
+        filtered = describe_filters(filters)
+        options = await ctx.get_options_by_prefix(option_prefix, **filter_arguments(filters))
 
         if not options:
-            return f"No nix-darwin options found with prefix '{option_prefix}'."
+            matching = f" and {filtered}" if filtered else ""
+            return f"No nix-darwin options found with prefix '{option_prefix}'{matching}."
 
         output = [f"## nix-darwin options with prefix '{option_prefix}'"]
+        if filtered:
+            output.append(f"Filtered by {filtered}")
         output.append(f"Found {len(options)} options.")
         output.append("")
 
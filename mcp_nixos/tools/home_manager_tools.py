@@ -10,9 +10,38 @@ logger = logging.getLogger("mcp_nixos")
 
 # Import utility functions
 from mcp_nixos.utils.helpers import create_wildcard_query
+from mcp_nixos.utils.option_filters import describe_filters, filter_arguments
+from mcp_nixos.utils.readiness import ReadinessEvent
 
 
-def home_manager_search(query: str, limit: int = 20, context=None) -> str:
+def pending_sources_note(result: Dict[str, Any]) -> str:
+    """Note for results answered before every Home Manager documentation source was loaded.
+
+    Args:
+        result: A search, lookup or prefix result from the Home Manager context
+
+    Returns:
+        The note, or an empty string if every source was loaded
+    """
+    pending = result.get("pending_sources")
+    if not pending:
+        return ""
+    if result.get("pending_error"):
+        return (
+            f"Note: failed to load {', '.join(pending)} ({result['pending_error']}); "
+            "options from there are not included.\n\n"
+        )
+    return f"Note: still loading {', '.join(pending)}; options from there are not included yet.\n\n"
+
+
+def home_manager_search(
+    query: str,
+    limit: int = 20,
+    context=None,
+    option_type: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+) -> str:
     """
     Search for Home Manager options.
 
@@ -20,11 +49,16 @@ def home_manager_search(query: str, limit: int = 20, context=None) -> str:
         query: The search term
         limit: Maximum number of results to return (default: 20)
         context: Optional context object for dependency injection in tests
+        option_type: Only options of this type (e.g. "boolean", "package")
+        source: Only options from this documentation page ("options", "nixos-options", "nix-darwin-options")
+        category: Only options in this category
 
     Returns:
         Results formatted as text
     """
     logger.info(f"Searching for Home Manager options with query '{query}'")
+    filters = {"type": option_type, "source": source, "category": category}
+    filtered = describe_filters(filters)
 
     # Import needed modules here to avoid circular imports
     import importlib
@@ -56,7 +90,7 @@ def home_manager_search(query: str, limit: int = 20, context=None) -> str:
                 real_context = get_home_manager_context()
                 if real_context is None:
                     return "Error: Home Manager context not available"
-                results = real_context.search_options(query, limit)
+                results = real_context.search_options(query, limit, count_total=False, **filter_arguments(filters))
             except Exception as e:
                 logger.error(f"Error getting Home Manager context when called with string context: {e}")
                 return f"Error: Could not search for '{query}': {str(e)}"
@@ -65,14 +99,16 @@ def home_manager_search(query: str, limit: int = 20, context=None) -> str:
             if context is None:
                 return "Error: Home Manager context not available"
 
-            results = context.search_options(query, limit)
+            results = context.search_options(query, limit, count_total=False, **filter_arguments(filters))
 
+        # The total match count is not shown, so the search need not compute it
         options = results.get("options", [])
 
         if not options:
             if "error" in results:
                 return f"Error: {results['error']}"
-            return f"No Home Manager options found for '{query}'."
+            matching = f" with {filtered}" if filtered else ""
+            return pending_sources_note(results) + f"No Home Manager options found for '{query}'{matching}."
 
         # Sort and prioritize results by relevance:
         # 1. Exact matches
@@ -103,7 +139,15 @@ def home_manager_search(query: str, limit: int = 20, context=None) -> str:
         # Reassemble in priority order
         prioritized_options = exact_matches + starts_with_matches + contains_matches + other_matches
 
-        output = f"Found {len(prioritized_options)} Home Manager options for '{query}':\n\n"
+        output = f"Found {len(prioritized_options)} Home Manager options for '{query}'"
+        output += f" with {filtered}:\n\n" if filtered else ":\n\n"
+        output += pending_sources_note(results)
+        # Misspelled words were searched as their corrections, so match programs against those too
+        corrections = results.get("corrections") or {}
+        query_terms = " ".join([query.lower(), *corrections.values()])
+        if corrections:
+            corrected = ", ".join(f"{word} -> {correction}" for word, correction in corrections.items())
+            output += f"Corrected spelling: {corrected}\n\n"
 
         # First, extract any program-specific options, identified by their path
         program_options = {}
@@ -123,7 +167,7 @@ def home_manager_search(query: str, limit: int = 20, context=None) -> str:
 
         # First show program-specific options if the search seems to be for a program
         if program_options and (
-            query.lower().startswith("program") or any(prog.lower() in query.lower() for prog in program_options.keys())
+            query.lower().startswith("program") or any(prog.lower() in query_terms for prog in program_options.keys())
         ):
             for program, options_list in sorted(program_options.items()):
                 output += f"## programs.{program}\n\n"
@@ -260,6 +304,7 @@ def home_manager_info(name: str, context=None) -> str:
 
         if not info.get("found", False):
             output = f"# Option '{name}' not found\n\n"
+            output += pending_sources_note(info)
 
             if "suggestions" in info:
                 output += "Did you mean one of these options?\n\n"
@@ -638,18 +683,31 @@ def home_manager_list_options(context=None) -> str:
         return f"Error retrieving options list: {str(e)}"
 
 
-def home_manager_options_by_prefix(option_prefix: str, context=None) -> str:
+def home_manager_options_by_prefix(
+    option_prefix: str,
+    context=None,
+    option_type: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+) -> str:
     """
     Get all Home Manager options under a specific prefix.
 
     Args:
         option_prefix: The option prefix to search for (e.g., "programs", "programs.git")
         context: Optional context object for dependency injection in tests
+        option_type: Only options of this type (e.g. "boolean", "package")
+        source: Only options from this documentation page ("options", "nixos-options", "nix-darwin-options")
+        category: Only options in this category
 
     Returns:
         Formatted list of options under the given prefix
     """
     logger.info(f"Getting Home Manager options by prefix '{option_prefix}'")
+    filters = {"type": option_type, "source": source, "category": category}
+    filtered = describe_filters(filters)
+    not_found = f"No Home Manager options found with prefix '{option_prefix}'"
+    not_found += f" and {filtered}." if filtered else "."
 
     # Import needed modules here to avoid circular imports
     import importlib
@@ -675,7 +733,7 @@ def home_manager_options_by_prefix(option_prefix: str, context=None) -> str:
                 real_context = get_home_manager_context()
                 if real_context is None:
                     return f"Error: Home Manager context not available for prefix '{option_prefix}'"
-                result = real_context.get_options_by_prefix(option_prefix)
+                result = real_context.get_options_by_prefix(option_prefix, **filter_arguments(filters))
             except Exception as e:
                 logger.error(f"Error getting Home Manager context when called with string context: {e}")
                 return f"Error: Could not get options by prefix '{option_prefix}': {str(e)}"
@@ -684,20 +742,23 @@ def home_manager_options_by_prefix(option_prefix: str, context=None) -> str:
             if context is None:
                 return f"Error: Home Manager context not available for prefix '{option_prefix}'"
 
-            result = context.get_options_by_prefix(option_prefix)
+            result = context.get_options_by_prefix(option_prefix, **filter_arguments(filters))
 
         if not result.get("found", False):
             if "error" in result:
-                return f"Error: {result['error']}"
-            return f"No Home Manager options found with prefix '{option_prefix}'."
+                return pending_sources_note(result) + f"Error: {result['error']}"
+            return not_found
 
         options = result.get("options", [])
 
         if not options:
-            return f"No Home Manager options found with prefix '{option_prefix}'."
+            return not_found
 
         output = f"# Home Manager Options: {option_prefix}\n\n"
+        if filtered:
+            output += f"Filtered by {filtered}\n\n"
         output += f"Found {len(options)} options\n\n"
+        output += pending_sources_note(result)
 
         # Organize options by next hierarchical level
         if "." in option_prefix:
@@ -944,6 +1005,27 @@ def check_home_manager_ready(ctx) -> Optional[Dict[str, Any]]:
     return None
 
 
+async def wait_for_home_manager_ready(ctx) -> Optional[Dict[str, Any]]:
+    """Check if Home Manager client is ready, first waiting for data that is still loading.
+
+    The wait ends as soon as the data is loaded or loading fails, or after the
+    client's ready_timeout; only then is a "still loading" error returned.
+
+    Args:
+        ctx: The request context or context string from MCP
+
+    Returns:
+        Dict with error message if not ready, None if ready
+    """
+    if not isinstance(ctx, str) and hasattr(ctx, "request_context") and check_request_ready(ctx):
+        home_manager_context = ctx.request_context.lifespan_context.get("home_manager_context")
+        client = getattr(home_manager_context, "hm_client", None)
+        ready = getattr(client, "ready", None)
+        if isinstance(ready, ReadinessEvent) and not client.is_loaded and client.loading_in_progress:
+            await ready.wait_async(client.ready_timeout)
+    return check_home_manager_ready(ctx)
+
+
 def register_home_manager_tools(mcp) -> None:
     """
     Register all Home Manager tools with the MCP server.
@@ -953,12 +1035,22 @@ def register_home_manager_tools(mcp) -> None:
     """
 
     @mcp.tool()
-    async def home_manager_search(ctx, query: str, limit: int = 20) -> str:
+    async def home_manager_search(
+        ctx,
+        query: str,
+        limit: int = 20,
+        option_type: Optional[str] = None,
+        source: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> str:
         """Search for Home Manager options.
 
         Args:
             query: The search term
             limit: Maximum number of results to return (default: 20)
+            option_type: Only options of this type (e.g. "boolean", "package", "null or string")
+            source: Only options from this documentation page ("options", "nixos-options", "nix-darwin-options")
+            category: Only options in this category
 
         Returns:
             Results formatted as text
@@ -966,7 +1058,7 @@ def register_home_manager_tools(mcp) -> None:
         logger.info(f"Home Manager search request: query='{query}', limit={limit}")
 
         # Check if Home Manager is ready
-        ready_check = check_home_manager_ready(ctx)
+        ready_check = await wait_for_home_manager_ready(ctx)
         if ready_check:
             logger.warning(f"Home Manager search blocked: {ready_check['error']}")
             return ready_check["error"]
@@ -978,7 +1070,7 @@ def register_home_manager_tools(mcp) -> None:
                 # Access the correct function (not this decorated function)
                 from mcp_nixos.tools.home_manager_tools import home_manager_search as search_func
 
-                result = search_func(query, limit, ctx)
+                result = search_func(query, limit, ctx, option_type, source, category)
                 return result
 
             # Regular request context from server
@@ -986,7 +1078,7 @@ def register_home_manager_tools(mcp) -> None:
             # Access the correct function (not this decorated function)
             from mcp_nixos.tools.home_manager_tools import home_manager_search as search_func
 
-            result = search_func(query, limit, home_ctx)
+            result = search_func(query, limit, home_ctx, option_type, source, category)
             return result
         except Exception as e:
             error_msg = f"Error during Home Manager search: {str(e)}"
@@ -1006,7 +1098,7 @@ def register_home_manager_tools(mcp) -> None:
         logger.info(f"Home Manager info request: name='{name}'")
 
         # Check if Home Manager is ready
-        ready_check = check_home_manager_ready(ctx)
+        ready_check = await wait_for_home_manager_ready(ctx)
         if ready_check:
             logger.warning(f"Home Manager info blocked: {ready_check['error']}")
             return ready_check["error"]
@@ -1042,7 +1134,7 @@ def register_home_manager_tools(mcp) -> None:
         logger.info("Home Manager stats request")
 
         # Check if Home Manager is ready
-        ready_check = check_home_manager_ready(ctx)
+        ready_check = await wait_for_home_manager_ready(ctx)
         if ready_check:
             logger.warning(f"Home Manager stats blocked: {ready_check['error']}")
             return ready_check["error"]
@@ -1078,7 +1170,7 @@ def register_home_manager_tools(mcp) -> None:
         logger.info("Home Manager list options request")
 
         # Check if Home Manager is ready
-        ready_check = check_home_manager_ready(ctx)
+        ready_check = await wait_for_home_manager_ready(ctx)
         if ready_check:
             logger.warning(f"Home Manager list options blocked: {ready_check['error']}")
             return ready_check["error"]
@@ -1105,11 +1197,20 @@ def register_home_manager_tools(mcp) -> None:
             return error_msg
 
     @mcp.tool()
-    async def home_manager_options_by_prefix(ctx, option_prefix: str) -> str:
+    async def home_manager_options_by_prefix(
+        ctx,
+        option_prefix: str,
+        option_type: Optional[str] = None,
+        source: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> str:
         """Get all Home Manager options under a specific prefix.
 
         Args:
             option_prefix: The option prefix to search for (e.g., "programs", "programs.git")
+            option_type: Only options of this type (e.g. "boolean" for the enable options)
+            source: Only options from this documentation page ("options", "nixos-options", "nix-darwin-options")
+            category: Only options in this category
 
         Returns:
             Formatted list of options under the given prefix
@@ -1117,7 +1218,7 @@ def register_home_manager_tools(mcp) -> None:
         logger.info(f"Home Manager options by prefix request: option_prefix='{option_prefix}'")
 
         # Check if Home Manager is ready
-        ready_check = check_home_manager_ready(ctx)
+        ready_check = await wait_for_home_manager_ready(ctx)
         if ready_check:
             logger.warning(f"Home Manager options by prefix blocked: {ready_check['error']}")
             return ready_check["error"]
@@ -1129,14 +1230,14 @@ def register_home_manager_tools(mcp) -> None:
                 # Access the correct function (not this decorated function)
                 from mcp_nixos.tools.home_manager_tools import home_manager_options_by_prefix as options_by_prefix_func
 
-                result = options_by_prefix_func(option_prefix, ctx)
+                result = options_by_prefix_func(option_prefix, ctx, option_type, source, category)
                 return result
 
             # Regular request context from server
             home_ctx = ctx.request_context.lifespan_context.get("home_manager_context")
             from mcp_nixos.tools.home_manager_tools import home_manager_options_by_prefix as options_by_prefix_func
 
-            result = options_by_prefix_func(option_prefix, home_ctx)
+            result = options_by_prefix_func(option_prefix, home_ctx, option_type, source, category)
             return result
         except Exception as e:
             error_msg = f"Error during Home Manager options by prefix: {str(e)}"
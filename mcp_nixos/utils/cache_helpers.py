@@ -466,14 +466,14 @@ def atomic_write(
 
 
 def write_with_metadata(
-    file_path: Union[str, pathlib.Path], content: str, metadata: Optional[Dict[str, Any]] = None
+    file_path: Union[str, pathlib.Path], content: Union[str, bytes], metadata: Optional[Dict[str, Any]] = None
 ) -> bool:
     """
     Write content to a file with associated metadata in a separate metadata file.
 
     Args:
         file_path: Path to the target file
-        content: Content string to write
+        content: Content string (or bytes, written in binary mode) to write
         metadata: Optional metadata dictionary to write alongside the content
 
     Returns:
@@ -490,7 +490,12 @@ def write_with_metadata(
         metadata["creation_timestamp"] = time.time()
 
     # Write main content file
-    content_written = atomic_write(path, lambda f: cast(None, f.write(content)))
+    def write_content(f):
+        f.write(content)
+
+    if isinstance(content, bytes):
+        write_content.mode = "wb"  # type: ignore
+    content_written = atomic_write(path, write_content)
 
     # Write metadata file
     metadata_written = atomic_write(meta_path, lambda f: cast(None, f.write(json.dumps(metadata, indent=2))))
@@ -498,12 +503,15 @@ def write_with_metadata(
     return content_written and metadata_written
 
 
-def read_with_metadata(file_path: Union[str, pathlib.Path]) -> Tuple[Optional[str], Dict[str, Any]]:
+def read_with_metadata(
+    file_path: Union[str, pathlib.Path], binary: bool = False
+) -> Tuple[Optional[Union[str, bytes]], Dict[str, Any]]:
     """
     Read content from a file along with its associated metadata file if it exists.
 
     Args:
         file_path: Path to the file to read
+        binary: Return the content as bytes instead of text
 
     Returns:
         Tuple of (content, metadata) where content is the file content and
@@ -517,7 +525,7 @@ def read_with_metadata(file_path: Union[str, pathlib.Path]) -> Tuple[Optional[st
     try:
         # Read main content with file locking to prevent reading during writes
         if path.exists():
-            with open(path, "r") as f:
+            with open(path, "rb" if binary else "r") as f:
                 if lock_file(f, exclusive=False, blocking=False):
                     try:
                         content = f.read()
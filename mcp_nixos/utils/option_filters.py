@@ -0,0 +1,107 @@
+"""
+Secondary indexes for filtering options by type, source and category.
+
+Each option is filed under one (field, value) key per filtered field, with the
+value normalized (lowercased, whitespace collapsed), so "null or package" and
+"Null or  package" are the same key. A filtered query intersects the postings
+of its keys, smallest first, and then intersects the result with the names
+the query matched in the other indexes, so filters never go through the
+options themselves.
+"""
+
+from typing import Any, Callable, Collection, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Key of the secondary index: field name and normalized value
+FilterKey = Tuple[str, str]
+
+
+def normalize_filter_value(value: Any) -> str:
+    """Normalized form of an option field value, as indexed and as looked up."""
+    return " ".join(str(value).lower().split())
+
+
+def filter_keys(filters: Optional[Mapping[str, Optional[str]]], fields: Collection[str]) -> List[FilterKey]:
+    """
+    Index keys for the filters of a query.
+
+    Args:
+        filters: Field name to required value; empty values are ignored
+        fields: The fields the index was built on
+
+    Returns:
+        The keys, in the order given
+
+    Raises:
+        ValueError: If a filter names a field that is not indexed
+    """
+    keys = []
+    for field, value in (filters or {}).items():
+        if value is None or not str(value).strip():
+            continue
+        if field not in fields:
+            raise ValueError(f"Cannot filter by '{field}'; filters are {', '.join(fields)}")
+        keys.append((field, normalize_filter_value(value)))
+    return keys
+
+
+def filtered_names(postings: Mapping[FilterKey, Iterable[str]], keys: List[FilterKey]) -> Set[str]:
+    """
+    Names filed under every one of the keys.
+
+    Args:
+        postings: The secondary index (a PostingLists, mapped postings or a dict of sets)
+        keys: Keys from filter_keys
+
+    Returns:
+        The names; empty if any key has no options at all
+    """
+    if not keys or any(key not in postings for key in keys):
+        return set()
+    intersect = getattr(postings, "intersect", None)
+    if intersect is not None:
+        return intersect(keys)
+    ordered = sorted((postings[key] for key in keys), key=len)
+    return set(ordered[0]).intersection(*ordered[1:])
+
+
+def names_under_prefix(
+    prefix: str, count: int, names: Callable[[], Iterable[str]], allowed: Set[str], include_prefix: bool = True
+) -> List[str]:
+    """
+    Names under a dotted prefix that are also among the allowed names, in name order.
+
+    Whichever side is smaller is scanned: the names under the prefix are checked
+    against the allowed set, or the allowed names against the prefix. The names
+    under the prefix are only listed in the first case.
+
+    Args:
+        prefix: The prefix, matching names that continue it with "."
+        count: Number of names under the prefix
+        names: Lists the names under the prefix, in name order
+        allowed: Names passing the filters
+        include_prefix: Whether the option named by the prefix itself counts as under it
+    """
+    if count <= len(allowed):
+        return [name for name in names() if name in allowed]
+    child_prefix = prefix + "."
+    return sorted(name for name in allowed if name.startswith(child_prefix) or (include_prefix and name == prefix))
+
+
+def filter_arguments(filters: Optional[Mapping[str, Optional[str]]]) -> Dict[str, Dict[str, str]]:
+    """
+    Keyword arguments passing the non-empty filters of a tool call on to a context or client.
+
+    Args:
+        filters: Field name to required value
+
+    Returns:
+        ``{"filters": {...}}``, or no arguments at all when nothing is filtered,
+        so unfiltered calls stay exactly as they were
+    """
+    given = {field: value for field, value in (filters or {}).items() if value and value.strip()}
+    return {"filters": given} if given else {}
+
+
+def describe_filters(filters: Optional[Mapping[str, Optional[str]]]) -> str:
+    """Filters as text for result headings and messages, e.g. "type 'boolean', source 'options'"."""
+    return ", ".join(f"{field} '{value}'" for field, value in (filters or {}).items() if value and value.strip())
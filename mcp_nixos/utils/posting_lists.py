@@ -0,0 +1,251 @@
+"""
+Word postings as sorted arrays of option IDs.
+
+Every option name is given an integer ID, and each word keeps the IDs of the
+options under it in a sorted ``array("I")``: four bytes per posting instead
+of a hash-table slot and a reference per posting in a set of names. Names
+get increasing IDs as they are added, so building an index only ever
+appends to the arrays.
+
+Postings are intersected as ID arrays, and only the IDs in the result are
+turned back into names. With the optional NumPy package the intersections
+are vectorized; without it, a short list is searched into a long one by
+bisection, and lists of similar size are intersected as sets of IDs.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any, Collection, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy  # type: ignore
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+# A list this many times shorter than the other is searched into it rather than intersected as a set
+BISECT_RATIO = 16
+
+
+def numpy_available() -> bool:
+    """Return True if the numpy package is installed."""
+    return numpy is not None
+
+
+def _intersect_pair(first: Collection[int], second: Sequence[int], is_sorted: bool = True) -> Collection[int]:
+    """
+    IDs in both of two posting lists, the shorter one first.
+
+    Args:
+        first: The shorter list, or the intersection so far
+        second: The longer list
+        is_sorted: Whether the longer list is in ascending order (lists of mapped index files need not be)
+    """
+    if numpy is not None:
+        small = first if isinstance(first, numpy.ndarray) else numpy.frombuffer(first, dtype=numpy.uint32)
+        large = numpy.frombuffer(second, dtype=numpy.uint32)
+        if not is_sorted:
+            large = numpy.sort(large)
+        if not len(small) or not len(large):
+            return small[:0]
+        positions = numpy.searchsorted(large, small)
+        positions[positions == len(large)] = 0
+        return small[large[positions] == small]
+    if is_sorted and len(first) * BISECT_RATIO < len(second):
+        found = []
+        for option_id in first:
+            position = bisect_left(second, option_id)
+            if position < len(second) and second[position] == option_id:
+                found.append(option_id)
+        return found
+    return (first if isinstance(first, set) else set(first)).intersection(second)
+
+
+def intersect_ids(postings: Iterable[Sequence[int]], is_sorted: bool = True) -> Collection[int]:
+    """
+    IDs in every one of the posting lists, in no particular order.
+
+    Lists are intersected from the shortest up, so every intermediate result is
+    at most as long as the shortest list, and the intersection stops as soon as
+    it is empty.
+
+    Args:
+        postings: Posting lists of option IDs
+        is_sorted: Whether the lists are in ascending order
+    """
+    ordered = sorted(postings, key=len)
+    if not ordered:
+        return ()
+    result: Collection[int] = ordered[0]
+    for ids in ordered[1:]:
+        result = _intersect_pair(result, ids, is_sorted)
+        if not len(result):
+            break
+    return result
+
+
+class PostingLists(Mapping):
+    """
+    Mapping from key (a word, or a field value) to the names indexed under it, stored as sorted option ID arrays.
+
+    ``postings["git"]`` is a new set of names. The lists are changed only through
+    add and discard. copy() shares the arrays with the copy until either one
+    changes them, so a successor generation copies only the lists it writes.
+    An index read from a snapshot keeps its lists packed in one array and
+    slices a list out as it is read, until the first change unpacks them all.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._postings: Dict[Hashable, array] = {}
+        self._names: List[Optional[str]] = []  # Name by ID; None once forgotten
+        self._ids: Dict[str, int] = {}
+        self._owned: Optional[Set[Hashable]] = None  # Keys whose arrays this copy may change; None if all
+        # Key positions, list offsets and IDs of packed lists, with _postings and _ids empty; None once unpacked
+        self._packed: Optional[Tuple[Dict[Hashable, int], Sequence[int], array]] = None
+
+    @classmethod
+    def from_ids(cls, names: Sequence[str], postings: Iterable[Any]) -> "PostingLists":
+        """
+        Index postings given as positions in a list of names.
+
+        Args:
+            names: The option names; a name's position is its ID
+            postings: (word, positions) pairs, positions in any order
+        """
+        index = cls()
+        index._names = list(names)
+        index._ids = {name: option_id for option_id, name in enumerate(index._names)}
+        index._postings = {key: array("I", sorted(ids)) for key, ids in postings}
+        return index
+
+    @classmethod
+    def from_packed(
+        cls, names: Sequence[str], keys: Sequence[Hashable], offsets: Sequence[int], postings: array
+    ) -> "PostingLists":
+        """
+        Index postings packed one after another into a single array, as a snapshot stores them.
+
+        Loading takes one dict of the keys; no list is copied until it is read.
+
+        Args:
+            names: The option names; a name's position is its ID
+            keys: The keys, in the order of their lists
+            offsets: Start of every key's list in ``postings``, followed by the end of the last one
+            postings: The lists of IDs, each in ascending order
+        """
+        index = cls()
+        index._names = list(names)
+        index._packed = (dict(zip(keys, range(len(keys)))), offsets, postings)
+        return index
+
+    def _unpack(self) -> None:
+        """Copy packed lists out into arrays of their own, before the first change."""
+        if self._packed is None:
+            return
+        positions, offsets, postings = self._packed
+        self._postings = {
+            key: postings[offsets[position] : offsets[position + 1]] for key, position in positions.items()
+        }
+        self._ids = {name: option_id for option_id, name in enumerate(self._names) if name is not None}
+        self._packed = None
+
+    @classmethod
+    def from_names(cls, postings: Mapping[Any, Iterable[str]]) -> "PostingLists":
+        """Index a mapping of word to names, such as another PostingLists or a mapped index's postings."""
+        members_by_key = [(key, postings[key]) for key in postings]
+        names = sorted({name for _, members in members_by_key for name in members})
+        option_ids = {name: option_id for option_id, name in enumerate(names)}
+        return cls.from_ids(names, ((key, map(option_ids.__getitem__, members)) for key, members in members_by_key))
+
+    def copy(self) -> "PostingLists":
+        """A copy sharing this index's arrays until either one changes them."""
+        successor = PostingLists()
+        successor._postings = dict(self._postings)
+        successor._names = list(self._names)
+        successor._ids = dict(self._ids)
+        successor._owned = set()
+        successor._packed = self._packed
+        if self._owned is not None:
+            self._owned.clear()  # Arrays written from now on are shared with the copy
+        else:
+            self._owned = set()
+        return successor
+
+    def _writable(self, key: Hashable) -> array:
+        """The array under a key, copied first if it is still shared, or a new empty one."""
+        self._unpack()
+        ids = self._postings.get(key)
+        if ids is None:
+            ids = self._postings[key] = array("I")
+        elif self._owned is not None and key not in self._owned:
+            ids = self._postings[key] = array("I", ids)
+        if self._owned is not None:
+            self._owned.add(key)
+        return ids
+
+    def add(self, key: Hashable, name: str) -> None:
+        """Index a name under a key."""
+        option_id = self._ids.get(name)
+        if option_id is None:
+            option_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        ids = self._writable(key)
+        if not ids or ids[-1] < option_id:
+            ids.append(option_id)  # Always the case while an index is built
+            return
+        position = bisect_left(ids, option_id)
+        if ids[position] != option_id:
+            ids.insert(position, option_id)
+
+    def discard(self, key: Hashable, name: str) -> None:
+        """Remove a name from a key, dropping the key once no name is left under it."""
+        self._unpack()
+        option_id = self._ids.get(name)
+        if option_id is None or key not in self._postings:
+            return
+        ids = self._postings[key]
+        position = bisect_left(ids, option_id)
+        if position == len(ids) or ids[position] != option_id:
+            return
+        if len(ids) == 1:
+            del self._postings[key]
+            return
+        del self._writable(key)[position]
+
+    def forget(self, name: str) -> None:
+        """Release the ID of a name no longer under any key; if it comes back it gets a new one."""
+        self._unpack()
+        option_id = self._ids.pop(name, None)
+        if option_id is not None:
+            self._names[option_id] = None
+
+    def ids(self, key: Hashable) -> Optional[array]:
+        """Option IDs under a key, in ascending order, or None if the key is not in the index."""
+        if self._packed is None:
+            return self._postings.get(key)
+        positions, offsets, postings = self._packed
+        position = positions.get(key)
+        if position is None:
+            return None
+        return postings[offsets[position] : offsets[position + 1]]
+
+    def intersect(self, keys: Iterable[Hashable]) -> Set[str]:
+        """Names under every one of the keys that is in the index (other keys are ignored)."""
+        postings = [ids for ids in map(self.ids, keys) if ids is not None]
+        return set(map(self._names.__getitem__, intersect_ids(postings)))  # type: ignore[arg-type]
+
+    def __getitem__(self, key: Hashable) -> Set[str]:
+        ids = self.ids(key)
+        if ids is None:
+            raise KeyError(key)
+        return set(map(self._names.__getitem__, ids))  # type: ignore[arg-type]
+
+    def __contains__(self, key: object) -> bool:
+        return key in (self._postings if self._packed is None else self._packed[0])
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._postings if self._packed is None else self._packed[0])
+
+    def __len__(self) -> int:
+        return len(self._postings if self._packed is None else self._packed[0])
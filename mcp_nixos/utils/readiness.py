@@ -0,0 +1,145 @@
+"""
+Readiness signal for data that loads in the background.
+
+Home Manager options load in a thread and nix-darwin options in an asyncio
+task. Requests that arrive meanwhile used to be answered with "still loading,
+try again", which assistants then retried blindly. A ReadinessEvent lets them
+wait instead: threads block on wait(), coroutines await wait_async() without
+blocking the event loop, and both return as soon as the loader calls set() -
+from whichever thread it runs in - or when the deadline passes. Time spent
+waiting is recorded per wait.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("mcp_nixos")
+
+# Seconds a request waits for data still loading before it gets a "still loading" answer
+DEFAULT_READY_TIMEOUT = 10.0
+
+
+def ready_timeout() -> float:
+    """Deadline for waiting on loading data, from MCP_NIXOS_READY_TIMEOUT (0 answers at once)."""
+    try:
+        return max(0.0, float(os.environ.get("MCP_NIXOS_READY_TIMEOUT", DEFAULT_READY_TIMEOUT)))
+    except ValueError:
+        logger.warning("Invalid MCP_NIXOS_READY_TIMEOUT, using default")
+        return DEFAULT_READY_TIMEOUT
+
+
+class ReadinessEvent:
+    """
+    Event set once a load has settled, that threads can wait on and coroutines can await.
+
+    The event is set both when data is published and when loading fails, so
+    waiters wake up either way and check the outcome themselves.
+    """
+
+    def __init__(self, name: str = "data"):
+        """
+        Initialize an unset event.
+
+        Args:
+            name: What is being loaded, for log messages
+        """
+        self.name = name
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._stats = {"waits": 0, "timeouts": 0, "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0}
+
+    def is_set(self) -> bool:
+        """Whether the load has settled."""
+        return self._event.is_set()
+
+    def set(self) -> None:
+        """Mark the load as settled and wake every waiter; safe to call from any thread."""
+        with self._lock:
+            self._event.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # The waiter's loop has been closed
+                pass
+
+    def clear(self) -> None:
+        """Mark a new load as started."""
+        self._event.clear()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block the calling thread until the load settles.
+
+        Args:
+            timeout: Seconds to wait at most (None waits indefinitely)
+
+        Returns:
+            Whether the load settled in time
+        """
+        if self._event.is_set():
+            return True
+        start = time.monotonic()
+        settled = self._event.wait(timeout)
+        self._record(time.monotonic() - start, settled)
+        return settled
+
+    async def wait_async(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the load to settle without blocking the event loop.
+
+        Args:
+            timeout: Seconds to wait at most (None waits indefinitely)
+
+        Returns:
+            Whether the load settled in time
+        """
+        if self._event.is_set():
+            return True
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self._event.is_set():
+                return True
+            self._waiters.append(waiter)
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout)
+            settled = True
+        except asyncio.TimeoutError:
+            settled = False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._record(time.monotonic() - start, settled)
+        return settled
+
+    def _record(self, elapsed: float, settled: bool) -> None:
+        with self._lock:
+            self._stats["waits"] += 1
+            self._stats["timeouts"] += not settled
+            self._stats["total_wait"] += elapsed
+            self._stats["max_wait"] = max(self._stats["max_wait"], elapsed)
+            self._stats["last_wait"] = elapsed
+        outcome = "ready" if settled else "still loading"
+        logger.info(f"Waited {elapsed:.3f}s for {self.name}: {outcome}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Number of waits and timeouts, and the total, longest and most recent wait in seconds."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["average_wait"] = stats["total_wait"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,49 @@
+"""
+Content digests of the documentation pages an index was built from.
+
+An index snapshot records the SHA-256 digest of every page it was parsed from.
+When the snapshot's TTL has expired and a page is downloaded again, the new
+copy is compared by digest: if every page is byte-identical, the snapshot is
+renewed instead of parsing the pages and building the index again. This
+covers servers that do not answer conditional requests with 304 Not
+Modified, or whose ETag changes with every deployment.
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+
+def content_digest(content: str) -> str:
+    """SHA-256 digest of a page's content, as stored with index snapshots."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class DigestStats:
+    """Counts of downloaded pages found unchanged by digest (hits) or changed (misses)."""
+
+    def __init__(self):
+        """Initialize empty counts."""
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {"hits": 0, "misses": 0, "last_result": None, "last_url": None}
+
+    def record(self, hit: bool, url: Optional[str] = None) -> None:
+        """
+        Count one comparison of a downloaded page with the digest stored for it.
+
+        Args:
+            hit: Whether the digests matched
+            url: The page compared
+        """
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+            self._stats["last_result"] = "hit" if hit else "miss"
+            self._stats["last_url"] = url
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Number of hits and misses, the hit ratio, and the most recent result."""
+        with self._lock:
+            stats = dict(self._stats)
+        checks = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / checks if checks else 0.0
+        return stats
@@ -91,6 +91,7 @@ def test_simple_cache_time_shift():
 
 
 @skip_in_ci
+@pytest.mark.usefixtures("synchronous_cache")
 def test_html_cache_time_shift():
     """
     Test HTMLCache behavior when system time shifts forward.
@@ -160,6 +161,7 @@ def test_html_cache_time_shift():
 
 
 @skip_in_ci
+@pytest.mark.usefixtures("synchronous_cache")
 def test_html_client_time_shift(real_cache_dir):
     """
     Test HTMLClient behavior when system time shifts forward.
@@ -271,6 +273,7 @@ def test_multiple_time_checks():
 
 
 @skip_in_ci
+@pytest.mark.usefixtures("synchronous_cache")
 def test_mixed_time_sources():
     """
     Test cache behavior when different time sources are used.
@@ -335,6 +338,7 @@ def test_mixed_time_sources():
 
 
 @skip_in_ci
+@pytest.mark.usefixtures("synchronous_cache")
 def test_cache_timestamp_storage_resilience():
     """
     Test that cache entries are resilient to time shifts with the new implementation.
@@ -43,6 +43,7 @@ def concurrent_cache_dir():
 
 
 @skip_in_ci
+@pytest.mark.usefixtures("synchronous_cache")
 def test_concurrent_html_cache_writes(concurrent_cache_dir):
     """
     Test that multiple threads can write to the same HTMLCache without corruption.
@@ -248,6 +249,7 @@ def test_concurrent_html_client_requests(concurrent_cache_dir):
 
 
 @skip_in_ci
+@pytest.mark.usefixtures("synchronous_cache", "uncompressed_cache")
 def test_atomic_file_operations(concurrent_cache_dir):
     """
     Test atomic file operations in the cache to prevent partial reads/writes.
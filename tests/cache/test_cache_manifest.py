@@ -0,0 +1,344 @@
+"""Tests for the cache manifest and size-capped LRU eviction."""
+
+import pathlib
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.cache.manifest import CacheManifest
+
+
+class TestCacheManifest:
+    """Tests for the CacheManifest class."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name) / CacheManifest.FILENAME
+        self.manifest = CacheManifest(self.path)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def test_totals(self):
+        """Test that running totals follow records and removals."""
+        self.manifest.record("html", "a", 100, files=2, has_meta=True)
+        self.manifest.record("data", "b", 50)
+        self.manifest.record("html", "a", 120, files=2, has_meta=True)  # Rewrite
+
+        stats = self.manifest.stats()
+        assert stats == {
+            "entries": 2,
+            "files": 3,
+            "meta_files": 1,
+            "size_bytes": 170,
+            "counts": {"html": 1, "data": 1},
+        }
+
+        self.manifest.remove("html", "a")
+        assert self.manifest.stats()["size_bytes"] == 50
+        assert self.manifest.stats()["counts"]["html"] == 0
+
+    def test_select_victims_in_lru_order(self):
+        """Test that the least recently used entries are selected first."""
+        for name in ("a", "b", "c"):
+            self.manifest.record("html", name, 100)
+        self.manifest.touch("html", "a")
+
+        assert self.manifest.select_victims(200) == [("html", "b")]
+        assert self.manifest.select_victims(100) == [("html", "b"), ("html", "c")]
+        assert self.manifest.select_victims(100, protect=("html", "b")) == [("html", "c"), ("html", "a")]
+        assert self.manifest.select_victims(1000) == []
+
+    def test_save_and_load_access_times(self):
+        """Test persisting access times."""
+        self.manifest.record("html", "a", 10, last_access=1.0)
+        self.manifest.record("data", "b", 10, last_access=2.0)
+        assert self.manifest.save()
+
+        loaded = CacheManifest(self.path).load_access_times()
+        assert loaded == {("html", "a"): 1.0, ("data", "b"): 2.0}
+
+    def test_unreadable_manifest_is_ignored(self):
+        """Test that a corrupt manifest file is ignored."""
+        self.path.write_text("not json")
+        assert self.manifest.load_access_times() == {}
+
+    def test_saves_merge_with_other_processes(self):
+        """Test that manifests sharing a file keep each other's entries and removals."""
+        other = CacheManifest(self.path)
+        self.manifest.record("html", "a", 10, last_access=1.0)
+        self.manifest.record("html", "b", 10, last_access=2.0)
+        assert self.manifest.save()
+
+        assert other.load()
+        other.record("data", "c", 20, last_access=3.0)
+        other.remove("html", "b")
+        other.touch("html", "a")
+        assert other.save()
+
+        self.manifest.record("binary", "d", 30, last_access=4.0)
+        assert self.manifest.save()
+        assert list(self.manifest._entries) == [("data", "c"), ("binary", "d"), ("html", "a")]
+        assert self.manifest.stats()["size_bytes"] == 60
+        assert set(CacheManifest(self.path).load_access_times()) == {("html", "a"), ("data", "c"), ("binary", "d")}
+
+    def test_older_format_is_rebuilt(self):
+        """Test that a manifest in the previous format is not adopted, but its access times are kept."""
+        self.path.write_text('{"version": 1, "entries": [["html", "a", 5.0]]}')
+        assert not self.manifest.load()
+        assert self.manifest.load_access_times() == {("html", "a"): 5.0}
+
+    def test_reconcile_keeps_recent_changes(self):
+        """Test that a walk drops missing entries and adds untracked ones, but not those changed meanwhile."""
+        self.manifest.record("html", "gone", 10, last_access=1.0)
+        self.manifest.record("html", "kept", 10, last_access=2.0)
+        started = time.time()
+        self.manifest.record("html", "new", 10)  # Written while the walk ran
+        found = [(("html", "kept"), {"size": 15, "files": 2, "meta": True, "last_access": 0.5})]
+        found.append((("data", "untracked"), {"size": 5, "files": 1, "meta": False, "last_access": 1.5}))
+        self.manifest.reconcile(found, started, self.manifest.epoch)
+        assert list(self.manifest._entries) == [("data", "untracked"), ("html", "kept"), ("html", "new")]
+        assert self.manifest.stats()["size_bytes"] == 30
+
+        epoch = self.manifest.epoch
+        self.manifest.clear()
+        self.manifest.reconcile(found, started, epoch)
+        assert len(self.manifest) == 0
+
+    def test_save_does_not_recreate_removed_directory(self):
+        """Test that saving after the cache directory is gone is a no-op."""
+        self.manifest.record("html", "a", 10)
+        self.temp_dir.cleanup()
+        assert self.manifest.save() is False
+        assert not self.path.parent.exists()
+
+
+class TestHTMLCacheEviction:
+    """Tests for HTMLCache disk budget enforcement."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.temp_dir.name
+        self.content = "x" * 1000
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _cache(self, max_size_bytes=0, **kwargs):
+        # Written synchronously, so sizes and evictions are counted as soon as set() returns
+        kwargs.setdefault("write_behind", False)
+        return HTMLCache(cache_dir=self.cache_dir, ttl=3600, max_size_bytes=max_size_bytes, **kwargs)
+
+    def test_get_stats_does_not_walk_directory(self):
+        """Test that statistics come from the manifest."""
+        cache = self._cache(compression="none")
+        cache.set("https://example.com/a", self.content)
+        cache.set_data("key", {"x": 1})
+
+        with mock.patch.object(pathlib.Path, "glob", side_effect=AssertionError("directory walked")):
+            stats = cache.get_stats()
+
+        assert stats["html_count"] == 1
+        assert stats["data_count"] == 1
+        assert stats["file_count"] == 3  # .html, .html.meta, .data.json
+        assert stats["meta_count"] == 1
+        assert stats["cache_size_bytes"] >= 1000
+
+    def test_evicts_least_recently_used(self):
+        """Test that exceeding the budget evicts the least recently used entry."""
+        cache = self._cache()
+        for name in ("a", "b", "c"):
+            cache.set(f"https://example.com/{name}", self.content)
+        # Room for the three entries but not a fourth
+        cache.max_size_bytes = cache.get_stats()["cache_size_bytes"] + 100
+        cache.get("https://example.com/a")  # "b" is now the least recently used
+        cache.set("https://example.com/d", self.content)
+
+        assert cache.get("https://example.com/b")[0] is None
+        assert not cache._get_cache_path("https://example.com/b").exists()
+        assert not pathlib.Path(f"{cache._get_cache_path('https://example.com/b')}.meta").exists()
+        for name in ("a", "c", "d"):
+            assert cache.get(f"https://example.com/{name}")[0] == self.content
+
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["html_count"] == 3
+        assert stats["cache_size_bytes"] <= cache.max_size_bytes
+
+    def test_entry_larger_than_budget_is_kept(self):
+        """Test that the entry just written is never evicted by its own write."""
+        cache = self._cache(max_size_bytes=10)
+        cache.set("https://example.com/a", self.content)
+        cache.set("https://example.com/b", self.content)
+
+        assert cache.get("https://example.com/a")[0] is None
+        assert cache.get("https://example.com/b")[0] == self.content
+
+    def test_unlimited_budget(self):
+        """Test that a budget of zero disables eviction."""
+        cache = self._cache(max_size_bytes=0)
+        for i in range(5):
+            cache.set(f"https://example.com/{i}", self.content)
+        assert cache.get_stats()["evictions"] == 0
+        assert cache.get_stats()["html_count"] == 5
+
+    def test_budget_from_environment(self):
+        """Test reading the budget from MCP_NIXOS_CACHE_MAX_SIZE_MB."""
+        with mock.patch.dict("os.environ", {"MCP_NIXOS_CACHE_MAX_SIZE_MB": "1.5"}):
+            cache = HTMLCache(cache_dir=self.cache_dir)
+        assert cache.max_size_bytes == int(1.5 * 1024**2)
+
+    def test_manifest_survives_restart(self):
+        """Test that access order persists across cache instances."""
+        cache = self._cache()
+        cache.set("https://example.com/a", self.content)
+        time.sleep(0.01)
+        cache.set("https://example.com/b", self.content)
+        time.sleep(0.01)
+        cache.get("https://example.com/a")
+        cache.close()
+
+        restarted = self._cache()
+        assert restarted.get_stats()["html_count"] == 2
+        victims = restarted.manifest.select_victims(restarted.manifest.total_bytes - 1)
+        assert victims == [("html", restarted._hash_key("https://example.com/b"))]
+
+    def test_rebuild_picks_up_external_changes(self):
+        """Test that a new instance reconciles the manifest with the directory."""
+        cache = self._cache()
+        cache.set("https://example.com/a", self.content)
+        cache.set("https://example.com/b", self.content)
+        cache._get_cache_path("https://example.com/a").unlink()
+
+        restarted = self._cache()
+        assert restarted.manifest_ready.wait(5)
+        stats = restarted.get_stats()
+        assert stats["html_count"] == 1
+        assert stats["file_count"] == 2  # Orphaned sidecars are not entries
+
+    def test_startup_does_not_wait_for_walk(self):
+        """Test that a restart adopts the saved manifest and walks the directory in the background."""
+        cache = self._cache()
+        cache.set("https://example.com/a", self.content)
+        cache.close()
+        (pathlib.Path(self.cache_dir) / "untracked.html").write_text(self.content)
+
+        walked = threading.Event()
+        release = threading.Event()
+        walk = HTMLCache._walk_entries
+
+        def slow_walk(*args):
+            walked.set()
+            release.wait(5)
+            walk(*args)
+
+        with mock.patch.object(HTMLCache, "_walk_entries", slow_walk):
+            restarted = self._cache()
+            assert walked.wait(5)
+            assert restarted.get_stats()["html_count"] == 1  # From the manifest while the walk is running
+            release.set()
+            assert restarted.manifest_ready.wait(5)
+        assert restarted.get_stats()["html_count"] == 2
+
+    def test_stats_wait_for_walk_without_manifest(self):
+        """Test that without a saved manifest, statistics count what the startup walk finds."""
+        (pathlib.Path(self.cache_dir) / "untracked.html").write_text(self.content)
+        walk = HTMLCache._walk_entries
+
+        def slow_walk(*args):
+            time.sleep(0.2)
+            walk(*args)
+
+        with mock.patch.object(HTMLCache, "_walk_entries", slow_walk):
+            restarted = self._cache()
+            assert not restarted.manifest_adopted
+            assert restarted.get_stats()["html_count"] == 1
+
+    def test_writes_save_manifest_once(self):
+        """Test that a burst of writes saves the manifest once, after the delay."""
+        cache = self._cache()
+        assert cache.manifest_ready.wait(5)
+        cache.manifest.save()  # The one scheduled by the startup walk
+        cache.manifest.save_delay = 0.2
+        with mock.patch.object(cache.manifest, "save", wraps=cache.manifest.save) as save:
+            for i in range(20):
+                cache.set(f"https://example.com/{i}", self.content)
+            assert save.call_count == 0
+            time.sleep(0.5)
+            assert save.call_count == 1
+        assert len(CacheManifest(cache.manifest.path).load_access_times()) == 20
+
+    def test_clear_resets_manifest(self):
+        """Test that clearing the cache empties the manifest."""
+        cache = self._cache()
+        cache.set("https://example.com/a", self.content)
+        result = cache.clear()
+
+        assert result["files_removed"] == 2
+        assert cache.get_stats()["file_count"] == 0
+        assert cache.get_stats()["cache_size_bytes"] == 0
+
+    def test_detail_files_are_entries(self):
+        """Test that detail files count against the budget, are evicted by LRU and found again on restart."""
+        cache = self._cache()
+        cache.set("https://example.com/a", self.content)
+        assert cache.set_details("other-0.details", [b"d" * 1000])["stored"]
+        assert not cache.set_details("../other.details", [b"d"])["stored"]
+        assert cache.get_stats()["details_count"] == 1
+
+        restarted = self._cache()
+        assert restarted.manifest_ready.wait(5)
+        assert restarted.get_stats()["details_count"] == 1
+        restarted.get("https://example.com/a")  # The detail file is now the least recently used
+        restarted.max_size_bytes = restarted.get_stats()["cache_size_bytes"] + 100
+        restarted.set("https://example.com/b", self.content)
+
+        assert restarted.get_details_path("other-0.details") is None
+        assert not (restarted.details_dir / "other-0.details").exists()
+        assert restarted.get_stats()["details_count"] == 0
+        assert restarted.get("https://example.com/a")[0] == self.content
+
+    def test_detail_files_written_behind(self):
+        """Test that detail files go through the write-behind queue."""
+        cache = self._cache(write_behind=True)
+        result = cache.set_details("other-0.details", [b"d" * 10])
+        assert result["stored"] and result["pending_write"]
+        assert cache.get_details_path("other-0.details").read_bytes() == b"d" * 10
+        assert cache.get_stats()["details_count"] == 1
+
+    def test_sqlite_backend_clears_detail_files(self):
+        """Test that detail files are kept in files by the SQLite backend and removed by clear()."""
+        cache = self._cache(backend="sqlite")
+        try:
+            cache.set_details("other-0.details", [b"d" * 10])
+            assert cache.get_details_path("other-0.details").is_file()
+            cache.clear()
+            assert cache.get_details_path("other-0.details") is None
+            assert cache.get_stats()["details_count"] == 0
+        finally:
+            cache.close()
+
+    def test_sqlite_backend_eviction(self):
+        """Test that the SQLite backend evicts rows over budget."""
+        cache = self._cache(backend="sqlite", compression="none")
+        try:
+            cache.set("https://example.com/a", self.content)
+            cache.max_size_bytes = cache.get_stats()["cache_size_bytes"] + 10
+            cache.set("https://example.com/b", self.content)
+
+            assert cache.get("https://example.com/a")[0] is None
+            assert cache.get("https://example.com/b")[0] == self.content
+            assert cache.store.stats()["entries"] == 1
+        finally:
+            cache.close()
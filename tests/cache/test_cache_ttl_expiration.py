@@ -22,6 +22,7 @@ def real_cache_dir():
         yield temp_dir
 
 
+@pytest.mark.usefixtures("synchronous_cache")
 def test_html_cache_ttl_expiration(real_cache_dir):
     """
     Test that HTMLCache properly respects TTL expiration.
@@ -84,6 +85,7 @@ def test_html_cache_ttl_expiration(real_cache_dir):
         new_cache._is_expired = original_is_expired
 
 
+@pytest.mark.usefixtures("synchronous_cache")
 def test_html_client_ttl_expiration(real_cache_dir):
     """
     Test that HTMLClient properly reloads content when cache TTL expires.
@@ -0,0 +1,196 @@
+"""Tests for compressed cache storage."""
+
+import json
+import os
+import pathlib
+import tempfile
+from collections import defaultdict
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache import compression
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.utils.cache_helpers import atomic_write
+
+
+class TestCodecs:
+    """Tests for the compression helpers."""
+
+    def test_gzip_roundtrip(self):
+        """Test compressing and decompressing with gzip."""
+        data = b"<html>" + b"option " * 1000 + b"</html>"
+        payload = compression.compress(data, compression.GZIP)
+        assert len(payload) < len(data)
+        assert compression.detect_codec(payload) == compression.GZIP
+        assert compression.decompress(payload, compression.GZIP) == data
+
+    def test_zstd_roundtrip(self):
+        """Test compressing and decompressing with zstd when available."""
+        pytest.importorskip("zstandard")
+        data = b"option " * 1000
+        payload = compression.compress(data, compression.ZSTD)
+        assert compression.detect_codec(payload) == compression.ZSTD
+        assert compression.decompress(payload, compression.ZSTD) == data
+
+    def test_identity_passthrough(self):
+        """Test that uncompressed payloads are returned unchanged."""
+        assert compression.compress(b"{}", compression.IDENTITY) == b"{}"
+        assert compression.decompress(b"{}") == b"{}"
+
+    def test_magic_bytes_win_over_tag(self):
+        """Test that a stale codec tag does not break decoding."""
+        payload = compression.compress(b"data", compression.GZIP)
+        assert compression.decompress(payload, compression.IDENTITY) == b"data"
+        assert compression.decompress(b"data", compression.GZIP) == b"data"
+
+    def test_resolve_codec(self):
+        """Test resolving configured compression settings."""
+        assert compression.resolve_codec("none") == compression.IDENTITY
+        assert compression.resolve_codec("gzip") == compression.GZIP
+        assert compression.resolve_codec("bogus") == compression.GZIP
+
+        expected_auto = compression.ZSTD if compression.zstd_available() else compression.GZIP
+        assert compression.resolve_codec("auto") == expected_auto
+
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_CACHE_COMPRESSION": "gzip"}):
+            assert compression.resolve_codec() == compression.GZIP
+
+    def test_zstd_falls_back_without_package(self):
+        """Test that requesting zstd without zstandard uses gzip."""
+        with mock.patch.object(compression, "zstandard", None):
+            assert compression.resolve_codec("zstd") == compression.GZIP
+            assert compression.resolve_codec("auto") == compression.GZIP
+
+
+class TestCompressedHTMLCache:
+    """Tests for HTMLCache with compression enabled."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.temp_dir.name
+        # Written synchronously, so the compressed files can be inspected as soon as set() returns
+        self.cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, compression="gzip", write_behind=False)
+        self.url = "https://example.com/options.xhtml"
+        self.content = "<html><body>" + "<dt>programs.git.enable</dt><dd>Whether to enable Git.</dd>" * 200 + "</html>"
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def _read_meta(self, path: pathlib.Path):
+        with open(f"{path}.meta") as f:
+            return json.load(f)
+
+    def test_html_is_compressed(self):
+        """Test that HTML content is stored compressed and read back transparently."""
+        self.cache.set(self.url, self.content)
+
+        cache_path = self.cache._get_cache_path(self.url)
+        raw = cache_path.read_bytes()
+        assert compression.detect_codec(raw) == compression.GZIP
+        assert len(raw) < len(self.content) / 10
+        assert self._read_meta(cache_path)["codec"] == compression.GZIP
+
+        content, metadata = self.cache.get(self.url)
+        assert content == self.content
+        assert metadata["codec"] == compression.GZIP
+
+    def test_data_is_compressed(self):
+        """Test that structured data is stored compressed with a codec sidecar."""
+        data = {"options": {f"opt{i}": {"description": "text " * 20} for i in range(100)}}
+        self.cache.set_data("key", data)
+
+        cache_path = self.cache._get_data_cache_path("key")
+        assert compression.detect_codec(cache_path.read_bytes()) == compression.GZIP
+        assert self._read_meta(cache_path)["codec"] == compression.GZIP
+
+        loaded, metadata = self.cache.get_data("key")
+        assert loaded["options"] == data["options"]
+        assert metadata["cache_hit"] is True
+
+    def test_binary_data_is_compressed(self):
+        """Test that binary data is stored compressed."""
+        data = {"index": defaultdict(set, {f"word{i}": {"a", "b"} for i in range(100)})}
+        self.cache.set_binary_data("key", data)
+
+        cache_path = self.cache._get_binary_data_cache_path("key")
+        assert compression.detect_codec(cache_path.read_bytes()) == compression.GZIP
+
+        loaded, metadata = self.cache.get_binary_data("key")
+        assert loaded["index"]["word1"] == {"a", "b"}
+        assert metadata["cache_hit"] is True
+
+    @pytest.mark.parametrize("kind", ["data", "binary"])
+    def test_sidecar_follows_data(self, kind):
+        """Test that the sidecar is written after the data, and not at all if the data write fails."""
+        cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, compression="gzip", write_behind=False)
+        store = cache.set_data if kind == "data" else cache.set_binary_data
+        cache_path = cache._get_data_cache_path("key") if kind == "data" else cache._get_binary_data_cache_path("key")
+        written = []
+        real_atomic_write = atomic_write
+
+        def record(path, write_func, *args, **kwargs):
+            written.append(pathlib.Path(path).name)
+            return real_atomic_write(path, write_func, *args, **kwargs)
+
+        with mock.patch("mcp_nixos.cache.html_cache.atomic_write", side_effect=record):
+            assert store("key", {"x": 1})["stored"]
+        assert written == [cache_path.name, f"{cache_path.name}.meta"]
+
+        cache.invalidate_data("key")
+        with mock.patch("mcp_nixos.cache.html_cache.atomic_write", return_value=False):
+            assert not store("key", {"x": 2})["stored"]
+        assert not cache_path.exists() and not pathlib.Path(f"{cache_path}.meta").exists()
+        cache.close()
+
+    def test_reads_uncompressed_entries(self):
+        """Test that entries written without compression remain readable."""
+        plain = HTMLCache(cache_dir=self.cache_dir, ttl=3600, compression="none", write_behind=False)
+        plain.set(self.url, self.content)
+        plain.set_data("key", {"x": 1})
+        plain.set_binary_data("key", {"s": {1}})
+
+        assert self.cache.get(self.url)[0] == self.content
+        assert self.cache.get_data("key")[0]["x"] == 1
+        assert self.cache.get_binary_data("key")[0]["s"] == {1}
+
+    def test_uncompressed_data_is_compact(self):
+        """Test that uncompressed JSON snapshots are written without indentation."""
+        plain = HTMLCache(cache_dir=self.cache_dir, ttl=3600, compression="none", write_behind=False)
+        plain.set_data("key", {"a": [1, 2]})
+        assert b"\n" not in plain._get_data_cache_path("key").read_bytes()
+
+    def test_sqlite_backend_compresses(self):
+        """Test that the SQLite backend stores compressed rows."""
+        cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, backend="sqlite", compression="gzip", write_behind=False)
+        try:
+            cache.set(self.url, self.content)
+            cache.set_data("key", {"x": 1})
+
+            raw, metadata, _ = cache.store.read("html", cache._hash_key(self.url))
+            assert compression.detect_codec(raw) == compression.GZIP
+            assert metadata["codec"] == compression.GZIP
+
+            assert cache.get(self.url)[0] == self.content
+            assert cache.get_data("key")[0]["x"] == 1
+        finally:
+            cache.close()
+
+    def test_sqlite_migrates_compressed_entries(self):
+        """Test that compressed file entries migrate with their creation timestamps."""
+        self.cache.set_data("key", {"x": 1})
+        created = self._read_meta(self.cache._get_data_cache_path("key"))["creation_timestamp"]
+
+        cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, backend="sqlite", compression="gzip")
+        try:
+            data, metadata = cache.get_data("key")
+            assert data["x"] == 1
+            assert metadata["creation_timestamp"] == pytest.approx(created)
+        finally:
+            cache.close()
@@ -164,6 +164,7 @@ class TestCrossplatformIntegration:
 class TestMultithreadingCache:
     """Tests for cache behavior in multithreaded scenarios."""
 
+    @pytest.mark.usefixtures("synchronous_cache")
     def test_concurrent_cache_access(self):
         """Test that cache can be safely accessed from multiple threads."""
         with tempfile.TemporaryDirectory() as temp_dir:
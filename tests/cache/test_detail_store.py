@@ -0,0 +1,202 @@
+"""Tests for option details kept in an append-only file."""
+
+import os
+import pathlib
+import tempfile
+import threading
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.detail_store import (
+    DetailStore,
+    detail_cache_size,
+    encode_details,
+    lazy_details_enabled,
+    save_details,
+)
+from mcp_nixos.cache.html_cache import HTMLCache
+
+FIELDS = ("default", "example")
+
+
+class TestDetailStore:
+    """Tests for DetailStore."""
+
+    def setup_method(self):
+        """Set up a store in its own directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = DetailStore(FIELDS, pathlib.Path(self.temp_dir.name), cache_size=2)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that entries read back as written, including None and non-ASCII text."""
+        entries = [self.store.append(values) for values in [("false", None), ("", '{ x = "ü ✓"; }\n'), (None, None)]]
+        assert entries == [0, 1, 2]
+        assert self.store.read(1) == ("", '{ x = "ü ✓"; }\n')
+        assert self.store.read(0) == ("false", None)
+        assert self.store.append(("after", "a read")) == 3  # Appends after reads go to the end
+        assert self.store.read(3) == ("after", "a read")
+        assert self.store.read(2) == (None, None)
+        assert len(self.store) == 4
+        with pytest.raises(IndexError):
+            self.store.read(4)
+        with pytest.raises(ValueError):
+            self.store.append(("too few",))
+
+    def test_lru_cache(self):
+        """Test that recently read entries are answered from memory and the oldest one is evicted."""
+        for i in range(3):
+            self.store.append((str(i), None))
+        self.store.read(0)
+        self.store.read(1)
+        self.store.read(0)  # Hit; entry 1 is now the least recently used
+        self.store.read(2)  # Evicts entry 1
+        self.store.read(0)
+        self.store.read(1)
+        assert self.store.stats() == {
+            "entries": 3,
+            "bytes": self.store.stats()["bytes"],
+            "cached": 2,
+            "hits": 2,
+            "misses": 4,
+            "hit_ratio": 2 / 6,
+        }
+
+    def test_no_cache(self):
+        """Test that a cache size of 0 reads every entry from the file."""
+        store = DetailStore(FIELDS, cache_size=0)
+        store.append(("a", "b"))
+        assert store.read(0) == store.read(0) == ("a", "b")
+        assert store.stats()["misses"] == 2 and store.stats()["cached"] == 0
+        store.close()
+
+    def test_file_has_no_name(self):
+        """Test that the file leaves nothing behind in the directory, even while open."""
+        self.store.append(("a", "b"))
+        assert os.listdir(self.temp_dir.name) == []
+
+    def test_concurrent_reads_and_appends(self):
+        """Test that reads see consistent entries while another thread appends."""
+        for i in range(100):
+            self.store.append((str(i), f"example {i}"))
+        errors = []
+
+        def append():
+            for i in range(100, 600):
+                self.store.append((str(i), f"example {i}"))
+
+        def read():
+            for i in range(2000):
+                entry = i % 100
+                if self.store.read(entry) != (str(entry), f"example {entry}"):
+                    errors.append(entry)
+
+        threads = [threading.Thread(target=append), threading.Thread(target=read), threading.Thread(target=read)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert [self.store.read(entry) for entry in (100, 599)] == [("100", "example 100"), ("599", "example 599")]
+
+    def test_for_cache(self):
+        """Test that the file goes to the cache directory, and a store that cannot be created is None."""
+        cache = HTMLCache(cache_dir=self.temp_dir.name)
+        with mock.patch("tempfile.TemporaryFile", wraps=tempfile.TemporaryFile) as create:
+            store = DetailStore.for_cache(cache, FIELDS)
+        assert store is not None and create.call_args.kwargs["dir"] == cache.cache_dir
+        store.close()
+        assert DetailStore.for_cache(None, FIELDS) is not None  # In the system temp directory
+        with mock.patch("tempfile.TemporaryFile", side_effect=OSError("read-only")):
+            assert DetailStore.for_cache(cache, FIELDS) is None
+
+    def test_settings(self):
+        """Test the environment settings."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_LAZY_DETAILS": "false", "MCP_NIXOS_DETAIL_CACHE_SIZE": "7"}):
+            assert not lazy_details_enabled()
+            assert detail_cache_size() == 7
+            assert DetailStore(FIELDS).cache_size == 7
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_DETAIL_CACHE_SIZE": "many"}):
+            assert detail_cache_size() == 128
+        with mock.patch.dict(os.environ, {}, clear=True):
+            assert lazy_details_enabled()
+
+
+class TestDetailFile:
+    """Tests for details saved with a snapshot and reopened by later loads."""
+
+    def setup_method(self):
+        """Set up a directory for the detail files."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.temp_dir.name)
+        self.entries = [(str(i), f"example ✓ {i}" if i % 2 else None) for i in range(5)]
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _write(self, entries):
+        name, content = encode_details("kind", FIELDS, entries)
+        path = self.directory / name
+        path.write_bytes(b"".join(content))
+        return path
+
+    def test_reopened_entries(self):
+        """Test that a reopened file reads its entries, and appends go to a temporary file of the store."""
+        path = self._write(self.entries)
+        size = path.stat().st_size
+        store = DetailStore.open(path, FIELDS, 5, directory=self.directory, cache_size=0)
+        assert store.path == path and len(store) == 5
+        assert [store.read(entry) for entry in (4, 0, 1)] == [self.entries[4], self.entries[0], self.entries[1]]
+        with pytest.raises(IndexError):
+            store.read(5)
+        assert store.append(("appended", None)) == 5
+        assert store.read(5) == ("appended", None) and store.read(3) == self.entries[3]
+        assert len(store) == 6 and path.stat().st_size == size
+        store.close()
+
+    def test_unusable_files(self):
+        """Test that missing, different and truncated files are not reopened."""
+        path = self._write(self.entries)
+        assert DetailStore.open(self.directory / "missing.details", FIELDS, 5) is None
+        assert DetailStore.open(path, FIELDS, 4) is None
+        assert DetailStore.open(path, ("default", "declared_by"), 5) is None
+        path.write_bytes(path.read_bytes()[:-1])
+        assert DetailStore.open(path, FIELDS, 5) is None
+        with pytest.raises(ValueError):
+            encode_details("kind", FIELDS, [("too few",)])
+
+    def test_versions(self):
+        """Test that equal details share a file, and only the newest file and the one before it are kept."""
+        cache = HTMLCache(cache_dir=self.temp_dir.name, write_behind=False)
+        first = save_details(cache, "kind", FIELDS, self.entries)
+        assert save_details(cache, "kind", FIELDS, self.entries) == first
+        names = [first]
+        for i in range(3):
+            os.utime(cache.details_dir / names[-1], (i, i))  # Older than the next one
+            names.append(save_details(cache, "kind", FIELDS, self.entries[i:]))
+        assert sorted(path.name for path in cache.details_dir.glob("kind-*.details")) == sorted(names[-2:])
+        assert cache.get_stats()["details_count"] == 2
+
+    def test_saved_for_a_cache(self):
+        """Test that a cache's details go to its details directory, unless lazy details are off."""
+        cache = HTMLCache(cache_dir=self.temp_dir.name)
+        name = save_details(cache, "kind", FIELDS, self.entries)
+        store = DetailStore.for_snapshot(cache, name, FIELDS, 5)  # Waits for the queued write
+        assert (cache.details_dir / name).is_file()
+        assert store.read(1) == self.entries[1]
+        store.close()
+        for other in [None, "../kind.details", "kind.idx"]:
+            assert DetailStore.for_snapshot(cache, other, FIELDS, 5) is None
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_LAZY_DETAILS": "false"}):
+            assert save_details(cache, "kind", FIELDS, self.entries[1:]) is None
+            assert DetailStore.for_snapshot(cache, name, FIELDS, 5) is None
+        assert save_details(None, "kind", FIELDS, self.entries) is None
@@ -24,7 +24,8 @@ class TestHTMLCache:
         """Set up test fixtures."""
         self.temp_dir = tempfile.TemporaryDirectory()
         self.cache_dir = self.temp_dir.name
-        self.cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600)
+        # These tests read the cache files themselves, so they are written synchronously and uncompressed
+        self.cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, write_behind=False, compression="none")
         self.test_url = "https://example.com/test"
         self.test_content = "<html><body>Test Content</body></html>"
         self.test_key = "test_data_key"
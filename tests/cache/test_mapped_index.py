@@ -0,0 +1,285 @@
+"""Tests for memory-mapped index files shared between processes."""
+
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.cache.mapped_index import (
+    BUNDLED_INDEX_DIR,
+    MappedIndexFile,
+    MappedIndexStore,
+    MappedNames,
+    SnapshotError,
+    dump_mapped_index,
+)
+
+FIELDS = ("name", "description", "parent")
+RECORDS = [
+    ("programs.zsh.enable", "Zsh — the Z shell ✓", None),
+    ("programs.git.userName", "", "programs.git"),
+    ("programs.git.enable", "Whether to enable Git.", None),
+]
+INDEXES = {
+    "words": {"git": [2, 1], "zsh": [0], "enable": [0, 2]},
+    "pairs": {("programs", "git"): [1, 2], ("programs", "zsh"): [0]},
+    "segments": {"programs": (), "git": ()},
+    "empty": {},
+}
+
+
+class TestMappedIndexFormat:
+    """Tests for dump_mapped_index and MappedIndexFile."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "test.idx")
+        self._write(dump_mapped_index("test", FIELDS, RECORDS, INDEXES, meta={"total": 3}))
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def test_records_are_sorted_by_name(self):
+        """Test that records are read back in name order, found by name, with their values."""
+        mapped = MappedIndexFile(self.path, "test")
+        assert len(mapped) == 3
+        assert mapped.fields == FIELDS
+        assert mapped.meta == {"total": 3}
+        assert list(mapped.names) == ["programs.git.enable", "programs.git.userName", "programs.zsh.enable"]
+        assert mapped.record(2) == ("programs.zsh.enable", "Zsh — the Z shell ✓", None)
+        assert mapped.find("programs.git.userName") == 1
+        assert mapped.find("programs.git") == -1
+        assert mapped.find("zzz") == -1
+
+    def test_names_work_with_bisect(self):
+        """Test that the name view supports binary search, slicing and negative positions."""
+        names = MappedIndexFile(self.path, "test").names
+        assert isinstance(names, MappedNames)
+        assert bisect_left(names, "programs.git.") == 0
+        assert bisect_left(names, "programs.h") == 2
+        assert names[1:] == ["programs.git.userName", "programs.zsh.enable"]
+        assert names[-1] == "programs.zsh.enable"
+        with pytest.raises(IndexError):
+            names[3]
+
+    def test_options_mapping(self):
+        """Test the mapping of names to records built on read."""
+        options = MappedIndexFile(self.path, "test").options(lambda values: dict(zip(FIELDS, values)))
+        assert len(options) == 3
+        assert "programs.git.enable" in options
+        assert "programs.git" not in options
+        assert options["programs.git.userName"]["parent"] == "programs.git"
+        assert options.get("missing", "default") == "default"
+        assert [name for name, _ in options.items()] == list(options)
+        assert [option["name"] for option in options.values()] == list(options)
+        assert dict(options) == {record[0]: dict(zip(FIELDS, record)) for record in RECORDS}
+
+    def test_postings_keep_their_order(self):
+        """Test that postings map to names in the order they were given, under string and tuple keys."""
+        mapped = MappedIndexFile(self.path, "test")
+        words = mapped.postings("words", list)
+        assert dict(words) == {
+            "enable": ["programs.zsh.enable", "programs.git.enable"],
+            "git": ["programs.git.enable", "programs.git.userName"],
+            "zsh": ["programs.zsh.enable"],
+        }
+        assert list(words) == ["enable", "git", "zsh"]  # Sorted keys
+        pairs = mapped.postings("pairs")
+        assert pairs[("programs", "zsh")] == {"programs.zsh.enable"}
+        assert ("programs", "git") in pairs and "programs" not in pairs
+        assert list(mapped.postings("segments")) == ["git", "programs"]
+        assert mapped.postings("segments")["git"] == set()
+        assert len(mapped.postings("empty")) == 0
+        with pytest.raises(KeyError):
+            mapped.postings("missing")
+
+    def test_intersect(self):
+        """Test intersecting the postings of several keys by record ID."""
+        words = MappedIndexFile(self.path, "test").postings("words")
+        assert words.intersect(["git", "enable"]) == {"programs.git.enable"}
+        assert words.intersect(["git", "unknown"]) == {"programs.git.enable", "programs.git.userName"}
+        assert words.intersect(["zsh", "git"]) == set()
+        assert words.intersect(["unknown"]) == set()
+
+    @pytest.mark.parametrize(
+        "mangle, message",
+        [
+            (lambda data: data[:10], "truncated"),
+            (lambda data: b"NOTMMAP\x00" + data[8:], "Not a mapped index"),
+            (lambda data: data[:8] + b"\x09\x00" + data[10:], "format version"),
+            (lambda data: data[:-16], "truncated"),
+            (lambda data: b"", "Cannot map"),
+        ],
+    )
+    def test_rejects_damaged_files(self, mangle, message):
+        """Test that damaged files are rejected before anything is read from them."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self._write(mangle(data))
+        with pytest.raises(SnapshotError, match=message):
+            MappedIndexFile(self.path, "test")
+
+    def test_rejects_other_kind(self):
+        """Test that a file of another kind is rejected."""
+        with pytest.raises(SnapshotError, match="not 'other'"):
+            MappedIndexFile(self.path, "other")
+
+    @pytest.mark.parametrize(
+        "records, indexes",
+        [
+            ([("a", "b\x00c", None)], {}),
+            ([("a", 1, None)], {}),
+            ([("a", "b", None), ("a", "c", None)], {}),
+            ([(None, "b", None)], {}),
+            ([("a", "b", None)], {"words": {"x": [0], ("x", "y"): [0]}}),
+        ],
+    )
+    def test_rejects_unstorable_input(self, records, indexes):
+        """Test that values the format cannot represent are refused."""
+        with pytest.raises(SnapshotError):
+            dump_mapped_index("test", FIELDS, records, indexes)
+
+
+class TestMappedIndexStore:
+    """Tests for publishing and opening versions of a mapped index."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = MappedIndexStore(os.path.join(self.temp_dir.name, "mapped"), "test")
+        self.data = dump_mapped_index("test", FIELDS, RECORDS, INDEXES)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _versions(self):
+        return sorted(path.name for path in self.store.directory.glob("test-*.idx"))
+
+    def test_publish_and_open(self):
+        """Test that a published version is the one opened, and that publishing is idempotent."""
+        assert self.store.open() is None
+        path = self.store.publish(self.data)
+        assert path is not None and path.read_bytes() == self.data
+        assert self.store.open().find("programs.zsh.enable") == 2
+        assert self.store.publish(self.data) == path
+        assert self._versions() == [path.name]
+        assert not list(self.store.directory.glob(".*.tmp"))
+
+    def test_new_version_leaves_mapped_one_readable(self):
+        """Test that publishing a new version does not disturb a process still using the old one."""
+        self.store.publish(self.data)
+        old = self.store.open()
+        for count in range(3):
+            records = RECORDS + [(f"programs.new{count}.enable", "", None)]
+            self.store.publish(dump_mapped_index("test", FIELDS, records, {}))
+
+        assert old.name(0) == "programs.git.enable"  # Still mapped, even though the file is gone
+        assert self.store.open().find("programs.new2.enable") >= 0
+        assert len(self._versions()) == 2  # The current one and the one before it
+
+    def test_max_age_and_renew(self):
+        """Test that an expired version is only opened when allowed, until renewed."""
+        self.store.ttl = 3600
+        self.store.publish(self.data)
+        with mock.patch("time.time", return_value=time.time() + 7200):
+            assert self.store.open() is None
+            assert self.store.open(allow_expired=True) is not None
+        os.utime(self.store.pointer, (time.time() - 7200, time.time() - 7200))
+        assert self.store.open() is None
+        assert self.store.renew()
+        assert self.store.open() is not None
+
+    def test_invalidate_and_corrupt_version(self):
+        """Test that invalidated or damaged versions are not opened."""
+        path = self.store.publish(self.data)
+        self.store.invalidate()
+        assert self.store.open() is None
+        self.store.invalidate()  # Nothing left to remove
+
+        self.store.publish(self.data)
+        path.write_bytes(self.data[:20])
+        assert self.store.open() is None
+        assert not self.store.pointer.exists()  # A damaged version is dropped
+
+    def test_pointer_cannot_leave_the_directory(self):
+        """Test that a pointer naming a file elsewhere is ignored."""
+        self.store.publish(self.data)
+        self.store.pointer.write_text("../test-elsewhere.idx")
+        assert self.store.open() is None
+
+    def test_for_cache(self):
+        """Test that stores live under the cache directory unless sharing is disabled."""
+        cache = HTMLCache(cache_dir=self.temp_dir.name, ttl=60, write_behind=False)
+        store = MappedIndexStore.for_cache(cache, "test")
+        assert store.directory == cache.cache_dir / "mapped"
+        assert store.ttl == 60
+        assert MappedIndexStore.for_cache(mock.MagicMock(), "test") is None
+        assert MappedIndexStore.for_cache(None, "test") is None
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"}):
+            assert MappedIndexStore.for_cache(cache, "test") is None
+
+    def test_read_only_store(self):
+        """Test that a prebuilt store never expires, is outdated by build time, and is never written to."""
+        self.store.publish(dump_mapped_index("test", FIELDS, RECORDS, INDEXES, meta={"timestamp": time.time()}))
+        os.utime(self.store.pointer, (1, 1))  # As in the Nix store
+        prebuilt = MappedIndexStore(self.store.directory, "test", ttl=3600, read_only=True)
+        assert prebuilt.open() is not None and not prebuilt.outdated()
+        with mock.patch("time.time", return_value=time.time() + 7200):
+            assert prebuilt.open() is not None and prebuilt.outdated()
+            assert not MappedIndexStore(self.store.directory, "test", read_only=True).outdated()
+            assert not self.store.outdated()  # Writable stores expire instead
+
+        assert prebuilt.publish(self.data) is None
+        assert not prebuilt.renew()
+        prebuilt.invalidate()
+        self.store.current_path().write_bytes(self.data[:20])
+        assert prebuilt.open() is None
+        assert prebuilt.pointer.exists()
+
+    def test_prebuilt_location(self):
+        """Test that the prebuilt store is pinned by MCP_NIXOS_PREBUILT_INDEX_DIR or else bundled."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_PREBUILT_INDEX_DIR": self.temp_dir.name}):
+            store = MappedIndexStore.prebuilt("test", ttl=60)
+            assert (store.directory, store.ttl, store.read_only) == (pathlib.Path(self.temp_dir.name), None, True)
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_PREBUILT_INDEX_DIR": ""}):
+            assert MappedIndexStore.prebuilt("test") is None
+        with mock.patch.dict(os.environ):
+            os.environ.pop("MCP_NIXOS_PREBUILT_INDEX_DIR", None)
+            store = MappedIndexStore.prebuilt("test", ttl=60)
+            assert (store.directory, store.ttl) == (BUNDLED_INDEX_DIR, 60)
+
+    def test_other_process_reads_published_version(self):
+        """Test that a separate process maps the version this one published."""
+        self.store.publish(self.data)
+        script = (
+            "import sys\n"
+            "from mcp_nixos.cache.mapped_index import MappedIndexStore\n"
+            "mapped = MappedIndexStore(sys.argv[1], 'test').open()\n"
+            "print(mapped.postings('words')['zsh'].pop())\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script, str(self.store.directory)],
+            capture_output=True,
+            text=True,
+            timeout=60,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "programs.zsh.enable"
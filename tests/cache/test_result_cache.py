@@ -0,0 +1,94 @@
+"""Tests for search results remembered per index generation."""
+
+import os
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.result_cache import ResultCache, copy_result, result_cache_size
+
+
+class TestResultCache:
+    """Tests for ResultCache."""
+
+    def setup_method(self):
+        """Set up a small cache and a search counting its runs."""
+        self.cache = ResultCache(max_size=2)
+        self.runs = []
+
+    def search(self, query):
+        def compute():
+            self.runs.append(query)
+            return {"options": [{"name": query}], "found": True}
+
+        return compute
+
+    def test_repeated_search_is_remembered(self):
+        """Test that a repeated search is answered from the cache, counting the CPU time it saved."""
+        first = self.cache.get_or_compute(1, ("git", 20), self.search("git"))
+        second = self.cache.get_or_compute(1, ("git", 20), self.search("git"))
+        assert first == second == {"options": [{"name": "git"}], "found": True}
+        assert self.runs == ["git"]
+        stats = self.cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"], stats["size"]) == (1, 1, 0.5, 1)
+        assert stats["saved_cpu_seconds"] == pytest.approx(stats["spent_cpu_seconds"])
+
+    def test_answers_are_copies(self):
+        """Test that changing an answer changes neither the cached one nor later answers."""
+        first = self.cache.get_or_compute(1, "git", self.search("git"))
+        first["options"].sort(key=lambda option: option["name"], reverse=True)
+        first["options"][0]["score"] = 100
+        first["options"].append({"name": "extra"})
+        assert self.cache.get_or_compute(1, "git", self.search("git")) == {"options": [{"name": "git"}], "found": True}
+
+    def test_generations(self):
+        """Test that a newer generation drops the older answers, and searches of older ones are not stored."""
+        self.cache.get_or_compute(1, "git", self.search("git"))
+        self.cache.get_or_compute(2, "git", self.search("git"))
+        assert self.runs == ["git", "git"] and self.cache.generation == 2
+        self.cache.get_or_compute(1, "zsh", self.search("zsh"))  # A query still running on the previous index
+        self.cache.get_or_compute(1, "zsh", self.search("zsh"))
+        assert self.runs == ["git", "git", "zsh", "zsh"]
+        assert self.cache.get_stats()["size"] == 1
+
+    def test_least_recently_used_answer_is_evicted(self):
+        """Test that the cache keeps max_size answers, evicting the least recently used."""
+        for query in ["a", "b", "a", "c", "a", "b"]:
+            self.cache.get_or_compute(1, query, self.search(query))
+        assert self.runs == ["a", "b", "c", "b"]
+
+    def test_disabled_and_cleared(self):
+        """Test that a cache of size 0 runs every search, and clear() forgets every answer."""
+        cache = ResultCache(max_size=0)
+        cache.get_or_compute(1, "git", self.search("git"))
+        cache.get_or_compute(1, "git", self.search("git"))
+        assert self.runs == ["git", "git"] and cache.get_stats()["misses"] == 0
+        self.cache.get_or_compute(1, "git", self.search("git"))
+        self.cache.clear()
+        self.cache.get_or_compute(1, "git", self.search("git"))
+        assert self.runs == ["git", "git", "git", "git"]
+
+    def test_errors_are_not_remembered(self):
+        """Test that a search raising an error is run again next time."""
+        compute = mock.Mock(side_effect=[ValueError("broken"), ["ok"]])
+        with pytest.raises(ValueError):
+            self.cache.get_or_compute(1, "git", compute)
+        assert self.cache.get_or_compute(1, "git", compute) == ["ok"]
+
+    def test_copy_result_shares_values(self):
+        """Test that copy_result copies containers only."""
+        name = "".join(["programs.", "git"])
+        result = {"options": [{"name": name}], "corrections": {"gti": "git"}}
+        copied = copy_result(result)
+        assert copied == result and copied["options"] is not result["options"]
+        assert copied["options"][0]["name"] is name
+
+    def test_settings(self):
+        """Test the MCP_NIXOS_RESULT_CACHE_SIZE setting."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_RESULT_CACHE_SIZE": "3"}):
+            assert result_cache_size() == 3 and ResultCache().max_size == 3
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_RESULT_CACHE_SIZE": "lots"}):
+            assert result_cache_size() == 256
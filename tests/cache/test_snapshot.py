@@ -0,0 +1,121 @@
+"""Tests for the binary index snapshot format."""
+
+import struct
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.snapshot import FORMAT_VERSION, MAGIC, SnapshotError, dump_snapshot, load_snapshot
+
+FIELDS = ("name", "description", "parent")
+RECORDS = [
+    ("programs.git.enable", "Whether to enable Git.", None),
+    ("programs.git.userName", "", "programs.git"),
+    ("programs.zsh.enable", "Zsh — the Z shell ✓", None),
+]
+INDEXES = {
+    "words": {"git": [0, 1], "zsh": [2], "enable": [2, 0]},
+    "pairs": {("programs", "git"): [0, 1], ("programs", "zsh"): [2]},
+    "empty": {},
+}
+
+
+def postings(snapshot, name):
+    return {key: list(ids) for key, ids in snapshot.postings(name)}
+
+
+class TestSnapshotFormat:
+    """Tests for dump_snapshot and load_snapshot."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.data = dump_snapshot("test", FIELDS, RECORDS, INDEXES, meta={"total": 3})
+
+    def test_round_trip(self):
+        """Test that records, postings and metadata survive a round trip."""
+        snapshot = load_snapshot(self.data, "test")
+
+        assert snapshot.kind == "test"
+        assert snapshot.fields == FIELDS
+        assert snapshot.records == RECORDS
+        assert snapshot.meta == {"total": 3}
+        assert snapshot.index_names == ["words", "pairs", "empty"]
+        # Record IDs are stored in ascending order, whatever order they were given in
+        assert postings(snapshot, "words") == {"git": [0, 1], "zsh": [2], "enable": [0, 2]}
+        assert postings(snapshot, "pairs") == {("programs", "git"): [0, 1], ("programs", "zsh"): [2]}
+        assert postings(snapshot, "empty") == {}
+
+    def test_columns_and_packed_postings(self):
+        """Test that values can be read a field at a time and postings as the arrays they are stored in."""
+        snapshot = load_snapshot(self.data, "test")
+        assert len(snapshot) == 3
+        assert snapshot.column("name") == [record[0] for record in RECORDS]
+        assert snapshot.column("parent") == [None, "programs.git", None]
+        keys, offsets, ids = snapshot.packed("words")
+        assert (keys, list(offsets), list(ids)) == (["git", "zsh", "enable"], [0, 2, 3, 5], [0, 1, 2, 0, 2])
+        assert snapshot.packed("pairs")[0] == [("programs", "git"), ("programs", "zsh")]
+
+    def test_strings_are_stored_once(self):
+        """Test that repeated strings share one string table entry."""
+        data = dump_snapshot("test", FIELDS, [("repeated", "repeated", None)] * 100, {"words": {"repeated": [0]}})
+        assert data.count(b"repeated") == 1
+        assert load_snapshot(data, "test").records[99] == ("repeated", "repeated", None)
+
+    def test_empty_snapshot(self):
+        """Test a snapshot without records or strings."""
+        snapshot = load_snapshot(dump_snapshot("test", FIELDS, [], {}), "test")
+        assert snapshot.records == []
+        assert snapshot.index_names == []
+
+    def test_single_empty_string(self):
+        """Test that an empty string is not confused with an empty string table."""
+        snapshot = load_snapshot(dump_snapshot("test", ("name",), [("",)], {}), "test")
+        assert snapshot.records == [("",)]
+
+    def test_header(self):
+        """Test the header layout."""
+        magic, version, _flags, length, _checksum = struct.unpack_from("<8sHHQI", self.data)
+        assert magic == MAGIC
+        assert version == FORMAT_VERSION
+        assert length == len(self.data) - struct.calcsize("<8sHHQI")
+
+    @pytest.mark.parametrize(
+        "mangle, message",
+        [
+            (lambda data: data[:10], "truncated"),
+            (lambda data: data[:-1], "truncated"),
+            (lambda data: b"NOTASNAP" + data[8:], "Not an index snapshot"),
+            (lambda data: data[:8] + struct.pack("<H", FORMAT_VERSION + 1) + data[10:], "version"),
+            (lambda data: data[:-5] + bytes([data[-5] ^ 0xFF]) + data[-4:], "checksum"),
+        ],
+    )
+    def test_rejects_damaged_data(self, mangle, message):
+        """Test that truncated, foreign or corrupt data is rejected before decoding."""
+        with pytest.raises(SnapshotError, match=message):
+            load_snapshot(mangle(self.data), "test")
+
+    def test_rejects_other_kind(self):
+        """Test that a snapshot of another kind is rejected."""
+        with pytest.raises(SnapshotError, match="not 'darwin'"):
+            load_snapshot(self.data, "darwin")
+
+    def test_rejects_non_bytes(self):
+        """Test that legacy pickled dictionaries are rejected."""
+        with pytest.raises(SnapshotError):
+            load_snapshot({"options": {}}, "test")  # type: ignore[arg-type]
+
+    @pytest.mark.parametrize(
+        "records, indexes",
+        [
+            ([("a", 1, None)], {}),
+            ([("a\x00b", "", None)], {}),
+            ([("a", "")], {}),
+            ([("a", "", None)], {"mixed": {"a": [0], ("a", "b"): [0]}}),
+        ],
+    )
+    def test_rejects_unstorable_input(self, records, indexes):
+        """Test that values the format cannot represent are refused when writing."""
+        with pytest.raises(SnapshotError):
+            dump_snapshot("test", FIELDS, records, indexes)
@@ -0,0 +1,258 @@
+"""Tests for the SQLite cache backend."""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.cache.sqlite_store import SQLiteCacheStore
+
+
+class TestSQLiteCacheStore:
+    """Tests for the SQLiteCacheStore class."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = SQLiteCacheStore(self.temp_dir.name)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_uses_wal_mode(self):
+        """Test that the database runs in WAL mode."""
+        mode = self.store._connect().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal"
+
+    def test_write_read_roundtrip(self):
+        """Test writing and reading an entry."""
+        assert self.store.write("html", "abc", b"<html/>", {"url": "u"}, created=123.0)
+
+        content, metadata, created = self.store.read("html", "abc")
+        assert content == b"<html/>"
+        assert metadata == {"url": "u"}
+        assert created == 123.0
+
+        # Kinds are separate namespaces
+        assert self.store.read("data", "abc") is None
+
+    def test_delete_and_clear(self):
+        """Test deleting single entries and clearing the store."""
+        self.store.write("html", "a", b"1", {})
+        self.store.write("data", "b", b"2", {})
+
+        assert self.store.delete("html", "a") is True
+        assert self.store.delete("html", "a") is False
+        assert self.store.clear() == 1
+        assert self.store.stats()["entries"] == 0
+
+    def test_stats(self):
+        """Test per-kind entry counts."""
+        self.store.write("html", "a", b"1", {})
+        self.store.write("binary", "b", b"2", {})
+
+        stats = self.store.stats()
+        assert stats["counts"] == {"html": 1, "data": 0, "binary": 1}
+        assert stats["entries"] == 2
+        assert stats["size_bytes"] > 0
+
+
+class TestHTMLCacheSQLiteBackend:
+    """Tests for HTMLCache running on the SQLite backend."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.temp_dir.name
+        # Written synchronously, so the rows can be inspected as soon as set() returns
+        self.cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, backend="sqlite", write_behind=False)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def _files(self):
+        return sorted(name for name in os.listdir(self.cache_dir) if not name.startswith("cache.sqlite3"))
+
+    def test_backend_selected(self):
+        """Test that the SQLite backend is active."""
+        assert self.cache.backend == "sqlite"
+        assert self.cache.store is not None
+
+    def test_backend_from_environment(self):
+        """Test selecting the backend through MCP_NIXOS_CACHE_BACKEND."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_CACHE_BACKEND": "sqlite"}):
+            cache = HTMLCache(cache_dir=self.cache_dir)
+        try:
+            assert cache.backend == "sqlite"
+        finally:
+            cache.close()
+
+    def test_unknown_backend_falls_back(self):
+        """Test that an unknown backend name falls back to the filesystem."""
+        cache = HTMLCache(cache_dir=self.cache_dir, backend="carrier-pigeon")
+        assert cache.backend == "filesystem"
+        assert cache.store is None
+
+    def test_html_roundtrip(self):
+        """Test storing and retrieving HTML content."""
+        url = "https://example.com/options.html"
+        result = self.cache.set(url, "<html>ok</html>")
+        assert result["stored"] is True
+
+        content, metadata = self.cache.get(url)
+        assert content == "<html>ok</html>"
+        assert metadata["cache_hit"] is True
+        assert "cache.sqlite3" in metadata["cache_path"]
+
+        # No per-entry files are written
+        assert self._files() == []
+
+    def test_data_and_binary_roundtrip(self):
+        """Test storing and retrieving structured and binary data."""
+        self.cache.set_data("key", {"values": [1, 2, 3]})
+        data, metadata = self.cache.get_data("key")
+        assert data["values"] == [1, 2, 3]
+        assert metadata["cache_hit"] is True
+
+        binary = {"set": {"a", "b"}, "dd": defaultdict(list, {"k": [1]})}
+        self.cache.set_binary_data("key", binary)
+        loaded, metadata = self.cache.get_binary_data("key")
+        assert loaded["set"] == {"a", "b"}
+        assert loaded["dd"]["k"] == [1]
+        assert metadata["cache_hit"] is True
+
+    def test_expiry(self):
+        """Test that entries older than the TTL are reported as expired."""
+        url = "https://example.com/old"
+        self.cache.set(url, "<html/>")
+
+        with mock.patch("time.time", return_value=time.time() + 7200):
+            content, metadata = self.cache.get(url)
+        assert content is None
+        assert metadata["expired"] is True
+
+    def test_invalidate(self):
+        """Test invalidating HTML and data entries."""
+        self.cache.set("https://example.com/a", "<html/>")
+        self.cache.set_data("key", {"x": 1})
+        self.cache.set_binary_data("key", {"x": 1})
+
+        assert self.cache.invalidate("https://example.com/a")["invalidated"] is True
+        result = self.cache.invalidate_data("key")
+        assert result["invalidated"] is True
+        assert result["binary_invalidated"] is True
+
+        assert self.cache.get("https://example.com/a")[0] is None
+        assert self.cache.get_data("key")[0] is None
+        assert self.cache.get_binary_data("key")[0] is None
+
+    def test_clear_and_stats(self):
+        """Test clearing the cache and reporting statistics."""
+        self.cache.set("https://example.com/a", "<html/>")
+        self.cache.set_data("key", {"x": 1})
+
+        stats = self.cache.get_stats()
+        assert stats["backend"] == "sqlite"
+        assert stats["html_count"] == 1
+        assert stats["data_count"] == 1
+        assert stats["file_count"] == 2
+
+        assert self.cache.clear()["files_removed"] == 2
+        assert self.cache.get_stats()["file_count"] == 0
+        # The database itself survives a clear
+        assert os.path.exists(os.path.join(self.cache_dir, "cache.sqlite3"))
+
+    def test_concurrent_readers_never_miss(self):
+        """Test that readers never miss an entry while it is being rewritten."""
+        url = "https://example.com/hot"
+        self.cache.set(url, "<html>v0</html>")
+        misses = []
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                i += 1
+                self.cache.set(url, f"<html>v{i}</html>")
+
+        def reader():
+            for _ in range(200):
+                content, _ = self.cache.get(url)
+                if content is None:
+                    misses.append(1)
+
+        writer_thread = threading.Thread(target=writer)
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        writer_thread.start()
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        stop.set()
+        writer_thread.join()
+
+        assert misses == []
+
+
+class TestSQLiteMigration:
+    """Tests for migrating an existing filesystem cache into SQLite."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.temp_dir.name
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def test_migrates_existing_entries(self):
+        """Test that entries written by the filesystem backend are readable after switching."""
+        fs_cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, write_behind=False)
+        fs_cache.set("https://example.com/a", "<html>a</html>")
+        fs_cache.set_data("key", {"x": 1})
+        fs_cache.set_binary_data("key", {"s": {1, 2}})
+
+        cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, backend="sqlite")
+        try:
+            assert cache.get("https://example.com/a")[0] == "<html>a</html>"
+            assert cache.get_data("key")[0]["x"] == 1
+            assert cache.get_binary_data("key")[0]["s"] == {1, 2}
+
+            # Legacy files and their metadata sidecars are removed
+            leftovers = [name for name in os.listdir(self.cache_dir) if not name.startswith("cache.sqlite3")]
+            assert leftovers == []
+        finally:
+            cache.close()
+
+    def test_migration_preserves_creation_time(self):
+        """Test that migrated entries keep their original creation timestamp."""
+        fs_cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, write_behind=False)
+        fs_cache.set("https://example.com/a", "<html/>")
+        meta_path = f"{fs_cache._get_cache_path('https://example.com/a')}.meta"
+        with open(meta_path) as f:
+            metadata = json.load(f)
+        metadata["creation_timestamp"] = time.time() - 7200
+        with open(meta_path, "w") as f:
+            json.dump(metadata, f)
+
+        cache = HTMLCache(cache_dir=self.cache_dir, ttl=3600, backend="sqlite")
+        try:
+            content, result = cache.get("https://example.com/a")
+            assert content is None
+            assert result["expired"] is True
+        finally:
+            cache.close()
@@ -0,0 +1,186 @@
+"""Tests for the write-behind cache queue."""
+
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.cache.write_behind import WriteBehindQueue
+
+
+class TestWriteBehindQueue:
+    """Tests for the WriteBehindQueue class."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.queue = WriteBehindQueue(max_pending=2)
+        self.gate = threading.Event()
+        self.written = []
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.gate.set()
+        self.queue.shutdown(timeout=5)
+
+    def _job(self, key, value, wait=False):
+        def job():
+            if wait:
+                self.gate.wait(5)
+            self.written.append((key, value))
+
+        return job
+
+    def _block_writer(self):
+        """Occupy the writer thread until the gate opens."""
+        self.queue.submit("blocker", self._job("blocker", 0, wait=True))
+        deadline = time.time() + 5
+        while self.queue.peek("blocker")[0] and len(self.queue) and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_submit_returns_before_write(self):
+        """Test that submit does not wait for the job to run."""
+        self._block_writer()
+        assert self.queue.submit("a", self._job("a", 1), value=1) is True
+        assert ("a", 1) not in self.written
+
+        self.gate.set()
+        assert self.queue.flush(timeout=5) is True
+        assert ("a", 1) in self.written
+
+    def test_coalesces_writes_to_same_key(self):
+        """Test that only the latest pending value for a key is written."""
+        self._block_writer()
+        for i in range(5):
+            self.queue.submit("a", self._job("a", i), value=i)
+
+        assert self.queue.peek("a") == (True, 4)
+        self.gate.set()
+        self.queue.flush(timeout=5)
+
+        assert [value for key, value in self.written if key == "a"] == [4]
+        assert self.queue.get_stats()["coalesced"] == 4
+
+    def test_backpressure_blocks_when_full(self):
+        """Test that submitters block while the queue is full."""
+        self._block_writer()
+        self.queue.submit("a", self._job("a", 1))
+        self.queue.submit("b", self._job("b", 1))
+
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (self.queue.submit("c", self._job("c", 1)), done.set()))
+        thread.start()
+        assert not done.wait(0.2)
+
+        self.gate.set()
+        assert done.wait(5)
+        thread.join()
+        self.queue.flush(timeout=5)
+        assert {key for key, _ in self.written} == {"blocker", "a", "b", "c"}
+        assert self.queue.get_stats()["blocked"] == 1
+
+    def test_discard_drops_pending_jobs(self):
+        """Test that discarded jobs are never written."""
+        self._block_writer()
+        self.queue.submit("a", self._job("a", 1))
+        assert self.queue.discard(lambda key: key == "a") == 1
+
+        self.gate.set()
+        self.queue.flush(timeout=5)
+        assert ("a", 1) not in self.written
+
+    def test_failed_job_is_counted(self):
+        """Test that a failing job does not stop the writer."""
+
+        def failing():
+            raise IOError("disk full")
+
+        self.queue.submit("bad", failing)
+        self.queue.submit("good", self._job("good", 1))
+        self.queue.flush(timeout=5)
+
+        assert ("good", 1) in self.written
+        assert self.queue.get_stats()["failed"] == 1
+
+    def test_submit_after_shutdown_runs_inline(self):
+        """Test that writes after shutdown are performed synchronously."""
+        self.queue.shutdown(timeout=5)
+        assert self.queue.submit("a", self._job("a", 1)) is False
+        assert ("a", 1) in self.written
+
+
+class TestHTMLCacheWriteBehind:
+    """Tests for HTMLCache with write-behind enabled."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.queue = WriteBehindQueue()
+        with mock.patch("mcp_nixos.cache.html_cache.get_write_behind_queue", return_value=self.queue):
+            self.cache = HTMLCache(cache_dir=self.temp_dir.name, ttl=3600, write_behind=True)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.queue.shutdown(timeout=5)
+        self.temp_dir.cleanup()
+
+    def test_disabled_by_argument(self):
+        """Test that write-behind can be turned off per cache."""
+        cache = HTMLCache(cache_dir=self.temp_dir.name, write_behind=False)
+        assert cache.write_queue is None
+
+    def test_set_returns_before_write(self):
+        """Test that set() hands off the write and serves the pending value."""
+        gate = threading.Event()
+        original = self.cache._write_html
+
+        def slow_write(*args):
+            gate.wait(5)
+            return original(*args)
+
+        with mock.patch.object(self.cache, "_write_html", side_effect=slow_write):
+            result = self.cache.set("https://example.com/a", "<html/>")
+            assert result["pending_write"] is True
+            assert not self.cache._get_cache_path("https://example.com/a").exists()
+
+            # Read-your-writes while the write is pending
+            content, metadata = self.cache.get("https://example.com/a")
+            assert content == "<html/>"
+            assert metadata["pending_write"] is True
+
+            gate.set()
+            assert self.cache.flush(timeout=5)
+
+        assert self.cache._get_cache_path("https://example.com/a").exists()
+        content, metadata = self.cache.get("https://example.com/a")
+        assert content == "<html/>"
+        assert "pending_write" not in metadata
+
+    def test_data_and_binary_persisted_after_flush(self):
+        """Test that queued data writes reach disk on flush."""
+        self.cache.set_data("key", {"x": 1})
+        self.cache.set_binary_data("key", {"s": {1, 2}})
+        self.cache.flush(timeout=5)
+
+        assert self.cache._get_data_cache_path("key").exists()
+        assert self.cache._get_binary_data_cache_path("key").exists()
+        assert self.cache.get_data("key")[0]["x"] == 1
+        assert self.cache.get_binary_data("key")[0]["s"] == {1, 2}
+
+    def test_invalidate_drops_pending_write(self):
+        """Test that invalidation prevents a queued write from landing later."""
+        gate = threading.Event()
+        self.queue.submit("blocker", lambda: gate.wait(5))
+
+        self.cache.set_data("key", {"x": 1})
+        self.cache.invalidate_data("key")
+        gate.set()
+        self.cache.flush(timeout=5)
+
+        assert self.cache.get_data("key")[0] is None
+        assert not self.cache._get_data_cache_path("key").exists()
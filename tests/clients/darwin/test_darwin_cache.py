@@ -1,11 +1,12 @@
 """Tests for the Darwin client filesystem caching."""
 
+import os
 import time
 import pytest
 import tempfile
 from datetime import datetime
 from collections import defaultdict
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 # Mark all tests in this module as unit tests
 pytestmark = pytest.mark.unit
@@ -125,6 +126,15 @@ async def test_save_to_filesystem_cache(mock_html_client):
     # Check results
     assert result is True
 
+    # Only the snapshot is written; the JSON/pickle pair is for what it cannot hold
+    assert [c[0][0] for c in mock_html_client.cache.set_binary_data.call_args_list] == [client.snapshot_key]
+    mock_html_client.cache.set_data.assert_not_called()
+
+    client.options["system.defaults.option1"].sub_options = {
+        "enable": DarwinOption(name="system.defaults.option1.enable", description="Enable it")
+    }
+    assert await client._save_to_filesystem_cache() is True
+
     # Verify cache.set_data was called with correct data
     set_data_call = mock_html_client.cache.set_data.call_args
     assert set_data_call is not None
@@ -288,6 +298,32 @@ async def test_load_options_from_cache(mock_html_client):
         assert not mock_html_client.fetch.called
 
 
+@pytest.mark.asyncio
+async def test_load_options_not_modified_skips_parse(mock_html_client):
+    """Test that a 304 for the options page reuses the expired snapshot without parsing."""
+    mock_html_client.fetch.return_value = ("<html></html>", {"success": True, "not_modified": True})
+    client = DarwinClient(html_client=mock_html_client)
+
+    async def load_snapshot(allow_expired=False):
+        if not allow_expired:
+            return False
+        client.options = {
+            "system.defaults.dock.autohide": DarwinOption(name="system.defaults.dock.autohide", description="")
+        }
+        return True
+
+    with (
+        patch.object(client, "_load_from_filesystem_cache", side_effect=load_snapshot),
+        patch.object(client, "_parse_options") as mock_parse,
+    ):
+        result = await client.load_options()
+
+    assert "system.defaults.dock.autohide" in result
+    mock_parse.assert_not_called()
+    assert mock_html_client.cache.renew_data.call_args_list == [call(client.cache_key), call(client.snapshot_key)]
+    assert client.loading_status == "loaded"
+
+
 @pytest.mark.asyncio
 async def test_invalidate_cache(mock_html_client):
     """Test cache invalidation."""
@@ -304,7 +340,10 @@ async def test_invalidate_cache(mock_html_client):
         client.invalidate_cache()
 
         # Verify filesystem cache invalidation calls
-        mock_html_client.cache.invalidate_data.assert_called_once_with(client.cache_key)
+        assert mock_html_client.cache.invalidate_data.call_args_list == [
+            call(client.cache_key),
+            call(client.snapshot_key),
+        ]
         mock_html_client.cache.invalidate.assert_called_once_with(client.OPTION_REFERENCE_URL)
 
 
@@ -373,6 +412,7 @@ async def test_empty_dataset_not_cached(real_cache_dir):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("synchronous_cache", "uncompressed_cache")
 async def test_expired_cache_ttl_reload(real_cache_dir):
     """
     Test that content is properly reloaded and cache files recreated when TTL expires.
@@ -572,6 +612,7 @@ async def test_reject_invalid_cached_data(real_cache_dir):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("synchronous_cache")
 async def test_darwin_client_expired_cache(real_cache_dir):
     """
     Test that DarwinClient properly reloads HTML and recreates cache files when TTL expires.
@@ -646,18 +687,16 @@ async def test_darwin_client_expired_cache(real_cache_dir):
             assert "system.defaults.dock.autohide" in options1
             assert options1["system.defaults.dock.autohide"].default == "false"
 
-            # Check if JSON and pickle files were created
-            cache_key = darwin_client.cache_key
+            # Check that the snapshot was created, and no JSON/pickle pair
             assert html_client.cache is not None, "HTMLClient cache should not be None"
-            json_path = html_client.cache._get_data_cache_path(cache_key)
-            pickle_path = html_client.cache._get_binary_data_cache_path(cache_key)
+            json_path = html_client.cache._get_data_cache_path(darwin_client.cache_key)
+            snapshot_path = html_client.cache._get_binary_data_cache_path(darwin_client.snapshot_key)
 
-            assert json_path.exists(), "JSON cache file was not created"
-            assert pickle_path.exists(), "Pickle cache file was not created"
+            assert snapshot_path.exists(), "Snapshot cache file was not created"
+            assert not json_path.exists(), "JSON cache file was created"
 
-            # Record file modification times
-            json_mtime1 = json_path.stat().st_mtime
-            pickle_mtime1 = pickle_path.stat().st_mtime
+            # Record file modification time
+            snapshot_mtime1 = snapshot_path.stat().st_mtime
 
             # Simulate passage of time to expire the cache (more than TTL)
             mock_time.return_value = current_time + ttl + 10
@@ -686,13 +725,139 @@ async def test_darwin_client_expired_cache(real_cache_dir):
                 options2["system.defaults.dock.autohide"].default == "true"
             ), "Default value should be updated to 'true'"
 
-            # Verify the cache files were recreated
-            assert json_path.exists(), "JSON cache file does not exist after refresh"
-            assert pickle_path.exists(), "Pickle cache file does not exist after refresh"
+            # Verify the snapshot was recreated
+            assert snapshot_path.exists(), "Snapshot cache file does not exist after refresh"
+
+            # Check that it was actually updated (modification times should be different)
+            assert snapshot_path.stat().st_mtime > snapshot_mtime1, "Snapshot cache file was not updated"
 
-            # Check that files were actually updated (modification times should be different)
-            json_mtime2 = json_path.stat().st_mtime
-            pickle_mtime2 = pickle_path.stat().st_mtime
 
-            assert json_mtime2 > json_mtime1, "JSON cache file was not updated"
-            assert pickle_mtime2 > pickle_mtime1, "Pickle cache file was not updated"
+def _indexed_client(cache_dir):
+    """A client with 30 options indexed as the parser would, and its cache fields set."""
+    client = DarwinClient(html_client=HTMLClient(cache_dir=cache_dir, ttl=3600))
+    for i in range(30):
+        name = f"system.defaults.group{i % 3}.option{i}"
+        option = DarwinOption(
+            name=name, description=f"Option {i} — description", type="boolean", default="false", parent=None
+        )
+        client.options[name] = option
+        client._index_option(name, option)
+    client.total_options = len(client.options)
+    client.total_categories = 1
+    client.last_updated = datetime(2024, 1, 2, 3, 4, 5)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_index_snapshot_matches_fresh_build(real_cache_dir):
+    """Test that the binary index snapshot reproduces the freshly built client state."""
+    client = _indexed_client(real_cache_dir)
+    assert await client._save_to_filesystem_cache()
+
+    loaded = DarwinClient(html_client=HTMLClient(cache_dir=real_cache_dir, ttl=3600))
+    # The shared mapped index is preferred when present; this covers the snapshot
+    with patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"}):
+        with patch.object(HTMLCache, "get_data", side_effect=AssertionError("legacy data read")):
+            assert await loaded._load_from_filesystem_cache()
+
+    assert loaded.options == client.options
+    assert dict(loaded.name_index) == dict(client.name_index)
+    assert dict(loaded.word_index) == dict(client.word_index)
+    assert dict(loaded.prefix_index) == dict(client.prefix_index)
+    assert (loaded.total_options, loaded.total_categories) == (30, 1)
+    assert loaded.last_updated == client.last_updated
+    assert await loaded.search_options("group1") == await client.search_options("group1")
+
+
+@pytest.mark.asyncio
+async def test_shared_index_matches_fresh_build(real_cache_dir):
+    """Test that a client mapping the shared index answers like the client that built it."""
+    client = _indexed_client(real_cache_dir)
+    assert await client._save_to_filesystem_cache()
+
+    loaded = DarwinClient(html_client=HTMLClient(cache_dir=real_cache_dir, ttl=3600))
+    with patch.object(HTMLCache, "get_binary_data", side_effect=AssertionError("snapshot read")):
+        assert await loaded._load_from_filesystem_cache()
+
+    assert loaded.options == client.options
+    assert dict(loaded.name_index) == dict(client.name_index)
+    assert dict(loaded.word_index) == dict(client.word_index)
+    assert dict(loaded.prefix_index) == dict(client.prefix_index)
+    assert (loaded.total_options, loaded.total_categories) == (30, 1)
+    assert loaded.last_updated == client.last_updated
+    assert loaded.memory_cache.get(loaded.cache_key) is None  # Not copied out of the mapping
+    for query in ("group1", "system.defaults.group2", "descrption", '"Option 7"'):
+        assert await loaded.search_options(query) == await client.search_options(query)
+    assert await loaded.get_options_by_prefix("system.defaults") == await client.get_options_by_prefix(
+        "system.defaults"
+    )
+
+    loaded.invalidate_cache()
+    assert not loaded._load_mapped_index()
+
+
+@pytest.mark.asyncio
+async def test_identical_page_renews_expired_cache_without_parsing(real_cache_dir):
+    """Test that an expired cache is renewed, not re-parsed, when the page downloaded again has its digest."""
+    served_while_parsing = []
+
+    async def parse(client, soup):
+        served_while_parsing.append(len(client.options))
+        indexed = _indexed_client(real_cache_dir)
+        client.options, client.name_index = indexed.options, indexed.name_index
+        client.word_index, client.prefix_index = indexed.word_index, indexed.prefix_index
+        client.total_options, client.total_categories = indexed.total_options, indexed.total_categories
+
+    async def load(html, **kwargs):
+        client = DarwinClient(html_client=HTMLClient(cache_dir=real_cache_dir, ttl=3600))
+        client.fetch_url = MagicMock(side_effect=lambda *args, **kw: _async_value(html))
+        with (
+            patch.dict(os.environ, {"MCP_NIXOS_PREBUILT_INDEX_DIR": ""}),
+            patch.object(DarwinClient, "_parse_options", autospec=True, side_effect=parse) as mock_parse,
+            patch("time.time", return_value=time.time() + kwargs.get("later", 0)),
+        ):
+            await client.load_options()
+        return client, mock_parse
+
+    page = "<html><body>nix-darwin options</body></html>"
+    client, mock_parse = await load(page)
+    mock_parse.assert_called_once()
+    assert client.digest_stats.get_stats()["hits"] + client.digest_stats.get_stats()["misses"] == 0
+
+    client, mock_parse = await load(page, later=7200)
+    mock_parse.assert_not_called()
+    assert len(client.options) == 30
+    assert client.digest_stats.get_stats()["hits"] == 1
+    assert (await client.get_statistics())["source_digest_checks"]["hit_ratio"] == 1.0
+
+    client, mock_parse = await load(page.replace("options", "options, revised"), later=2 * 7200)
+    mock_parse.assert_called_once()
+    assert client.digest_stats.get_stats()["misses"] == 1
+    assert served_while_parsing == [0, 0]  # The expired cache was not served while the changed page was parsed
+
+
+async def _async_value(value):
+    return value
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared", ["true", "false"])
+async def test_category_counts_saved_with_index(real_cache_dir, shared):
+    """Test that category counts are loaded with the shared index or snapshot rather than counted again."""
+    client = _indexed_client(real_cache_dir)
+    client.category_counts = client._count_categories()
+    assert client.category_counts == {"system": 30}
+    with patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": shared}):
+        assert await client._save_to_filesystem_cache()
+        loaded = DarwinClient(html_client=HTMLClient(cache_dir=real_cache_dir, ttl=3600))
+        with patch.object(DarwinClient, "_get_top_level_categories", side_effect=AssertionError("recounted")):
+            assert await loaded._load_from_filesystem_cache()
+            assert await loaded.get_categories() == [{"name": "system", "option_count": 30, "path": "system"}]
+            assert (await loaded.get_statistics())["categories"] == await client.get_categories()
+
+
+def test_category_counts_missing_from_older_cache(real_cache_dir):
+    """Test that data cached before category counts were saved is counted once on load."""
+    client = _indexed_client(real_cache_dir)
+    assert client._count_categories({}) == {"system": 30}
+    assert client._count_categories({"system": 12}) == {"system": 12}
@@ -0,0 +1,156 @@
+"""Tests for nix-darwin option details kept on disk."""
+
+import os
+import pathlib
+import pickle
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Mark all tests in this module as unit tests
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.darwin.darwin_client import SUMMARY_FIELDS, DarwinClient, DarwinOption, DarwinOptionSummary
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.contexts.darwin.darwin_context import DarwinContext
+from mcp_nixos.tools.darwin.darwin_tools import darwin_info, darwin_search
+
+PAGE = "".join(f"""
+    <dt><a id="opt-system.defaults.dock.option{i}"></a><code>system.defaults.dock.option{i}</code></dt>
+    <dd>
+        Dock option {i}, shown on the left — or not.
+        *Type:* boolean
+        *Default:* {"false" if i % 2 else "{ enable = true; }"}
+        *Example:* true
+        *Declared by:* &lt;nix-darwin/modules/system/defaults/dock{i}.nix&gt;
+    </dd>""" for i in range(12))
+
+
+async def _parsed_client(cache_dir):
+    """A client with the options of PAGE parsed and indexed."""
+    client = DarwinClient(html_client=HTMLClient(cache_dir=cache_dir, ttl=3600))
+    await client._parse_options(BeautifulSoup(f"<html><body><dl>{PAGE}</dl></body></html>", "html.parser"))
+    client.last_updated = datetime(2024, 1, 2, 3, 4, 5)
+    return client
+
+
+@pytest.fixture
+def cache_dir():
+    """A cache directory of its own."""
+    with tempfile.TemporaryDirectory() as directory:
+        yield directory
+
+
+@pytest.mark.asyncio
+async def test_parsed_options_are_summaries(cache_dir):
+    """Test that parsed options keep their details on disk and read and compare like full options."""
+    client = await _parsed_client(cache_dir)
+    with patch.dict(os.environ, {"MCP_NIXOS_LAZY_DETAILS": "false"}):
+        eager = await _parsed_client(cache_dir)
+
+    assert all(type(option) is DarwinOptionSummary for option in client.options.values())
+    assert all(type(option) is DarwinOption for option in eager.options.values())
+    assert client.options == eager.options
+    option = client.options["system.defaults.dock.option3"]
+    assert (option.default, option.example) == ("false", "true")
+    assert option.declared_by == eager.options["system.defaults.dock.option3"].declared_by
+    with pytest.raises(AttributeError):
+        option.default = "true"
+
+    restored = pickle.loads(pickle.dumps(option))
+    assert type(restored) is DarwinOption and restored == option
+
+    for name in ["system.defaults.dock.option0", "system.defaults.dock.option11", "system.missing"]:
+        assert await client.get_option(name) == await eager.get_option(name)
+    assert await client.search_options("dock", limit=5) == await eager.search_options("dock", limit=5)
+
+
+@pytest.mark.asyncio
+async def test_results_read_no_details(cache_dir):
+    """Test that searches and prefix listings answer from the summaries; lookups read the details."""
+    client = await _parsed_client(cache_dir)
+    option = client.options["system.defaults.dock.option5"]
+    details = option._details
+    with patch.object(details, "read", wraps=details.read) as read:
+        found = await client.search_options("dock", limit=5)
+        listed = await client.get_options_by_prefix("system.defaults.dock")
+        assert read.call_count == 0
+        assert (await client.get_option(option.name))["default"] == "false"
+    assert {call.args[0] for call in read.call_args_list} == {option._entry}
+    assert set(found[0]) == set(listed[0]) == set(SUMMARY_FIELDS)
+
+
+@pytest.mark.asyncio
+async def test_quoted_phrases_match_full_descriptions(cache_dir):
+    """Test that quoted phrases are found past the shortened description, and only where they occur."""
+    client = await _parsed_client(cache_dir)
+    tail = " Further text." * 20 + " The hidden phrase is at the end."
+    long = DarwinOption(name="system.defaults.dock.long", description="Dock option, described at length." + tail)
+    client.options[long.name] = long
+    client._index_option(long.name, long)
+    client._spill_details()
+    summary = client.options[long.name]
+    assert type(summary) is DarwinOptionSummary and summary.summary_description.endswith("...")
+
+    details = summary._details
+    with patch.object(details, "read", wraps=details.read) as read:
+        results = await client.search_options('"hidden phrase is at"', limit=5)
+        assert [result["name"] for result in results] == [long.name]
+        assert read.call_count == 1  # Only the option indexed under "phrase"
+    assert [result["name"] for result in await client.search_options('"en phrase is at the e"')] == [long.name]
+    assert await client.search_options('"phrase at the"') == []
+    assert results[0]["description"] == summary.summary_description
+
+
+@pytest.mark.asyncio
+async def test_tool_output_unchanged(cache_dir):
+    """Test that the tools print the same text as with the details in memory."""
+    contexts = []
+    for lazy in ["true", "false"]:
+        with patch.dict(os.environ, {"MCP_NIXOS_LAZY_DETAILS": lazy}):
+            context = DarwinContext(darwin_client=await _parsed_client(cache_dir), eager_loading=False)
+        context.status = "loaded"
+        contexts.append(context)
+    lazy, eager = contexts
+    assert await darwin_info("system.defaults.dock.option4", context=lazy) == await darwin_info(
+        "system.defaults.dock.option4", context=eager
+    )
+    assert await darwin_search("dock", context=lazy) == await darwin_search("dock", context=eager)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared", ["true", "false"])
+async def test_loaded_options_are_summaries(cache_dir, shared):
+    """Test that options loaded from the snapshot keep their details on disk; mapped ones stay mapped."""
+    client = await _parsed_client(cache_dir)
+    with patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": shared}):
+        assert await client._save_to_filesystem_cache()
+        loaded = DarwinClient(html_client=client.html_client)
+        assert await loaded._load_from_filesystem_cache()
+    if shared == "false":
+        assert all(type(option) is DarwinOptionSummary for option in loaded.options.values())
+        # Read from the detail file saved with the snapshot, not written out again
+        details = loaded.options["system.defaults.dock.option3"]._details
+        assert details.path.parent == pathlib.Path(cache_dir) / "details" and len(details) == len(client.options)
+    assert {name: loaded.options[name] for name in client.options} == client.options
+    assert await loaded.get_option("system.defaults.dock.option3") == await client.get_option(
+        "system.defaults.dock.option3"
+    )
+
+
+@pytest.mark.asyncio
+async def test_options_with_sub_options_stay_whole(cache_dir):
+    """Test that options with sub-options and unwritable stores keep everything in memory."""
+    client = await _parsed_client(cache_dir)
+    parent = DarwinOption(name="launchd.agents", description="Agents", type="attribute set", default="{ }")
+    parent.sub_options = {"command": DarwinOption(name="launchd.agents.<name>.command", description="Command")}
+    client.options["launchd.agents"] = parent
+    client._spill_details()
+    assert client.options["launchd.agents"] is parent
+
+    with patch("tempfile.TemporaryFile", side_effect=OSError("read-only")):
+        whole = await _parsed_client(cache_dir)
+    assert all(type(option) is DarwinOption for option in whole.options.values())
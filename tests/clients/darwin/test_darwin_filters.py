@@ -0,0 +1,108 @@
+"""Tests for filtering nix-darwin queries by option type and category."""
+
+import os
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+# Mark all tests in this module as unit tests
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.darwin.darwin_client import DarwinClient, DarwinOption
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.contexts.darwin.darwin_context import DarwinContext
+from mcp_nixos.tools.darwin.darwin_tools import darwin_options_by_prefix, darwin_search
+
+TYPES = ["boolean", "string", "null or package"]
+
+
+def _filtered_client(cache_dir):
+    """A client with options of several types under the system and homebrew categories."""
+    client = DarwinClient(html_client=HTMLClient(cache_dir=cache_dir, ttl=3600))
+    for i in range(36):
+        category = "system" if i % 4 else "homebrew"
+        name = f"{category}.defaults.group{i % 3}.option{i}"
+        option = DarwinOption(name=name, description=f"Option {i} of the dock", type=TYPES[i % 3], parent=None)
+        client.options[name] = option
+        client._index_option(name, option)
+    client.total_options = len(client.options)
+    client.last_updated = datetime(2024, 1, 2, 3, 4, 5)
+    return client
+
+
+def _passes(option, filters):
+    values = {"type": option["type"], "category": option["name"].split(".")[0]}
+    return all(values[field] == value.lower() for field, value in filters.items())
+
+
+@pytest.fixture
+def client():
+    """An indexed client with a cache directory of its own."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        yield _filtered_client(cache_dir)
+
+
+FILTERS = [{"type": "boolean"}, {"type": "Null or Package", "category": "system"}, {"category": "nowhere"}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("query", ["group1", "system.defaults", "dock", "option1"])
+async def test_search_keeps_unfiltered_order(client, query, filters):
+    """Test that a filtered search returns the unfiltered results that pass the filters, in order."""
+    everything = await client.search_options(query, limit=1000)
+    expected = [option for option in everything if _passes(option, filters)]
+    assert await client.search_options(query, limit=1000, filters=filters) == expected
+
+
+@pytest.mark.asyncio
+async def test_empty_query_lists_filtered_options(client):
+    """Test that an empty query with filters lists the options passing them, by name."""
+    result = await client.search_options("", limit=5, filters={"category": "homebrew"})
+    assert [option["name"] for option in result] == sorted(name for name in client.options if name[0] == "h")[:5]
+    with pytest.raises(ValueError, match="Cannot filter by 'source'"):
+        await client.search_options("dock", filters={"source": "options"})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("prefix", ["system", "system.defaults.group2", "homebrew.defaults"])
+async def test_prefix_lookup(client, prefix, filters):
+    """Test that a filtered prefix lookup lists the options under the prefix that pass the filters."""
+    expected = [option for option in await client.get_options_by_prefix(prefix) if _passes(option, filters)]
+    assert await client.get_options_by_prefix(prefix, filters=filters) == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared", ["true", "false"])
+async def test_attribute_index_saved_with_index(client, shared):
+    """Test that the shared index and the snapshot carry the attribute index."""
+    filters = {"type": "string", "category": "system"}
+    with patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": shared}):
+        assert await client._save_to_filesystem_cache()
+        loaded = DarwinClient(html_client=client.html_client)
+        with patch.object(DarwinClient, "_rebuild_attributes", side_effect=AssertionError("rebuilt")):
+            assert await loaded._load_from_filesystem_cache()
+    assert {key: set(names) for key, names in loaded.attribute_index.items()} == dict(client.attribute_index)
+    assert await loaded.search_options("dock", filters=filters) == await client.search_options("dock", filters=filters)
+
+
+@pytest.mark.asyncio
+async def test_tools_report_filters(client):
+    """Test that the tools pass filters through the context and say they were applied."""
+    context = DarwinContext(darwin_client=client, eager_loading=False)
+    context.status = "loaded"
+
+    output = await darwin_search("dock", context=context, option_type="boolean", category="system")
+    assert "Filtered by type 'boolean', category 'system'" in output
+    assert "homebrew." not in output and "option1\n" not in output  # option1 is a string
+    missing = await darwin_search("dock", context=context, category="nowhere")
+    assert missing == "No nix-darwin options found matching 'dock' with category 'nowhere'."
+
+    output = await darwin_options_by_prefix("system.defaults", context=context, option_type="null or package")
+    assert "Filtered by type 'null or package'" in output
+    assert "Found 9 options." in output
+    missing = await darwin_options_by_prefix("homebrew", context=context, category="system")
+    assert missing == "No nix-darwin options found with prefix 'homebrew' and category 'system'."
@@ -0,0 +1,78 @@
+"""Tests for remembered nix-darwin search results."""
+
+import tempfile
+from unittest.mock import patch
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Mark all tests in this module as unit tests
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.darwin.darwin_client import DarwinClient, DarwinOption
+from mcp_nixos.contexts.darwin.darwin_context import DarwinContext
+from tests.clients.darwin.test_darwin_details import PAGE
+from tests.clients.darwin.test_darwin_filters import _filtered_client
+
+
+@pytest.fixture
+def client():
+    """An indexed client with a cache directory of its own."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        yield _filtered_client(cache_dir)
+
+
+def _fuzzy(client):
+    return patch.object(client, "_find_fuzzy_matches", wraps=client._find_fuzzy_matches)
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_is_remembered(client):
+    """Test that a repeated search skips the index and fuzzy scans, and gets an unchanged copy."""
+    with _fuzzy(client) as fuzzy:
+        first = await client.search_options(" dock ", limit=5, filters={"type": "Boolean"})
+        first[0]["name"] = "changed"
+        again = await client.search_options("dock", limit=5, filters={"type": "boolean", "category": None})
+        other = await client.search_options("dock", limit=6, filters={"type": "boolean"})
+    assert again[0]["name"] != "changed" and again == other[:5]
+    assert fuzzy.call_count == 2
+    stats = client.result_cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 2, 1 / 3)
+    with pytest.raises(ValueError, match="Cannot filter by 'source'"):
+        await client.search_options("dock", filters={"source": "options"})
+
+
+@pytest.mark.asyncio
+async def test_changed_options_are_searched(client):
+    """Test that indexing an option in place, or parsing the options again, starts a new generation."""
+    assert await client.search_options("newcomer") == []
+    option = DarwinOption(name="system.newcomer", description="A newcomer", type="boolean")
+    client.options[option.name] = option
+    client._index_option(option.name, option)
+    assert [result["name"] for result in await client.search_options("newcomer")] == ["system.newcomer"]
+
+    before = await client.search_options("dock", limit=50)
+    await client._parse_options(BeautifulSoup(f"<html><body><dl>{PAGE}</dl></body></html>", "html.parser"))
+    after = await client.search_options("dock", limit=50)
+    assert {result["name"] for result in after} == set(client.options) != {result["name"] for result in before}
+
+
+@pytest.mark.asyncio
+async def test_statistics_report_hits(client):
+    """Test that the statistics and the context status report the hit ratio and saved CPU time."""
+    await client.search_options("dock")
+    await client.search_options("dock")
+    assert (await client.get_statistics())["search_result_cache"]["hit_ratio"] == 0.5
+    context = DarwinContext(darwin_client=client, eager_loading=False)
+    context.status = "loaded"
+    stats = (await context.get_status())["search_result_cache"]
+    assert stats["hits"] == 1 and stats["saved_cpu_seconds"] >= 0
+
+
+def test_every_load_starts_a_generation():
+    """Test that assigning the options, as every load does, moves the generation on."""
+    client = DarwinClient()
+    generation = client.generation
+    client.options = {}
+    client.options = {}
+    assert client.generation == generation + 2
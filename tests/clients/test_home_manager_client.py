@@ -11,6 +11,7 @@ pytestmark = pytest.mark.unit
 
 # Import the HomeManagerClient class
 from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_index import HomeManagerIndex
 
 # Import HTMLClient for patching object instances
 from mcp_nixos.clients.html_client import HTMLClient
@@ -149,7 +150,7 @@ class TestHomeManagerClient(unittest.TestCase):
         """Test loading options from all sources combines results."""
 
         # Configure mock to return different HTML based on URL substring
-        def fetch_side_effect(url, force_refresh=False):
+        def fetch_side_effect(url, force_refresh=False, chunk_consumer=None):
             if "nixos-options" in url:
                 return SAMPLE_HTML_NIXOS, {"success": True, "from_cache": False}
             elif "nix-darwin-options" in url:
@@ -416,13 +417,65 @@ class TestHomeManagerClient(unittest.TestCase):
 
         client.invalidate_cache()
 
-        # Check invalidation of specific data key
-        mock_cache.invalidate_data.assert_called_once_with(client.cache_key)
+        # Check invalidation of the data key and the index snapshot
+        self.assertEqual(mock_cache.invalidate_data.call_args_list, [call(client.cache_key), call(client.snapshot_key)])
         # Check invalidation of individual URLs
         expected_calls = [call(url) for url in client.hm_urls.values()]
         mock_cache.invalidate.assert_has_calls(expected_calls, any_order=True)
         self.assertEqual(mock_cache.invalidate.call_count, len(client.hm_urls))
 
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient.load_all_options")
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient._read_cached_snapshot")
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient._load_from_cache", return_value=False)
+    @patch.object(HTMLClient, "fetch")
+    def test_not_modified_sources_skip_reparse(self, mock_fetch, mock_load_cache, mock_snapshot, mock_load_all):
+        """Test that an expired snapshot is reused when every page answers 304."""
+        mock_fetch.return_value = (SAMPLE_HTML_OPTIONS, {"success": True, "not_modified": True})
+        client = HomeManagerClient()
+        client.html_client.cache = mock.MagicMock()
+        stale = HomeManagerIndex()
+        mock_snapshot.return_value = stale
+
+        def fetch(url, force_refresh=False):
+            # Nothing is served while the pages are being compared
+            self.assertEqual(client.index.generation, 0)
+            return mock_fetch.return_value
+
+        mock_fetch.side_effect = fetch
+        client._load_data_internal()
+
+        mock_snapshot.assert_called_once_with(allow_expired=True)
+        self.assertEqual(mock_fetch.call_count, len(client.hm_urls))
+        mock_load_all.assert_not_called()
+        self.assertEqual(
+            client.html_client.cache.renew_data.call_args_list, [call(client.cache_key), call(client.snapshot_key)]
+        )
+        self.assertIs(client.index, stale)
+        self.assertTrue(client.is_loaded)
+
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient._save_in_memory_data")
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient.build_search_indices")
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient.load_all_options", return_value=SAMPLE_OPTIONS_LIST)
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient._read_cached_snapshot")
+    @patch("mcp_nixos.clients.home_manager_client.HomeManagerClient._load_from_cache", return_value=False)
+    @patch.object(HTMLClient, "fetch")
+    def test_modified_source_triggers_reparse(
+        self, mock_fetch, mock_load_cache, mock_snapshot, mock_load_all, mock_build, mock_save
+    ):
+        """Test that a changed page falls back to a full parse, without serving the expired snapshot first."""
+        mock_fetch.return_value = (SAMPLE_HTML_OPTIONS, {"success": True, "not_modified": False})
+        client = HomeManagerClient()
+        client.html_client.cache = mock.MagicMock()
+        stale = HomeManagerIndex()
+        mock_snapshot.return_value = stale
+
+        client._load_data_internal()
+
+        mock_load_all.assert_called_once()
+        mock_build.assert_called_once_with(SAMPLE_OPTIONS_LIST)
+        client.html_client.cache.renew_data.assert_not_called()
+        self.assertIsNot(client.index, stale)
+
 
 # Standard unittest runner
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+"""Tests for Home Manager option details kept on disk."""
+
+import copy
+import os
+import pathlib
+import pickle
+import tempfile
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.detail_store import DetailStore
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.clients.option_record import SHORT_DESCRIPTION_LENGTH, OptionRecord, OptionSummary
+from mcp_nixos.resources.home_manager_resources import home_manager_search_options_resource
+from mcp_nixos.tools.home_manager_tools import home_manager_info, home_manager_options_by_prefix, home_manager_search
+from tests.clients.test_home_manager_incremental import make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+def detailed_options():
+    """Fixture options plus synthetic ones with defaults, examples and manual links."""
+    options = make_options(60)
+    for i, option in enumerate(options):
+        option["default"] = f"{{ setting = {i}; }}"
+        option["example"] = f'literalExpression "pkgs.example{i} — ✓"' if i % 2 else None
+        option["manual_url"] = f"https://example.org/options.xhtml#opt-{option['name']}"
+        if i % 5 == 0:
+            option["description"] += " Long enough to be shortened in summaries." * 6
+    return parse_options(FIXTURE.read_text(), "options") + options
+
+
+class TestLazyDetails:
+    """Tests for OptionSummary records in published generations."""
+
+    def setup_method(self):
+        """Set up a client with its details on disk and one with everything in memory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.options = detailed_options()
+        self.client = self._client()
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_LAZY_DETAILS": "false"}):
+            self.eager = self._client()
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _client(self):
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        client.build_search_indices(copy.deepcopy(self.options))
+        client.is_loaded = True
+        return client
+
+    def _context(self, client):
+        context = mock.MagicMock()
+        context.get_option.side_effect = client.get_option
+        context.search_options.side_effect = client.search_options
+        context.get_options_by_prefix.side_effect = client.get_options_by_prefix
+        return context
+
+    def test_options_are_summaries(self):
+        """Test that published options keep their summary in memory and read like the full option."""
+        details = self.client.index.details
+        assert isinstance(details, DetailStore) and len(details) == len(self.options)
+        assert all(type(option) is OptionSummary for option in self.client.index.options.values())
+        assert all(type(option) is OptionRecord for option in self.eager.index.options.values())
+        assert self.eager.index.details is None
+        for option in self.options:
+            summary = self.client.index.options[option["name"]]
+            assert summary == option and dict(summary) == option and summary.copy() == option
+            assert summary.get("missing", "fallback") == "fallback"
+        with pytest.raises(AttributeError):
+            summary.default = "changed"  # type: ignore[misc]
+
+    def test_queries_answer_as_before(self):
+        """Test that lookups, searches and prefix listings return the same options with their details."""
+        for name in ["programs.git.enable", "programs.neovim.setting7", "programs.nothing"]:
+            assert self.client.get_option(name) == self.eager.get_option(name)
+        for query in ["git", "setting", "programs.git.setting*"]:
+            assert self.client.search_options(query, limit=15) == self.eager.search_options(query, limit=15)
+        assert self.client.get_options_by_prefix("programs") == self.eager.get_options_by_prefix("programs")
+
+    def test_tool_output_unchanged(self):
+        """Test that the tools and the search resource print the same text as with the details in memory."""
+        lazy, eager = self._context(self.client), self._context(self.eager)
+        for name in ["programs.git.enable", "programs.neovim.setting3"]:
+            assert home_manager_info(name, context=lazy) == home_manager_info(name, context=eager)
+        for query in ["setting", "shortened", "programs.zsh"]:
+            output = home_manager_search(query, limit=30, context=lazy)
+            assert output == home_manager_search(query, limit=30, context=eager)
+            assert home_manager_search_options_resource(query, lazy) == home_manager_search_options_resource(
+                query, eager
+            )
+        for prefix in ["programs.git", "programs.zsh"]:
+            listing = home_manager_options_by_prefix(prefix, context=lazy)
+            assert listing == home_manager_options_by_prefix(prefix, context=eager)
+
+        # Descriptions longer than the summaries keep are printed in full
+        full = next(opt for opt in self.options if opt["name"] == "programs.zsh.setting5")["description"]
+        assert len(full) > SHORT_DESCRIPTION_LENGTH
+        assert full in output and full in listing
+
+    def test_ranking_reads_only_returned_details(self):
+        """Test that a search reads the details of the options it returns, not of every match."""
+        details = self.client.index.details
+        with mock.patch.object(details, "read", wraps=details.read) as read:
+            result = self.client.search_options("setting", limit=3)
+        assert result["count"] > 3
+        assert {call.args[0] for call in read.call_args_list} == {
+            self.client.index.options[option["name"]]._entry for option in result["options"]
+        }
+        first = result["options"][0]
+        assert first == {**self.eager.index.options[first["name"]], "score": first["score"]}
+
+    def test_incremental_update_shares_store(self):
+        """Test that a successor appends changed options to the same store, leaving older entries alone."""
+        previous = self.client.index
+        old_default = previous.options["programs.zsh.setting1"]["default"]
+        options = copy.deepcopy(self.options)
+        changed = next(option for option in options if option["name"] == "programs.zsh.setting1")
+        changed["default"] = "{ changed = true; }"
+
+        self.client.update_search_indices(options)
+
+        current = self.client.index
+        assert current.details is previous.details
+        assert len(current.details) == len(self.options) + 1
+        assert current.options["programs.zsh.setting1"]["default"] == "{ changed = true; }"
+        assert previous.options["programs.zsh.setting1"]["default"] == old_default
+        assert current.options["programs.git.enable"] is previous.options["programs.git.enable"]
+
+    def test_pickled_and_saved_in_full(self):
+        """Test that summaries pickle as OptionRecords and the snapshot carries their details."""
+        summary = self.client.index.options["programs.zsh.setting5"]
+        restored = pickle.loads(pickle.dumps(summary))
+        assert type(restored) is OptionRecord and restored == summary
+
+        assert self.client._save_in_memory_data()
+        loaded = self._load_saved()
+        assert loaded.index.details is not None and loaded.index.details is not self.client.index.details
+        assert loaded.get_option("programs.zsh.setting5") == self.eager.get_option("programs.zsh.setting5")
+
+    def _load_saved(self):
+        loaded = HomeManagerClient()
+        loaded.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"}):
+            assert loaded._load_from_cache()
+        loaded.is_loaded = True
+        return loaded
+
+    def test_loads_reopen_saved_details(self):
+        """Test that loading the snapshot reopens the details saved with it instead of writing them again."""
+        assert self.client._save_in_memory_data()
+        self.client.html_client.cache.flush()
+        saved = list((pathlib.Path(self.temp_dir.name) / "details").glob("*.details"))
+        assert len(saved) == 1
+        with mock.patch("tempfile.TemporaryFile", side_effect=OSError("no temporary files")):
+            loaded, again = self._load_saved(), self._load_saved()
+        details = loaded.index.details
+        assert details.path == again.index.details.path == saved[0]
+        assert all(type(option) is OptionSummary for option in loaded.index.options.values())
+        assert details.stats()["misses"] == 0 and len(details) == len(self.options)
+        for name in ["programs.git.enable", "programs.zsh.setting5"]:
+            assert loaded.get_option(name) == self.eager.get_option(name)
+        assert loaded.search_options("setting", limit=15) == self.eager.search_options("setting", limit=15)
+
+        options = copy.deepcopy(self.options)
+        options[-1]["default"] = "{ changed = true; }"
+        loaded.update_search_indices(options)  # Appended to a temporary file of the store, not to the saved one
+        assert loaded.index.details is details and len(details) == len(self.options) + 1
+        assert loaded.get_option(options[-1]["name"])["default"] == "{ changed = true; }"
+        assert again.get_option(options[-1]["name"]) == self.eager.get_option(options[-1]["name"])
+
+    def test_missing_saved_details_are_written_again(self):
+        """Test that a snapshot whose detail file is gone is loaded with its details moved to a new store."""
+        assert self.client._save_in_memory_data()
+        self.client.html_client.cache.flush()
+        for path in (pathlib.Path(self.temp_dir.name) / "details").glob("*.details"):
+            path.unlink()
+        loaded = self._load_saved()
+        assert loaded.index.details.path is None and len(loaded.index.details) == len(self.options)
+        assert loaded.get_option("programs.zsh.setting5") == self.eager.get_option("programs.zsh.setting5")
+
+    def test_unwritable_store_keeps_details_in_memory(self):
+        """Test that options stay complete records when no detail file can be created."""
+        with mock.patch("tempfile.TemporaryFile", side_effect=OSError("read-only")):
+            client = self._client()
+        assert client.index.details is None
+        assert all(type(option) is OptionRecord for option in client.index.options.values())
+        assert client.get_option("programs.git.enable") == self.eager.get_option("programs.git.enable")
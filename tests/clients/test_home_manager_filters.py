@@ -0,0 +1,206 @@
+"""Tests for filtering Home Manager queries by option type, source and category."""
+
+import copy
+import os
+import tempfile
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_index import HomeManagerIndex
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.contexts.home_manager_context import HomeManagerContext
+from mcp_nixos.tools.home_manager_tools import home_manager_options_by_prefix, home_manager_search
+from tests.clients.test_home_manager_incremental import index_state, make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+def varied_options():
+    """Fixture options plus synthetic ones spread over types, sources and categories."""
+    options = make_options(120)
+    for i, option in enumerate(options):
+        if i % 5 == 0:
+            option["type"] = "null or package"
+        option["source"] = ["options", "nixos-options", "nix-darwin-options"][i % 3]
+    return parse_options(FIXTURE.read_text(), "options") + options
+
+
+def passes(option, filters):
+    """Whether an option passes the filters, checked field by field."""
+    missing = {"type": "unknown", "source": "unknown", "category": "Uncategorized"}
+    return all(
+        " ".join(str(option.get(field) or missing[field]).lower().split()) == value.lower()
+        for field, value in filters.items()
+    )
+
+
+FILTERS = [
+    {"type": "boolean"},
+    {"type": "Null or Package"},
+    {"source": "nixos-options", "category": "category 1"},
+    {"type": "boolean", "source": "nix-darwin-options", "category": "Category 2"},
+    {"type": "no such type"},
+]
+
+
+class TestFilteredQueries:
+    """Tests for the attribute index and the filter parameters of search and prefix lookups."""
+
+    def setup_method(self):
+        """Set up a client with indexed options and a cache directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.options = varied_options()
+        self.client = self._client()
+        self.client.build_search_indices(self.options)
+        self.client.is_loaded = True
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _client(self):
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        return client
+
+    @pytest.mark.parametrize("filters", FILTERS)
+    @pytest.mark.parametrize("query", ["programs", "programs.git.", "configure git", "enable", "setting12"])
+    def test_search_ranks_like_unfiltered_search(self, query, filters):
+        """Test that a filtered search returns the unfiltered ranking with other options left out."""
+        everything = self.client.search_options(query, limit=10000)
+        expected = [option["name"] for option in everything["options"] if passes(option, filters)]
+        result = self.client.search_options(query, limit=7, filters=filters)
+        assert [option["name"] for option in result["options"]] == expected[:7]
+        assert result["count"] == len(expected)
+        uncounted = self.client.search_options(query, limit=7, count_total=False, filters=filters)
+        assert uncounted["options"] == result["options"]
+
+    @pytest.mark.parametrize("filters", FILTERS)
+    @pytest.mark.parametrize("prefix", ["programs", "programs.git", "programs.git.enable"])
+    def test_prefix_lookup(self, prefix, filters):
+        """Test that a filtered prefix lookup lists the options under the prefix that pass the filters."""
+        expected = sorted(
+            option["name"]
+            for option in self.options
+            if (option["name"] == prefix or option["name"].startswith(prefix + ".")) and passes(option, filters)
+        )
+        result = self.client.get_options_by_prefix(prefix, filters=filters)
+        if expected:
+            assert [option["name"] for option in result["options"]] == expected
+            assert result["count"] == len(expected)
+        else:
+            assert not result["found"]
+            assert result["error"].startswith(f"No options found with prefix '{prefix}' and ")
+
+    def test_empty_and_unknown_filters(self):
+        """Test that empty filters change nothing and unknown fields are reported."""
+        assert self.client.search_options("git", filters={"type": "", "source": None}) == (
+            self.client.search_options("git")
+        )
+        assert self.client.index.filter_names({"category": " "}) is None
+        result = self.client.search_options("git", filters={"colour": "red"})
+        assert not result["found"] and "Cannot filter by 'colour'" in result["error"]
+        assert "Cannot filter by" in self.client.get_options_by_prefix("programs", {"colour": "red"})["error"]
+
+    def test_filters_never_go_through_options(self):
+        """Test that the filtered names come from the attribute index alone."""
+        index = self.client.index
+        with mock.patch.object(index, "options", {}):
+            names = index.filter_names({"type": "boolean", "source": "options"})
+        assert names == {option["name"] for option in self.options if passes(option, {"type": "boolean"})} & {
+            option["name"] for option in self.options if option.get("source") == "options"
+        }
+
+    def test_incremental_update(self):
+        """Test that changed options move between values, leaving the previous generation as it was."""
+        previous = self.client.index
+        before = previous.filter_names({"type": "boolean"})
+        options = copy.deepcopy(self.options)
+        options[-1]["type"] = "string"
+        options.append(dict(options[-2], name="programs.newcomer.enable", type="boolean"))
+
+        self.client.update_search_indices(options)
+
+        after = self.client.index.filter_names({"type": "boolean"})
+        assert after == before - {options[-2]["name"]} | {"programs.newcomer.enable"}
+        assert previous.filter_names({"type": "boolean"}) == before
+        fresh = self._client()
+        fresh.build_search_indices(options)
+        assert index_state(self.client)["attributes"] == index_state(fresh)["attributes"]
+
+    @pytest.mark.parametrize("shared", ["true", "false"])
+    def test_saved_with_snapshot(self, shared):
+        """Test that a generation loaded from the shared index or snapshot takes the saved attribute index."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": shared}):
+            assert self.client._save_in_memory_data()
+            loaded = self._client()
+            with mock.patch.object(HomeManagerIndex, "rebuild_attributes", side_effect=AssertionError("rebuilt")):
+                assert loaded._load_from_cache()
+        loaded.is_loaded = True
+        filters = {"type": "boolean", "category": "category 2"}
+        assert loaded.get_options_by_prefix("programs", filters) == self.client.get_options_by_prefix(
+            "programs", filters
+        )
+        assert index_state(loaded)["attributes"] == index_state(self.client)["attributes"]
+
+    def test_legacy_cache_is_indexed(self):
+        """Test that the JSON/pickle cache of older releases still loads with an attribute index."""
+        self.client._save_legacy_data(self.client.index)
+        loaded = self._client()
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"}):
+            assert loaded._load_from_cache()
+        assert loaded.index.origin == "cache"
+        assert index_state(loaded)["attributes"] == index_state(self.client)["attributes"]
+
+
+class TestFilterParameters:
+    """Tests for the filter parameters of the Home Manager tools and context."""
+
+    def setup_method(self):
+        """Set up a context answering from an indexed client."""
+        self.client = HomeManagerClient()
+        self.client.build_search_indices(varied_options())
+        self.client.is_loaded = True
+        self.context = mock.MagicMock()
+        self.context.search_options.side_effect = self.client.search_options
+        self.context.get_options_by_prefix.side_effect = self.client.get_options_by_prefix
+
+    def test_search_tool(self):
+        """Test that the search tool passes filters on and says they were applied."""
+        output = home_manager_search("git", context=self.context, option_type="boolean")
+        assert "options for '*git*' with type 'boolean':" in output
+        assert "- enable\n  Type: boolean" in output
+        self.context.search_options.assert_called_with("*git*", 20, count_total=False, filters={"type": "boolean"})
+        missing = home_manager_search("git", context=self.context, source="nowhere")
+        assert missing == "No Home Manager options found for '*git*' with source 'nowhere'."
+
+    def test_prefix_tool(self):
+        """Test that the prefix tool lists only the options passing the filters."""
+        output = home_manager_options_by_prefix("programs.git", context=self.context, option_type="boolean")
+        assert "Filtered by type 'boolean'" in output
+        assert "(null or package)" not in output and "(string)" not in output
+        self.context.get_options_by_prefix.assert_called_with("programs.git", filters={"type": "boolean"})
+        missing = home_manager_options_by_prefix("programs.git", context=self.context, category="nothing")
+        assert missing == "Error: No options found with prefix 'programs.git' and category 'nothing'"
+
+        home_manager_options_by_prefix("programs.git", context=self.context)
+        self.context.get_options_by_prefix.assert_called_with("programs.git")  # Unfiltered calls are unchanged
+
+    @mock.patch("mcp_nixos.contexts.home_manager_context.HomeManagerClient")
+    def test_context_passes_filters(self, MockClient):
+        """Test that the context hands the filters to the client."""
+        client = MockClient.return_value
+        client.loading_in_progress = False
+        client.loading_error = None
+        client.search_options.return_value = {"count": 0, "options": [], "found": False}
+        context = HomeManagerContext()
+        context.search_options("git", 5, filters={"type": "boolean", "source": ""})
+        client.search_options.assert_called_once_with("git", 5, count_total=True, filters={"type": "boolean"})
+        client.search_options.reset_mock()
+        context.get_options_by_prefix("programs", filters={"category": "Programs"})
+        client.search_options.assert_called_once_with("programs.*", limit=500, filters={"category": "Programs"})
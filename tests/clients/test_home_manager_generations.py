@@ -0,0 +1,213 @@
+"""Tests for double-buffered Home Manager index generations."""
+
+import copy
+import threading
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.contexts.home_manager_context import HomeManagerContext
+from tests.clients.test_home_manager_incremental import assert_invariants, fresh_state, index_state, make_options
+
+
+def generation_state(index):
+    """index_state of a HomeManagerIndex rather than a client."""
+    client = HomeManagerClient.__new__(HomeManagerClient)
+    client.index = index
+    return index_state(client)
+
+
+class TestIndexGenerations:
+    """Tests for building and publishing index generations."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.options = make_options(40)
+        self.client = HomeManagerClient()
+        self.client.build_search_indices(self.options)
+        self.client.is_loaded = True
+
+    def _changed(self):
+        options = copy.deepcopy(self.options)
+        del options[0]  # programs.git.setting0
+        options[3]["description"] = "Reworded description mentioning telescope."
+        options.append(dict(options[1], name="services.gpg-agent.enable", description="Run the agent."))
+        return options
+
+    def test_each_build_publishes_a_new_generation(self):
+        """Test that every build replaces the active index object and numbers it."""
+        first = self.client.index
+        assert first.generation == 1
+        assert first.published_at is not None
+        self.client.build_search_indices(self._changed())
+        assert self.client.index is not first
+        assert self.client.index.generation == 2
+        assert self.client.get_generation_info()["generation"] == 2
+
+    def test_update_leaves_previous_generation_untouched(self):
+        """Test that an incremental refresh changes a successor, never the served generation."""
+        previous = self.client.index
+        before = generation_state(previous)
+        new_options = self._changed()
+
+        self.client.update_search_indices(new_options)
+
+        assert self.client.index is not previous
+        assert self.client.index.generation == previous.generation + 1
+        assert generation_state(previous) == before
+        assert "telescope" not in previous.inverted_index
+        assert "services.gpg-agent.enable" not in previous.prefix_index
+        assert "gpg" not in previous.segment_index
+        assert index_state(self.client) == fresh_state(new_options)
+        assert_invariants(self.client)
+
+    def test_successor_copies_only_changed_postings(self):
+        """Test that posting sets and arrays are shared with the previous generation until written."""
+        previous = self.client.index
+        successor = previous.successor()
+        assert successor.inverted_index.ids("zsh") is previous.inverted_index.ids("zsh")
+
+        successor.inverted_index.add("git", "programs.git.extra")
+        assert successor.inverted_index.ids("git") is not previous.inverted_index.ids("git")
+        assert "programs.git.extra" not in previous.inverted_index["git"]
+        assert successor.inverted_index.ids("zsh") is previous.inverted_index.ids("zsh")
+
+        key = ("programs", "git")
+        assert successor.hierarchical_index[key] is previous.hierarchical_index[key]
+        successor.postings(successor.hierarchical_index, key).add("programs.git.extra")
+        assert successor.hierarchical_index[key] is not previous.hierarchical_index[key]
+        assert "programs.git.extra" not in previous.hierarchical_index[key]
+
+        successor.add_segment("firefox")  # Already present: nothing is copied
+        assert successor.segment_index is previous.segment_index
+        successor.add_segment("extra")
+        assert successor.segment_index is not previous.segment_index
+        assert "extra" not in previous.segment_index
+
+    def test_query_uses_one_generation(self):
+        """Test that a query already running is not affected by a generation published meanwhile."""
+        published = threading.Event()
+        original = self.client._intersect_postings
+
+        def publish_midway(words, index=None):
+            if not published.is_set():
+                published.set()
+                self.client.build_search_indices(make_options(3))  # Drops most options
+            return original(words, index)
+
+        with mock.patch.object(self.client, "_intersect_postings", side_effect=publish_midway):
+            result = self.client.search_options("configure zsh")
+
+        assert self.client.index.generation == 2
+        expected = HomeManagerClient()
+        expected.build_search_indices(self.options)
+        expected.is_loaded = True
+        assert result == expected.search_options("configure zsh")
+
+    def test_failed_build_publishes_nothing(self):
+        """Test that the active generation stays when building the next one fails."""
+        active = self.client.index
+        with mock.patch.object(self.client, "_index_option", side_effect=ValueError("bad option")):
+            with pytest.raises(ValueError):
+                self.client.build_search_indices(self._changed())
+        assert self.client.index is active
+
+
+class TestRefreshWhileServing:
+    """Tests for refreshing while queries keep being served."""
+
+    def setup_method(self):
+        """Set up a loaded client whose refresh blocks until released."""
+        self.client = HomeManagerClient()
+        self.client.build_search_indices(make_options(40))
+        self.client.is_loaded = True
+        self.client.invalidate_cache = mock.MagicMock()
+        self.client._save_in_memory_data = mock.MagicMock(return_value=True)
+        self.client._load_from_cache = mock.MagicMock(return_value=False)
+        self.client._revalidate_stale_cache = mock.MagicMock(return_value=False)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _blocking_load(self, result):
+        def load_all_options():
+            self.started.set()
+            assert self.release.wait(5)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        self.client.load_all_options = load_all_options
+
+    def _refresh_in_background(self):
+        errors = []
+
+        def refresh():
+            try:
+                self.client.ensure_loaded(force_refresh=True)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=refresh)
+        thread.start()
+        assert self.started.wait(5)
+        return thread, errors
+
+    def test_queries_served_during_refresh(self):
+        """Test that the previous generation answers queries until the new one is published."""
+        self._blocking_load(make_options(40) + [dict(make_options(1)[0], name="programs.new.enable")])
+        thread, errors = self._refresh_in_background()
+
+        assert self.client.is_loaded
+        assert not self.client.loading_in_progress
+        assert self.client.refresh_in_progress
+        assert self.client._check_load_status("search options") is None
+        assert self.client.get_option("programs.git.setting0")["found"]
+        assert not self.client.get_option("programs.new.enable")["found"]
+        assert self.client.get_generation_info()["generation"] == 1
+
+        self.release.set()
+        thread.join(5)
+        assert not errors
+        assert not self.client.refresh_in_progress
+        assert self.client.get_option("programs.new.enable")["found"]
+        info = self.client.get_generation_info()
+        assert info["generation"] == 2
+        assert info["origin"] == "web"
+        assert info["refreshing"] is False
+
+    def test_failed_refresh_keeps_serving(self):
+        """Test that a failed refresh keeps the previous generation and reports the error."""
+        self._blocking_load(RuntimeError("network down"))
+        thread, errors = self._refresh_in_background()
+        self.release.set()
+        thread.join(5)
+
+        assert [str(e) for e in errors] == ["network down"]
+        assert self.client.is_loaded
+        assert self.client.loading_error is None
+        assert self.client.get_option("programs.git.setting0")["found"]
+        info = self.client.get_generation_info()
+        assert info["generation"] == 1
+        assert info["refresh_error"] == "network down"
+
+    def test_status_reports_active_generation(self):
+        """Test that the Home Manager status includes the generation being served."""
+        self._blocking_load(make_options(40))
+        with mock.patch("mcp_nixos.contexts.home_manager_context.HomeManagerClient", return_value=self.client):
+            self.client.load_in_background = mock.MagicMock()
+            context = HomeManagerContext()
+        thread, errors = self._refresh_in_background()
+
+        status = context.get_status()
+        assert status["status"] == "ok"
+        assert status["generation"]["generation"] == 1
+        assert status["generation"]["refreshing"] is True
+        assert status["generation"]["options_count"] == 40
+
+        self.release.set()
+        thread.join(5)
+        assert context.get_status()["generation"]["generation"] == 2
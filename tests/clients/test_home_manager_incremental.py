@@ -0,0 +1,187 @@
+"""Tests for incremental maintenance of the Home Manager search indices."""
+
+import copy
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+
+
+def make_options(count):
+    """Build a synthetic option list spread over a few categories and modules."""
+    options = []
+    for i in range(count):
+        module = ["git", "zsh", "firefox", "neovim"][i % 4]
+        options.append(
+            {
+                "name": f"programs.{module}.setting{i}",
+                "type": "boolean" if i % 2 else "string",
+                "description": f"Configure {module} setting number {i}.",
+                "default": None,
+                "example": None,
+                "category": f"Category {i % 3}",
+                "source": "options",
+                "introduced_version": None,
+                "deprecated_version": None,
+                "manual_url": None,
+            }
+        )
+    return options
+
+
+def index_state(client):
+    """Comparable snapshot of every index (category order is not significant)."""
+    return {
+        "options": dict(client.options),
+        "categories": {category: sorted(names) for category, names in client.options_by_category.items()},
+        "inverted": {key: set(names) for key, names in client.inverted_index.items()},
+        "attributes": {key: set(names) for key, names in client.attribute_index.items()},
+        "prefix": {key: set(names) for key, names in client.prefix_index.items()},
+        "hierarchical": {key: set(names) for key, names in client.hierarchical_index.items()},
+    }
+
+
+def fresh_state(options):
+    client = HomeManagerClient()
+    client.build_search_indices(options)
+    return index_state(client)
+
+
+def assert_invariants(client):
+    """Check the structural invariants that every index must keep."""
+    for index in (client.inverted_index, client.attribute_index, client.prefix_index, client.hierarchical_index):
+        for key, names in index.items():
+            assert names, f"empty posting list left for {key!r}"
+            assert set(names) <= client.options.keys(), f"postings for {key!r} refer to unknown options"
+
+    categorized = [name for names in client.options_by_category.values() for name in names]
+    assert sorted(categorized) == sorted(client.options)
+    for category, names in client.options_by_category.items():
+        assert names, f"empty category {category!r}"
+        assert all(client.options[name].get("category", "Uncategorized") == category for name in names)
+
+    for name in client.options:
+        assert name in client.prefix_index[name]
+
+
+class TestIncrementalIndexing:
+    """Tests for HomeManagerClient.update_search_indices."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.options = make_options(40)
+        self.client = HomeManagerClient()
+        self.client.build_search_indices(self.options)
+
+    def _changed(self):
+        """A new option set with a few additions, removals and edits."""
+        options = copy.deepcopy(self.options)
+        del options[5]  # programs.zsh.setting5
+        del options[0]  # programs.git.setting0
+        options[3]["description"] = "Reworded description mentioning telescope."
+        options[7]["category"] = "Category 9"
+        options.append(dict(options[1], name="services.gpg-agent.enable", description="Run the agent."))
+        return options
+
+    def test_update_matches_full_rebuild(self):
+        """Test that applying a diff yields the same indices as rebuilding."""
+        new_options = self._changed()
+        diff = self.client.update_search_indices(new_options)
+
+        assert diff == {"added": 1, "removed": 2, "updated": 2, "unchanged": 36}
+        assert index_state(self.client) == fresh_state(new_options)
+        assert_invariants(self.client)
+
+    def test_work_scales_with_change(self):
+        """Test that only added and updated options are indexed again."""
+        index = mock.patch.object(self.client, "_index_option", wraps=self.client._index_option)
+        unindex = mock.patch.object(self.client, "_unindex_option", wraps=self.client._unindex_option)
+        with index as index, unindex as unindex:
+            self.client.update_search_indices(self._changed())
+
+        assert index.call_count == 3  # 1 added + 2 updated
+        assert unindex.call_count == 4  # 2 removed + 2 updated
+
+    def test_unchanged_options_are_not_touched(self):
+        """Test that an identical option set changes nothing."""
+        before = index_state(self.client)
+        with mock.patch.object(self.client, "_index_option") as index:
+            diff = self.client.update_search_indices(copy.deepcopy(self.options))
+        assert diff == {"added": 0, "removed": 0, "updated": 0, "unchanged": 40}
+        index.assert_not_called()
+        assert index_state(self.client) == before
+
+    def test_shared_keys_survive_removal(self):
+        """Test that removing one option keeps keys still used by others."""
+        remaining = [option for option in self.options if option["name"] != "programs.git.setting0"]
+        self.client.update_search_indices(remaining)
+
+        assert "programs.git.setting0" not in self.client.prefix_index
+        assert "programs.git.setting0" not in self.client.prefix_index["programs.git"]
+        assert "programs.git.setting4" in self.client.prefix_index["programs.git"]
+        assert "setting0" not in self.client.inverted_index
+        assert "git" in self.client.inverted_index
+        assert_invariants(self.client)
+
+    def test_large_change_rebuilds(self):
+        """Test that replacing most options falls back to a full rebuild."""
+        new_options = make_options(10)
+        for option in new_options:
+            option["description"] = "Completely different."
+        with mock.patch.object(self.client, "build_search_indices", wraps=self.client.build_search_indices) as build:
+            self.client.update_search_indices(new_options)
+        build.assert_called_once_with(new_options)
+        assert index_state(self.client) == fresh_state(new_options)
+
+    def test_first_update_builds(self):
+        """Test that an empty client builds its indices from scratch."""
+        client = HomeManagerClient()
+        diff = client.update_search_indices(self.options)
+        assert diff["added"] == 40
+        assert index_state(client) == index_state(self.client)
+
+    def test_update_after_loading_snapshot(self):
+        """Test diffing against options loaded from a cache snapshot without hashes."""
+        self.client.option_hashes = {}
+        new_options = self._changed()
+        diff = self.client.update_search_indices(new_options)
+        assert diff["updated"] == 2
+        assert index_state(self.client) == fresh_state(new_options)
+
+    def test_repeated_updates_keep_invariants(self):
+        """Test a sequence of refreshes against rebuilding each time."""
+        current = copy.deepcopy(self.options)
+        for step in range(5):
+            current = copy.deepcopy(current)
+            current[step]["description"] += f" Revision {step}."
+            current.pop()
+            current.append(dict(current[0], name=f"programs.new.option{step}"))
+            self.client.update_search_indices(current)
+            assert_invariants(self.client)
+            assert index_state(self.client) == fresh_state(current)
+
+    def test_duplicate_names_keep_last(self):
+        """Test that a later option of the same name replaces the earlier one."""
+        duplicate = dict(self.options[0], description="Replacement text.")
+        client = HomeManagerClient()
+        client.build_search_indices(self.options + [duplicate])
+        assert client.options[duplicate["name"]]["description"] == "Replacement text."
+        assert_invariants(client)
+
+    @mock.patch.object(HomeManagerClient, "_save_in_memory_data", return_value=True)
+    @mock.patch.object(HomeManagerClient, "_revalidate_stale_cache", return_value=False)
+    @mock.patch.object(HomeManagerClient, "_load_from_cache", return_value=False)
+    def test_refresh_applies_diff(self, *mocks):
+        """Test that reloading from the web re-indexes only the changed options."""
+        new_options = self._changed()
+        with (
+            mock.patch.object(self.client, "load_all_options", return_value=new_options),
+            mock.patch.object(self.client, "_index_option", wraps=self.client._index_option) as index,
+        ):
+            self.client._load_data_internal()
+        assert index.call_count == 3
+        assert index_state(self.client) == fresh_state(new_options)
@@ -0,0 +1,317 @@
+"""Tests for the streaming Home Manager option parser."""
+
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import (
+    COMPACT_FIELDS,
+    HomeManagerOptionParser,
+    expand_records,
+    parse_options,
+    parse_options_compact,
+)
+from mcp_nixos.clients.html_client import HTMLClient
+
+FIXTURE = pathlib.Path(__file__).parent.parent / "fixtures" / "home_manager" / "options.xhtml"
+
+
+def dom_records(client, html, doc_type="options"):
+    """Parse with the BeautifulSoup reference: _parse_single_option for each <dt>."""
+    soup = BeautifulSoup(html, "html.parser")
+    dl = soup.find(class_="variablelist").find("dl")
+    records = [client._parse_single_option(dt, doc_type) for dt in dl.find_all("dt", recursive=False)]
+    return [record for record in records if record]
+
+
+class TestHomeManagerOptionParser:
+    """Tests for HomeManagerOptionParser."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.html = FIXTURE.read_text()
+        self.client = HomeManagerClient()
+
+    def test_matches_dom_parser(self):
+        """Test that records match _parse_single_option record for record."""
+        expected = dom_records(self.client, self.html)
+        assert len(expected) == 12
+        assert parse_options(self.html, "options") == expected
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 100, 4096])
+    def test_chunked_input(self, chunk_size):
+        """Test that splitting the document anywhere gives the same records."""
+        parser = HomeManagerOptionParser("options")
+        records = []
+        for start in range(0, len(self.html), chunk_size):
+            records.extend(parser.feed(self.html[start : start + chunk_size]))
+        records.extend(parser.close())
+        assert records == dom_records(self.client, self.html)
+
+    def test_records_are_emitted_incrementally(self):
+        """Test that each option is available as soon as its definition closes."""
+        parser = HomeManagerOptionParser("options")
+        cut = self.html.index("<dt>", self.html.index("opt-programs.git.enable") - 200)
+        first = parser.feed(self.html[:cut])
+        assert [record["name"] for record in first] == ["_module.args", "accounts.email.accounts"]
+        rest = parser.feed(self.html[cut:]) + parser.close()
+        assert parser.option_count == 12
+        assert len(first) + len(rest) == 12
+
+    def test_edge_cases(self):
+        """Test categories, shared definitions, entities and skipped terms."""
+        records = {record["name"]: record for record in parse_options(self.html, "options")}
+
+        assert records["_module.args"]["category"] == "Uncategorized"
+        assert records["programs.git.enable"]["category"] == "Programs"
+        assert records["services.nested"]["category"] == "Services and daemons"
+        assert records["services.gpg-agent.enable"]["description"] == "Shared definition for two consecutive terms."
+        assert records["programs.nix-index.enable"]["manual_url"].startswith("https://nixos.org/manual/")
+        assert records["programs.old.enable"]["deprecated_version"] == "24.05"
+        assert "&foo" in records["programs.old.enable"]["description"]
+        assert "xdg.enable" in records
+        assert "zzz.dangling" not in records  # No definition follows
+        assert "ignored.second.list" not in records  # Only the first variablelist is used
+
+    def test_parse_html_uses_streaming_parser(self):
+        """Test that parse_html produces the same records as the DOM parser."""
+        assert self.client.parse_html(self.html, "options") == self.client._parse_html_dom(self.html, "options")
+
+    def test_missing_variablelist(self):
+        """Test documents without an option list."""
+        assert parse_options("<html><body><dl><dt>x</dt><dd>y</dd></dl></body></html>", "options") == []
+
+    def test_critical_error_returns_no_records(self):
+        """Test that a failure inside the parser yields no partial results."""
+        parser = HomeManagerOptionParser("options")
+        with mock.patch.object(parser, "_finish_item", side_effect=RuntimeError("boom")):
+            assert parser.feed(self.html) == []
+        assert parser.failed
+        assert parser.close() == []
+
+
+class TestDomForwardPass:
+    """Tests for the single-pass BeautifulSoup fallback parser."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.html = FIXTURE.read_text()
+        self.client = HomeManagerClient()
+
+    def test_matches_per_option_lookups(self):
+        """Test that the forward pass matches per-option sibling and category lookups."""
+        assert self.client._parse_html_dom(self.html, "options") == dom_records(self.client, self.html)
+
+    def test_no_backward_category_walks(self):
+        """Test that categories are carried forward instead of searched for per option."""
+        with mock.patch.object(self.client, "_find_category", side_effect=AssertionError("backward walk")):
+            records = self.client._parse_html_dom(self.html, "options")
+        assert len(records) == 12
+
+    def test_bad_option_does_not_stop_the_pass(self):
+        """Test that an error in one option is logged and the rest are still parsed."""
+        original = self.client._parse_single_option
+
+        def flaky(dt, doc_type, **kwargs):
+            if "programs.git.enable" in dt.text:
+                raise ValueError("bad option")
+            return original(dt, doc_type, **kwargs)
+
+        with mock.patch.object(self.client, "_parse_single_option", side_effect=flaky):
+            records = self.client._parse_html_dom(self.html, "options")
+        names = [record["name"] for record in records]
+        assert "programs.git.enable" not in names
+        assert len(names) == 11
+
+    def test_parse_time_scales_linearly(self):
+        """Test that four times the options takes roughly four times as long, not sixteen."""
+
+        def synthetic_doc(count):
+            items = "".join(
+                f'<dt><span class="term"><code class="option">programs.p{i}.enable</code></span></dt>'
+                f"<dd><p>Whether to enable p{i}.</p><p><em>Type:</em> boolean</p></dd>"
+                for i in range(count)
+            )
+            return f'<html><body><h3>Options</h3><div class="variablelist"><dl>{items}</dl></div></body></html>'
+
+        def best_time(html):
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                records = self.client._parse_html_dom(html, "options")
+                timings.append(time.perf_counter() - start)
+            return min(timings), len(records)
+
+        small, small_count = best_time(synthetic_doc(250))
+        large, large_count = best_time(synthetic_doc(1000))
+        assert (small_count, large_count) == (250, 1000)
+        # Linear growth gives a ratio near 4; the old backward walks gave about 16
+        assert large / small < 8
+
+
+class TestStreamingFetch:
+    """Tests for parsing Home Manager pages while they download."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.html = FIXTURE.read_text()
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _response(self):
+        payload = self.html.encode("utf-8")
+        response = mock.Mock()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response.headers = {}
+        response.raise_for_status = mock.Mock()
+        response.text = self.html
+        # Odd-sized chunks can split multi-byte characters, exercising incremental decoding
+        response.iter_content = lambda chunk_size: (payload[i : i + 1001] for i in range(0, len(payload), 1001))
+        return response
+
+    @mock.patch("requests.get")
+    def test_fetch_streams_chunks(self, mock_get):
+        """Test that HTMLClient hands decoded chunks to the consumer and caches the page."""
+        mock_get.return_value = self._response()
+        client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        chunks = []
+
+        content, metadata = client.fetch("https://example.com/options.xhtml", chunk_consumer=chunks.append)
+
+        assert metadata["streamed"] is True
+        assert len(chunks) > 1
+        assert "".join(chunks) == content == self.html
+        assert mock_get.call_args.kwargs["stream"] is True
+        assert client.cache.get("https://example.com/options.xhtml")[0] == self.html
+
+    @mock.patch("requests.get")
+    def test_load_all_options_parses_while_downloading(self, mock_get):
+        """Test that without parse workers, streamed pages and cached pages are parsed alike."""
+        mock_get.side_effect = lambda *args, **kwargs: self._response()
+        client = HomeManagerClient()
+        client.parse_workers = 0
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        expected_per_source = len(dom_records(client, self.html))
+
+        with mock.patch.object(client, "parse_html", wraps=client.parse_html) as mock_parse:
+            options = client.load_all_options()
+            mock_parse.assert_not_called()  # Everything was parsed from the stream
+        assert len(options) == expected_per_source * len(client.hm_urls)
+        assert {option["source"] for option in options} == set(client.hm_urls)
+
+        # Second load comes from the cache and is parsed from the cached text
+        mock_get.reset_mock()
+        assert client.load_all_options() == options
+        mock_get.assert_not_called()
+
+
+class TestParallelLoad:
+    """Tests for fetching the sources concurrently and parsing them in worker processes."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.html = FIXTURE.read_text()
+        self.client = HomeManagerClient()
+        self.expected = parse_options(self.html, "options")
+
+    def _fetch(self, url, force_refresh=False, chunk_consumer=None):
+        return self.html, {"success": True, "from_cache": False}
+
+    def test_compact_records_round_trip(self):
+        """Test that compact records expand to the same option records."""
+        rows = parse_options_compact(self.html, "options")
+        assert all(len(row) == len(COMPACT_FIELDS) for row in rows)
+        assert expand_records(rows, "options") == self.expected
+
+        # Equal values are shared so they are pickled once
+        types = [row[COMPACT_FIELDS.index("type")] for row in rows if row[COMPACT_FIELDS.index("type")] == "boolean"]
+        assert len(types) > 1 and all(value is types[0] for value in types)
+
+    def test_compact_parse_failure(self):
+        """Test that a critical parsing error is reported as None."""
+        with mock.patch.object(HomeManagerOptionParser, "_finish_item", side_effect=RuntimeError("boom")):
+            assert parse_options_compact(self.html, "options") is None
+
+    def test_sources_fetched_concurrently(self):
+        """Test that every source is being fetched at the same time."""
+        barrier = threading.Barrier(len(self.client.hm_urls), timeout=5)
+
+        def fetch(url, force_refresh=False, chunk_consumer=None):
+            barrier.wait()  # Breaks (and fails the load) unless all fetches are in flight together
+            return self._fetch(url)
+
+        self.client.parse_workers = 0
+        with mock.patch.object(HTMLClient, "fetch", side_effect=fetch):
+            options = self.client.load_all_options()
+        assert len(options) == len(self.expected) * len(self.client.hm_urls)
+        # Results keep the source order even though the fetches finish in any order
+        assert [option["source"] for option in options[:: len(self.expected)]] == list(self.client.hm_urls)
+
+    def test_parsing_happens_in_worker_processes(self):
+        """Test that pages are parsed outside this process."""
+        self.client.parse_workers = 2
+        with (
+            mock.patch.object(HTMLClient, "fetch", side_effect=self._fetch),
+            mock.patch(
+                "mcp_nixos.clients.home_manager_client.HomeManagerOptionParser",
+                side_effect=AssertionError("in-process"),
+            ),
+            mock.patch.object(self.client, "parse_html", side_effect=AssertionError("in-process")),
+        ):
+            options = self.client.load_all_options()
+        assert options[: len(self.expected)] == self.expected
+        assert {option["source"] for option in options} == set(self.client.hm_urls)
+
+    def test_broken_worker_falls_back_to_in_process_parsing(self):
+        """Test that a dead worker pool does not lose the page."""
+        pool = mock.Mock()
+        pool.submit.side_effect = BrokenProcessPool("worker died")
+        with (
+            mock.patch.object(HTMLClient, "fetch", side_effect=self._fetch),
+            mock.patch.object(self.client, "_create_parse_pool", return_value=pool),
+        ):
+            options = self.client.load_all_options()
+        assert options[: len(self.expected)] == self.expected
+        pool.shutdown.assert_called_once()
+
+    def test_worker_parse_failure_uses_dom_parser(self):
+        """Test that a page the worker could not parse goes through parse_html."""
+        pool = mock.Mock()
+        pool.submit.return_value.result.return_value = None
+        with (
+            mock.patch.object(HTMLClient, "fetch", side_effect=self._fetch),
+            mock.patch.object(self.client, "_create_parse_pool", return_value=pool),
+            mock.patch.object(self.client, "parse_html", return_value=[]) as mock_parse,
+        ):
+            self.client.load_all_options()
+        assert mock_parse.call_count == len(self.client.hm_urls)
+
+    def test_parse_workers_from_environment(self):
+        """Test reading the worker count from MCP_NIXOS_HM_PARSE_WORKERS."""
+        with mock.patch.dict("os.environ", {"MCP_NIXOS_HM_PARSE_WORKERS": "0"}):
+            assert HomeManagerClient().parse_workers == 0
+            assert HomeManagerClient()._create_parse_pool() is None
+        with mock.patch.dict("os.environ", {"MCP_NIXOS_HM_PARSE_WORKERS": "lots"}):
+            assert HomeManagerClient().parse_workers == min(3, os.cpu_count() or 1)
+
+    def test_worker_processes_do_not_load_in_background(self):
+        """Test that a worker re-importing the server does not start its own load."""
+        with mock.patch("multiprocessing.parent_process", return_value=mock.Mock()):
+            self.client.load_in_background()
+        assert self.client.loading_thread is None
+        assert not self.client.loading_in_progress
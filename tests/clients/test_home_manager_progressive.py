@@ -0,0 +1,224 @@
+"""Tests for publishing Home Manager sources one by one while a cold start loads the rest."""
+
+import os
+import tempfile
+import threading
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.tools.home_manager_tools import home_manager_info, home_manager_search
+from tests.clients.test_home_manager_incremental import assert_invariants, fresh_state, index_state, make_options
+
+
+def source_options(doc_type, count):
+    """Options of one documentation source, named after it."""
+    prefix = doc_type.replace("-", "_")
+    return [dict(option, name=f"{prefix}.{option['name']}", source=doc_type) for option in make_options(count)]
+
+
+SOURCES = {
+    "options": source_options("options", 40),
+    "nixos-options": source_options("nixos-options", 5),
+    "nix-darwin-options": source_options("nix-darwin-options", 5),
+}
+ALL_OPTIONS = [option for options in SOURCES.values() for option in options]
+
+
+class TestProgressiveLoad:
+    """Tests for the cold-start load publishing each source as soon as it is parsed."""
+
+    def setup_method(self):
+        """Set up a client whose sources finish only when released."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {"MCP_NIXOS_PREBUILT_INDEX_DIR": ""})
+        self.env.start()
+        self.client = HomeManagerClient()
+        self.client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        self.client.parse_workers = 0
+        self.released = {doc_type: threading.Event() for doc_type in SOURCES}
+        self.client._load_source = self._load_source
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        for event in self.released.values():
+            event.set()
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def _load_source(self, doc_type, url, parse_pool=None):
+        assert self.released[doc_type].wait(10)
+        if isinstance(SOURCES[doc_type], Exception):
+            raise SOURCES[doc_type]
+        return SOURCES[doc_type]
+
+    def _start_load(self):
+        self.client.load_in_background()
+        return self.client.loading_thread
+
+    def test_main_source_published_before_the_others(self):
+        """Test that queries are answered from the main page while the other pages are still loading."""
+        loader = self._start_load()
+        self.released["options"].set()
+        assert self.client.ready.wait(10)
+
+        assert self.client.is_loaded and not self.client.loading_in_progress
+        assert self.client.refresh_in_progress
+        assert index_state(self.client) == fresh_state(SOURCES["options"])
+        result = self.client.search_options("options.programs.git")
+        assert result["found"]
+        assert result["pending_sources"] == ["nixos-options", "nix-darwin-options"]
+        assert self.client.get_option("nixos_options.programs.git.setting0")["pending_sources"]
+        assert self.client.get_generation_info()["pending_sources"] == ["nixos-options", "nix-darwin-options"]
+
+        self.released["nix-darwin-options"].set()
+        self.released["nixos-options"].set()
+        loader.join(10)
+
+        assert not self.client.refresh_in_progress and not self.client.pending_sources
+        assert index_state(self.client) == fresh_state(ALL_OPTIONS)
+        assert_invariants(self.client)
+        assert "pending_sources" not in self.client.get_option("nixos_options.programs.git.setting0")
+        assert self.client.get_generation_info()["pending_sources"] == []
+        assert self.client._load_index_snapshot()  # Only the complete generation is saved
+
+    def test_other_sources_wait_for_main_source(self):
+        """Test that sources finishing before the main page are merged into its first publication."""
+        loader = self._start_load()
+        self.released["nix-darwin-options"].set()
+        assert not self.client.ready.wait(0.2)
+        assert self.client.index.generation == 0
+
+        self.released["options"].set()
+        assert self.client.ready.wait(10)
+        assert self.client.index.pending_sources == ("nixos-options",)
+        assert len(self.client.options) == len(SOURCES["options"]) + len(SOURCES["nix-darwin-options"])
+
+        self.released["nixos-options"].set()
+        loader.join(10)
+        assert index_state(self.client) == fresh_state(ALL_OPTIONS)
+
+    def test_failed_source_stays_pending(self):
+        """Test that a source failing after the first publication is reported as pending and nothing is saved."""
+        with mock.patch.dict(SOURCES, {"nixos-options": Exception("offline")}):
+            loader = self._start_load()
+            self.released["options"].set()
+            assert self.client.ready.wait(10)
+            self.released["nix-darwin-options"].set()
+            self.released["nixos-options"].set()
+            loader.join(10)
+        assert self.client.is_loaded and not self.client.loading_error
+        assert not self.client.refresh_in_progress
+        assert self.client.index.pending_sources == ("nixos-options",)
+        assert len(self.client.options) == len(SOURCES["options"]) + len(SOURCES["nix-darwin-options"])
+
+        result = self.client.search_options("nix_darwin_options.programs.git")
+        assert result["found"] and result["pending_sources"] == ["nixos-options"]
+        assert "offline" in result["pending_error"] and "nixos-options" in result["pending_error"]
+        assert self.client.get_generation_info()["refresh_error"] == result["pending_error"]
+        assert not self.client._load_index_snapshot()  # Not saved as if it were complete
+
+    def test_refresh_with_failed_source_is_not_saved(self):
+        """Test that a refresh missing a source publishes what it loaded without saving it."""
+        self.client.build_search_indices(ALL_OPTIONS)
+        self.client.is_loaded = True
+        with mock.patch.dict(SOURCES, {"nix-darwin-options": Exception("offline")}):
+            for event in self.released.values():
+                event.set()
+            with mock.patch.object(self.client, "_save_in_memory_data") as save:
+                self.client.ensure_loaded(force_refresh=True)
+        save.assert_not_called()
+        assert self.client.index.pending_sources == ("nix-darwin-options",)
+        assert len(self.client.options) == len(SOURCES["options"]) + len(SOURCES["nixos-options"])
+        assert "offline" in self.client.search_options("options.programs.git")["pending_error"]
+
+    def test_failed_load_keeps_published_sources(self):
+        """Test that a load failing after the first publication keeps serving it and reports the failure."""
+
+        def failing_load(on_source=None):
+            on_source({"options": SOURCES["options"]})
+            raise RuntimeError("parser crashed")
+
+        self.client.load_all_options = failing_load
+        self.client.load_in_background()
+        self.client.loading_thread.join(10)
+
+        assert self.client.is_loaded and not self.client.loading_error
+        assert not self.client.refresh_in_progress
+        assert self.client.get_generation_info()["refresh_error"] == "parser crashed"
+        result = self.client.search_options("options.programs.git")
+        assert result["found"] and result["pending_error"] == "parser crashed"
+        assert result["pending_sources"] == ["nixos-options", "nix-darwin-options"]
+        assert not self.client._load_index_snapshot()  # The partial generation is not saved
+
+    def test_failed_load_without_publication_fails(self):
+        """Test that a load failing before anything was published is still reported as failed."""
+        self.client.load_all_options = mock.Mock(side_effect=RuntimeError("offline"))
+        self.client.load_in_background()
+        self.client.loading_thread.join(10)
+        assert not self.client.is_loaded and self.client.loading_error == "offline"
+
+    def test_refresh_is_not_progressive(self):
+        """Test that a refresh of loaded data publishes only the complete generation."""
+        self.client.build_search_indices(SOURCES["options"][:10])
+        self.client.is_loaded = True
+        generation = self.client.index.generation
+        for event in self.released.values():
+            event.set()
+        self.client.ensure_loaded(force_refresh=True)
+        assert self.client.index.generation == generation + 1
+        assert index_state(self.client) == fresh_state(ALL_OPTIONS)
+
+    def test_callback_errors_do_not_stop_loading(self):
+        """Test that load_all_options reports sources in completion order and survives a failing callback."""
+        seen = []
+
+        def on_source(results):
+            seen.append(list(results))
+            raise ValueError("publish failed")
+
+        self.released["nixos-options"].set()
+        threading.Timer(0.2, self.released["options"].set).start()
+        threading.Timer(0.4, self.released["nix-darwin-options"].set).start()
+        options = self.client.load_all_options(on_source=on_source)
+        assert options == ALL_OPTIONS  # Documented source order
+        assert seen == [
+            ["nixos-options"],
+            ["nixos-options", "options"],
+            ["nixos-options", "options", "nix-darwin-options"],
+        ]
+
+
+class TestPendingSourcesNote:
+    """Tests for the tools noting results answered while sources are still loading."""
+
+    def setup_method(self):
+        """Set up a context answering from a partial generation."""
+        self.client = HomeManagerClient()
+        self.client.pending_sources = ("nixos-options",)
+        self.client.build_search_indices(SOURCES["options"])
+        self.client.is_loaded = True
+        self.context = mock.MagicMock()
+        self.context.search_options.side_effect = lambda query, limit, count_total: self.client.search_options(
+            query, limit, count_total
+        )
+        self.context.get_option.side_effect = self.client.get_option
+
+    def test_search_and_info_note_pending_sources(self):
+        """Test that search results and missing options say which sources are still loading."""
+        assert "Note: still loading nixos-options" in home_manager_search("options.programs.git", context=self.context)
+        assert "Note: still loading nixos-options" in home_manager_info("nixos_options.foo", context=self.context)
+        found = home_manager_info("options.programs.git.setting0", context=self.context)
+        assert "still loading" not in found
+
+    def test_note_reports_failed_sources(self):
+        """Test that the note says which sources failed once the load has given up on them."""
+        self.client.pending_error = "offline"
+        output = home_manager_search("options.programs.git", context=self.context)
+        assert "Note: failed to load nixos-options (offline)" in output
+        assert "still loading" not in output
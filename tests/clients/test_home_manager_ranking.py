@@ -0,0 +1,173 @@
+"""Tests for top-k ranked retrieval in Home Manager search."""
+
+import random
+import re
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.result_cache import ResultCache
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.utils import posting_lists
+from tests.clients.test_home_manager_incremental import make_options
+
+QUERIES = [
+    "programs",
+    "programs.git",
+    "programs.git.",
+    "programs.git.setting4",
+    "programs.zsh.setting1",
+    "setting12",
+    "git",
+    "configure",
+    "configure git",
+    "number git",
+    "git zsh",
+    "configure nothing-indexed",
+    "xy",
+    "programs.",
+    "services",
+    "telescope",
+    "*programs.git*",
+]
+
+
+def reference_search(client, query, limit):
+    """Ranking of the previous implementation: score every match, sort them all."""
+    query = query.strip().lower()
+    matches = {}
+    words = re.findall(r"\w+", query)
+    if query in client.options:
+        matches[query] = 100
+    if query in client.prefix_index:
+        for name in client.prefix_index[query]:
+            matches[name] = max(matches.get(name, 0), 80)
+    if query.endswith(".") and query[:-1] in client.prefix_index:
+        for name in client.prefix_index[query[:-1]]:
+            if name.startswith(query):
+                matches[name] = max(matches.get(name, 0), 90)
+    candidate_sets = [client.inverted_index[word] for word in words if word in client.inverted_index]
+    for name in set.intersection(*candidate_sets) if candidate_sets else set():
+        score = 60 if any(word in name.lower() for word in words) else 50
+        matches[name] = max(matches.get(name, 0), score)
+    ranked = sorted(matches.items(), key=lambda item: (-item[1], item[0]))
+    return len(matches), ranked[:limit]
+
+
+def build_client(options):
+    client = HomeManagerClient()
+    client.build_search_indices(options)
+    client.is_loaded = True
+    return client
+
+
+class TestTopKSearch:
+    """Tests for HomeManagerClient.search_options ranking."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        options = make_options(400)
+        # An option whose name is also the parent of others, and one mentioning a word in its name only
+        options.append(dict(options[0], name="programs.git", description="Git itself."))
+        options.append(dict(options[1], name="programs.gitui.configure", description="Configure number git."))
+        self.client = build_client(options)
+
+    @pytest.mark.parametrize("query", QUERIES)
+    @pytest.mark.parametrize("limit", [1, 5, 20, 1000])
+    def test_matches_full_sort(self, query, limit):
+        """Test that the top-k results and count equal scoring and sorting everything."""
+        count, ranked = reference_search(self.client, query, limit)
+        result = self.client.search_options(query, limit)
+
+        assert result["count"] == count
+        assert [(option["name"], option["score"]) for option in result["options"]] == ranked
+        assert result["found"] == bool(ranked)
+
+    @pytest.mark.parametrize("query", QUERIES)
+    def test_skipping_count_keeps_results(self, query):
+        """Test that skipping the total count returns the same options without a count."""
+        counted = self.client.search_options(query, 10)
+        uncounted = self.client.search_options(query, 10, count_total=False)
+        assert "count" not in uncounted
+        assert uncounted["options"] == counted["options"]
+        assert uncounted["found"] == counted["found"]
+
+    def test_name_matches_short_circuit_word_search(self):
+        """Test that the word search is skipped when name matches fill the result."""
+        with mock.patch.object(self.client, "_intersect_postings", wraps=self.client._intersect_postings) as intersect:
+            self.client.search_options("programs.git", 5, count_total=False)
+            intersect.assert_not_called()
+            self.client.search_options("programs.git", 5)
+            intersect.assert_called_once()
+
+    def test_intersection_starts_from_smallest_posting(self):
+        """Test that posting lists are intersected rarest first and the intersection stops when empty."""
+        operations = []
+        real_intersect_pair = posting_lists._intersect_pair
+
+        def intersect_pair(first, second, is_sorted=True):
+            operations.append((len(first), len(second)))
+            return real_intersect_pair(first, second, is_sorted)
+
+        with mock.patch.object(posting_lists, "_intersect_pair", side_effect=intersect_pair):
+            assert self.client._intersect_postings(["configure", "git", "setting12"]) == {"programs.git.setting12"}
+            assert operations == [(1, 102), (1, 401)]
+
+            operations.clear()
+            assert self.client._intersect_postings(["configure", "zsh", "setting12"]) == set()
+            assert operations == [(1, 100)]  # Empty after the first step; "configure" is never touched
+
+    def test_unknown_words_are_ignored(self):
+        """Test that words without postings do not empty the intersection."""
+        assert set(self.client._intersect_postings(["telescope", "setting12"])) == {"programs.git.setting12"}
+        assert list(self.client._intersect_postings(["telescope"])) == []
+
+    def test_zero_limit(self):
+        """Test that a zero limit returns no options but still counts matches."""
+        result = self.client.search_options("git", 0)
+        assert result["options"] == []
+        assert result["count"] == reference_search(self.client, "git", 0)[0]
+
+
+@pytest.mark.slow
+class TestSearchLatency:
+    """Latency benchmarks against the full-sort ranking, on a large synthetic corpus."""
+
+    @classmethod
+    def setup_class(cls):
+        """Build a corpus where common words match thousands of options."""
+        random.seed(7)
+        options = make_options(15000)
+        for option in options:
+            option["description"] += random.choice([" Enable the package.", " Extra settings.", ""])
+        cls.client = build_client(options)
+        cls.client.result_cache = ResultCache(max_size=0)  # Time the search itself, not remembered results
+
+    def _best_time(self, function, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    @pytest.mark.parametrize(
+        "query",
+        ["configure", "configure git", "enable package setting", "programs", "programs.git."],
+        ids=["one-word", "two-words", "three-words", "prefix", "children"],
+    )
+    def test_top_k_latency(self, query):
+        """Test that top-k search, with and without a count, beats sorting every match."""
+        reference = self._best_time(lambda: reference_search(self.client, query, 20))
+        counted = self._best_time(lambda: self.client.search_options(query, 20))
+        uncounted = self._best_time(lambda: self.client.search_options(query, 20, count_total=False))
+        print(
+            f"\n{query!r}: full sort {reference * 1000:.2f}ms, top-k {counted * 1000:.2f}ms, "
+            f"top-k without count {uncounted * 1000:.2f}ms"
+        )
+        assert counted < reference
+        assert uncounted <= counted * 1.5
@@ -0,0 +1,136 @@
+"""Tests for remembered Home Manager search results."""
+
+import copy
+import random
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.result_cache import ResultCache
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.contexts.home_manager_context import HomeManagerContext
+from tests.clients.test_home_manager_incremental import make_options
+from tests.clients.test_home_manager_ranking import build_client
+
+
+class TestSearchResultCache:
+    """Tests for search_options answered from the result cache."""
+
+    def setup_method(self):
+        """Set up an indexed client."""
+        self.options = make_options(200)
+        self.client = build_client(copy.deepcopy(self.options))
+
+    def _ranked(self):
+        return mock.patch.object(self.client, "_rank_matches", wraps=self.client._rank_matches)
+
+    def test_repeated_search_is_not_ranked_again(self):
+        """Test that a search repeated with the same normalized query, limit and filters is remembered."""
+        with self._ranked() as rank:
+            first = self.client.search_options("Configure Git", 10, filters={"type": "String"})
+            again = self.client.search_options("  configure git ", 10, filters={"type": "string", "source": ""})
+        assert again == first and first["found"]
+        assert rank.call_count == 1
+        stats = self.client.result_cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    @pytest.mark.parametrize(
+        "other",
+        [
+            {"query": "configure zsh"},
+            {"limit": 11},
+            {"count_total": False},
+            {"filters": {"type": "string"}},
+        ],
+        ids=["query", "limit", "count", "filters"],
+    )
+    def test_other_searches_are_ranked(self, other):
+        """Test that searches differing in query, limit, count or filters are not mixed up."""
+        arguments = {"query": "configure git", "limit": 10, "count_total": True, "filters": None}
+        self.client.search_options(**arguments)
+        arguments.update(other)
+        expected = self.client._search(
+            arguments["query"], arguments["limit"], arguments["count_total"], arguments["filters"], self.client.index
+        )
+        assert self.client.search_options(**arguments) == expected
+        assert self.client.result_cache.get_stats()["hits"] == 0
+
+    def test_new_generation_is_searched(self):
+        """Test that results are not reused once a new generation is published."""
+        before = self.client.search_options("setting7", 5)
+        options = copy.deepcopy(self.options)
+        options[7]["description"] = "Moved elsewhere."
+        self.client.update_search_indices(options)
+
+        after = self.client.search_options("setting7", 5)
+        assert after != before
+        assert after == build_client(options).search_options("setting7", 5)
+        assert self.client.result_cache.generation == self.client.index.generation
+
+    def test_structures_replaced_in_place(self):
+        """Test that replacing a structure of the served generation forgets its results."""
+        self.client.search_options("setting7", 5)
+        self.client.options = {
+            name: {**option, "description": "Replaced."} for name, option in self.client.options.items()
+        }
+        assert self.client.search_options("setting7", 5)["options"][0]["description"] == "Replaced."
+
+    def test_callers_cannot_change_remembered_results(self):
+        """Test that sorting or extending a result leaves the next answer intact."""
+        first = self.client.search_options("programs.git.*", 500)
+        expected = copy.deepcopy(first)
+        first["options"].sort(key=lambda option: option["name"], reverse=True)
+        first["options"][0]["name"] = "changed"
+        assert self.client.search_options("programs.git.*", 500) == expected
+
+    def test_errors_are_answered_as_before(self):
+        """Test that unknown filters and empty queries are answered without touching the cache."""
+        assert "Cannot filter by" in self.client.search_options("git", filters={"colour": "red"})["error"]
+        assert self.client.search_options("  ")["error"] == "Empty query"
+        stats = self.client.result_cache.get_stats()
+        assert stats["hits"] == stats["misses"] == 0
+
+    @mock.patch("mcp_nixos.contexts.home_manager_context.HomeManagerClient")
+    def test_context_reports_stats(self, MockClient):
+        """Test that the context status reports the hit ratio and saved CPU time."""
+        MockClient.return_value = self.client
+        context = HomeManagerContext()
+        self.client.search_options("git")
+        self.client.search_options("git")
+        stats = context.get_status()["search_result_cache"]
+        assert stats["hit_ratio"] == 0.5 and stats["saved_cpu_seconds"] >= 0
+
+
+@pytest.mark.slow
+class TestSearchResultCacheBenchmark:
+    """Hit ratio and CPU time saved on a conversation-like stream of repeated searches."""
+
+    def test_repeated_searches(self):
+        """Test that a stream where most searches repeat an earlier one spends less CPU time searching."""
+        rng = random.Random(50)
+        options = make_options(15000)
+        for option in options:
+            option["description"] += rng.choice([" Enable the package.", " Extra settings.", ""])
+        client = build_client(options)
+        queries = ["configure", "configure git", "enable package setting", "programs.git.", "programs.zsh.*"]
+        queries += [f"setting{rng.randrange(15000)}" for _ in range(15)]
+        stream = [rng.choice(queries) for _ in range(200)]
+
+        uncached = HomeManagerClient()
+        uncached.index = client.index
+        uncached.is_loaded = True
+        uncached.result_cache = ResultCache(max_size=0)
+        for query in stream:
+            assert client.search_options(query, 20) == uncached.search_options(query, 20)
+
+        stats = client.result_cache.get_stats()
+        print(
+            f"\nhit ratio {stats['hit_ratio']:.0%}, searching {stats['spent_cpu_seconds'] * 1000:.1f}ms CPU, "
+            f"saved {stats['saved_cpu_seconds'] * 1000:.1f}ms CPU"
+        )
+        assert stats["hits"] + stats["misses"] == len(stream)
+        assert stats["misses"] <= len(queries) and stats["hit_ratio"] >= 0.85
+        assert stats["saved_cpu_seconds"] > stats["spent_cpu_seconds"]
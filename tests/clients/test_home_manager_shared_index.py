@@ -0,0 +1,130 @@
+"""Tests for serving Home Manager options from a shared, memory-mapped index file."""
+
+import copy
+import os
+import tempfile
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.cache.mapped_index import MappedPostings
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.clients.option_record import OptionRecord
+from tests.clients.test_home_manager_incremental import assert_invariants, fresh_state, index_state, make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+class TestSharedIndex:
+    """Tests for publishing and mapping the shared Home Manager index."""
+
+    def setup_method(self):
+        """Set up a client that has built and saved its indices."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.options = parse_options(FIXTURE.read_text(), "options") + make_options(200)
+        self.client = self._client()
+        self.client.build_search_indices(self.options)
+        self.client.is_loaded = True
+        assert self.client._save_in_memory_data()
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _client(self):
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        return client
+
+    def _mapped_client(self):
+        client = self._client()
+        # Neither the snapshot nor the legacy JSON/pickle pair must be needed
+        with mock.patch.object(HTMLCache, "get_binary_data", side_effect=AssertionError("snapshot read")):
+            assert client._load_from_cache()
+        client.is_loaded = True
+        return client
+
+    def test_mapped_index_matches_fresh_build(self):
+        """Test that the mapped generation holds the same options and indices."""
+        loaded = self._mapped_client()
+        assert loaded.index.origin == "shared"
+        assert isinstance(loaded.inverted_index, MappedPostings)
+        assert isinstance(loaded.options["programs.git.setting0"], OptionRecord)
+        assert index_state(loaded) == index_state(self.client)
+        assert_invariants(loaded)
+
+    def test_mapped_client_answers_like_fresh_one(self):
+        """Test that searches, lookups and spelling corrections are unchanged."""
+        loaded = self._mapped_client()
+        for query in ("programs.git", "programs.git.", "enable", "setting1", "telescope", "configure zsh", "gti"):
+            assert loaded.search_options(query) == self.client.search_options(query)
+        for name in ("programs.zsh.setting1", "programs.zhs.setting1", "programs.git"):
+            assert loaded.get_option(name) == self.client.get_option(name)
+        assert loaded.get_options_by_prefix("programs.git") == self.client.get_options_by_prefix("programs.git")
+        stats, expected = loaded.get_stats(), self.client.get_stats()
+        stats.pop("generation"), expected.pop("generation")
+        assert stats == expected
+
+    def test_update_on_mapped_generation(self):
+        """Test that an incremental refresh copies the mapped generation into memory and leaves the file alone."""
+        loaded = self._mapped_client()
+        mapped_index = loaded.index
+        options = copy.deepcopy(self.options)
+        del options[0]
+        options[3]["description"] = "Reworded description mentioning telescope."
+        options.append(dict(options[5], name="programs.brand-new.enable"))
+
+        loaded.update_search_indices(options)
+
+        assert loaded.index is not mapped_index
+        assert index_state(loaded) == fresh_state(options)
+        assert_invariants(loaded)
+        assert "programs.brand-new.enable" not in mapped_index.options
+        assert index_state(self._mapped_client()) == index_state(self.client)
+
+    def test_other_processes_see_newer_version(self):
+        """Test that a newly saved version is the one mapped next, and invalidation stops sharing it."""
+        self.client.build_search_indices(self.options + [dict(self.options[0], name="programs.new.enable")])
+        assert self.client._save_in_memory_data()
+        assert "programs.new.enable" in self._mapped_client().options
+
+        self.client.invalidate_cache()
+        assert not self.client._load_mapped_index()
+
+    def test_expired_index_used_for_revalidation(self):
+        """Test that an expired shared index loads only when expired data is allowed, and is renewed."""
+        loaded = self._client()
+        store = loaded._mapped_store()
+        os.utime(store.pointer, (time.time() - 7200, time.time() - 7200))
+        assert not loaded._load_mapped_index()
+        assert loaded._load_mapped_index(allow_expired=True)
+
+        loaded.fetch_url = mock.MagicMock(return_value="<html/>")
+        loaded.last_fetch_metadata = {url: {"not_modified": True} for url in loaded.hm_urls.values()}
+        assert loaded._revalidate_stale_cache()
+        assert loaded._load_mapped_index()
+
+    def test_damaged_index_falls_back_to_snapshot(self):
+        """Test that a damaged shared index is dropped and the binary snapshot is loaded instead."""
+        path = self.client._mapped_store().current_path()
+        path.write_bytes(path.read_bytes()[:100])
+
+        loaded = self._client()
+        assert loaded._load_from_cache()
+        assert loaded.index.origin == "cache"
+        assert index_state(loaded) == index_state(self.client)
+        assert self.client._mapped_store().current_path() is None
+
+    def test_sharing_disabled(self):
+        """Test that MCP_NIXOS_SHARED_INDEX=false neither writes nor maps shared indices."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"}):
+            assert not self.client._save_mapped_index()
+            loaded = self._client()
+            assert loaded._load_from_cache()
+        assert loaded.index.origin == "cache"
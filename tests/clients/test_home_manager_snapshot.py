@@ -0,0 +1,114 @@
+"""Tests for loading Home Manager data from binary index snapshots."""
+
+import os
+import tempfile
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.html_cache import HTMLCache
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.html_client import HTMLClient
+from tests.clients.test_home_manager_incremental import index_state, make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+class TestHomeManagerSnapshot:
+    """Tests for the Home Manager index snapshot."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Loading prefers the shared mapped index (tested separately); these tests cover the snapshot
+        self.no_shared_index = mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"})
+        self.no_shared_index.start()
+        self.options = parse_options(FIXTURE.read_text(), "options") + make_options(200)
+        self.client = self._client()
+        self.client.build_search_indices(self.options)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.no_shared_index.stop()
+        self.temp_dir.cleanup()
+
+    def _client(self):
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        return client
+
+    def test_snapshot_matches_fresh_build(self):
+        """Test that loading the snapshot reproduces the freshly built indices."""
+        assert self.client._save_in_memory_data()
+
+        loaded = self._client()
+        # The legacy JSON/pickle pair must not be needed
+        with mock.patch.object(HTMLCache, "get_data", side_effect=AssertionError("legacy data read")):
+            assert loaded._load_from_cache()
+        assert index_state(loaded) == index_state(self.client)
+        assert list(loaded.options) == list(self.client.options)
+        assert loaded.options_by_category == self.client.options_by_category  # Order included
+
+    def test_loaded_client_searches_like_fresh_one(self):
+        """Test that search results are identical after a snapshot load."""
+        self.client.is_loaded = True
+        self.client._save_in_memory_data()
+        loaded = self._client()
+        loaded._load_from_cache()
+        loaded.is_loaded = True
+
+        for query in ("programs.git", "enable", "setting1", "telescope"):
+            assert loaded.search_options(query) == self.client.search_options(query)
+        assert loaded.get_option("programs.zsh.setting1") == self.client.get_option("programs.zsh.setting1")
+
+    def test_corrupt_snapshot_falls_back_to_legacy(self):
+        """Test that a damaged snapshot is discarded and the JSON/pickle pair is used."""
+        self.client._save_in_memory_data()
+        self.client._save_legacy_data(self.client.index)
+        cache = self.client.html_client.cache
+        data, _ = cache.get_binary_data(self.client.snapshot_key)
+        cache.set_binary_data(self.client.snapshot_key, data[:-10])
+
+        loaded = self._client()
+        assert loaded._load_from_cache()
+        assert index_state(loaded) == index_state(self.client)
+        assert cache.get_binary_data(self.client.snapshot_key)[0] is None  # Invalidated
+
+    def test_expired_snapshot_used_for_revalidation(self):
+        """Test that an expired snapshot loads only when expired data is allowed."""
+        self.client._save_in_memory_data()
+        self.client.html_client.cache.flush()  # Age the snapshot on disk, not in the write queue
+        loaded = self._client()
+        with mock.patch("time.time", return_value=time.time() + 7200):
+            assert not loaded._load_index_snapshot()
+            assert loaded._load_index_snapshot(allow_expired=True)
+        assert len(loaded.options) == len(self.client.options)
+
+    def test_unstorable_options_skip_snapshot(self):
+        """Test that options the format cannot hold still reach the legacy cache."""
+        self.client.options["programs.git.enable"] = dict(self.client.options["programs.git.enable"], extra=1)
+        assert self.client._save_in_memory_data()
+        assert self.client.html_client.cache.get_binary_data(self.client.snapshot_key)[0] is None
+        assert self.client.html_client.cache.get_data(self.client.cache_key)[0] is not None
+
+    def test_snapshot_replaces_legacy_data(self):
+        """Test that options the snapshot holds are not also saved as the JSON/pickle pair."""
+        assert self.client._save_in_memory_data()
+        assert self.client.html_client.cache.get_data(self.client.cache_key)[0] is None
+
+    def test_legacy_hierarchical_keys_are_not_evaluated(self):
+        """Test that legacy tuple keys are parsed as literals, never executed."""
+        self.client._save_legacy_data(self.client.index)
+        cache = self.client.html_client.cache
+        binary, _ = cache.get_binary_data(self.client.cache_key)
+        binary["hierarchical_index"]["__import__('os').getcwd()"] = ["programs.git.enable"]
+        cache.set_binary_data(self.client.cache_key, binary)
+
+        loaded = self._client()
+        with mock.patch("os.getcwd", side_effect=AssertionError("evaluated")):
+            assert loaded._load_from_cache()
+        assert loaded.hierarchical_index == self.client.hierarchical_index
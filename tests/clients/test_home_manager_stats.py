@@ -0,0 +1,114 @@
+"""Tests for the Home Manager option counts kept with each index generation."""
+
+import copy
+import os
+import tempfile
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_index import HomeManagerIndex
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.html_client import HTMLClient
+from tests.clients.test_home_manager_incremental import make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+def counted(options):
+    """Option counts by source, type and category, counted the way get_stats used to."""
+    counts = {"by_source": {}, "by_type": {}, "by_category": {}}
+    for option in options:
+        for name, field, missing in (
+            ("by_source", "source", "unknown"),
+            ("by_type", "type", "unknown"),
+            ("by_category", "category", "Uncategorized"),
+        ):
+            value = option.get(field) or missing
+            counts[name][value] = counts[name].get(value, 0) + 1
+    return counts
+
+
+class TestOptionCounts:
+    """Tests for option counts kept up to date and saved with snapshots."""
+
+    def setup_method(self):
+        """Set up a client with indexed options and a cache directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.options = parse_options(FIXTURE.read_text(), "options") + make_options(100)
+        self.client = self._client()
+        self.client.build_search_indices(self.options)
+        self.client.is_loaded = True
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _client(self):
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        return client
+
+    def test_stats_come_from_counts(self):
+        """Test that stats report the counts without going through the options."""
+        assert self.client.index.option_counts == counted(self.options)
+        with mock.patch.object(HomeManagerIndex, "count_option", side_effect=AssertionError("counted")):
+            stats = self.client.get_stats()
+            options_list = self.client.get_options_list()
+        assert stats["total_options"] == len(self.options)
+        assert stats["by_type"] == counted(self.options)["by_type"]
+        assert stats["total_categories"] == len(self.client.options_by_category)
+        assert {category: len(names) for category, names in self.client.options_by_category.items()} == (
+            stats["by_category"]
+        )
+        assert options_list["count"] == stats["total_categories"]
+
+    def test_counts_follow_incremental_updates(self):
+        """Test that adding, removing and changing options keeps the counts exact, without touching the old ones."""
+        previous = copy.deepcopy(self.client.index.option_counts)
+        options = copy.deepcopy(self.options)
+        del options[0]
+        options[4]["type"] = "a brand new type"
+        options.append(dict(options[6], name="programs.brand-new.enable", source="nixos-options"))
+
+        self.client.update_search_indices(options)
+
+        assert self.client.index.option_counts == counted(options)
+        assert self.client.get_stats()["by_source"]["nixos-options"] == 1
+        assert previous == counted(self.options)
+
+    @pytest.mark.parametrize("shared", ["true", "false"])
+    def test_counts_saved_with_snapshot(self, shared):
+        """Test that a generation loaded from the shared index or snapshot takes the saved counts."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": shared}):
+            assert self.client._save_in_memory_data()
+            loaded = self._client()
+            with mock.patch.object(HomeManagerIndex, "count_option", side_effect=AssertionError("counted")):
+                assert loaded._load_from_cache()
+        assert loaded.index.origin == ("shared" if shared == "true" else "cache")
+        loaded.is_loaded = True
+        assert loaded.get_stats()["by_category"] == self.client.get_stats()["by_category"]
+
+    def test_older_snapshot_is_counted(self):
+        """Test that a snapshot saved without counts, or with counts that do not add up, is counted on load."""
+        index = HomeManagerIndex()
+        index.options = {option["name"]: option for option in make_options(10)}
+        index.restore_counts(None)
+        assert index.option_counts == counted(make_options(10))
+        index.restore_counts({"by_source": {"options": 3}, "by_type": {}, "by_category": {}})
+        assert index.option_counts == counted(make_options(10))
+
+    def test_legacy_cache_is_counted(self):
+        """Test that the JSON/pickle cache of older releases still loads with counts."""
+        self.client._save_legacy_data(self.client.index)
+        data, _ = self.client.html_client.cache.get_data(self.client.cache_key)
+        del data["option_counts"]
+        self.client.html_client.cache.set_data(self.client.cache_key, data)
+        loaded = self._client()
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_SHARED_INDEX": "false"}):
+            assert loaded._load_from_cache()
+        assert loaded.index.origin == "cache"
+        assert loaded.index.option_counts == counted(self.options)
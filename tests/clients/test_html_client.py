@@ -1,6 +1,10 @@
 """Unit tests for HTML client implementation."""
 
+import json
+import os
+import pathlib
 import tempfile
+import time
 import pytest
 from unittest import mock
 
@@ -20,7 +24,9 @@ class TestHTMLClient:
         """Set up test fixtures."""
         self.temp_dir = tempfile.TemporaryDirectory()
         self.cache_dir = self.temp_dir.name
-        self.client = HTMLClient(cache_dir=self.cache_dir, ttl=3600)
+        # These tests count and age cache files, so writes land on disk before set() returns
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_CACHE_WRITE_BEHIND": "false"}):
+            self.client = HTMLClient(cache_dir=self.cache_dir, ttl=3600)
         self.test_url = "https://example.com/test"
         self.test_content = "<html><body>Test Content</body></html>"
 
@@ -196,3 +202,153 @@ class TestHTMLClient:
             content, metadata = client.fetch(self.test_url)
             assert content == self.test_content
             assert "cache_result" not in metadata
+
+
+class TestConditionalRevalidation:
+    """Tests for revalidating expired entries with ETag/Last-Modified."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Expired entries are aged on disk, so writes land there before set() returns
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_CACHE_WRITE_BEHIND": "false"}):
+            self.client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        self.cache = self.client.cache
+        self.url = "https://example.com/options.xhtml"
+        self.content = "<html><body>Options</body></html>"
+        self.headers = {"ETag": '"abc123"', "Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"}
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _response(self, status_code=200, text="", headers=None):
+        response = mock.Mock()
+        response.status_code = status_code
+        response.text = text
+        response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        response.raise_for_status = mock.Mock()
+        return response
+
+    def _expire(self, url):
+        """Backdate an entry past the TTL."""
+        past = time.time() - 7200
+        cache_path = self.cache._get_cache_path(url)
+        meta_path = pathlib.Path(f"{cache_path}.meta")
+        meta = json.loads(meta_path.read_text())
+        meta["creation_timestamp"] = past
+        meta_path.write_text(json.dumps(meta))
+        os.utime(cache_path, (past, past))
+
+    @mock.patch("requests.get")
+    def test_validators_are_stored(self, mock_get):
+        """Test that ETag and Last-Modified are kept in the cache metadata."""
+        mock_get.return_value = self._response(text=self.content, headers=self.headers)
+        self.client.fetch(self.url)
+
+        _, metadata = self.cache.get(self.url)
+        assert metadata["etag"] == '"abc123"'
+        assert metadata["last_modified"] == "Wed, 01 Oct 2025 10:00:00 GMT"
+
+    @mock.patch("requests.get")
+    def test_not_modified_renews_entry(self, mock_get):
+        """Test that a 304 response serves the cached content and restarts its TTL."""
+        mock_get.return_value = self._response(text=self.content, headers=self.headers)
+        self.client.fetch(self.url)
+        self._expire(self.url)
+
+        mock_get.return_value = self._response(status_code=304)
+        content, metadata = self.client.fetch(self.url)
+
+        assert content == self.content
+        assert metadata["not_modified"] is True
+        assert metadata["from_cache"] is True
+        assert metadata["status_code"] == 304
+        assert metadata["cache_result"]["renewed"] is True
+        _, kwargs = mock_get.call_args
+        assert kwargs["headers"] == {
+            "If-None-Match": '"abc123"',
+            "If-Modified-Since": "Wed, 01 Oct 2025 10:00:00 GMT",
+        }
+
+        # The entry is fresh again and keeps its validators
+        mock_get.reset_mock()
+        content, metadata = self.client.fetch(self.url)
+        assert content == self.content
+        assert metadata["cache_hit"] is True
+        assert metadata["not_modified"] is False
+        assert metadata["etag"] == '"abc123"'
+        mock_get.assert_not_called()
+
+    @mock.patch("requests.get")
+    def test_modified_content_replaces_entry(self, mock_get):
+        """Test that a 200 response to a conditional request stores the new content."""
+        mock_get.return_value = self._response(text=self.content, headers=self.headers)
+        self.client.fetch(self.url)
+        self._expire(self.url)
+
+        mock_get.return_value = self._response(text="<html>new</html>", headers={"ETag": '"def456"'})
+        content, metadata = self.client.fetch(self.url)
+
+        assert content == "<html>new</html>"
+        assert metadata["not_modified"] is False
+        assert self.cache.get(self.url)[1]["etag"] == '"def456"'
+
+    @mock.patch("requests.get")
+    def test_no_validators_means_unconditional_request(self, mock_get):
+        """Test that entries without validators are downloaded again."""
+        self.cache.set(self.url, self.content)
+        self._expire(self.url)
+
+        mock_get.return_value = self._response(text=self.content)
+        self.client.fetch(self.url)
+        mock_get.assert_called_once_with(self.url, timeout=30)
+
+    @mock.patch("requests.get")
+    def test_force_refresh_skips_revalidation(self, mock_get):
+        """Test that force_refresh never sends a conditional request."""
+        self.cache.set(self.url, self.content, {"etag": '"abc123"'})
+
+        mock_get.return_value = self._response(text=self.content)
+        self.client.fetch(self.url, force_refresh=True)
+        mock_get.assert_called_once_with(self.url, timeout=30)
+
+    def test_sqlite_backend_renew(self):
+        """Test renewing an expired entry in the SQLite backend."""
+        cache = HTMLCache(cache_dir=self.temp_dir.name, ttl=3600, backend="sqlite", write_behind=False)
+        try:
+            cache.set(self.url, self.content, {"etag": '"abc123"'})
+            cache.store.touch("html", cache._hash_key(self.url), time.time() - 7200)
+
+            assert cache.get(self.url)[0] is None
+            content, metadata = cache.get(self.url, allow_expired=True)
+            assert content == self.content
+            assert metadata["stale"] is True
+            assert metadata["etag"] == '"abc123"'
+
+            assert cache.renew(self.url, {"etag": '"xyz"'})["renewed"] is True
+            content, metadata = cache.get(self.url)
+            assert content == self.content
+            assert metadata["etag"] == '"xyz"'
+        finally:
+            cache.close()
+
+    def test_renew_data(self):
+        """Test renewing expired data snapshots."""
+        past = time.time() - 7200
+        self.cache.set_data("key", {"x": 1, "creation_timestamp": past})
+        self.cache.set_binary_data("key", {"y": {2}})
+        meta_path = pathlib.Path(f"{self.cache._get_binary_data_cache_path('key')}.meta")
+        meta_path.write_text(json.dumps(dict(json.loads(meta_path.read_text()), creation_timestamp=past)))
+        for path in (self.cache._get_data_cache_path("key"), self.cache._get_binary_data_cache_path("key")):
+            os.utime(path, (past, past))
+
+        assert self.cache.get_data("key")[0] is None
+        assert self.cache.get_binary_data("key")[0] is None
+        assert self.cache.get_binary_data("key", allow_expired=True)[1]["stale"] is True
+
+        result = self.cache.renew_data("key")
+        assert result["renewed"] is True
+        assert result["binary_renewed"] is True
+        assert self.cache.get_data("key")[0]["x"] == 1
+        assert self.cache.get_binary_data("key")[0] == {"y": {2}}
@@ -0,0 +1,163 @@
+"""Tests for the trigram index and typo-tolerant Home Manager lookups."""
+
+import time
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.ngram_index import TrigramIndex, edit_distance, trigrams
+from tests.clients.test_home_manager_incremental import make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+SEGMENTS = ["programs", "services", "neovim", "git", "gitui", "gpg-agent", "enable", "enableSshSupport", "userName"]
+
+
+class TestTrigramIndex:
+    """Tests for TrigramIndex and its helpers."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.index = TrigramIndex(SEGMENTS)
+
+    def test_trigrams(self):
+        """Test padding and lowercasing."""
+        assert trigrams("Git") == {"  g", " gi", "git", "it "}
+
+    @pytest.mark.parametrize(
+        "first, second, expected",
+        [
+            ("neovim", "neovim", 0),
+            ("neovm", "neovim", 1),  # Deletion
+            ("enabel", "enable", 1),  # Adjacent transposition
+            ("gti", "git", 1),
+            ("servcies", "services", 1),
+            ("usrname", "username", 1),
+            ("kitten", "sitting", 3),
+        ],
+    )
+    def test_edit_distance(self, first, second, expected):
+        """Test the optimal string alignment distance."""
+        assert edit_distance(first, second, 5) == expected
+        assert edit_distance(first, second, 0) == (0 if expected == 0 else 1)
+
+    @pytest.mark.parametrize(
+        "typo, expected",
+        [
+            ("neovm", "neovim"),
+            ("enabel", "enable"),
+            ("servics", "services"),
+            ("gti", "git"),
+            ("gpg-agnet", "gpg-agent"),
+            ("username", "userName"),  # Case-insensitive
+        ],
+    )
+    def test_similar_finds_intended_term(self, typo, expected):
+        """Test that the intended term is the closest match for common typos."""
+        assert self.index.similar(typo)[0][0] == expected
+
+    def test_similar_rejects_distant_terms(self):
+        """Test that unrelated terms are not suggested."""
+        assert self.index.similar("telescope") == []
+        assert self.index.similar("xyz") == []
+        assert sorted(term for term, _ in self.index.similar("gitu")) == ["git", "gitui"]
+
+    def test_add_is_idempotent(self):
+        """Test adding a known term and membership."""
+        self.index.add("neovim")
+        assert len(self.index) == len(SEGMENTS)
+        assert "neovim" in self.index
+        assert "neovm" not in self.index
+
+    def test_deferred_index(self):
+        """Test that a deferred index reads its terms only when first used, and then answers like any other."""
+        read = []
+        index = TrigramIndex.deferred(read.append(term) or term for term in SEGMENTS)
+        assert read == []
+        assert index.similar("neovm") == self.index.similar("neovm")
+        assert read == SEGMENTS
+        index.add("nvim")
+        assert len(index) == len(SEGMENTS) + 1 and "nvim" in index and "nvim" not in self.index
+
+
+class TestHomeManagerSpelling:
+    """Tests for spelling suggestions and corrections in the Home Manager client."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.client = HomeManagerClient()
+        self.client.build_search_indices(parse_options(FIXTURE.read_text(), "options"))
+        self.client.is_loaded = True
+
+    @pytest.mark.parametrize(
+        "typo, expected",
+        [
+            ("programs.gti.enable", "programs.git.enable"),
+            ("progams.git.username", "programs.git.userName"),
+            ("servics.gpg-agnet.enable", "services.gpg-agent.enable"),
+        ],
+    )
+    def test_get_option_suggests_spellings(self, typo, expected):
+        """Test that a misspelled name gets the intended option as a suggestion."""
+        result = self.client.get_option(typo)
+        assert result["found"] is False
+        assert result["spelling_suggestions"][0] == expected
+        assert expected in result["suggestions"]
+        assert expected in result["error"]
+
+    def test_spelling_follows_prefix_suggestions(self):
+        """Test that prefix-based suggestions come first and are not repeated."""
+        result = self.client.get_option("programs.git.enabel")
+        prefix_based = self.client.prefix_index.children("programs.git", 5)
+        assert result["suggestions"] == prefix_based  # Already includes programs.git.enable
+        assert "spelling_suggestions" not in result
+
+        result = self.client.get_option("programs.git.enabel.extra")
+        assert result["suggestions"][0] == "programs.git.enable"
+        assert len(result["suggestions"]) == len(set(result["suggestions"]))
+
+    def test_corrected_prefix_suggests_its_options(self):
+        """Test that a misspelled prefix suggests the options under the corrected one."""
+        assert self.client.spelling_suggestions("programs.gti") == [
+            "programs.git.enable",
+            "programs.git.extraConfig",
+            "programs.git.userName",
+        ]
+        assert self.client.spelling_suggestions("servics.gpg-agent.telescope")[0] == "services.gpg-agent.enable"
+
+    def test_no_suggestions_for_unrelated_names(self):
+        """Test that nothing is suggested for names unlike any option."""
+        result = self.client.get_option("telescope.nvim")
+        assert "spelling_suggestions" not in result
+        assert "suggestions" not in result
+
+    def test_search_corrects_unknown_words(self):
+        """Test that unknown query words are replaced by the closest name segment."""
+        result = self.client.search_options("servics enablesshsuport")
+        assert result["corrections"] == {"servics": "services", "enablesshsuport": "enablesshsupport"}
+        assert [option["name"] for option in result["options"]] == ["services.gpg-agent.enableSshSupport"]
+        assert "corrections" not in self.client.search_options("services enablesshsupport")
+
+    def test_segment_index_rebuilt_on_snapshot_load(self, tmp_path):
+        """Test that a client loaded from the cache can correct spellings too."""
+        from mcp_nixos.clients.html_client import HTMLClient
+
+        self.client.html_client = HTMLClient(cache_dir=str(tmp_path), ttl=3600)
+        self.client._save_in_memory_data()
+        loaded = HomeManagerClient()
+        loaded.html_client = HTMLClient(cache_dir=str(tmp_path), ttl=3600)
+        assert loaded._load_from_cache()
+        loaded.is_loaded = True
+        assert loaded.spelling_suggestions("programs.gti.enable") == ["programs.git.enable"]
+
+    def test_candidate_lookup_is_fast(self):
+        """Test that candidate retrieval stays well under a millisecond on a large vocabulary."""
+        client = HomeManagerClient()
+        client.build_search_indices(make_options(15000))
+        start = time.perf_counter()
+        for _ in range(100):
+            client.segment_index.similar("neovm")
+        assert (time.perf_counter() - start) / 100 < 0.001
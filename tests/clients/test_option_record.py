@@ -0,0 +1,149 @@
+"""Tests for compact, interned option records."""
+
+import json
+import pickle
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.darwin.darwin_client import DarwinClient, DarwinOption
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.option_record import (
+    OPTION_FIELDS,
+    SHORT_DESCRIPTION_LENGTH,
+    SUMMARY_FIELDS,
+    InternTable,
+    OptionRecord,
+    OptionSummary,
+    short_description,
+    summarize,
+)
+from tests.clients.test_home_manager_incremental import make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+def fresh_copy(option):
+    """Copy an option so that none of its strings are shared with the original."""
+    return {key: "".join(value) if isinstance(value, str) else value for key, value in option.items()}
+
+
+class TestOptionRecord:
+    """Tests for OptionRecord and InternTable."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.option = make_options(1)[0]
+        self.record = OptionRecord.from_mapping(self.option)
+
+    def test_dict_view(self):
+        """Test that a record reads and compares like the dict it came from."""
+        assert isinstance(self.record, OptionRecord)
+        assert self.record == self.option
+        assert self.option == self.record
+        assert dict(self.record) == self.option
+        assert {**self.record, "score": 1} == {**self.option, "score": 1}
+        assert list(self.record) == list(OPTION_FIELDS)
+        assert self.record["type"] == self.record.get("type") == "string"
+        assert self.record.get("missing", "fallback") == "fallback"
+        assert "missing" not in self.record
+        with pytest.raises(KeyError):
+            self.record["missing"]
+
+    def test_copy_is_a_plain_dict(self):
+        """Test that copy() returns a mutable, JSON-serializable dict."""
+        copy = self.record.copy()
+        copy["found"] = True
+        assert type(copy) is dict
+        assert json.loads(json.dumps(copy))["name"] == self.option["name"]
+        assert "found" not in self.record
+
+    def test_compact_and_read_only(self):
+        """Test that records have no per-instance dict and cannot be changed."""
+        assert not hasattr(self.record, "__dict__")
+        with pytest.raises(AttributeError):
+            self.record.type = "int"  # type: ignore[misc]
+
+    def test_from_columns(self):
+        """Test that records built a field at a time equal records built one by one."""
+        options = make_options(3)
+        columns = [[option[field] for option in options] for field in OPTION_FIELDS]
+        records = OptionRecord.from_columns(columns)
+        assert records == [OptionRecord.from_mapping(option) for option in options]
+        assert all(type(record) is OptionRecord for record in records)
+        with pytest.raises(TypeError):
+            OptionRecord.from_columns(columns[1:])
+        with pytest.raises(ValueError):
+            OptionRecord.from_columns([column[:2] for column in columns[:-1]] + [columns[-1]])
+
+    def test_pickle_round_trip(self):
+        """Test that records survive pickling."""
+        assert pickle.loads(pickle.dumps(self.record)) == self.record
+
+    def test_other_fields_are_left_as_dicts(self):
+        """Test that options with missing or extra fields are returned unchanged."""
+        extra = dict(self.option, extra=1)
+        missing = {key: value for key, value in self.option.items() if key != "manual_url"}
+        assert OptionRecord.from_mapping(extra) is extra
+        assert OptionRecord.from_mapping(missing) is missing
+        assert OptionRecord.from_mapping(self.record) is self.record
+
+    def test_summarize(self):
+        """Test that summaries hold the summary fields only, with long descriptions shortened."""
+        assert summarize(self.record) == {field: self.option[field] for field in SUMMARY_FIELDS}
+        long = dict(self.option, description="word " * 100)
+        shortened = summarize(long)["description"]
+        assert len(shortened) == SHORT_DESCRIPTION_LENGTH and shortened.endswith("wo...")
+        assert shortened == short_description(long["description"])
+        assert short_description(None) is None
+
+    def test_interning_shares_repeated_values(self):
+        """Test that equal values in interned fields become one object."""
+        table = InternTable()
+        first = OptionRecord.from_mapping(fresh_copy(self.option), table)
+        second = OptionRecord.from_mapping(fresh_copy(self.option), table)
+        assert first["type"] is second["type"]
+        assert first["category"] is second["category"]
+        assert first["description"] is not second["description"]  # Not interned
+        assert table(None) is None
+        assert len(table) == 3  # type, category, source
+
+
+class TestCompactDatasets:
+    """Tests for the records held by the clients."""
+
+    def test_home_manager_options_are_compact(self):
+        """Test that indexed HM options are interned summaries and results are dicts."""
+        client = HomeManagerClient()
+        client.build_search_indices([fresh_copy(option) for option in parse_options(FIXTURE.read_text(), "options")])
+        client.is_loaded = True
+
+        records = list(client.options.values())
+        assert all(isinstance(record, OptionSummary) for record in records)
+        assert len({id(record["source"]) for record in records}) == 1
+
+        name = "programs.git.enable"
+        assert type(client.get_option(name)) is dict
+        assert all(type(option) is dict for option in client.get_options_by_prefix("programs.git")["options"])
+        assert all(type(option) is dict for option in client.search_options("git")["options"])
+
+    def test_home_manager_legacy_cache_is_json(self):
+        """Test that the legacy JSON cache still receives plain option dicts."""
+        client = HomeManagerClient()
+        client.build_search_indices(make_options(20))
+        saved = {}
+        client.html_client.cache.set_data = lambda key, data: saved.setdefault(key, json.dumps(data))
+        client.html_client.cache.set_binary_data = lambda key, data: None
+        client._save_legacy_data(client.index)
+        assert json.loads(saved[client.cache_key])["options"] == {name: dict(o) for name, o in client.options.items()}
+
+    def test_darwin_options_are_slotted_and_interned(self):
+        """Test that darwin options carry no instance dict and share repeated values."""
+        client = DarwinClient()
+        first = client._compact_option(DarwinOption(name="a", description="A", type="".join("boolean")))
+        second = client._compact_option(DarwinOption(name="b", description="B", type="".join("boolean")))
+        assert not hasattr(first, "__dict__")
+        assert first.type is second.type
+        assert client._option_to_dict(first)["type"] == "boolean"
@@ -0,0 +1,118 @@
+"""Tests for the sorted-array prefix index and Home Manager prefix lookups."""
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.prefix_index import PrefixIndex
+from tests.clients.test_home_manager_incremental import make_options
+
+NAMES = [
+    "programs.git.enable",
+    "programs.git.userName",
+    "programs.git",  # A name that is also a prefix of other names
+    "programs.git-credential-oauth.enable",  # Sorts between "programs.git" and "programs.git."
+    "programs.gitui.enable",
+    "programs.zsh.enable",
+    "services.gpg-agent.enable",
+]
+
+
+def set_based(names):
+    """The per-prefix sets the sorted index replaces."""
+    index = {}
+    for name in names:
+        parts = name.split(".")
+        for i in range(1, len(parts) + 1):
+            index.setdefault(".".join(parts[:i]), set()).add(name)
+    return index
+
+
+class TestPrefixIndex:
+    """Tests for PrefixIndex."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.index = PrefixIndex(NAMES)
+
+    def test_lookup_matches_component_boundaries(self):
+        """Test that a prefix covers itself and its dotted children only."""
+        assert self.index["programs.git"] == ["programs.git", "programs.git.enable", "programs.git.userName"]
+        assert self.index["programs.git-credential-oauth"] == ["programs.git-credential-oauth.enable"]
+        assert self.index["services.gpg-agent.enable"] == ["services.gpg-agent.enable"]
+        for missing in ("programs.gi", "programs.git.", "", "prog", "zzz"):
+            assert missing not in self.index
+            assert self.index.get(missing) is None
+
+    def test_equivalent_to_set_index(self):
+        """Test that keys and postings equal the per-prefix sets."""
+        expected = set_based(NAMES)
+        assert {key: set(names) for key, names in self.index.items()} == expected
+        assert len(self.index) == len(expected)
+        for key, names in self.index.items():
+            assert names == sorted(names)
+            assert self.index.count(key) == len(names)
+
+    def test_lookups_do_not_mutate(self):
+        """Test that changing a returned list leaves the index alone."""
+        self.index["programs"].append("bogus")
+        self.index["programs.git"].clear()
+        assert self.index.names == sorted(NAMES)
+        assert len(self.index["programs"]) == 6
+
+    def test_add_and_discard(self):
+        """Test that updates keep the names sorted and the key count current."""
+        keys = len(self.index)
+        self.index.add("programs.bash.enable")
+        self.index.add("programs.bash.enable")  # Already present
+        assert self.index.names == sorted(NAMES + ["programs.bash.enable"])
+        assert len(self.index) == keys + 2
+        assert self.index["programs.bash"] == ["programs.bash.enable"]
+
+        self.index.discard("programs.bash.enable")
+        self.index.discard("programs.bash.enable")  # Already gone
+        assert "programs.bash" not in self.index
+        assert len(self.index) == keys
+
+    def test_non_string_keys(self):
+        """Test that non-string keys are simply absent."""
+        assert ("programs", "git") not in self.index
+        assert self.index.get(None) is None
+
+
+class TestHomeManagerPrefixLookup:
+    """Tests for Home Manager lookups backed by the prefix index."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.client = HomeManagerClient()
+        self.client.build_search_indices(make_options(40) + [dict(make_options(1)[0], name="programs.gitui.enable")])
+        self.client.is_loaded = True
+
+    def test_get_options_by_prefix_does_not_mutate_index(self):
+        """Test that prefix listing leaves the index unchanged and is repeatable."""
+        before = dict(self.client.prefix_index.items())
+        first = self.client.get_options_by_prefix("programs.git")
+        second = self.client.get_options_by_prefix("programs.git")
+        assert dict(self.client.prefix_index.items()) == before
+        assert first == second
+        names = [option["name"] for option in first["options"]]
+        assert names == sorted(f"programs.git.setting{i}" for i in range(0, 40, 4))
+        assert "programs.gitui.enable" not in names
+
+    def test_get_options_by_prefix_not_found(self):
+        """Test partial components and trailing dots find nothing."""
+        for prefix in ("programs.gi", "programs.git.", ""):
+            assert self.client.get_options_by_prefix(prefix)["found"] is False
+
+    def test_get_options_by_prefix_avoids_full_scan(self):
+        """Test that the options dictionary is not iterated for a prefix listing."""
+
+        class NoScan(dict):
+            def __iter__(self):
+                raise AssertionError("options scanned")
+
+        self.client.options = NoScan(self.client.options)
+        assert self.client.get_options_by_prefix("programs.zsh")["count"] == 10
@@ -338,6 +338,35 @@ def clean_system_cache_dirs():
         pass
 
 
+@pytest.fixture(autouse=True)
+def save_cache_manifests():
+    """Write manifests whose save is still pending, so it cannot run during a later test."""
+    yield
+    from mcp_nixos.cache.manifest import save_live_manifests
+
+    save_live_manifests()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_teardown(item):
+    """Persist queued cache writes before teardown_method and fixtures remove cache directories."""
+    from mcp_nixos.cache.write_behind import flush_write_behind
+
+    flush_write_behind(10.0)
+
+
+@pytest.fixture
+def synchronous_cache(monkeypatch):
+    """Persist cache writes before set() returns, for tests that inspect cache files right away."""
+    monkeypatch.setenv("MCP_NIXOS_CACHE_WRITE_BEHIND", "false")
+
+
+@pytest.fixture
+def uncompressed_cache(monkeypatch):
+    """Store cache entries uncompressed, for tests that read cache files as text."""
+    monkeypatch.setenv("MCP_NIXOS_CACHE_COMPRESSION", "none")
+
+
 def pytest_runtest_setup(item):
     """
     Handle platform-specific test markers:
@@ -245,7 +245,7 @@ class TestHomeManagerClient(unittest.TestCase):
 
         client.invalidate_cache()
 
-        mock_cache.invalidate_data.assert_called_once_with(client.cache_key)
+        self.assertEqual(mock_cache.invalidate_data.call_args_list, [call(client.cache_key), call(client.snapshot_key)])
         expected_invalidate_calls = [call(url) for url in client.hm_urls.values()]
         mock_cache.invalidate.assert_has_calls(expected_invalidate_calls, any_order=True)
         self.assertEqual(mock_cache.invalidate.call_count, len(client.hm_urls))
@@ -300,7 +300,7 @@ class TestHomeManagerContext(unittest.TestCase):
         # Search
         mock_client_instance.search_options.return_value = {"count": 1, "options": [{"name": "a"}]}
         context.search_options("q", 5)
-        mock_client_instance.search_options.assert_called_once_with("q", 5)
+        mock_client_instance.search_options.assert_called_once_with("q", 5, count_total=True)
 
         # Get Option
         mock_client_instance.get_option.return_value = {"name": "a", "found": True}
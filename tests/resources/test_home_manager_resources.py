@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import unittest  # Import explicitly for the main block
 import pytest
@@ -10,7 +11,9 @@ pytestmark = pytest.mark.unit
 from tests import MCPNixOSTestBase
 
 # Import the resource functions directly from the resources module
+from mcp_nixos.contexts.home_manager_context import HomeManagerContext
 from mcp_nixos.resources.home_manager_resources import (
+    register_home_manager_resources,
     home_manager_status_resource,
     home_manager_search_options_resource,
     home_manager_option_resource,
@@ -18,6 +21,7 @@ from mcp_nixos.resources.home_manager_resources import (
     home_manager_options_list_resource,
     home_manager_options_by_prefix_resource,
 )
+from mcp_nixos.utils.readiness import ReadinessEvent
 
 # Disable logging during tests - Keep this as it's effective for tests
 logging.disable(logging.CRITICAL)
@@ -340,6 +344,40 @@ class TestHomeManagerResourceEndpoints(MCPNixOSTestBase):
         self.mock_context.get_options_by_prefix.assert_called_once_with("invalid.prefix")
 
 
+class TestHomeManagerResourceHandlers:
+    """Test the resource handlers registered with the MCP server."""
+
+    @pytest.mark.asyncio
+    async def test_waiting_for_load_keeps_event_loop_running(self):
+        """Test that a resource waiting for options still loading does not block the event loop."""
+        context = HomeManagerContext.__new__(HomeManagerContext)
+        context.hm_client = Mock(
+            is_loaded=False, loading_in_progress=True, loading_error=None, ready=ReadinessEvent(), ready_timeout=0.5
+        )
+        handlers = {}
+        mcp = Mock()
+        mcp.resource.side_effect = lambda uri: lambda handler: handlers.setdefault(uri, handler)
+        register_home_manager_resources(mcp, lambda: context)
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        try:
+            result = await handlers["home-manager://search/options/{query}"]("git")
+        finally:
+            ticker.cancel()
+
+        assert result["loading"] is True
+        assert context.hm_client.ready.get_stats()["timeouts"] == 1
+        assert ticks >= 10  # None at all if the wait had blocked the loop
+
+
 # Keep the standard unittest runner block
 if __name__ == "__main__":
     unittest.main()
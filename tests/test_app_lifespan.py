@@ -117,3 +117,24 @@ class TestAppLifespan:
 
                 # Verify the darwin context was shut down
                 mock_shutdown.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_app_lifespan_flushes_cache_writes(self, temp_cache_dir):
+        """Test that queued cache writes are flushed during shutdown."""
+        mock_server = MagicMock()
+
+        # Reload the module to ensure clean state
+        if "mcp_nixos.server" in sys.modules:
+            del sys.modules["mcp_nixos.server"]
+
+        with patch("mcp_nixos.server.logger"):
+            from mcp_nixos.server import app_lifespan
+
+            with patch("mcp_nixos.server.flush_write_behind", return_value=True) as mock_flush:
+                context_manager = app_lifespan(mock_server)
+                await context_manager.__aenter__()
+                mock_flush.assert_not_called()
+
+                await context_manager.__aexit__(None, None, None)
+
+                mock_flush.assert_called_once()
@@ -26,6 +26,27 @@ class TestMainModule:
             args = parse_args()
             assert args.pre_cache
 
+    def test_parse_args_build_index(self):
+        """Test parsing the build-index flag, which needs a directory."""
+        with patch("sys.argv", ["mcp_nixos"]):
+            assert parse_args().build_index is None
+        with patch("sys.argv", ["mcp_nixos", "--build-index"]), pytest.raises(SystemExit):
+            parse_args()
+        with patch("sys.argv", ["mcp_nixos", "--build-index", "/tmp/prebuilt"]):
+            assert parse_args().build_index == "/tmp/prebuilt"
+
+    @patch("mcp_nixos.__main__.build_prebuilt_index")
+    def test_main_build_index_mode(self, mock_build):
+        """Test that build-index mode builds into the given directory and exits with its outcome."""
+        mock_build.return_value = {"home_manager": {"options": 10, "path": "x"}, "darwin": {"options": 5, "path": "y"}}
+        with patch("sys.argv", ["mcp_nixos", "--build-index", "/tmp/prebuilt"]):
+            assert main() == 0
+        mock_build.assert_called_once_with("/tmp/prebuilt")
+
+        mock_build.return_value["darwin"] = {"error": "offline"}
+        with patch("sys.argv", ["mcp_nixos", "--build-index", "/tmp/prebuilt"]):
+            assert main() == 1
+
     @patch("mcp_nixos.__main__.run_precache")
     def test_main_pre_cache_mode(self, mock_run_precache):
         """Test running in pre-cache mode."""
@@ -0,0 +1,211 @@
+"""Tests for building the Home Manager and nix-darwin indexes ahead of time and starting from them."""
+
+import asyncio
+import contextlib
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.cache.mapped_index import MappedIndexStore
+from mcp_nixos.clients.darwin.darwin_client import DarwinClient, DarwinOption
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.home_manager_parser import parse_options
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.server import build_prebuilt_index
+from tests.clients.darwin.test_darwin_details import PAGE
+from tests.clients.test_home_manager_incremental import index_state, make_options
+from tests.clients.test_home_manager_parser import FIXTURE
+
+HM_OPTIONS = parse_options(FIXTURE.read_text(), "options") + make_options(50)
+
+
+def load_hm_options(self, allow_prebuilt=True):
+    """Stands in for loading Home Manager options from the web."""
+    assert not allow_prebuilt  # A prebuilt index is never built from another one
+    self.build_search_indices(HM_OPTIONS)
+
+
+async def load_darwin_options(self, force_refresh=False, allow_prebuilt=True):
+    """Stands in for loading nix-darwin options from the web."""
+    assert not allow_prebuilt
+    for i in range(30):
+        name = f"system.defaults.group{i % 3}.option{i}"
+        option = DarwinOption(name=name, description=f"Option {i} description", type="boolean", default="false")
+        self.options[name] = option
+        self._index_option(name, option)
+    self.total_options = len(self.options)
+    self.total_categories = 1
+    return self.options
+
+
+class TestPrebuiltIndex:
+    """Tests for build_prebuilt_index and the clients loading its output."""
+
+    def setup_method(self):
+        """Build the prebuilt indexes into a directory pinned with MCP_NIXOS_PREBUILT_INDEX_DIR."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.temp_dir.name, "prebuilt")
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        self.env = mock.patch.dict(os.environ, {"MCP_NIXOS_PREBUILT_INDEX_DIR": self.output_dir})
+        self.env.start()
+        with (
+            mock.patch.object(HomeManagerClient, "_load_data_internal", load_hm_options),
+            mock.patch.object(DarwinClient, "load_options", load_darwin_options),
+            mock.patch("mcp_nixos.server.flush_write_behind"),
+        ):
+            self.results = build_prebuilt_index(self.output_dir)
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def _hm_client(self):
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.cache_dir, ttl=3600)
+        client.load_all_options = mock.MagicMock(side_effect=AssertionError("web load"))
+        return client
+
+    def _darwin_client(self):
+        client = DarwinClient(html_client=HTMLClient(cache_dir=self.cache_dir, ttl=3600))
+        client.fetch_url = mock.AsyncMock(side_effect=AssertionError("web load"))
+        return client
+
+    @contextlib.contextmanager
+    def _bundled(self):
+        """Serve the built indexes as if bundled with the package, two hours after a one-hour TTL."""
+        del os.environ["MCP_NIXOS_PREBUILT_INDEX_DIR"]
+        later = time.time() + 7200
+        with (
+            mock.patch("mcp_nixos.cache.mapped_index.BUNDLED_INDEX_DIR", pathlib.Path(self.output_dir)),
+            mock.patch.dict(os.environ, {"MCP_NIXOS_CACHE_TTL": "3600"}),
+            mock.patch("time.time", return_value=later),
+        ):
+            yield
+
+    def test_build_writes_both_indexes(self):
+        """Test that both sources are written, one version each, and reported."""
+        assert self.results["home_manager"]["options"] == len(HM_OPTIONS)
+        assert self.results["darwin"]["options"] == 30
+        for client in (HomeManagerClient(), DarwinClient()):
+            store = MappedIndexStore(self.output_dir, client.cache_key)
+            assert [str(path) for path in store.directory.glob(f"{store.kind}-*.idx")] == [str(store.current_path())]
+
+    def test_build_reports_failed_source(self):
+        """Test that a source that cannot be loaded is reported without stopping the other."""
+        with (
+            mock.patch.object(HomeManagerClient, "_load_data_internal", side_effect=Exception("offline")),
+            mock.patch.object(DarwinClient, "load_options", load_darwin_options),
+            mock.patch("mcp_nixos.server.flush_write_behind"),
+        ):
+            results = build_prebuilt_index(self.output_dir)
+        assert results["home_manager"] == {"error": "offline"}
+        assert results["darwin"]["options"] == 30
+
+    def test_home_manager_starts_from_prebuilt_index(self):
+        """Test that without a disk cache Home Manager options are mapped from the prebuilt index."""
+        client = self._hm_client()
+        start = time.monotonic()
+        client.ensure_loaded()
+        assert time.monotonic() - start < 1
+        assert client.index.origin == "prebuilt"
+        fresh = HomeManagerClient()
+        fresh.build_search_indices(HM_OPTIONS)
+        fresh.is_loaded = True
+        assert index_state(client) == index_state(fresh)
+        assert client.search_options("enable") == fresh.search_options("enable")
+
+    def test_fresh_cache_preferred_over_prebuilt_index(self):
+        """Test that a fresh disk cache is loaded instead of the prebuilt index."""
+        cached = self._hm_client()
+        cached.build_search_indices(HM_OPTIONS[:20])
+        assert cached._save_in_memory_data()
+
+        client = self._hm_client()
+        client.ensure_loaded()
+        assert client.index.origin in ("shared", "cache")
+        assert len(client.options) == 20
+
+    def test_force_refresh_skips_prebuilt_index(self):
+        """Test that a forced refresh loads current data rather than the prebuilt index."""
+        client = self._hm_client()
+        client.load_all_options = mock.MagicMock(return_value=HM_OPTIONS[:10])
+        client.ensure_loaded(force_refresh=True)
+        client.load_all_options.assert_called_once()
+        assert client.index.origin == "web"
+
+    def test_outdated_bundled_index_served_then_refreshed(self):
+        """Test that a bundled index older than the TTL is served at once and replaced by a background load."""
+        fetching = threading.Event()
+        with self._bundled():
+            client = self._hm_client()
+            client.load_all_options = mock.MagicMock(side_effect=lambda: fetching.wait(5) and HM_OPTIONS[:10])
+            client.ensure_loaded()
+            assert client.index.origin == "prebuilt" and client.refresh_in_progress
+            assert len(client.search_options("enable", 5)["options"]) == 5
+            fetching.set()
+            client.refresh_thread.join(5)
+        assert client.index.origin == "web" and len(client.options) == 10
+        assert not client.refresh_in_progress and client.refresh_error is None
+
+    def test_outdated_bundled_index_kept_offline(self):
+        """Test that the bundled index keeps being served when the background load fails."""
+        with self._bundled():
+            client = self._hm_client()
+            client.load_all_options = mock.MagicMock(side_effect=Exception("no network"))
+            client.ensure_loaded()
+            client.refresh_thread.join(5)
+        assert client.index.origin == "prebuilt" and client.is_loaded
+        assert client.refresh_error == "no network" and not client.refresh_in_progress
+
+    def test_pinned_index_is_never_outdated(self):
+        """Test that an index pinned with MCP_NIXOS_PREBUILT_INDEX_DIR is served without refreshing."""
+        with mock.patch("time.time", return_value=time.time() + 10**8):
+            client = self._hm_client()
+            client.ensure_loaded()
+        assert client.index.origin == "prebuilt" and client.refresh_thread is None
+
+    def test_prebuilt_index_disabled(self):
+        """Test that an empty MCP_NIXOS_PREBUILT_INDEX_DIR turns the prebuilt index off."""
+        with mock.patch.dict(os.environ, {"MCP_NIXOS_PREBUILT_INDEX_DIR": ""}):
+            client = self._hm_client()
+            assert not client._load_prebuilt_index()
+            with pytest.raises(Exception, match="web load"):
+                client._load_data_internal()
+
+    def test_darwin_starts_from_prebuilt_index(self):
+        """Test that without a disk cache nix-darwin options are mapped from the prebuilt index."""
+        client = self._darwin_client()
+        options = asyncio.run(client.load_options())
+        assert len(options) == 30
+        assert client.loading_status == "loaded"
+        client.fetch_url.assert_not_awaited()
+        results = asyncio.run(client.search_options("system.defaults.group1.option4"))
+        assert results[0]["name"] == "system.defaults.group1.option4"
+
+    def test_darwin_outdated_bundled_index_served_then_refreshed(self):
+        """Test that nix-darwin serves an outdated bundled index at once and parses the documentation meanwhile."""
+
+        async def load(page):
+            client = self._darwin_client()
+            client.fetch_url = mock.AsyncMock(side_effect=page)
+            served = len(await client.load_options())
+            client.fetch_url.assert_not_awaited()
+            await client.refresh_task
+            return client, served
+
+        with self._bundled():
+            client, served = asyncio.run(load(ValueError("no network")))
+            assert (served, len(client.options), client.loading_status) == (30, 30, "loaded")
+
+            client, served = asyncio.run(load([f"<html><body><dl>{PAGE}</dl></body></html>"]))
+        assert (served, len(client.options), client.loading_status) == (30, 12, "loaded")
+        assert client.options["system.defaults.dock.option3"].default == "false"
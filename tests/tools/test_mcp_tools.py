@@ -394,7 +394,7 @@ class TestHomeManagerTools(unittest.TestCase):
         result = home_manager_search("programs.git", 5, context=mock_context)
 
         # Verify search_options was called with wildcards added
-        mock_context.search_options.assert_called_with("*programs.git*", 5)
+        mock_context.search_options.assert_called_with("*programs.git*", 5, count_total=False)
 
         # Check the result format
         self.assertIn("Found 2 Home Manager options", result)
@@ -408,6 +408,29 @@ class TestHomeManagerTools(unittest.TestCase):
         self.assertIn("programs.git", result)
         self.assertIn("enable = true", result)
 
+    def test_home_manager_search_spelling_corrections(self):
+        """Test that home_manager_search reports spelling corrections."""
+        mock_context = MagicMock()
+        mock_context.search_options.return_value = {
+            "options": [
+                {
+                    "name": "programs.neovim.enable",
+                    "type": "boolean",
+                    "description": "Whether to enable Neovim.",
+                    "category": "Programs",
+                    "source": "options",
+                }
+            ],
+            "found": True,
+            "corrections": {"neovm": "neovim"},
+        }
+
+        result = home_manager_search("neovm", 5, context=mock_context)
+
+        self.assertIn("Corrected spelling: neovm -> neovim", result)
+        self.assertIn("## programs.neovim", result)
+        self.assertIn("Whether to enable Neovim.", result)
+
     def test_home_manager_search_prioritization(self):
         """Test that home_manager_search prioritizes exact matches and organizes results correctly."""
         # Create mock context
@@ -459,7 +482,7 @@ class TestHomeManagerTools(unittest.TestCase):
         result = home_manager_search("git", 10, context=mock_context)
 
         # Verify search_options was called with wildcards added
-        mock_context.search_options.assert_called_with("*git*", 10)
+        mock_context.search_options.assert_called_with("*git*", 10, count_total=False)
 
         # The exact match "git" should be prioritized
         result_lines = result.split("\n")
@@ -494,7 +517,7 @@ class TestHomeManagerTools(unittest.TestCase):
         result = home_manager_search("nonexistent_option_xyz", 5, context=mock_context)
 
         # Verify search_options was called with wildcards added
-        mock_context.search_options.assert_called_with("*nonexistent_option_xyz*", 5)
+        mock_context.search_options.assert_called_with("*nonexistent_option_xyz*", 5, count_total=False)
 
         # Check the result format contains the "not found" message
         self.assertIn("No Home Manager options found", result)
@@ -0,0 +1,69 @@
+"""Tests for the helpers of filtered option queries."""
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.utils.option_filters import (
+    describe_filters,
+    filter_arguments,
+    filter_keys,
+    filtered_names,
+    names_under_prefix,
+    normalize_filter_value,
+)
+from mcp_nixos.utils.posting_lists import PostingLists
+
+POSTINGS = {
+    ("type", "boolean"): {"a.enable", "b.enable", "b.flag"},
+    ("type", "string"): {"a.name"},
+    ("category", "a"): {"a.enable", "a.name"},
+    ("category", "b"): {"b.enable", "b.flag"},
+}
+
+
+class TestOptionFilters:
+    """Tests for filter keys, filtered names and prefix selection."""
+
+    def test_normalize_and_keys(self):
+        """Test that values are lowercased with whitespace collapsed, and unknown fields refused."""
+        assert normalize_filter_value("  Null or\n Package ") == "null or package"
+        assert filter_keys({"type": "Boolean", "category": "", "source": None}, ("type", "category", "source")) == [
+            ("type", "boolean")
+        ]
+        assert filter_keys(None, ("type",)) == []
+        with pytest.raises(ValueError, match="Cannot filter by 'colour'"):
+            filter_keys({"colour": "red"}, ("type", "category"))
+
+    @pytest.mark.parametrize("postings", [POSTINGS, PostingLists.from_names(POSTINGS)], ids=["sets", "arrays"])
+    def test_filtered_names(self, postings):
+        """Test intersecting the postings of several keys, with unknown values matching nothing."""
+        assert filtered_names(postings, [("type", "boolean"), ("category", "b")]) == {"b.enable", "b.flag"}
+        assert filtered_names(postings, [("type", "string")]) == {"a.name"}
+        assert filtered_names(postings, [("type", "boolean"), ("category", "c")]) == set()
+        assert filtered_names(postings, []) == set()
+
+    @pytest.mark.parametrize("allowed", [{"a", "a.name"}, {"a", "a.name", "ab.x", "b.enable", "b.flag"}])
+    @pytest.mark.parametrize("include_prefix", [True, False])
+    def test_names_under_prefix_scans_smaller_side(self, allowed, include_prefix):
+        """Test that scanning either side gives the same names in order, listing the prefix only when smaller."""
+        under = (["a"] if include_prefix else []) + ["a.enable", "a.name"]
+        listed = []
+
+        def names():
+            listed.append(True)
+            return under
+
+        result = names_under_prefix("a", len(under), names, allowed, include_prefix=include_prefix)
+        assert result == [name for name in under if name in allowed]
+        assert bool(listed) == (len(under) <= len(allowed))
+
+    def test_arguments_and_description(self):
+        """Test that only given filters are passed on and described."""
+        assert filter_arguments({"type": "boolean", "source": "", "category": None}) == {"filters": {"type": "boolean"}}
+        assert filter_arguments({"type": " "}) == {}
+        assert filter_arguments(None) == {}
+        assert describe_filters({"type": "boolean", "source": "options", "category": None}) == (
+            "type 'boolean', source 'options'"
+        )
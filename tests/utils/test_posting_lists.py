@@ -0,0 +1,184 @@
+"""Tests for word postings stored as sorted arrays of option IDs."""
+
+import random
+import time
+import tracemalloc
+from array import array
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.utils import posting_lists
+from mcp_nixos.utils.posting_lists import PostingLists, intersect_ids
+from tests.clients.test_home_manager_incremental import make_options
+from tests.clients.test_home_manager_ranking import build_client
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request):
+    """Run a test with and without NumPy (the latter only where it is installed)."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        yield request.param
+    else:
+        with mock.patch.object(posting_lists, "numpy", None):
+            yield request.param
+
+
+class TestIntersectIds:
+    """Tests for intersect_ids."""
+
+    @pytest.mark.parametrize("sizes", [(5, 2000), (800, 1000), (300, 900, 2000)], ids=["bisect", "set", "three"])
+    def test_matches_set_intersection(self, backend, sizes):
+        """Test that sorted lists of any relative size intersect like sets."""
+        rng = random.Random(sum(sizes))
+        postings = [array("I", sorted(rng.sample(range(3000), size))) for size in sizes]
+        expected = set.intersection(*map(set, postings))
+        assert expected
+        assert set(map(int, intersect_ids(postings))) == expected
+        assert set(map(int, intersect_ids(reversed(postings)))) == expected
+
+    def test_unsorted_lists(self, backend):
+        """Test that lists in written order intersect correctly when declared unsorted."""
+        first, second = array("I", [9, 3, 7, 1]), array("I", [7, 2, 9, 5, 8, 0, 4, 6, 11, 12] * 4)
+        assert set(map(int, intersect_ids([second, first], is_sorted=False))) == {7, 9}
+
+    def test_empty(self, backend):
+        """Test that no lists, an empty list or disjoint lists give an empty result."""
+        assert not len(intersect_ids([]))
+        assert not len(intersect_ids([array("I", [1, 2]), array("I")]))
+        assert not len(intersect_ids([array("I", [1, 2]), array("I", [3, 4]), array("I", [1, 3])]))
+
+
+class TestPostingLists:
+    """Tests for the PostingLists mapping."""
+
+    def setup_method(self):
+        """Set up a small index."""
+        self.postings = PostingLists()
+        for name, words in [("b.git", "git enable"), ("a.zsh", "zsh enable"), ("c.git", "git")]:
+            for word in words.split():
+                self.postings.add(word, name)
+
+    def test_mapping(self):
+        """Test that words map to sets of names, stored as ascending IDs."""
+        assert dict(self.postings) == {"git": {"b.git", "c.git"}, "enable": {"b.git", "a.zsh"}, "zsh": {"a.zsh"}}
+        assert list(self.postings.ids("git")) == [0, 2]
+        assert self.postings.ids("missing") is None
+        assert "zsh" in self.postings and "missing" not in self.postings
+        assert self.postings.intersect(["git", "enable", "missing"]) == {"b.git"}
+        assert self.postings.intersect(["missing"]) == set()
+
+    def test_add_keeps_ids_sorted(self):
+        """Test that adding an older name under a word inserts its ID in order, once."""
+        self.postings.add("zsh", "b.git")
+        self.postings.add("zsh", "b.git")
+        assert list(self.postings.ids("zsh")) == [0, 1]
+
+    def test_discard_and_forget(self):
+        """Test that discarding drops emptied words, and a forgotten name comes back with a new ID."""
+        self.postings.discard("zsh", "a.zsh")
+        self.postings.discard("enable", "a.zsh")
+        self.postings.discard("enable", "unknown")
+        self.postings.discard("unknown", "b.git")
+        self.postings.forget("a.zsh")
+        assert "zsh" not in self.postings
+        assert self.postings["enable"] == {"b.git"}
+        self.postings.add("zsh", "a.zsh")
+        assert list(self.postings.ids("zsh")) == [3]
+
+    def test_copy_on_write(self):
+        """Test that a copy shares arrays until either side changes them."""
+        successor = self.postings.copy()
+        assert successor.ids("git") is self.postings.ids("git")
+        successor.add("git", "a.zsh")
+        successor.add("git", "d.git")
+        assert successor["git"] == {"a.zsh", "b.git", "c.git", "d.git"}
+        assert self.postings["git"] == {"b.git", "c.git"}
+        assert successor.ids("zsh") is self.postings.ids("zsh")
+
+        self.postings.discard("zsh", "a.zsh")  # The previous generation writes too
+        self.postings.add("enable", "c.git")
+        assert successor["zsh"] == {"a.zsh"}
+        assert successor["enable"] == {"a.zsh", "b.git"}
+        third = successor.copy()
+        successor.discard("enable", "b.git")
+        assert third["enable"] == {"a.zsh", "b.git"}
+
+    def test_from_names_and_ids(self):
+        """Test building from name sets (IDs in name order) and from positions in any order."""
+        rebuilt = PostingLists.from_names(self.postings)
+        assert dict(rebuilt) == dict(self.postings)
+        assert list(rebuilt.ids("enable")) == [0, 1]  # a.zsh, b.git
+        indexed = PostingLists.from_ids(["x", "y", "z"], [("w", [2, 0])])
+        assert list(indexed.ids("w")) == [0, 2]
+        assert indexed["w"] == {"x", "z"}
+
+    def test_from_packed(self):
+        """Test that packed lists read like unpacked ones, and are unpacked by the first change only."""
+        names = ["a.zsh", "b.git", "c.git"]
+        packed = PostingLists.from_packed(
+            names, ["git", "enable", "zsh"], array("I", [0, 2, 4, 5]), array("I", [1, 2, 0, 1, 0])
+        )
+        assert dict(packed) == dict(self.postings) and len(packed) == 3
+        assert list(packed.ids("git")) == [1, 2] and packed.ids("missing") is None
+        assert packed.intersect(["git", "enable"]) == {"b.git"}
+        successor = packed.copy()
+        successor.discard("zsh", "a.zsh")
+        successor.add("git", "d.git")
+        assert "zsh" not in successor and successor["git"] == {"b.git", "c.git", "d.git"}
+        assert packed["zsh"] == {"a.zsh"} and packed["git"] == {"b.git", "c.git"}
+        packed.forget("a.zsh")
+        packed.add("zsh", "a.zsh")
+        assert list(packed.ids("zsh")) == [0, 3]
+
+
+@pytest.mark.slow
+class TestPostingListsFootprint:
+    """Memory and intersection benchmarks against posting sets, at the size of the Home Manager corpus and 10x."""
+
+    def _corpus(self, count):
+        rng = random.Random(count)
+        options = make_options(count)
+        for option in options:
+            option["description"] += rng.choice([" Enable the package.", " Extra settings.", ""])
+        return build_client(options).inverted_index
+
+    def _allocated(self, build):
+        tracemalloc.start()
+        try:
+            kept = build()
+            return tracemalloc.get_traced_memory()[0], kept
+        finally:
+            tracemalloc.stop()
+
+    def _best_time(self, function, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    @pytest.mark.parametrize("count", [4800, 48000], ids=["full", "10x"])
+    def test_footprint_and_intersections(self, count):
+        """Test that ID arrays take a fraction of the memory of name sets and intersect to the same names."""
+        index = self._corpus(count)
+        names = {key: index[key] for key in index}
+        sets_size, sets = self._allocated(lambda: {key: set(members) for key, members in names.items()})
+        arrays_size, arrays = self._allocated(lambda: PostingLists.from_names(names))
+        print(f"\n{count} options: posting sets {sets_size // 1024} KiB, ID arrays {arrays_size // 1024} KiB")
+        assert arrays_size * 2 < sets_size
+
+        for query in (["enable", "package"], ["git", "setting"], ["settings", "zsh", "extra"], ["number", "setting"]):
+            expected = set.intersection(*(sets[word] for word in query))
+            assert arrays.intersect(query) == expected
+            with_sets = self._best_time(lambda: set.intersection(*(sets[word] for word in query)))
+            with_arrays = self._best_time(lambda: arrays.intersect(query))
+            print(
+                f"{' '.join(query)!r} ({len(expected)} matches): sets {with_sets * 1000:.2f}ms, "
+                f"ID arrays {with_arrays * 1000:.2f}ms (numpy: {posting_lists.numpy_available()})"
+            )
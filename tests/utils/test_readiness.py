@@ -0,0 +1,262 @@
+"""Tests for waiting on data that loads in the background."""
+
+import asyncio
+import threading
+import time
+from unittest import mock
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.darwin.darwin_client import DarwinClient
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.contexts.darwin.darwin_context import DarwinContext
+from mcp_nixos.contexts.home_manager_context import HomeManagerContext
+from mcp_nixos.tools.home_manager_tools import wait_for_home_manager_ready
+from mcp_nixos.utils.readiness import DEFAULT_READY_TIMEOUT, ReadinessEvent, ready_timeout
+
+
+def set_later(event, delay):
+    """Set an event from another thread after a delay."""
+    timer = threading.Timer(delay, event.set)
+    timer.start()
+    return timer
+
+
+def request_context(client):
+    """A request context as the server passes it to tool handlers."""
+    ctx = MagicMock()
+    ctx.request_context.lifespan_context = {"is_ready": True, "home_manager_context": MagicMock(hm_client=client)}
+    return ctx
+
+
+class TestReadinessEvent:
+    """Tests for ReadinessEvent."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.event = ReadinessEvent("test data")
+
+    def test_wait_returns_when_set_from_another_thread(self):
+        """Test that a blocked thread wakes up as soon as the event is set."""
+        set_later(self.event, 0.05)
+        start = time.monotonic()
+        assert self.event.wait(5)
+        assert time.monotonic() - start < 1
+
+    def test_wait_times_out(self):
+        """Test that waiting gives up at the deadline and counts a timeout."""
+        assert not self.event.wait(0.01)
+        stats = self.event.get_stats()
+        assert stats["waits"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["last_wait"] >= 0.01
+
+    def test_async_wait_wakes_on_set_from_thread(self):
+        """Test that an awaiting coroutine wakes up when a loader thread sets the event."""
+
+        async def main():
+            set_later(self.event, 0.05)
+            start = time.monotonic()
+            settled = await self.event.wait_async(5)
+            return settled, time.monotonic() - start
+
+        settled, elapsed = asyncio.run(main())
+        assert settled
+        assert 0.03 <= elapsed < 1
+        assert self.event.get_stats()["max_wait"] == pytest.approx(elapsed, abs=0.02)
+
+    def test_async_wait_does_not_block_the_loop(self):
+        """Test that other tasks keep running while a request waits."""
+
+        async def main():
+            ticks = []
+
+            async def ticker():
+                for _ in range(5):
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(ticker())
+            settled = await self.event.wait_async(0.1)
+            await task
+            return settled, ticks
+
+        settled, ticks = asyncio.run(main())
+        assert not settled
+        assert len(ticks) == 5
+        assert self.event.get_stats()["timeouts"] == 1
+
+    def test_set_event_returns_at_once(self):
+        """Test that no wait is recorded once the data is ready."""
+        self.event.set()
+        assert self.event.wait(0)
+        assert asyncio.run(self.event.wait_async(0))
+        assert self.event.get_stats()["waits"] == 0
+
+    def test_clear_and_stats(self):
+        """Test that clearing starts a new load and stats accumulate."""
+        self.event.set()
+        self.event.clear()
+        assert not self.event.is_set()
+        self.event.wait(0.01)
+        set_later(self.event, 0.02)
+        self.event.wait(5)
+        stats = self.event.get_stats()
+        assert stats["waits"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["average_wait"] == pytest.approx(stats["total_wait"] / 2)
+
+    @pytest.mark.parametrize(
+        "value, expected", [(None, DEFAULT_READY_TIMEOUT), ("2.5", 2.5), ("0", 0.0), ("-1", 0.0), ("soon", 10.0)]
+    )
+    def test_ready_timeout_from_environment(self, value, expected, monkeypatch):
+        """Test reading the deadline from MCP_NIXOS_READY_TIMEOUT."""
+        if value is None:
+            monkeypatch.delenv("MCP_NIXOS_READY_TIMEOUT", raising=False)
+        else:
+            monkeypatch.setenv("MCP_NIXOS_READY_TIMEOUT", value)
+        assert ready_timeout() == expected
+
+
+class TestHomeManagerReadiness:
+    """Tests for requests arriving while Home Manager data loads."""
+
+    def setup_method(self):
+        """Set up a client whose background load finishes when released."""
+        self.client = HomeManagerClient()
+        self.release = threading.Event()
+
+        def load():
+            assert self.release.wait(5)
+            self.client.is_loaded = True
+
+        self.client._load_data_internal = load
+
+    def teardown_method(self):
+        """Let any background load finish."""
+        self.release.set()
+
+    def test_tool_check_waits_for_load(self):
+        """Test that a tool request waits for the load and then proceeds instead of failing."""
+        self.client.load_in_background()
+        set_later(self.release, 0.05)
+        assert asyncio.run(wait_for_home_manager_ready(request_context(self.client))) is None
+        stats = self.client.ready.get_stats()
+        assert stats["waits"] == 1
+        assert stats["timeouts"] == 0
+
+    def test_tool_check_reports_loading_after_deadline(self):
+        """Test that the "still loading" answer only comes after the deadline."""
+        self.client.ready_timeout = 0.05
+        self.client.load_in_background()
+        start = time.monotonic()
+        result = asyncio.run(wait_for_home_manager_ready(request_context(self.client)))
+        assert time.monotonic() - start >= 0.05
+        assert "still loading" in result["error"]
+        assert self.client.ready.get_stats()["timeouts"] == 1
+
+    def test_tool_check_reports_failed_load(self):
+        """Test that a failed load wakes waiting requests with the error."""
+
+        def failing_load():
+            assert self.release.wait(5)
+            raise RuntimeError("no network")
+
+        self.client._load_data_internal = failing_load
+        self.client.load_in_background()
+        set_later(self.release, 0.02)
+        result = asyncio.run(wait_for_home_manager_ready(request_context(self.client)))
+        assert result["error"] == "Failed to load Home Manager data: no network"
+
+    def test_loaded_client_does_not_wait(self):
+        """Test that no wait happens once data is loaded."""
+        self.client.is_loaded = True
+        assert asyncio.run(wait_for_home_manager_ready(request_context(self.client))) is None
+        assert self.client.ready.get_stats()["waits"] == 0
+
+    def test_context_waits_for_load(self):
+        """Test that context methods, as resources call them, wait for the load instead of failing."""
+        with mock.patch("mcp_nixos.contexts.home_manager_context.HomeManagerClient", return_value=self.client):
+            context = HomeManagerContext()
+        self.client.search_options = MagicMock(return_value={"count": 0, "options": [], "found": False})
+        set_later(self.release, 0.05)
+        result = context.search_options("git")
+        assert "error" not in result
+        self.client.search_options.assert_called_once()
+        assert self.client.ready.get_stats()["waits"] == 1
+
+    def test_context_reports_loading_after_deadline(self):
+        """Test that context methods answer "still loading" only after the deadline."""
+        self.client.ready_timeout = 0.05
+        with mock.patch("mcp_nixos.contexts.home_manager_context.HomeManagerClient", return_value=self.client):
+            context = HomeManagerContext()
+        start = time.monotonic()
+        for result in [context.get_option("programs.git.enable"), context.get_stats()]:
+            assert "still loading" in result["error"]
+        assert time.monotonic() - start >= 0.1
+        assert self.client.ready.get_stats()["timeouts"] == 2
+
+    def test_ensure_loaded_uses_ready_timeout(self):
+        """Test that ensure_loaded waits for the background load up to the configured deadline."""
+        self.client.ready_timeout = 0.05
+        self.client.load_in_background()
+        with pytest.raises(Exception, match="Timed out waiting for background loading"):
+            self.client.ensure_loaded()
+
+        self.client.ready_timeout = 5
+        set_later(self.release, 0.02)
+        self.client.ensure_loaded()
+        assert self.client.is_loaded
+
+
+class TestDarwinReadiness:
+    """Tests for requests arriving while nix-darwin data loads."""
+
+    def test_request_waits_for_background_load(self):
+        """Test that a request during background loading waits for it instead of loading again."""
+
+        async def main():
+            async def slow_load(**kwargs):
+                await asyncio.sleep(0.1)
+
+            client = MagicMock(spec=DarwinClient)
+            client.load_options = AsyncMock(side_effect=slow_load)
+            client.search_options = AsyncMock(return_value=[{"name": "system.defaults.dock.autohide"}])
+            context = DarwinContext(darwin_client=client, eager_loading_timeout=0.01)
+            context.client.total_options = 1
+            await context.startup()
+            assert context.status == "loading_background"
+
+            results = await context.search_options("dock")
+            return context, client, results
+
+        context, client, results = asyncio.run(main())
+        assert results == [{"name": "system.defaults.dock.autohide"}]
+        assert context.status == "loaded"
+        assert client.load_options.await_count == 2  # The timed-out eager load and the background load
+        stats = context.ready.get_stats()
+        assert stats["waits"] == 1
+        assert stats["timeouts"] == 0
+
+    def test_request_answers_after_deadline(self):
+        """Test that a request stops waiting at the deadline and the client answers from what it has."""
+
+        async def main():
+            client = MagicMock(spec=DarwinClient)
+            client.search_options = AsyncMock(return_value=[])
+            context = DarwinContext(darwin_client=client)
+            context.status = "loading_background"
+            context.ready_timeout = 0.02
+            with mock.patch.object(client, "load_options", AsyncMock()) as load:
+                results = await context.search_options("dock")
+            load.assert_not_awaited()
+            return context, results
+
+        context, results = asyncio.run(main())
+        assert results == []
+        assert context.ready.get_stats()["timeouts"] == 1
+        assert "ready_wait" in asyncio.run(context.get_status())
@@ -0,0 +1,106 @@
+"""Tests for skipping the parse of documentation pages whose content is unchanged."""
+
+import tempfile
+import time
+from unittest import mock
+
+import pytest
+
+# Mark as unit tests (not integration)
+pytestmark = [pytest.mark.unit, pytest.mark.not_integration]
+
+from mcp_nixos.clients.home_manager_client import HomeManagerClient
+from mcp_nixos.clients.html_client import HTMLClient
+from mcp_nixos.utils.source_digest import DigestStats, content_digest
+from tests.clients.test_home_manager_parser import FIXTURE
+
+
+class TestDigestStats:
+    """Tests for content_digest and DigestStats."""
+
+    def test_content_digest(self):
+        """Test that digests are stable and tell different content apart."""
+        assert content_digest("<html/>") == content_digest("<html/>")
+        assert content_digest("<html/>") != content_digest("<html />")
+        assert len(content_digest("ü")) == 64
+
+    def test_stats(self):
+        """Test counting hits and misses."""
+        stats = DigestStats()
+        assert stats.get_stats() == {"hits": 0, "misses": 0, "last_result": None, "last_url": None, "hit_ratio": 0.0}
+        stats.record(True, "a")
+        stats.record(True, "b")
+        stats.record(False, "c")
+        result = stats.get_stats()
+        assert (result["hits"], result["misses"], result["last_result"], result["last_url"]) == (2, 1, "miss", "c")
+        assert result["hit_ratio"] == pytest.approx(2 / 3)
+
+
+class TestHomeManagerDigests:
+    """Tests for renewing an expired Home Manager snapshot by page digest."""
+
+    def setup_method(self):
+        """Set up a cache directory and the pages served from the "web"."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict("os.environ", {"MCP_NIXOS_PREBUILT_INDEX_DIR": ""})
+        self.env.start()
+        self.pages = {
+            "options": FIXTURE.read_text(),
+            "nixos-options": "<html><body></body></html>",
+            "nix-darwin-options": "<html><body><p>nothing here</p></body></html>",
+        }
+
+    def teardown_method(self):
+        """Tear down test fixtures."""
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def _load(self, later=0):
+        """Load into a new client at a time ``later`` seconds from now, counting parses."""
+        client = HomeManagerClient()
+        client.html_client = HTMLClient(cache_dir=self.temp_dir.name, ttl=3600)
+        client.parse_workers = 0
+        urls = {url: doc_type for doc_type, url in client.hm_urls.items()}
+        client.fetch_url = lambda url, force_refresh=False, consumer=None: self.pages[urls[url]]
+        client.parse_html = mock.MagicMock(side_effect=HomeManagerClient().parse_html)
+        with mock.patch("time.time", return_value=time.time() + later):
+            client._load_data_internal()
+        return client
+
+    def test_identical_pages_skip_parse(self):
+        """Test that pages downloaded again with the recorded digests renew the expired snapshot."""
+        first = self._load()
+        assert first.parse_html.call_count == 3
+        assert set(first.index.source_digests) == set(first.hm_urls.values())
+
+        client = self._load(later=7200)
+        client.parse_html.assert_not_called()
+        assert client.index.origin in ("shared", "cache")
+        assert client.index.source_digests == first.index.source_digests
+        assert sorted(client.options) == sorted(first.options)
+        stats = client.digest_stats.get_stats()
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (3, 0, 1.0)
+
+        # Renewed: an hour after the revalidation the snapshot is fresh again, no download needed
+        assert self._load(later=7200 + 1800).digest_stats.get_stats()["hits"] == 0
+
+    def test_changed_page_is_parsed(self):
+        """Test that a page whose digest differs is parsed again and its new digest recorded."""
+        self._load()
+        self.pages["nixos-options"] = "<html><body><p>changed</p></body></html>"
+        client = self._load(later=7200)
+        assert client.parse_html.call_count == 3
+        assert client.digest_stats.get_stats()["misses"] == 1
+        assert client.index.source_digests[client.hm_urls["nixos-options"]] == content_digest(
+            self.pages["nixos-options"]
+        )
+        assert "source_digest_checks" not in client.get_stats()  # Reported in the context status
+
+    def test_snapshot_without_digests_is_parsed(self):
+        """Test that a snapshot written before digests were recorded counts as a miss."""
+        first = self._load()
+        first.index.source_digests = {}
+        assert first._save_in_memory_data()
+        client = self._load(later=7200)
+        assert client.parse_html.call_count == 3
+        assert client.digest_stats.get_stats()["misses"] == 1